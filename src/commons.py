@@ -197,6 +197,9 @@ Allgatherv = lambda sendbuf, recvbuf: comm.Allgatherv(
     buf_and_dtype(sendbuf), recvbuf)
 Allreduce = lambda sendbuf, recvbuf, op=MPI.SUM: comm.Allreduce(
     buf_and_dtype(sendbuf), recvbuf, op)
+Alltoall = lambda sendbuf, recvbuf: comm.Alltoall(
+    buf_and_dtype(sendbuf), buf_and_dtype(recvbuf))
+Alltoallv = lambda sendbuf, recvbuf: comm.Alltoallv(sendbuf, recvbuf)
 Barrier = comm.Barrier
 Bcast = lambda buf, root=master_rank: comm.Bcast(buf_and_dtype(buf), root)
 Gather = lambda sendbuf, recvbuf, root=master_rank: comm.Gather(
@@ -2458,6 +2461,7 @@ def to_rgbα(value, α=1, *, collective=False):
 cython.declare(
     # Input/output
     initial_conditions=object,  # str or container of str's
+    initial_conditions_streaming='bint',
     output_dirs=dict,
     output_bases=dict,
     output_times=dict,
@@ -2480,6 +2484,7 @@ cython.declare(
     potential_options=dict,
     ewald_gridsize='Py_ssize_t',
     shortrange_params=dict,
+    treenonperiodic_opening_angle='double',
     powerspec_options=dict,
     bispec_options=dict,
     bispec_antialiasing='bint',
@@ -2514,9 +2519,12 @@ cython.declare(
     Δa_max_late='double',
     static_timestepping=object,  # str, callable or None
     N_rungs='Py_ssize_t',
+    num_threads='int',
     fftw_wisdom_rigor=str,
     fftw_wisdom_reuse='bint',
     fftw_wisdom_share='bint',
+    memory_budget='double',
+    domain_balancing=dict,
     random_generator=str,
     random_seeds=dict,
     primordial_noise_imprinting=str,
@@ -2537,6 +2545,8 @@ cython.declare(
     render3D_options=dict,
     # Debugging options
     print_load_imbalance=object,
+    print_memory_usage=object,
+    print_exchange_cost='bint',
     allow_snapshot_multifile_singleload='bint',
     particle_reordering=object,
     enable_Hubble='bint',
@@ -2547,6 +2557,8 @@ cython.declare(
 # Input/output
 initial_conditions = user_params.get('initial_conditions', '')
 user_params['initial_conditions'] = initial_conditions
+initial_conditions_streaming = bool(user_params.get('initial_conditions_streaming', False))
+user_params['initial_conditions_streaming'] = initial_conditions_streaming
 output_kinds = ('snapshot', 'powerspec', 'bispec', 'render2D', 'render3D')
 if isinstance(user_params.get('output_dirs'), str):
     output_dirs = {
@@ -2967,12 +2979,14 @@ valid_potential_options = {
     'deconvolve',
     'interlace',
     'differentiation',
+    'fuse',
+    'precision',
 }
 for key in potential_options:
     if key not in valid_potential_options:
         abort(f'Option "{key}" in potential_options not understood')
 potential_forces_implemented = {
-    'gravity': ['pm', 'p3m'],  # Default force
+    'gravity': ['pm', 'p3m', 'tree'],  # Default force
     'lapse': ['pm'],
 }
 potential_methods_implemented = set(itertools.chain(*potential_forces_implemented.values()))
@@ -3064,8 +3078,9 @@ potential_options['gridsize'] = potential_gridsizes
 interpolation_orders = {'NGP': 1, 'CIC': 2, 'TSC': 3, 'PCS': 4}
 force_interpolations = {
     'gravity': {
-        'pm' : 'CIC',
-        'p3m': 'CIC',
+        'pm'  : 'CIC',
+        'p3m' : 'CIC',
+        'tree': 'CIC',
     },
     'lapse': {
         'pm': 'CIC',
@@ -3080,7 +3095,7 @@ for key, val in replace_ellipsis(dict(potential_options.get('interpolation', {})
     elif isinstance(val, (tuple, list)):
         force_interpolations[key][val[0].lower()] = val[1]
     elif isinstance(val, str):
-        force_interpolations[key] = {'pm': val.lower(), 'p3m': val.lower()}
+        force_interpolations[key] = {'pm': val.lower(), 'p3m': val.lower(), 'tree': val.lower()}
     else:
         abort('Could not interpret the potential_options["interpolation"] parameter')
 for key, val in force_interpolations.copy().items():
@@ -3101,8 +3116,9 @@ PotentialUpstreamDownstreamPair = collections.namedtuple(
 )
 force_deconvolutions = {
     'gravity': {
-        'pm' : PotentialUpstreamDownstreamPair(True, True),
-        'p3m': PotentialUpstreamDownstreamPair(True, True),
+        'pm'  : PotentialUpstreamDownstreamPair(True, True),
+        'p3m' : PotentialUpstreamDownstreamPair(True, True),
+        'tree': PotentialUpstreamDownstreamPair(True, True),
     },
     'lapse': {
         'pm' : PotentialUpstreamDownstreamPair(True, True),
@@ -3115,7 +3131,7 @@ for key, val in replace_ellipsis(dict(potential_options.get('deconvolve', {}))).
             subd_key.lower(): subd_val for subd_key, subd_val in replace_ellipsis(val).items()
         })
     else:
-        force_deconvolutions[key] = {'pm': val, 'p3m': val}
+        force_deconvolutions[key] = {'pm': val, 'p3m': val, 'tree': val}
     for key2, val2 in force_deconvolutions[key].copy().items():
         val2 = any2list(val2)
         if len(val2) == 1:
@@ -3140,8 +3156,9 @@ for key, val in force_deconvolutions.copy().items():
 potential_options['deconvolve'] = force_deconvolutions
 force_interlacings = {
     'gravity': {
-        'pm' : PotentialUpstreamDownstreamPair('sc', 'sc'),
-        'p3m': PotentialUpstreamDownstreamPair('sc', 'sc'),
+        'pm'  : PotentialUpstreamDownstreamPair('sc', 'sc'),
+        'p3m' : PotentialUpstreamDownstreamPair('sc', 'sc'),
+        'tree': PotentialUpstreamDownstreamPair('sc', 'sc'),
     },
     'lapse': {
         'pm' : PotentialUpstreamDownstreamPair('sc', 'sc'),
@@ -3163,8 +3180,9 @@ for key, val in replace_ellipsis(dict(potential_options.get('interlace', {}))).i
         })
     else:
         force_interlacings[key] = {
-            'pm' : interlace2latticekind(val),
-            'p3m': interlace2latticekind(val),
+            'pm'  : interlace2latticekind(val),
+            'p3m' : interlace2latticekind(val),
+            'tree': interlace2latticekind(val),
         }
     for key2, val2 in force_interlacings[key].copy().items():
         val2 = any2list(val2)
@@ -3190,8 +3208,9 @@ for key, val in force_interlacings.copy().items():
 potential_options['interlace'] = force_interlacings
 potential_differentiations_default = {
     'gravity': {
-        'pm' : 2,
-        'p3m': 4,
+        'pm'  : 2,
+        'p3m' : 4,
+        'tree': 4,
     },
     'lapse': {
         'pm': 2,
@@ -3212,9 +3231,11 @@ for name, d in potential_differentiations_input.items():
         elif isinstance(val, (tuple, list)):
             potential_differentiations[name][key][val[0].lower()] = val[1]
         elif isinstance(val, (int, float, np.integer, np.floating)):
-            potential_differentiations[name][key] = {'pm': int(round(val)), 'p3m': int(round(val))}
+            potential_differentiations[name][key] = {
+                'pm': int(round(val)), 'p3m': int(round(val)), 'tree': int(round(val)),
+            }
         elif isinstance(val, str):
-            potential_differentiations[name][key] = {'pm': val, 'p3m': val}
+            potential_differentiations[name][key] = {'pm': val, 'p3m': val, 'tree': val}
         else:
             abort('Could not interpret the potential_options["differentiation"] parameter')
     for key, val in potential_differentiations[name].copy().items():
@@ -3234,6 +3255,41 @@ for name, d in potential_differentiations_input.items():
             subd[subd_key] = subd_val
         potential_differentiations[name][key] = subd
 potential_options['differentiation'] = potential_differentiations
+potential_options['fuse'] = bool(potential_options.get('fuse', False))
+force_precisions = {
+    'gravity': {
+        'pm'  : 'double',
+        'p3m' : 'double',
+        'tree': 'double',
+    },
+    'lapse': {
+        'pm': 'double',
+    },
+}
+for key, val in replace_ellipsis(dict(potential_options.get('precision', {}))).items():
+    key = key.lower()
+    if isinstance(val, dict):
+        force_precisions[key].update({
+            subd_key.lower(): subd_val for subd_key, subd_val in replace_ellipsis(val).items()
+        })
+    elif isinstance(val, (tuple, list)):
+        force_precisions[key][val[0].lower()] = val[1]
+    elif isinstance(val, str):
+        force_precisions[key] = {'pm': val, 'p3m': val, 'tree': val}
+    else:
+        abort('Could not interpret the potential_options["precision"] parameter')
+for key, val in force_precisions.copy().items():
+    subd = {}
+    for subd_key, subd_val in val.items():
+        subd_key = re.sub(r'[ _\-^()]', '', subd_key.lower())
+        for n in range(10):
+            subd_key = subd_key.replace(unicode_superscript(str(n)), str(n))
+        subd_val = str(subd_val).lower()
+        if subd_val not in ('double', 'single'):
+            abort(f'Invalid potential_options["precision"] value {subd_val}')
+        subd[subd_key] = subd_val
+    force_precisions[key] = subd
+potential_options['precision'] = force_precisions
 user_params['potential_options'] = potential_options
 ewald_gridsize = to_int(user_params.get('ewald_gridsize', 64))
 user_params['ewald_gridsize'] = ewald_gridsize
@@ -3260,23 +3316,28 @@ shortrange_params_defaults = {
         'tablesize': -1,
     },
     'gravity': {
-        'scale'    : '1.25*boxsize/gridsize',
-        'range'    : '4.5*scale',
-        'tilesize' : 'range',
-        'subtiling': 'automatic',
-        'tablesize': 2**12,
+        'scale'              : '1.25*boxsize/gridsize',
+        'range'              : '4.5*scale',
+        'tilesize'           : 'range',
+        'subtiling'          : 'automatic',
+        'tablesize'          : 2**12,
+        'table interpolation': 'NGP',
+        'opening angle'      : 0.5,
+        'skin'               : 0,
+        'precision'          : 'double',
     },
 }
 for force, d in shortrange_params_defaults.items():
     shortrange_params.setdefault(force, d)
 subtiling_refinement_period_default = 16
+subtiling_adaptive_particles_default = 11
 for force, d in shortrange_params.items():
     for key, val in shortrange_params_defaults.get(force, {}).items():
         d.setdefault(key, val)
     scale = d.get('scale')
     if isinstance(scale, str) and 'N' in scale:
         scale = d['scale'] = {'all': scale}
-    keys = ['scale', 'range', 'tilesize']
+    keys = ['scale', 'range', 'tilesize', 'skin']
     if isinstance(scale, dict):
         keys.remove('scale')
         forcerange = d.get('range')
@@ -3292,6 +3353,10 @@ for force, d in shortrange_params.items():
         val = val.replace('boxsize', str(boxsize))
         if 'gridsize' in val:
             gridsize = potential_options['gridsize']['global'][force]['p3m']
+            if gridsize == -1:
+                # Fall back to the grid size of the TreePM method,
+                # which shares the short-range parameters with P³M.
+                gridsize = potential_options['gridsize']['global'][force].get('tree', -1)
             if gridsize == -1:
                 if user_specification_involves_gridsize[force]:
                     abort(
@@ -3325,10 +3390,17 @@ for force, d in shortrange_params.items():
                 )
             val = val.replace('range', str(forcerange))
         d[key] = eval_unit(val)
+    # The neighbour lists used with a positive skin contain particle
+    # pairs separated by up to the range plus the skin, all of which
+    # must be found within neighbouring tiles.
+    if d.get('skin', 0) > 0 and isinstance(d.get('range'), (int, float, np.integer, np.floating)):
+        d['tilesize'] = max(d['tilesize'], d['range'] + d['skin'])
     subtiling = d.get('subtiling', (1, 1, 1))
     if isinstance(subtiling, str):
         if subtiling.lower().startswith('auto'):
             d['subtiling'] = ('automatic', subtiling_refinement_period_default)
+        elif subtiling.lower().startswith('adapt'):
+            d['subtiling'] = ('adaptive', subtiling_adaptive_particles_default)
         else:
             abort(
                 f'Could not understand subtiling = "{subtiling}" of shortrange_params["{force}"]'
@@ -3340,17 +3412,29 @@ for force, d in shortrange_params.items():
             if isinstance(subtiling, str):
                 if subtiling.lower().startswith('auto'):
                     subtiling = ('automatic', subtiling_refinement_period_default)
+                elif subtiling.lower().startswith('adapt'):
+                    subtiling = ('adaptive', subtiling_adaptive_particles_default)
             else:
                 subtiling = (int(subtiling),)*3
         elif len(subtiling) == 2:
             if isinstance(subtiling[1], str):
-                subtiling = (subtiling[1], int(subtiling[0]))
+                subtiling = (subtiling[1], subtiling[0])
             if isinstance(subtiling[0], str) and subtiling[0].lower().startswith('auto'):
                 subtiling = ('automatic', int(subtiling[1]))
+            elif isinstance(subtiling[0], str) and subtiling[0].lower().startswith('adapt'):
+                subtiling = ('adaptive', float(subtiling[1]))
         d['subtiling'] = subtiling
     tablesize = int(round(d.get('tablesize', -1)))
     d['tablesize'] = tablesize
+    if 'opening angle' in d:
+        d['opening angle'] = float(d['opening angle'])
+    if 'table interpolation' in d:
+        d['table interpolation'] = str(d['table interpolation']).lower()
+    if 'precision' in d:
+        d['precision'] = str(d['precision']).lower()
 user_params['shortrange_params'] = shortrange_params
+treenonperiodic_opening_angle = float(user_params.get('treenonperiodic_opening_angle', 0.5))
+user_params['treenonperiodic_opening_angle'] = treenonperiodic_opening_angle
 powerspec_options_defaults = {
     'upstream gridsize': {
         'default': -1,
@@ -3665,7 +3749,7 @@ default_force_method = {
     'gravity': 'p3m',
     'lapse'  : 'pm',
 }
-methods_implemented = ('ppnonperiodic', 'pp', 'p3m', 'pm')
+methods_implemented = ('ppnonperiodic', 'treenonperiodic', 'pp', 'p3m', 'tree', 'pm')
 select_forces = {}
 for key, val in replace_ellipsis(dict(user_params.get('select_forces', {}))).items():
     key = key.lower()
@@ -3689,9 +3773,12 @@ if not select_forces:
         if methods == {'pm'}:
             select_forces['particles'].setdefault(key_force, 'pm')
             select_forces['fluid'    ].setdefault(key_force, 'pm')
-        elif methods in ({'p3m'}, {'pm', 'p3m'}):
+        elif 'p3m' in methods and methods <= {'pm', 'p3m', 'tree'}:
             select_forces['particles'].setdefault(key_force, 'p3m')
             select_forces['fluid'    ].setdefault(key_force, 'pm')
+        elif methods in ({'tree'}, {'pm', 'tree'}):
+            select_forces['particles'].setdefault(key_force, 'tree')
+            select_forces['fluid'    ].setdefault(key_force, 'pm')
         else:
             abort(
                 f'Force methods "{methods}" from potential_options["gridsize"]["global"]["{key_force}""] '
@@ -3890,12 +3977,46 @@ if static_timestepping == '':
 user_params['static_timestepping'] = static_timestepping
 N_rungs = int(user_params.get('N_rungs', 8))
 user_params['N_rungs'] = N_rungs
+num_threads = int(user_params.get('num_threads', 1))
+user_params['num_threads'] = num_threads
 fftw_wisdom_rigor = user_params.get('fftw_wisdom_rigor', 'measure').lower()
 user_params['fftw_wisdom_rigor'] = fftw_wisdom_rigor
 fftw_wisdom_reuse = bool(user_params.get('fftw_wisdom_reuse', True))
 user_params['fftw_wisdom_reuse'] = fftw_wisdom_reuse
 fftw_wisdom_share = bool(user_params.get('fftw_wisdom_share', False))
 user_params['fftw_wisdom_share'] = fftw_wisdom_share
+memory_budget_input = user_params.get('memory_budget')
+if memory_budget_input is None:
+    memory_budget_input = -1
+if isinstance(memory_budget_input, str):
+    match = re.fullmatch(
+        r'\s*([0-9.eE+\-]+)\s*(B|kB|MB|GB|TB|KiB|MiB|GiB|TiB)?\s*',
+        memory_budget_input,
+    )
+    if not match:
+        abort(f'Could not interpret memory_budget = "{memory_budget_input}"')
+    memory_budget_input = float(match.group(1))*{
+        None: 1, 'B': 1,
+        'kB': 1e+3, 'MB': 1e+6, 'GB': 1e+9, 'TB': 1e+12,
+        'KiB': 2**10, 'MiB': 2**20, 'GiB': 2**30, 'TiB': 2**40,
+    }[match.group(2)]
+memory_budget = float(memory_budget_input)
+user_params['memory_budget'] = memory_budget
+domain_balancing = {'dynamic': False, 'period': 8, 'tolerance': 0.25}
+if 'domain_balancing' in user_params:
+    if isinstance(user_params['domain_balancing'], dict):
+        for key, val in user_params['domain_balancing'].items():
+            if key not in domain_balancing:
+                abort(f'Key "{key}" in domain_balancing not understood')
+            domain_balancing[key] = val
+    else:
+        domain_balancing['dynamic'] = user_params['domain_balancing']
+domain_balancing['dynamic'] = bool(domain_balancing['dynamic'])
+domain_balancing['period'] = to_int(domain_balancing['period'])
+if domain_balancing['period'] < 1:
+    abort(f'domain_balancing["period"] = {domain_balancing["period"]} < 1')
+domain_balancing['tolerance'] = float(domain_balancing['tolerance'])
+user_params['domain_balancing'] = domain_balancing
 random_generator = user_params.get('random_generator', 'PCG64DXSM')
 user_params['random_generator'] = random_generator
 random_seeds_default = {
@@ -3913,10 +4034,10 @@ for key in random_seeds.keys():
 primordial_noise_imprinting = str(
     user_params.get('primordial_noise_imprinting', 'distributed')
 ).lower()
-if primordial_noise_imprinting not in {'simple', 'distributed'}:
+if primordial_noise_imprinting not in {'simple', 'distributed', 'counter'}:
     abort(
         f'primordial_noise_imprinting = "{primordial_noise_imprinting}" '
-        f'∉ {{"simple", "distributed"}}'
+        f'∉ {{"simple", "distributed", "counter"}}'
     )
 user_params['primordial_noise_imprinting'] = primordial_noise_imprinting
 primordial_amplitude_fixed = bool(user_params.get('primordial_amplitude_fixed', False))
@@ -4306,6 +4427,12 @@ print_load_imbalance = user_params.get('print_load_imbalance', True)
 if isinstance(print_load_imbalance, str):
     print_load_imbalance = print_load_imbalance.lower()
 user_params['print_load_imbalance'] = print_load_imbalance
+print_memory_usage = user_params.get('print_memory_usage', False)
+if isinstance(print_memory_usage, str):
+    print_memory_usage = print_memory_usage.lower()
+user_params['print_memory_usage'] = print_memory_usage
+print_exchange_cost = bool(user_params.get('print_exchange_cost', False))
+user_params['print_exchange_cost'] = print_exchange_cost
 allow_snapshot_multifile_singleload = user_params.get(
     'allow_snapshot_multifile_singleload', False,
 )
@@ -5877,12 +6004,21 @@ for key, d in shortrange_params.items():
                     f'shortrange_params["{key}"]["subtiling"] == {subtiling}, '
                     f'but must be at least 1 in every direction.'
                 )
+    elif len(subtiling) == 2 and subtiling[0] == 'adaptive':
+        # The second value is the targeted mean number of particles
+        # within each subtile.
+        if subtiling[1] <= 0:
+            abort(
+                f'shortrange_params["{key}"]["subtiling"] == {subtiling}, '
+                f'but the number of particles per subtile must be positive.'
+            )
     elif len(subtiling) == 2:
         if not (subtiling[0] == 'automatic' and isinstance(subtiling[1], (int, np.integer))):
             abort(
                 f'shortrange_params["{key}"]["subtiling"] == {subtiling}. '
                 f'When two values are specified, the first should be the str "automatic" '
-                f'and the second should be an int specifying the subtiling refinement period.'
+                f'(or "adaptive") and the second should be an int specifying the subtiling '
+                f'refinement period (or the number of particles per subtile).'
             )
         # The subtiling refinement period needs to be at least 7 for the
         # automatic subtiling refinement scheme to function properly.
@@ -5927,6 +6063,17 @@ if N_rungs == 1 and Δt_rung_factor != 1:
         f'You are running without rungs (N_rungs = 1), but have set '
         f'Δt_rung_factor = {Δt_rung_factor}. This value does not matter.'
     )
+# Abort on non-positive number of threads. Threads are only used by
+# compiled code, and so we fall back to a single thread per process
+# when running in pure Python mode.
+if num_threads < 1:
+    abort(f'num_threads = {num_threads}, but at least one thread must be used')
+if num_threads > 1 and not cython.compiled:
+    masterwarn(
+        f'You have specified num_threads = {num_threads}, but threads are only used '
+        f'in compiled mode. Running with a single thread per process.'
+    )
+    num_threads = 1
 # Abort on illegal FFTW rigour
 if fftw_wisdom_rigor not in ('estimate', 'measure', 'patient', 'exhaustive'):
     abort('Does not recognise FFTW rigour "{}"'.format(user_params['fftw_wisdom_rigor']))
@@ -5983,11 +6130,37 @@ if autosave_interval < 0:
 # Check keys and values in shortrange_params
 for d in shortrange_params.values():
     for key, val in d.items():
-        if key not in {'scale', 'range', 'tilesize', 'subtiling', 'tablesize'}:
+        if key not in {
+            'scale', 'range', 'tilesize', 'subtiling', 'tablesize', 'table interpolation',
+            'opening angle', 'skin', 'precision',
+        }:
             masterwarn(f'Unrecognised parameter "{key}" in shortrange_params')
         if key == 'subtiling':
-            if isinstance(val, str) and val != 'automatic':
+            if isinstance(val, str) and val not in {'automatic', 'adaptive'}:
                 abort(f'Failed to interpret subtiling "{val}"')
+        if key == 'opening angle':
+            if val < 0:
+                abort(f'The opening angle in shortrange_params must be non-negative, not {val}')
+        if key == 'table interpolation':
+            if val not in {'ngp', 'linear', 'cubic'}:
+                abort(
+                    f'The table interpolation in shortrange_params must be one of '
+                    f'"NGP", "linear" or "cubic", not "{val}"'
+                )
+        if key == 'skin':
+            if val < 0:
+                abort(f'The skin in shortrange_params must be non-negative, not {val}')
+        if key == 'precision':
+            if val not in {'double', 'single'}:
+                abort(
+                    f'The precision in shortrange_params must be either '
+                    f'"double" or "single", not "{val}"'
+                )
+if treenonperiodic_opening_angle < 0:
+    abort(
+        f'The treenonperiodic_opening_angle must be non-negative, '
+        f'not {treenonperiodic_opening_angle}'
+    )
 # Replace h in power spectrum top-hat filter
 d = powerspec_options['tophat']
 for key, val in d.copy().items():
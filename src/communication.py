@@ -64,72 +64,17 @@ def partition(size):
     include_mom='bint',
     progress_msg='bint',
     # Locals
-    data_mv='double[::1]',
-    data_mvs=list,
-    dim='int',
-    ids='Py_ssize_t*',
-    ids_mv='Py_ssize_t[::1]',
     indexᵖ='Py_ssize_t',
-    indexᵖ_end_i='Py_ssize_t',
-    indexᵖ_hole_bgn='Py_ssize_t',
-    indexᵖ_hole_end='Py_ssize_t',
-    indexᵖ_i='Py_ssize_t',
-    indexᵖ_j='Py_ssize_t',
-    indexᵖ_j_bgn='Py_ssize_t',
-    indexᵖ_left='Py_ssize_t',
-    indexᵖ_recv_bgn_ℓ='Py_ssize_t',
-    indexᵖ_right='Py_ssize_t',
-    indexᵖ_send_bgn_i='Py_ssize_t',
-    indexᵖ_send_bgn_ℓ='Py_ssize_t',
-    indexᵖ_send_end_i='Py_ssize_t',
-    indexᵖ_send_end_ℓ='Py_ssize_t',
-    indexʳ_i='Py_ssize_t',
-    indexʳ_j='Py_ssize_t',
-    indexʳ_left='Py_ssize_t',
-    indexʳ_recv_bgn_ℓ='Py_ssize_t',
-    indexʳ_right='Py_ssize_t',
-    indexʳ_send_bgn_ℓ='Py_ssize_t',
-    indexʳ_send_end_ℓ='Py_ssize_t',
     indexˣ='Py_ssize_t',
-    indexˣ_hole='Py_ssize_t',
-    indexˣ_i='Py_ssize_t',
-    indexˣ_j='Py_ssize_t',
-    indexˣ_left='Py_ssize_t',
-    indexˣ_right='Py_ssize_t',
-    mom='double*',
-    mom_mv='double[::1]',
-    n_particles_recv_tot='Py_ssize_t',
-    n_particles_recv_ℓ='Py_ssize_t',
-    n_particles_send_max='Py_ssize_t',
     n_particles_send_tot='Py_ssize_t',
     n_particles_send_tot_global='Py_ssize_t',
-    n_particles_send_ℓ='Py_ssize_t',
-    n_particles_store='Py_ssize_t',
-    particles_leftover='bint',
-    pos='double*',
-    pos_mv='double[::1]',
     posxˣ='double*',
     posyˣ='double*',
     poszˣ='double*',
-    rank_left='int',
     rank_other='int',
-    rank_other_i='int',
-    rank_other_j='int',
-    rank_recv='int',
-    rank_right='int',
-    rank_send='int',
-    rung_index='signed char',
-    rung_index_i='signed char',
-    rung_index_j='signed char',
-    rung_index_left='signed char',
-    rung_index_right='signed char',
-    rung_indices='signed char*',
-    rung_indices_jumped='signed char*',
-    rung_indices_mv='signed char[::1]',
-    rungs_N='Py_ssize_t*',
-    Δmom='double*',
-    Δmom_mv='double[::1]',
-    ℓ='int',
+    ranks='int*',
+    ranks_mv='int[::1]',
+    time_bgn='double',
     returns='void',
 )
 def exchange(component, include_mom=True, progress_msg=False):
@@ -138,42 +83,36 @@ def exchange(component, include_mom=True, progress_msg=False):
     domain where the particle is located.
     The particle data to be exchanged is:
       - pos
-      - mom
-      - Δmom
+      - mom          (if include_mom is True)
+      - Δmom         (if include_mom is True)
       - ids          (if IDs   are used by the component)
       - rung_indices (if rungs are used by the component)
     We do not communicate rung jumps, as it is expected that no such
     jumps are flagged when calling this function.
     The overall scheme for the particle exchange is this:
-      - Locate non-local particles at the left end of the particle array
-        and swap them with local particles at the right end. This leaves
-        all non-local particles to the right of all local particles.
-        Keep track of the total number of non-local particles
-        to send to each process.
-      - Go over the now contiguous sub-list of non-local particles and
-        swap them so that they are ordered by the process
+      - Find the process to which each particle belongs, once and for
+        all, counting up the number of particles to send to each
+        process.
+      - Sort the indices of the non-local particles by the process
+        they belong to, once and for all.
+      - Pack all data of the non-local particles into a single send
+        buffer of interleaved particle records, ordered by the process
         they belong to.
-      - Send the non-local particles to each non-local process.
-        When receiving, do so directly into the component data arrays,
-        to the right of even the non-local particles.
-        The data arrays then need to be expanded first.
-      - Once particles have been exchanged to all processes,
-        move the received data to the left where the
-        non-local particles used to be.
-      - In all of the above, the only particle buffer memory needed
-        (not counting buffers of size nprocs) are that which is used to
-        receive the particle data. Still, to keep this to a minimum,
-        a maximum number of particles to be sent to each process
-        is introduced. If more particles should be exchanged than this,
-        the above steps are simply repeated in a second round
-        of exchange. Note that after the first step, the left part of
-        the particles are guaranteed to be local, so we start at the end
-        of these when searching for non-local particles.
-        Likewise, particles appearing further to the right than already
-        dealt with will have to be have come there by receiving them
-        from other processes, implying that they are local. The window
-        of particles to check then shrinks from both sides
-        as more and more exchanges take place.
+      - Send and receive all records using a single Alltoallv, receiving
+        into a receive buffer of records. These are then unpacked into
+        the component data arrays, to the right of all of the
+        particles. The data arrays then need to be expanded first.
+      - Move the local particles to the left, filling up the holes left
+        by the sent particles while retaining their order, followed by
+        the received particles.
+      - The send and receive buffers hold the records of all particles
+        to be exchanged by the process. When a memory_budget is set,
+        the exchange is split into a (minimal) number of rounds, in each
+        of which the records sent and received by every process fit
+        within a quarter of the budget.
+    The time spent, the number of particles and bytes communicated and
+    the number of rounds are recorded, for use with
+    report_exchange_cost().
     """
     # No need to consider exchange of particles if running serially
     if 𝔹[nprocs == 1]:
@@ -183,324 +122,30 @@ def exchange(component, include_mom=True, progress_msg=False):
         return
     if progress_msg:
         masterprint(f'Exchanging {component.name} particles between processes ...')
-    # Maximum number of particles allowed to be sent
-    # to each process at a time.
-    n_particles_send_max = 2**17
-    # Carry out exchanges as long as we have particles to communicate
-    particles_leftover = True
-    indexᵖ_left = 0
-    indexᵖ_right = component.N_local - 1
-    while particles_leftover:
-        particles_leftover = False
-        # Extract pointers
-        posxˣ               = component.posxˣ
-        posyˣ               = component.posyˣ
-        poszˣ               = component.poszˣ
-        pos                 = component.pos
-        mom                 = component.mom
-        Δmom                = component.Δmom
-        ids                 = component.ids
-        rung_indices        = component.rung_indices
-        rung_indices_jumped = component.rung_indices_jumped
-        # Sweep over the particles from the left and right
-        # simultaneously, matching a left non-local particle with a
-        # right local particle and swapping them. Keep a tally of the
-        # total number of non-local particles belonging to each process.
-        for rank_other in range(nprocs):
-            n_particles_send[rank_other] = 0
-        indexˣ_left  = 3*indexᵖ_left
-        indexˣ_right = 3*indexᵖ_right
-        while indexᵖ_left <= indexᵖ_right and not particles_leftover:
-            rank_left = which_domain(
-                posxˣ[indexˣ_left],
-                posyˣ[indexˣ_left],
-                poszˣ[indexˣ_left],
-            )
-            if rank_left == rank:
-                # Local left particle found
-                indexᵖ_left += 1
-                indexˣ_left += 3
-                continue
-            # Non-local left particle found
-            if n_particles_send[rank_left] == n_particles_send_max:
-                # Send limit reached for left process
-                particles_leftover = True
-                break
-            # Pair non-local left particle with local right particle
-            while indexᵖ_left <= indexᵖ_right:
-                rank_right = which_domain(
-                    posxˣ[indexˣ_right],
-                    posyˣ[indexˣ_right],
-                    poszˣ[indexˣ_right],
-                )
-                if rank_right == rank:
-                    # Local right particle found.
-                    # Increment send tally of left process.
-                    n_particles_send[rank_left] += 1
-                    # Swap non-local left with local right particle.
-                    for dim in range(3):
-                        indexʳ_left  = indexˣ_left  + dim
-                        indexʳ_right = indexˣ_right + dim
-                        pos[indexʳ_left], pos[indexʳ_right] = pos[indexʳ_right], pos[indexʳ_left]
-                    with unswitch(2):
-                        if include_mom:
-                            for dim in range(3):
-                                indexʳ_left  = indexˣ_left  + dim
-                                indexʳ_right = indexˣ_right + dim
-                                mom[indexʳ_left], mom[indexʳ_right] = mom[indexʳ_right], mom[indexʳ_left]
-                            for dim in range(3):
-                                indexʳ_left  = indexˣ_left  + dim
-                                indexʳ_right = indexˣ_right + dim
-                                Δmom[indexʳ_left], Δmom[indexʳ_right] = Δmom[indexʳ_right], Δmom[indexʳ_left]
-                    with unswitch(2):
-                        if component.use_ids:
-                            ids[indexᵖ_left], ids[indexᵖ_right] = ids[indexᵖ_right], ids[indexᵖ_left]
-                    with unswitch(2):
-                        if component.use_rungs:
-                            rung_index_left  = rung_indices[indexᵖ_left]
-                            rung_index_right = rung_indices[indexᵖ_right]
-                            rung_indices[indexᵖ_left ] = rung_index_right
-                            rung_indices[indexᵖ_right] = rung_index_left
-                            # The jumped rung indices are equal to the
-                            # rung indices as we cannot have
-                            # upcoming jumps.
-                            rung_indices_jumped[indexᵖ_left ] = rung_index_right
-                            rung_indices_jumped[indexᵖ_right] = rung_index_left
-                    # Go to next left and right particles
-                    indexᵖ_left  += 1
-                    indexˣ_left  += 3
-                    indexᵖ_right -= 1
-                    indexˣ_right -= 3
-                    break
-                else:
-                    # Non-local right particle found
-                    if n_particles_send[rank_right] == n_particles_send_max:
-                        # Send limit reached for right process
-                        particles_leftover = True
-                        break
-                    # Increment send tally of right process,
-                    # leaving the left non-local particle hanging.
-                    n_particles_send[rank_right] += 1
-                    # Go to next right particle
-                    indexᵖ_right -= 1
-                    indexˣ_right -= 3
-                    continue
-        # No need to continue if no particles should be exchanged
-        n_particles_send_tot = sum(n_particles_send_mv)
-        n_particles_send_tot_global = allreduce(n_particles_send_tot, op=MPI.SUM)
-        if n_particles_send_tot_global == 0:
-            break
-        # If any process have more non-local particles than can be
-        # sent in one go, every process should know about it.
-        particles_leftover = allreduce(particles_leftover, op=MPI.LOR)
-        # Sort non-local right particles in order of rank
-        if n_particles_send_tot > 0:
-            # Construct beginning particle indices of each rank.
-            # The non-local particles of each rank should then end up
-            # in range(indicesᵖ_send_bgn[rank], indicesᵖ_send_bgn[rank] + n_particles_send[rank]).
-            indexᵖ = indexᵖ_right + 1
-            for rank_other in range(nprocs):
-                indicesᵖ_send_bgn[rank_other] = indexᵖ
-                indexᵖ += n_particles_send[rank_other]
-            # The running tally of the number of sorted particles will
-            # be stored in this array.
-            for rank_other in range(nprocs):
-                n_particles_sorted[rank_other] = 0
-            # Sweep over the non-local particles, swapping particles
-            # situated at wrong indices with the particle
-            # at their destination index.
-            indexᵖ_i = indexᵖ_right + 1
-            indexᵖ_end_i = indexᵖ_i + n_particles_send_tot
-            indexˣ_i = 3*indexᵖ_i
-            rank_other_i = 0
-            while indexᵖ_i < indexᵖ_end_i:
-                if rank_other_i == -1:
-                    rank_other_i = rank_other_j
-                else:
-                    rank_other_i = which_domain(
-                        posxˣ[indexˣ_i],
-                        posyˣ[indexˣ_i],
-                        poszˣ[indexˣ_i],
-                    )
-                indexᵖ_send_bgn_i = indicesᵖ_send_bgn[rank_other_i]
-                indexᵖ_send_end_i = indexᵖ_send_bgn_i + n_particles_send[rank_other_i]
-                if indexᵖ_send_bgn_i <= indexᵖ_i < indexᵖ_send_end_i:
-                    # Particle already situated correctly
-                    n_particles_sorted[rank_other_i] += 1
-                    indexᵖ_i += 1
-                    indexˣ_i += 3
-                    continue
-                # Locate index j where particle currently at i
-                # should be moved to.
-                indexᵖ_j_bgn = indexᵖ_send_bgn_i + n_particles_sorted[rank_other_i]
-                indexᵖ_j = indexᵖ_j_bgn
-                indexˣ_j = 3*indexᵖ_j
-                while True:
-                    rank_other_j = which_domain(
-                        posxˣ[indexˣ_j],
-                        posyˣ[indexˣ_j],
-                        poszˣ[indexˣ_j],
-                    )
-                    if rank_other_i != rank_other_j:
-                        break
-                    # Particle at j belongs to the same process as the
-                    # one at i. Skip along, counting the particle at j
-                    # as being sorted.
-                    indexᵖ_j += 1
-                    indexˣ_j += 3
-                n_particles_sorted[rank_other_i] += indexᵖ_j - indexᵖ_j_bgn
-                # Swap particle i and j
-                for dim in range(3):
-                    indexʳ_i = indexˣ_i + dim
-                    indexʳ_j = indexˣ_j + dim
-                    pos[indexʳ_i], pos[indexʳ_j] = pos[indexʳ_j], pos[indexʳ_i]
-                with unswitch(1):
-                    if include_mom:
-                        for dim in range(3):
-                            indexʳ_i = indexˣ_i + dim
-                            indexʳ_j = indexˣ_j + dim
-                            mom[indexʳ_i], mom[indexʳ_j] = mom[indexʳ_j], mom[indexʳ_i]
-                        for dim in range(3):
-                            indexʳ_i = indexˣ_i + dim
-                            indexʳ_j = indexˣ_j + dim
-                            Δmom[indexʳ_i], Δmom[indexʳ_j] = Δmom[indexʳ_j], Δmom[indexʳ_i]
-                with unswitch(1):
-                    if component.use_ids:
-                        ids[indexᵖ_i], ids[indexᵖ_j] = ids[indexᵖ_j], ids[indexᵖ_i]
-                with unswitch(1):
-                    if component.use_rungs:
-                        rung_index_i = rung_indices[indexᵖ_i]
-                        rung_index_j = rung_indices[indexᵖ_j]
-                        rung_indices[indexᵖ_i] = rung_index_j
-                        rung_indices[indexᵖ_j] = rung_index_i
-                        # The jumped rung indices are equal to the rung
-                        # indices as we cannot have upcoming jumps.
-                        rung_indices_jumped[indexᵖ_i] = rung_index_i
-                        rung_indices_jumped[indexᵖ_j] = rung_index_j
-                # The particle previous at i is now situated correctly,
-                # but the swapped in particle (the one previously at j)
-                # may now be incorrectly placed.
-                # Continue without incrementing indexᵖ_i and indexˣ_i.
-                n_particles_sorted[rank_other_i] += 1
-                rank_other_i = -1  # flag as being equal to rank_other_j
-                continue
-        # Find out how many particles to receive
-        n_particles_recv_tot = 0
-        for ℓ in range(1, nprocs):
-            rank_send = mod(rank + ℓ, nprocs)
-            rank_recv = mod(rank - ℓ, nprocs)
-            n_particles_recv_ℓ = sendrecv(
-                n_particles_send[rank_send],
-                dest=rank_send,
-                source=rank_recv,
-            )
-            n_particles_recv[rank_recv] = n_particles_recv_ℓ
-            n_particles_recv_tot += n_particles_recv_ℓ
-        # The particles to be received will be so directly into the
-        # component particle arrays. Enlarge these if necessary.
-        n_particles_store = component.N_local + n_particles_recv_tot
-        if component.N_allocated < n_particles_store:
-            component.resize(n_particles_store)
-        # Extract particle data pointers and memory views
-        pos     = component. pos
-        mom     = component. mom
-        Δmom    = component.Δmom
-        ids     = component. ids
-        pos_mv  = component. pos_mv
-        mom_mv  = component. mom_mv
-        Δmom_mv = component.Δmom_mv
-        ids_mv  = component. ids_mv
-        # Extract rung information
-        rungs_N             = component.rungs_N
-        rung_indices        = component.rung_indices
-        rung_indices_mv     = component.rung_indices_mv
-        rung_indices_jumped = component.rung_indices_jumped
-        # Particle data to be exchanged
-        data_mvs = [pos_mv]
-        if include_mom:
-            data_mvs += [mom_mv, Δmom_mv]
-        # Exchange particles between processes
-        indexᵖ_recv_bgn_ℓ = component.N_local  # start index for received data
-        for ℓ in range(1, nprocs):
-            rank_send = mod(rank + ℓ, nprocs)
-            rank_recv = mod(rank - ℓ, nprocs)
-            n_particles_send_ℓ = n_particles_send[rank_send]
-            n_particles_recv_ℓ = n_particles_recv[rank_recv]
-            # Exchange particle data
-            indexᵖ_send_bgn_ℓ = indicesᵖ_send_bgn[rank_send]
-            indexᵖ_send_end_ℓ = indexᵖ_send_bgn_ℓ + n_particles_send_ℓ
-            indexᵖ_recv_end_ℓ = indexᵖ_recv_bgn_ℓ + n_particles_recv_ℓ
-            indexʳ_send_bgn_ℓ = 3*indexᵖ_send_bgn_ℓ
-            indexʳ_send_end_ℓ = 3*indexᵖ_send_end_ℓ
-            indexʳ_recv_bgn_ℓ = 3*indexᵖ_recv_bgn_ℓ
-            for data_mv in data_mvs:
-                Sendrecv(
-                    data_mv[indexʳ_send_bgn_ℓ:indexʳ_send_end_ℓ],
-                    dest=rank_send,
-                    recvbuf=data_mv[indexʳ_recv_bgn_ℓ:],
-                    source=rank_recv,
-                )
-            # If using IDs we also exchange these
-            if component.use_ids:
-                Sendrecv(
-                    ids_mv[indexᵖ_send_bgn_ℓ:indexᵖ_send_end_ℓ],
-                    dest=rank_send,
-                    recvbuf=ids_mv[indexᵖ_recv_bgn_ℓ:],
-                    source=rank_recv,
-                )
-            # If using rungs we also exchange the rung indices
-            if component.use_rungs:
-                Sendrecv(
-                    rung_indices_mv[indexᵖ_send_bgn_ℓ:indexᵖ_send_end_ℓ],
-                    dest=rank_send,
-                    recvbuf=rung_indices_mv[indexᵖ_recv_bgn_ℓ:],
-                    source=rank_recv,
-                )
-                # Decrement rung population due to sent particles
-                for indexᵖ in range(indexᵖ_send_bgn_ℓ, indexᵖ_send_end_ℓ):
-                    rung_index = rung_indices[indexᵖ]
-                    rungs_N[rung_index] -= 1
-                # Increment rung population due to received
-                # particles and set their jumped rung indices.
-                for indexᵖ in range(indexᵖ_recv_bgn_ℓ, indexᵖ_recv_end_ℓ):
-                    rung_index = rung_indices[indexᵖ]
-                    rungs_N[rung_index] += 1
-                    # Set the jumped rung index equal to
-                    # the rung index, signalling no upcoming jump.
-                    rung_indices_jumped[indexᵖ] = rung_index
-            # Update the start index for received data
-            indexᵖ_recv_bgn_ℓ += n_particles_recv_ℓ
-        # Move particles into the holes left by the sent particles
-        indexᵖ_hole_bgn = indexᵖ_right + 1
-        indexᵖ_hole_end = pairmin(indexᵖ_hole_bgn + n_particles_send_tot, component.N_local)
-        indexˣ_hole = 3*(indexᵖ_hole_bgn - 1)
-        indexᵖ = indexᵖ_recv_bgn_ℓ
+    time_bgn = time()
+    # Find the process in charge of each particle
+    # and count up the particles to send to each process.
+    if exchange_ranks_arr.shape[0] < component.N_local:
+        exchange_ranks_arr.resize(component.N_local, refcheck=False)
+    ranks_mv = exchange_ranks_arr
+    ranks = cython.address(ranks_mv[:])
+    for rank_other in range(nprocs):
+        n_particles_send[rank_other] = 0
+    posxˣ = component.posxˣ
+    posyˣ = component.posyˣ
+    poszˣ = component.poszˣ
+    for indexᵖ in range(component.N_local):
         indexˣ = 3*indexᵖ
-        for indexᵖ_hole in range(indexᵖ_hole_bgn, indexᵖ_hole_end):
-            indexˣ_hole += 3
-            indexˣ -= 3
-            with unswitch(1):
-                if component.use_ids or component.use_rungs:
-                    indexᵖ -= 1
-            for dim in range(3):
-                pos [indexˣ_hole + dim] = pos [indexˣ + dim]
-            with unswitch(1):
-                if include_mom:
-                    for dim in range(3):
-                        mom [indexˣ_hole + dim] = mom [indexˣ + dim]
-                    for dim in range(3):
-                        Δmom[indexˣ_hole + dim] = Δmom[indexˣ + dim]
-            with unswitch(1):
-                if component.use_ids:
-                    ids[indexᵖ_hole] = ids[indexᵖ]
-            with unswitch(1):
-                if component.use_rungs:
-                    rung_index = rung_indices[indexᵖ]
-                    rung_indices       [indexᵖ_hole] = rung_index
-                    rung_indices_jumped[indexᵖ_hole] = rung_index  # no jump
-        # With the holes filled, update the N_local attribute
-        component.N_local -= n_particles_send_tot
-        component.N_local += n_particles_recv_tot
+        rank_other = which_domain(posxˣ[indexˣ], posyˣ[indexˣ], poszˣ[indexˣ])
+        ranks[indexᵖ] = rank_other
+        n_particles_send[rank_other] += 1
+    n_particles_send[rank] = 0
+    n_particles_send_tot = sum(n_particles_send_mv)
+    # Carry out the exchange, unless no particles
+    # should be exchanged at all.
+    n_particles_send_tot_global = allreduce(n_particles_send_tot, op=MPI.SUM)
+    if n_particles_send_tot_global > 0:
+        exchange_records(component, include_mom)
     # Exchange completed.
     # Update the rung flags.
     if component.use_rungs:
@@ -513,27 +158,309 @@ def exchange(component, include_mom=True, progress_msg=False):
     else:
         # When not using rungs, all particles occupy rung 0
         component.rungs_N[0] = component.N_local
+    exchange_cost['time'] += time() - time_bgn
+    exchange_cost['calls'] += 1
     if progress_msg:
         masterprint('done')
 # Buffers used by the exchange() function
 cython.declare(
+    exchange_ranks_arr=object,  # np.ndarray
+    exchange_indices_arr=object,  # np.ndarray
     n_particles_send_mv='Py_ssize_t[::1]',
     n_particles_recv_mv='Py_ssize_t[::1]',
     n_particles_sorted_mv='Py_ssize_t[::1]',
-    indicesᵖ_send_bgn_mv='Py_ssize_t[::1]',
     n_particles_send='Py_ssize_t*',
     n_particles_recv='Py_ssize_t*',
     n_particles_sorted='Py_ssize_t*',
-    indicesᵖ_send_bgn='Py_ssize_t*',
+    counts_send_mv='int[::1]',
+    counts_recv_mv='int[::1]',
+    displs_send_mv='int[::1]',
+    displs_recv_mv='int[::1]',
 )
+exchange_ranks_arr = empty(1, dtype=C2np['int'])
+exchange_indices_arr = empty(1, dtype=C2np['Py_ssize_t'])
 n_particles_send_mv   = zeros(nprocs, dtype=C2np['Py_ssize_t'])
 n_particles_recv_mv   = zeros(nprocs, dtype=C2np['Py_ssize_t'])
 n_particles_sorted_mv = zeros(nprocs, dtype=C2np['Py_ssize_t'])
-indicesᵖ_send_bgn_mv  = zeros(nprocs, dtype=C2np['Py_ssize_t'])
 n_particles_send   = cython.address(n_particles_send_mv[:])
 n_particles_recv   = cython.address(n_particles_recv_mv[:])
 n_particles_sorted = cython.address(n_particles_sorted_mv[:])
-indicesᵖ_send_bgn  = cython.address(indicesᵖ_send_bgn_mv[:])
+counts_send_mv = zeros(nprocs, dtype=C2np['int'])
+counts_recv_mv = zeros(nprocs, dtype=C2np['int'])
+displs_send_mv = zeros(nprocs, dtype=C2np['int'])
+displs_recv_mv = zeros(nprocs, dtype=C2np['int'])
+# Accumulated cost of the exchange() function
+cython.declare(exchange_cost=dict)
+exchange_cost = {'time': 0, 'calls': 0, 'rounds': 0, 'particles': 0, 'bytes': 0}
+
+# Helper function for the exchange() function, carrying out the actual
+# communication of particle records. The process in charge of each
+# particle and the number of particles to send to each process must
+# already be stored in exchange_ranks_arr and n_particles_send.
+@cython.header(
+    # Arguments
+    component='Component',
+    include_mom='bint',
+    # Locals
+    dim='int',
+    ids='Py_ssize_t*',
+    indexᵖ='Py_ssize_t',
+    indexᵖ_local='Py_ssize_t',
+    indexᵖ_recv='Py_ssize_t',
+    indexʳ='Py_ssize_t',
+    indexˣ='Py_ssize_t',
+    indexˣ_local='Py_ssize_t',
+    indices_send='Py_ssize_t*',
+    indices_send_mv='Py_ssize_t[::1]',
+    mom='double*',
+    n_particles_recv_tot='Py_ssize_t',
+    n_particles_send_tot='Py_ssize_t',
+    n_records_max='Py_ssize_t',
+    n_records_recv='Py_ssize_t',
+    n_records_send='Py_ssize_t',
+    n_round_bgn='Py_ssize_t',
+    n_round_end='Py_ssize_t',
+    n_rounds='Py_ssize_t',
+    N_local='Py_ssize_t',
+    ordinal='Py_ssize_t',
+    pos='double*',
+    rank_other='int',
+    ranks='int*',
+    ranks_mv='int[::1]',
+    record_size='Py_ssize_t',
+    recvbuf='double*',
+    recvbuf_ids='Py_ssize_t*',
+    recvbuf_ids_mv='Py_ssize_t[::1]',
+    recvbuf_mv='double[::1]',
+    round_index='Py_ssize_t',
+    rung_index='signed char',
+    rung_indices='signed char*',
+    rung_indices_jumped='signed char*',
+    rungs_N='Py_ssize_t*',
+    sendbuf='double*',
+    sendbuf_ids='Py_ssize_t*',
+    sendbuf_ids_mv='Py_ssize_t[::1]',
+    sendbuf_mv='double[::1]',
+    slot_ids='Py_ssize_t',
+    slot_rung='Py_ssize_t',
+    Δmom='double*',
+    returns='void',
+)
+def exchange_records(component, include_mom):
+    # Communicate the number of particles to send to
+    # and receive from each process.
+    Alltoall(n_particles_send_mv, n_particles_recv_mv)
+    n_particles_send_tot = sum(n_particles_send_mv)
+    n_particles_recv_tot = sum(n_particles_recv_mv)
+    # Layout of the particle records, with the positions first,
+    # then the momenta and momentum updates, the IDs and finally the
+    # rung indices. The IDs are stored using their exact bit pattern.
+    record_size = 3
+    if include_mom:
+        record_size += 6
+    slot_ids = record_size
+    if component.use_ids:
+        record_size += 1
+    slot_rung = record_size
+    if component.use_rungs:
+        record_size += 1
+    # The number of records which may be sent or received by a process
+    # at a time is limited by the MPI count type as well as by
+    # the memory budget, if any. Find the number of rounds needed.
+    n_records_max = 2**31//record_size - 1
+    if memory_budget > 0:
+        n_records_max = pairmin(
+            n_records_max,
+            pairmax(1, int(memory_budget/(4*2*record_size*sizeof('double')))),
+        )
+    n_rounds = allreduce(
+        1 + (pairmax(n_particles_send_tot, n_particles_recv_tot) - 1)//n_records_max,
+        op=MPI.MAX,
+    )
+    # The received particles will be unpacked into the component
+    # particle arrays, to the right of all local particles.
+    # Enlarge these if necessary.
+    N_local = component.N_local
+    if component.N_allocated < N_local + n_particles_recv_tot:
+        component.resize(N_local + n_particles_recv_tot)
+    # Extract particle data pointers
+    pos                 = component.pos
+    mom                 = component.mom
+    Δmom                = component.Δmom
+    ids                 = component.ids
+    rung_indices        = component.rung_indices
+    rung_indices_jumped = component.rung_indices_jumped
+    rungs_N             = component.rungs_N
+    ranks_mv = exchange_ranks_arr
+    ranks = cython.address(ranks_mv[:])
+    # Sort the indices of the particles to be sent by the process to
+    # which they are to be sent (retaining their order), so that each
+    # round below only visits the particles to be sent in that round.
+    # The particles to be sent to process rank_other are then found at
+    # indices_send[n_particles_sorted[rank_other] + ordinal].
+    if exchange_indices_arr.shape[0] < n_particles_send_tot:
+        exchange_indices_arr.resize(n_particles_send_tot, refcheck=False)
+    indices_send_mv = exchange_indices_arr
+    indices_send = cython.address(indices_send_mv[:])
+    n_particles_sorted[0] = 0
+    for rank_other in range(1, nprocs):
+        n_particles_sorted[rank_other] = (
+            n_particles_sorted[rank_other - 1] + n_particles_send[rank_other - 1]
+        )
+    for indexᵖ in range(N_local):
+        rank_other = ranks[indexᵖ]
+        if rank_other == rank:
+            continue
+        indices_send[n_particles_sorted[rank_other]] = indexᵖ
+        n_particles_sorted[rank_other] += 1
+    for rank_other in range(nprocs):
+        n_particles_sorted[rank_other] -= n_particles_send[rank_other]
+    # Carry out the exchange in rounds. In each round, an equal share
+    # of the particles to be sent to each process is sent.
+    indexᵖ_recv = N_local
+    for round_index in range(n_rounds):
+        # Compute counts and displacements in units of doubles
+        n_records_send = 0
+        n_records_recv = 0
+        for rank_other in range(nprocs):
+            counts_send_mv[rank_other] = record_size*(
+                + n_particles_send[rank_other]*(round_index + 1)//n_rounds
+                - n_particles_send[rank_other]*round_index//n_rounds
+            )
+            counts_recv_mv[rank_other] = record_size*(
+                + n_particles_recv[rank_other]*(round_index + 1)//n_rounds
+                - n_particles_recv[rank_other]*round_index//n_rounds
+            )
+            displs_send_mv[rank_other] = n_records_send
+            displs_recv_mv[rank_other] = n_records_recv
+            n_records_send += counts_send_mv[rank_other]
+            n_records_recv += counts_recv_mv[rank_other]
+        # Fetch send and receive buffers, with an additional view of
+        # these used for the IDs.
+        sendbuf_mv = get_buffer(n_records_send, 'send')
+        recvbuf_mv = get_buffer(n_records_recv, 'recv')
+        sendbuf = cython.address(sendbuf_mv[:])
+        recvbuf = cython.address(recvbuf_mv[:])
+        if component.use_ids:
+            sendbuf_ids_mv = asarray(sendbuf_mv).view(C2np['Py_ssize_t'])
+            recvbuf_ids_mv = asarray(recvbuf_mv).view(C2np['Py_ssize_t'])
+            sendbuf_ids = cython.address(sendbuf_ids_mv[:])
+            recvbuf_ids = cython.address(recvbuf_ids_mv[:])
+        # Pack the records of the particles to be sent in this round.
+        # The ordinal of each particle among the particles to be sent to
+        # the same process determines the round in which it is sent.
+        indexʳ = 0
+        for rank_other in range(nprocs):
+            n_round_bgn = n_particles_send[rank_other]*round_index//n_rounds
+            n_round_end = n_particles_send[rank_other]*(round_index + 1)//n_rounds
+            for ordinal in range(n_round_bgn, n_round_end):
+                indexᵖ = indices_send[n_particles_sorted[rank_other] + ordinal]
+                indexˣ = 3*indexᵖ
+                for dim in range(3):
+                    sendbuf[indexʳ + dim] = pos[indexˣ + dim]
+                with unswitch(2):
+                    if include_mom:
+                        for dim in range(3):
+                            sendbuf[indexʳ + 3 + dim] = mom[indexˣ + dim]
+                        for dim in range(3):
+                            sendbuf[indexʳ + 6 + dim] = Δmom[indexˣ + dim]
+                with unswitch(2):
+                    if component.use_ids:
+                        sendbuf_ids[indexʳ + slot_ids] = ids[indexᵖ]
+                with unswitch(2):
+                    if component.use_rungs:
+                        sendbuf[indexʳ + slot_rung] = rung_indices[indexᵖ]
+                indexʳ += record_size
+        # Communicate the records
+        Alltoallv(
+            [asarray(sendbuf_mv[:n_records_send]), (counts_send_mv, displs_send_mv), MPI.DOUBLE],
+            [asarray(recvbuf_mv[:n_records_recv]), (counts_recv_mv, displs_recv_mv), MPI.DOUBLE],
+        )
+        # Unpack the received records into the particle arrays
+        for indexʳ in range(0, n_records_recv, record_size):
+            indexˣ = 3*indexᵖ_recv
+            for dim in range(3):
+                pos[indexˣ + dim] = recvbuf[indexʳ + dim]
+            with unswitch(1):
+                if include_mom:
+                    for dim in range(3):
+                        mom[indexˣ + dim] = recvbuf[indexʳ + 3 + dim]
+                    for dim in range(3):
+                        Δmom[indexˣ + dim] = recvbuf[indexʳ + 6 + dim]
+            with unswitch(1):
+                if component.use_ids:
+                    ids[indexᵖ_recv] = recvbuf_ids[indexʳ + slot_ids]
+            with unswitch(1):
+                if component.use_rungs:
+                    # Increment rung population due to received
+                    # particle and set its jumped rung index equal to
+                    # the rung index, signalling no upcoming jump.
+                    rung_index = cast(recvbuf[indexʳ + slot_rung], 'signed char')
+                    rung_indices       [indexᵖ_recv] = rung_index
+                    rung_indices_jumped[indexᵖ_recv] = rung_index
+                    rungs_N[rung_index] += 1
+            indexᵖ_recv += 1
+        exchange_cost['rounds'] += 1
+    exchange_cost['particles'] += n_particles_send_tot
+    exchange_cost['bytes'] += n_particles_send_tot*record_size*sizeof('double')
+    # Move the local particles into the holes left by the sent
+    # particles, retaining their order, followed by the
+    # received particles.
+    indexᵖ_local = 0
+    for indexᵖ in range(N_local + n_particles_recv_tot):
+        if indexᵖ < N_local and ranks[indexᵖ] != rank:
+            # Decrement rung population due to sent particle
+            with unswitch(1):
+                if component.use_rungs:
+                    rungs_N[rung_indices[indexᵖ]] -= 1
+            continue
+        if indexᵖ_local < indexᵖ:
+            indexˣ = 3*indexᵖ
+            indexˣ_local = 3*indexᵖ_local
+            for dim in range(3):
+                pos[indexˣ_local + dim] = pos[indexˣ + dim]
+            with unswitch(1):
+                if include_mom:
+                    for dim in range(3):
+                        mom [indexˣ_local + dim] = mom [indexˣ + dim]
+                    for dim in range(3):
+                        Δmom[indexˣ_local + dim] = Δmom[indexˣ + dim]
+            with unswitch(1):
+                if component.use_ids:
+                    ids[indexᵖ_local] = ids[indexᵖ]
+            with unswitch(1):
+                if component.use_rungs:
+                    rung_index = rung_indices[indexᵖ]
+                    rung_indices       [indexᵖ_local] = rung_index
+                    rung_indices_jumped[indexᵖ_local] = rung_index  # no jump
+        indexᵖ_local += 1
+    component.N_local = indexᵖ_local
+
+# Function for printing out the accumulated cost of the exchange()
+# function since the last call, after which the cost is reset.
+@cython.pheader(
+    # Locals
+    bytes_max='double',
+    key=str,
+    n_particles='Py_ssize_t',
+    time_max='double',
+    returns='void',
+)
+def report_exchange_cost():
+    if nprocs == 1 or exchange_cost['calls'] == 0:
+        return
+    n_particles = allreduce(exchange_cost['particles'], op=MPI.SUM)
+    time_max    = allreduce(exchange_cost['time'],      op=MPI.MAX)
+    bytes_max   = allreduce(exchange_cost['bytes'],     op=MPI.MAX)
+    masterprint(
+        f'Particle exchange: {n_particles} particles sent in '
+        f'{exchange_cost["rounds"]} round{"s"*(exchange_cost["rounds"] != 1)}, '
+        f'taking {significant_figures(time_max, 3, fmt="unicode", incl_zeros=False)} s '
+        f'and {significant_figures(bytes_max/2**20, 3, fmt="unicode", incl_zeros=False)} MiB '
+        f'at most within a process'
+    )
+    for key in exchange_cost:
+        exchange_cost[key] = 0
 
 # Function for communicating ghost values
 # of domain grids between processes.
@@ -542,22 +469,21 @@ indicesᵖ_send_bgn  = cython.address(indicesᵖ_send_bgn_mv[:])
     grid='double[:, :, ::1]',
     operation=str,
     # Locals
-    i='int',
-    index_recv_bgn_i='Py_ssize_t',
-    index_recv_end_i='Py_ssize_t',
-    index_send_bgn_i='Py_ssize_t',
-    index_send_end_i='Py_ssize_t',
-    index_recv_bgn_j='Py_ssize_t',
-    index_recv_end_j='Py_ssize_t',
-    index_send_bgn_j='Py_ssize_t',
-    index_send_end_j='Py_ssize_t',
-    index_recv_bgn_k='Py_ssize_t',
-    index_recv_end_k='Py_ssize_t',
-    index_send_bgn_k='Py_ssize_t',
-    index_send_end_k='Py_ssize_t',
-    j='int',
-    k='int',
-    reverse='bint',
+    bulk_slices=tuple,
+    dest='int',
+    dtype_bulk=object,  # mpi4py.MPI.Datatype
+    dtype_ghost=object,  # mpi4py.MPI.Datatype
+    exchange=tuple,
+    exchanges=list,
+    grid_arr=object,  # np.ndarray
+    offset='Py_ssize_t',
+    offsets=list,
+    recvbuf_ghosts_mv='double[::1]',
+    requests=list,
+    size='Py_ssize_t',
+    size_total='Py_ssize_t',
+    source='int',
+    tag='int',
     returns='void',
 )
 def communicate_ghosts(grid, operation):
@@ -571,93 +497,145 @@ def communicate_ghosts(grid, operation):
         All local ghost points will be assigned values based on the
         values stored at the corresponding points on neighbour
         processes. Current ghost point values will be ignored.
+    The communication with all 26 neighbours takes place concurrently,
+    with the non-contiguous ghost and boundary blocks described by MPI
+    subarray datatypes (see get_ghost_exchanges()). Sending is then
+    carried out directly from the grid, as is receiving for
+    operation == '='. For operation == '+=', each block is received
+    into a contiguous buffer and then added to the grid.
+    The grid must be C-contiguous, as is the case for all domain grids.
     """
     if grid is None:
         return
-    # Set the direction of communication depending on the operation
-    reverse = (operation == '=')
-    # Loop over all 26 neighbour domains
+    grid_arr = asarray(grid)
+    if not grid_arr.flags.c_contiguous:
+        abort('communicate_ghosts() called with non-contiguous grid')
+    exchanges = get_ghost_exchanges(grid_arr.shape)
+    requests = []
+    if operation == '=':
+        # Receive ghost blocks directly into the grid
+        for tag, exchange in enumerate(exchanges):
+            dest, source, dtype_ghost, dtype_bulk, bulk_slices, size = exchange
+            requests.append(comm_ghosts.Irecv([grid_arr, 1, dtype_ghost], source=dest, tag=tag))
+            requests.append(comm_ghosts.Isend([grid_arr, 1, dtype_bulk], dest=source, tag=tag))
+        MPI.Request.Waitall(requests)
+        return
+    # For operation == '+=', receive the blocks into separate parts
+    # of a common contiguous buffer.
+    size_total = 0
+    offsets = []
+    for exchange in exchanges:
+        offsets.append(size_total)
+        size_total += exchange[5]
+    recvbuf_ghosts_mv = get_buffer(size_total, 'ghosts')
+    for tag, exchange in enumerate(exchanges):
+        dest, source, dtype_ghost, dtype_bulk, bulk_slices, size = exchange
+        offset = offsets[tag]
+        requests.append(comm_ghosts.Irecv(
+            buf_and_dtype(recvbuf_ghosts_mv[offset:offset + size]), source=source, tag=tag,
+        ))
+        requests.append(comm_ghosts.Isend([grid_arr, 1, dtype_ghost], dest=dest, tag=tag))
+    MPI.Request.Waitall(requests)
+    # Add the received blocks to the outer layer of the local bulk
+    for tag, exchange in enumerate(exchanges):
+        bulk_slices, size = exchange[4], exchange[5]
+        offset = offsets[tag]
+        copy_to_noncontiguous(
+            recvbuf_ghosts_mv[offset:offset + size], grid_arr[bulk_slices], operation,
+        )
+# Separate communicator used by communicate_ghosts(),
+# so that its tags cannot clash with other point-to-point messages.
+cython.declare(comm_ghosts=object)  # mpi4py.MPI.Intracomm
+comm_ghosts = comm.Dup()
+
+# Function returning the information needed by communicate_ghosts()
+# for each of the 26 neighbour directions, given the local grid shape.
+@cython.header(
+    # Arguments
+    shape=tuple,
+    # Locals
+    bgn_bulk=list,
+    bgn_ghost=list,
+    dim='int',
+    direction=tuple,
+    dtype_bulk=object,  # mpi4py.MPI.Datatype
+    dtype_ghost=object,  # mpi4py.MPI.Datatype
+    exchanges=list,
+    i='int',
+    j='int',
+    k='int',
+    l='int',
+    sizes=list,
+    returns=list,
+)
+def get_ghost_exchanges(shape):
+    """For each direction (i, j, k) ≠ (0, 0, 0), a tuple is returned
+    containing
+    - the rank of the neighbour in the direction (i, j, k);
+    - the rank of the neighbour in the direction (-i, -j, -k);
+    - a committed MPI subarray datatype covering the ghost block of the
+      grid in the direction (i, j, k);
+    - a committed MPI subarray datatype covering the block of the
+      outer layer of the local bulk in the direction (-i, -j, -k);
+    - slices picking out the latter block;
+    - the number of elements within each of the two blocks.
+    In the case of operation == '+=', the ghost block in direction
+    (i, j, k) is added to the bulk block in direction (-i, -j, -k) of
+    the neighbour in direction (i, j, k). For operation == '=', the
+    bulk block is instead copied to the ghost block of the neighbour
+    in direction (-i, -j, -k). The results are cached by shape.
+    """
+    exchanges = ghost_exchanges_cache.get(shape)
+    if exchanges is not None:
+        return exchanges
+    exchanges = []
     for i in range(-1, 2):
-        if i == -1:
-            # Send left, receive right
-            index_send_bgn_i = 0
-            index_send_end_i = ℤ[1*nghosts]
-            index_recv_bgn_i = ℤ[grid.shape[0] - 2*nghosts]
-            index_recv_end_i = ℤ[grid.shape[0] - 1*nghosts]
-        elif i == 0:
-            # Do not send to or receive from this direction.
-            # Include the entire i-dimension of the local bulk.
-            index_send_bgn_i = ℤ[1*nghosts]
-            index_send_end_i = ℤ[grid.shape[0] - 1*nghosts]
-            index_recv_bgn_i = ℤ[1*nghosts]
-            index_recv_end_i = ℤ[grid.shape[0] - 1*nghosts]
-        else:  # i == -1
-            # Send right, receive left
-            index_send_bgn_i = ℤ[grid.shape[0] - 1*nghosts]
-            index_send_end_i = ℤ[grid.shape[0]]
-            index_recv_bgn_i = ℤ[1*nghosts]
-            index_recv_end_i = ℤ[2*nghosts]
         for j in range(-1, 2):
-            if j == -1:
-                # Send backward, receive forward
-                index_send_bgn_j = 0
-                index_send_end_j = ℤ[1*nghosts]
-                index_recv_bgn_j = ℤ[grid.shape[1] - 2*nghosts]
-                index_recv_end_j = ℤ[grid.shape[1] - 1*nghosts]
-            elif j == 0:
-                # Do not send to or receive from this direction.
-                # Include the entire j-dimension of the local bulk.
-                index_send_bgn_j = ℤ[1*nghosts]
-                index_send_end_j = ℤ[grid.shape[1] - 1*nghosts]
-                index_recv_bgn_j = ℤ[1*nghosts]
-                index_recv_end_j = ℤ[grid.shape[1] - 1*nghosts]
-            else:  # j == -1
-                # Send forward, receive backward
-                index_send_bgn_j = ℤ[grid.shape[1] - 1*nghosts]
-                index_send_end_j = ℤ[grid.shape[1]]
-                index_recv_bgn_j = ℤ[1*nghosts]
-                index_recv_end_j = ℤ[2*nghosts]
             for k in range(-1, 2):
                 if i == j == k == 0:
                     # Do not communicate the local bulk
                     continue
-                if k == -1:
-                    # Send downward, receive upward
-                    index_send_bgn_k = 0
-                    index_send_end_k = ℤ[1*nghosts]
-                    index_recv_bgn_k = ℤ[grid.shape[2] - 2*nghosts]
-                    index_recv_end_k = ℤ[grid.shape[2] - 1*nghosts]
-                elif k == 0:
-                    # Do not send to or receive from this direction.
-                    # Include the entire k-dimension of the local bulk.
-                    index_send_bgn_k = ℤ[1*nghosts]
-                    index_send_end_k = ℤ[grid.shape[2] - 1*nghosts]
-                    index_recv_bgn_k = ℤ[1*nghosts]
-                    index_recv_end_k = ℤ[grid.shape[2] - 1*nghosts]
-                else:  # k == -1
-                    # Send upward, receive downward
-                    index_send_bgn_k = ℤ[grid.shape[2] - 1*nghosts]
-                    index_send_end_k = ℤ[grid.shape[2]]
-                    index_recv_bgn_k = ℤ[1*nghosts]
-                    index_recv_end_k = ℤ[2*nghosts]
-                # Communicate this face/edge/corner
-                smart_mpi(
-                    grid[
-                        index_send_bgn_i:index_send_end_i,
-                        index_send_bgn_j:index_send_end_j,
-                        index_send_bgn_k:index_send_end_k,
-                    ],
-                    grid[
-                        index_recv_bgn_i:index_recv_end_i,
-                        index_recv_bgn_j:index_recv_end_j,
-                        index_recv_bgn_k:index_recv_end_k,
-                    ],
-                    dest  =rank_neighbouring_domain(+i, +j, +k),
-                    source=rank_neighbouring_domain(-i, -j, -k),
-                    reverse=reverse,
-                    mpifun='Sendrecv',
-                    operation=operation,
-                )
+                direction = (i, j, k)
+                sizes = []
+                bgn_ghost = []
+                bgn_bulk = []
+                for dim in range(3):
+                    l = direction[dim]
+                    if l == -1:
+                        # Ghost layer at the lower edge,
+                        # outer bulk layer at the upper edge.
+                        sizes.append(nghosts)
+                        bgn_ghost.append(0)
+                        bgn_bulk.append(shape[dim] - 2*nghosts)
+                    elif l == 0:
+                        # The entire extent of the local bulk
+                        sizes.append(shape[dim] - 2*nghosts)
+                        bgn_ghost.append(nghosts)
+                        bgn_bulk.append(nghosts)
+                    else:  # l == +1
+                        # Ghost layer at the upper edge,
+                        # outer bulk layer at the lower edge.
+                        sizes.append(nghosts)
+                        bgn_ghost.append(shape[dim] - nghosts)
+                        bgn_bulk.append(nghosts)
+                dtype_ghost = MPI.DOUBLE.Create_subarray(list(shape), sizes, bgn_ghost).Commit()
+                dtype_bulk  = MPI.DOUBLE.Create_subarray(list(shape), sizes, bgn_bulk ).Commit()
+                exchanges.append((
+                    rank_neighbouring_domain(+i, +j, +k),
+                    rank_neighbouring_domain(-i, -j, -k),
+                    dtype_ghost,
+                    dtype_bulk,
+                    tuple([
+                        slice(bgn_bulk[dim], bgn_bulk[dim] + sizes[dim])
+                        for dim in range(3)
+                    ]),
+                    int(np.prod(sizes)),
+                ))
+    ghost_exchanges_cache[shape] = exchanges
+    return exchanges
+# Cache used by the get_ghost_exchanges() function
+cython.declare(ghost_exchanges_cache=dict)
+ghost_exchanges_cache = {}
 
 # Function for cutting out domains as cuboidal boxes in the best
 # possible way. The return value is an array of 3 elements; the number
@@ -763,6 +741,24 @@ def which_domain(x, y, z):
     x_index = int(x*domain_size_x_inv)
     y_index = int(y*domain_size_y_inv)
     z_index = int(z*domain_size_z_inv)
+    # For a non-uniform (dynamically balanced) domain decomposition,
+    # the above indices of the uniform decomposition serve as an
+    # initial guess, from which we walk to the domain actually
+    # containing the coordinates. The cuts are padded with ∓ထ so that
+    # the walking never leaves the box.
+    if domain_dynamic:
+        while x < domain_cuts_x[x_index]:
+            x_index -= 1
+        while x >= domain_cuts_x[x_index + 1]:
+            x_index += 1
+        while y < domain_cuts_y[y_index]:
+            y_index -= 1
+        while y >= domain_cuts_y[y_index + 1]:
+            y_index += 1
+        while z < domain_cuts_z[z_index]:
+            z_index -= 1
+        while z >= domain_cuts_z[z_index + 1]:
+            z_index += 1
     # To get the rank we could index into domain_layout[...],
     # but as an optimization we compute it ourselves.
     return (
@@ -801,12 +797,12 @@ def rank_neighbouring_domain(i, j, k):
     source='int',
     component_recv='Component',
     use_Δ_recv='bint',
+    tile_indices_recv='Py_ssize_t[::1]',
     # Locals
     N_particles='Py_ssize_t',
     N_particles_recv='Py_ssize_t',
-    contain_particles='signed char*',
-    domain_layout_source='int[::1]',
     indexᵖ='Py_ssize_t',
+    lowest_active_rung='signed char',
     mv_recv='double[::1]',
     mv_recv_buf='double[::1]',
     mv_recv_list=list,
@@ -822,7 +818,6 @@ def rank_neighbouring_domain(i, j, k):
     rung='Py_ssize_t*',
     rung_N='Py_ssize_t',
     rung_index='signed char',
-    rung_indices='signed char*',
     rung_indices_buf='signed char[::1]',
     rung_indices_buf_ptr='signed char*',
     rung_indices_jumped='signed char*',
@@ -830,23 +825,21 @@ def rank_neighbouring_domain(i, j, k):
     rung_indices_jumped_buf_ptr='signed char*',
     rung_particle_index='Py_ssize_t',
     rungs_N='Py_ssize_t*',
-    subtiling_name=str,
     tile='Py_ssize_t**',
     tile_index='Py_ssize_t',
-    tile_indices_send_prev_ptr='Py_ssize_t*',
     tile_indices_send_ptr='Py_ssize_t*',
     tiles='Py_ssize_t***',
     tiles_rungs_N='Py_ssize_t**',
     tiling='Tiling',
     tiling_name=str,
     tiling_recv='Tiling',
-    use_rungs='bint',
     variable=str,
     returns='Component',
 )
 def sendrecv_component(
     component_send, variables, pairing_level, interaction_name,
     tile_indices_send, dest, source, component_recv=None, use_Δ_recv=True,
+    tile_indices_recv=None,
 ):
     """This function operates in two modes:
     - Communicate data (no component_recv supplied):
@@ -874,7 +867,10 @@ def sendrecv_component(
     interaction_name. In the case of pairing_level == 'domain',
     no actual tiling should be used, and so here we use the trivial
     tiling. Note that the passed tile_indices_send should be identical
-    on all processes. After tile particles have been communicated,
+    on all processes. For non-uniform domains this is not so, in which
+    case the indices of the received tiles, as seen by the tiling of
+    the source process, must be passed as tile_indices_recv.
+    After tile particles have been communicated,
     the returned buffer component will be tile sorted at the domain
     (tile, not subtile) level. Note that the particle order is not
     preserved when doing such a communication + tile sorting.
@@ -933,24 +929,7 @@ def sendrecv_component(
         # component_send (Component) and instantiate such an instance.
         if component_buffer is None:
             component_buffer = type(component_send)('', 'cold dark matter', N=1)
-        # Adjust important meta data on the buffer component
-        component_buffer.name             = component_send.name
-        component_buffer.species          = component_send.species
-        component_buffer.representation   = component_send.representation
-        component_buffer.N                = component_send.N
-        component_buffer.mass             = component_send.mass
-        component_buffer.softening_length = component_send.softening_length
-        component_buffer.use_rungs        = component_send.use_rungs
-        # Enlarge the data arrays of the component_buffer if necessary
-        component_buffer.N_local = N_particles_recv
-        if component_buffer.N_allocated < component_buffer.N_local:
-            # Temporarily set use_rungs = True to ensure that the
-            # rung_indices and rung_indices_jumped
-            # get resized as well.
-            use_rungs = component_buffer.use_rungs
-            component_buffer.use_rungs = True
-            component_buffer.resize(component_buffer.N_local)
-            component_buffer.use_rungs = use_rungs
+        prepare_buffer_component(component_buffer, component_send, N_particles_recv)
         # Use component_buffer as component_recv
         component_recv = component_buffer
     # Operation-dependent preparations for the communication
@@ -1062,76 +1041,28 @@ def sendrecv_component(
                     n_send += 1
         Sendrecv(rung_indices_jumped_buf[:n_send],
             recvbuf=component_recv.rung_indices_jumped_mv, dest=dest, source=source)
-        # Count up how many particles occupy each rung
-        rung_indices = component_recv.rung_indices
-        rungs_N = component_recv.rungs_N
-        for rung_index in range(N_rungs):
-            rungs_N[rung_index] = 0
-        for indexᵖ in range(component_recv.N_local):
-            rung_index = rung_indices[indexᵖ]
-            rungs_N[rung_index] += 1
-        # Find and set lowest and highest populated rung
-        component_recv.set_lowest_highest_populated_rung()
-        # Communicate the active rung
-        component_recv.lowest_active_rung = sendrecv(
+        # Communicate the active rung and count up
+        # how many particles occupy each rung.
+        lowest_active_rung = sendrecv(
             component_send.lowest_active_rung, dest=dest, source=source,
         )
-        if component_recv.lowest_active_rung < component_recv.lowest_populated_rung:
-            # There is no need to have the lowest active rung
-            # be below the lowest populated rung.
-            component_recv.lowest_active_rung = component_recv.lowest_populated_rung
+        tally_buffer_rungs(component_recv, lowest_active_rung)
     # When in communication mode the buffer (recv) component
     # needs to know its own tiling.
     if 𝔹[operation == '=']:
-        # Ensure that the required tiling (and subtiling)
-        # is instantiated on the buffer component.
-        tiling_recv = component_recv.tilings.get(tiling_name)
-        if tiling_recv is None:
-            component_recv.init_tiling(tiling_name, initial_rung_size=0)
-            tiling_recv = component_recv.tilings[tiling_name]
-            if 𝔹[tiling_name != 'trivial']:
-                subtiling_name = f'{interaction_name} (subtiles)'
-                component_recv.init_tiling(subtiling_name, initial_rung_size=0)
-        # Place the tiling over the domain of the process
-        # with a rank given by 'source'.
-        if 𝔹[tiling_name != 'trivial']:
-            domain_layout_source = asarray(
-                np.unravel_index(source, domain_subdivisions),
-                dtype=C2np['int'],
-            )
-            tiling_recv.relocate(asarray(
-                (
-                    domain_layout_source[0]*domain_size_x,
-                    domain_layout_source[1]*domain_size_y,
-                    domain_layout_source[2]*domain_size_z,
-                ),
-                dtype=C2np['double'],
-            ))
-        # Perform tile sorting (but do not sort into subtiles)
-        if tile_indices_send_prev is None:
-            tiling_recv.sort(None, -1, already_reset=False)
-        else:
-            # We know that all particles (left over from the last call)
-            # are within tile_indices_send_prev. Reset particle
-            # information within tiling_recv before sorting into tiles.
-            tile_indices_send_prev_ptr = cython.address(tile_indices_send_prev[:])
-            tiles_rungs_N = tiling_recv.tiles_rungs_N
-            contain_particles = tiling_recv.contain_particles
-            for tile_index in range(tile_indices_send_prev.shape[0]):
-                tile_index = tile_indices_send_prev_ptr[tile_index]
-                rungs_N = tiles_rungs_N[tile_index]
-                for rung_index in range(N_rungs):
-                    rungs_N[rung_index] = 0
-                contain_particles[tile_index] = 0
-            tiling_recv.sort(None, -1, already_reset=True)
+        sort_buffer_component(
+            component_recv, tiling_name, interaction_name, source,
+            tile_indices_send_prev,
+        )
         # Set the global tile_indices_send_prev,
         # for use with the next call to this function.
-        tile_indices_send_prev = tile_indices_send
+        if tile_indices_recv is None:
+            tile_indices_recv = tile_indices_send
+        tile_indices_send_prev = tile_indices_recv
     return component_recv
 
 # Declare global buffers used by sendrecv_component() function.
-# The rung_indices_arr array is also used by the exchange() function
-# and the species.Component class.
+# The rung_indices_arr array is also used by the species.Component class.
 cython.declare(
     component_buffer='Component',
     rung_indices_arr=object,  # np.ndarray
@@ -1141,6 +1072,556 @@ component_buffer = None
 rung_indices_arr = empty(1, dtype=C2np['signed char'])
 tile_indices_send_prev = None
 
+# Helper function for the sendrecv_component() and
+# sendrecv_component_finish() functions, adjusting the meta data and
+# size of a buffer component to match the sending component.
+@cython.header(
+    # Arguments
+    component_buffer='Component',
+    component_send='Component',
+    N_particles_recv='Py_ssize_t',
+    # Locals
+    use_rungs='bint',
+)
+def prepare_buffer_component(component_buffer, component_send, N_particles_recv):
+    # Adjust important meta data on the buffer component
+    component_buffer.name             = component_send.name
+    component_buffer.species          = component_send.species
+    component_buffer.representation   = component_send.representation
+    component_buffer.N                = component_send.N
+    component_buffer.mass             = component_send.mass
+    component_buffer.softening_length = component_send.softening_length
+    component_buffer.use_rungs        = component_send.use_rungs
+    # Enlarge the data arrays of the component_buffer if necessary
+    component_buffer.N_local = N_particles_recv
+    if component_buffer.N_allocated < component_buffer.N_local:
+        # Temporarily set use_rungs = True to ensure that the
+        # rung_indices and rung_indices_jumped
+        # get resized as well.
+        use_rungs = component_buffer.use_rungs
+        component_buffer.use_rungs = True
+        component_buffer.resize(component_buffer.N_local)
+        component_buffer.use_rungs = use_rungs
+
+# Helper function for the sendrecv_component() and
+# sendrecv_component_finish() functions, counting up the rung
+# populations of a buffer component with freshly received
+# rung indices and setting its lowest active rung.
+@cython.header(
+    # Arguments
+    component_recv='Component',
+    lowest_active_rung='signed char',
+    # Locals
+    indexᵖ='Py_ssize_t',
+    rung_index='signed char',
+    rung_indices='signed char*',
+    rungs_N='Py_ssize_t*',
+)
+def tally_buffer_rungs(component_recv, lowest_active_rung):
+    # Count up how many particles occupy each rung
+    rung_indices = component_recv.rung_indices
+    rungs_N = component_recv.rungs_N
+    for rung_index in range(N_rungs):
+        rungs_N[rung_index] = 0
+    for indexᵖ in range(component_recv.N_local):
+        rung_index = rung_indices[indexᵖ]
+        rungs_N[rung_index] += 1
+    # Find and set lowest and highest populated rung
+    component_recv.set_lowest_highest_populated_rung()
+    # Set the active rung
+    component_recv.lowest_active_rung = lowest_active_rung
+    if component_recv.lowest_active_rung < component_recv.lowest_populated_rung:
+        # There is no need to have the lowest active rung
+        # be below the lowest populated rung.
+        component_recv.lowest_active_rung = component_recv.lowest_populated_rung
+
+# Helper function for the sendrecv_component() and
+# sendrecv_component_finish() functions, equipping a buffer component
+# with freshly received particles with its own tiling and performing
+# the tile sorting. All particles left over from the last use of the
+# buffer component are known to reside within the tiles given by
+# tile_indices_send_prev.
+@cython.header(
+    # Arguments
+    component_recv='Component',
+    tiling_name=str,
+    interaction_name=str,
+    source='int',
+    tile_indices_send_prev='Py_ssize_t[::1]',
+    # Locals
+    contain_particles='signed char*',
+    rung_index='signed char',
+    rungs_N='Py_ssize_t*',
+    subtiling_name=str,
+    tile_index='Py_ssize_t',
+    tile_indices_send_prev_ptr='Py_ssize_t*',
+    tiles_rungs_N='Py_ssize_t**',
+    tiling_recv='Tiling',
+)
+def sort_buffer_component(
+    component_recv, tiling_name, interaction_name, source, tile_indices_send_prev,
+):
+    # Ensure that the required tiling (and subtiling)
+    # is instantiated on the buffer component.
+    tiling_recv = component_recv.tilings.get(tiling_name)
+    if tiling_recv is None:
+        component_recv.init_tiling(tiling_name, initial_rung_size=0)
+        tiling_recv = component_recv.tilings[tiling_name]
+        if 𝔹[tiling_name != 'trivial']:
+            subtiling_name = f'{interaction_name} (subtiles)'
+            component_recv.init_tiling(subtiling_name, initial_rung_size=0)
+    # Place the tiling over the domain of the process
+    # with a rank given by 'source'.
+    if 𝔹[tiling_name != 'trivial']:
+        tiling_recv.relocate(get_domain_bgn(source))
+    # Perform tile sorting (but do not sort into subtiles)
+    if tile_indices_send_prev is None:
+        tiling_recv.sort(None, -1, already_reset=False)
+    else:
+        # We know that all particles (left over from the last call)
+        # are within tile_indices_send_prev. Reset particle
+        # information within tiling_recv before sorting into tiles.
+        tile_indices_send_prev_ptr = cython.address(tile_indices_send_prev[:])
+        tiles_rungs_N = tiling_recv.tiles_rungs_N
+        contain_particles = tiling_recv.contain_particles
+        for tile_index in range(tile_indices_send_prev.shape[0]):
+            tile_index = tile_indices_send_prev_ptr[tile_index]
+            rungs_N = tiles_rungs_N[tile_index]
+            for rung_index in range(N_rungs):
+                rungs_N[rung_index] = 0
+            contain_particles[tile_index] = 0
+        tiling_recv.sort(None, -1, already_reset=True)
+
+# Function which starts the communication of the particles within
+# the tiles given by tile_indices_send of component_send to the process
+# of rank dest, while receiving the corresponding particles from the
+# process of rank source into a buffer component. Unlike
+# sendrecv_component(), the particle data is communicated
+# non-blockingly, allowing for the communication to overlap with
+# computation. The returned record of the pending communication must
+# be passed to sendrecv_component_finish(), which completes the
+# communication and returns the (tile sorted) buffer component.
+# At most two such communications may be pending at any one time,
+# as these make use of two alternating buffer components.
+@cython.header(
+    # Arguments
+    component_send='Component',
+    variables=list,  # list of str's
+    pairing_level=str,
+    interaction_name=str,
+    tile_indices_send='Py_ssize_t[::1]',
+    dest='int',
+    source='int',
+    tile_indices_recv='Py_ssize_t[::1]',
+    # Locals
+    N_particles='Py_ssize_t',
+    N_particles_recv='Py_ssize_t',
+    component_recv='Component',
+    indexᵖ='Py_ssize_t',
+    mv_recv_buf='double[::1]',
+    mv_send_buf='double[::1]',
+    n_send='Py_ssize_t',
+    ptr_send='double*',
+    ptr_send_buf='double*',
+    requests=list,
+    rung='Py_ssize_t*',
+    rung_N='Py_ssize_t',
+    rung_index='signed char',
+    rung_indices_jumped='signed char*',
+    rung_particle_index='Py_ssize_t',
+    rungs_N='Py_ssize_t*',
+    size_particle='Py_ssize_t',
+    slot='int',
+    tile='Py_ssize_t**',
+    tile_index='Py_ssize_t',
+    tile_indices_send_ptr='Py_ssize_t*',
+    tiles='Py_ssize_t***',
+    tiles_rungs_N='Py_ssize_t**',
+    tiling='Tiling',
+    tiling_name=str,
+    variable=str,
+    returns=tuple,
+)
+def sendrecv_component_start(
+    component_send, variables, pairing_level, interaction_name,
+    tile_indices_send, dest, source, tile_indices_recv=None,
+):
+    global pipeline_slot
+    if component_send.representation != 'particles':
+        abort('The sendrecv_component_start function is only implemented for particle components')
+    # No communication is needed if the destination and source is
+    # really the local process. The pending record then holds
+    # no requests.
+    if tile_indices_recv is None:
+        tile_indices_recv = tile_indices_send
+    if dest == rank == source:
+        return (component_send, [], variables, '', interaction_name, source, tile_indices_recv, 0)
+    # Determine which tiling to use
+    if pairing_level == 'tile':
+        tiling_name = f'{interaction_name} (tiles)'
+    else:  # pairing_level == 'domain'
+        tiling_name = 'trivial'
+    # Find out how many particles should be communicated
+    tiling = component_send.tilings[tiling_name]
+    tiles         = tiling.tiles
+    tiles_rungs_N = tiling.tiles_rungs_N
+    tile_indices_send_ptr = cython.address(tile_indices_send[:])
+    N_particles = 0
+    for tile_index in range(tile_indices_send.shape[0]):
+        tile_index = tile_indices_send_ptr[tile_index]
+        rungs_N    = tiles_rungs_N        [tile_index]
+        for rung_index in range(
+            ℤ[component_send.lowest_populated_rung],
+            ℤ[component_send.highest_populated_rung + 1],
+        ):
+            N_particles += rungs_N[rung_index]
+    N_particles_recv = comm_pipeline.sendrecv(
+        N_particles, dest=dest, source=source, recvtag=0,
+    )
+    # Switch to the other buffer component, instantiating it
+    # the first time it is needed (see sendrecv_component()).
+    pipeline_slot = 1 - pipeline_slot
+    slot = pipeline_slot
+    component_recv = pipeline_buffers[slot]
+    if component_recv is None:
+        component_recv = type(component_send)('', 'cold dark matter', N=1)
+        pipeline_buffers[slot] = component_recv
+    prepare_buffer_component(component_recv, component_send, N_particles_recv)
+    # All data is packed into a single contiguous buffer of doubles,
+    # so that only a single message has to be exchanged. Besides the
+    # three components of each variable, each particle carries its
+    # rung index and jumped rung index when using rungs, followed by
+    # a single trailing element holding the lowest active rung.
+    size_particle = 3*len(variables) + 2*component_send.use_rungs
+    mv_send_buf = get_buffer(
+        size_particle*N_particles + component_send.use_rungs, ('pipeline send', slot),
+    )
+    ptr_send_buf = cython.address(mv_send_buf[:])
+    n_send = 0
+    for variable in variables:
+        if variable == 'pos':
+            ptr_send = component_send.pos
+        elif variable == 'mom':
+            ptr_send = component_send.mom
+        else:
+            abort(
+                f'Variable "{variable}" supplied to sendrecv_component_start() '
+                f'but only "pos" and "mom" are implemented.'
+            )
+        n_send += copy_particles_in_tiles(
+            component_send,
+            tiling, tile_indices_send,
+            ptr_send, cython.address(mv_send_buf[n_send:]),
+        )
+    if component_send.use_rungs:
+        for tile_index in range(tile_indices_send.shape[0]):
+            tile_index = tile_indices_send_ptr[tile_index]
+            rungs_N    = tiles_rungs_N        [tile_index]
+            for rung_index in range(
+                ℤ[component_send.lowest_populated_rung],
+                ℤ[component_send.highest_populated_rung + 1],
+            ):
+                rung_N = rungs_N[rung_index]
+                for rung_particle_index in range(rung_N):
+                    ptr_send_buf[n_send] = rung_index
+                    n_send += 1
+        rung_indices_jumped = component_send.rung_indices_jumped
+        for tile_index in range(tile_indices_send.shape[0]):
+            tile_index = tile_indices_send_ptr[tile_index]
+            tile       = tiles                [tile_index]
+            rungs_N    = tiles_rungs_N        [tile_index]
+            for rung_index in range(
+                ℤ[component_send.lowest_populated_rung],
+                ℤ[component_send.highest_populated_rung + 1],
+            ):
+                rung = tile[rung_index]
+                rung_N = rungs_N[rung_index]
+                for rung_particle_index in range(rung_N):
+                    indexᵖ = rung[rung_particle_index]
+                    ptr_send_buf[n_send] = rung_indices_jumped[indexᵖ]
+                    n_send += 1
+        ptr_send_buf[n_send] = component_send.lowest_active_rung
+        n_send += 1
+    # Post the non-blocking communication. This takes place over the
+    # separate comm_pipeline communicator, so that these messages
+    # cannot be picked up by any other (blocking) receive, with a tag
+    # distinguishing the data from the particle counts.
+    mv_recv_buf = get_buffer(
+        size_particle*N_particles_recv + component_send.use_rungs, ('pipeline recv', slot),
+    )
+    requests = [
+        comm_pipeline.Irecv(
+            buf_and_dtype(mv_recv_buf[:size_particle*N_particles_recv + component_send.use_rungs]),
+            source=source, tag=1,
+        ),
+        comm_pipeline.Isend(buf_and_dtype(mv_send_buf[:n_send]), dest=dest, tag=1),
+    ]
+    return (
+        component_recv, requests, variables, tiling_name, interaction_name,
+        source, tile_indices_recv, slot,
+    )
+
+# Function which completes a communication started by
+# sendrecv_component_start(), returning the buffer component.
+@cython.header(
+    # Arguments
+    pending=tuple,
+    # Locals
+    N_particles_recv='Py_ssize_t',
+    component_recv='Component',
+    i='Py_ssize_t',
+    interaction_name=str,
+    mv_recv_buf='double[::1]',
+    n_recv='Py_ssize_t',
+    ptr_recv='double*',
+    ptr_recv_buf='double*',
+    requests=list,
+    rung_indices='signed char*',
+    rung_indices_jumped='signed char*',
+    slot='int',
+    source='int',
+    tile_indices_recv='Py_ssize_t[::1]',
+    tiling_name=str,
+    variable=str,
+    variables=list,
+    returns='Component',
+)
+def sendrecv_component_finish(pending):
+    (
+        component_recv, requests, variables, tiling_name, interaction_name,
+        source, tile_indices_recv, slot,
+    ) = pending
+    # Nothing has been communicated if the destination and source
+    # was really the local process.
+    if not requests:
+        return component_recv
+    MPI.Request.Waitall(requests)
+    # Unpack the received data into the buffer component
+    N_particles_recv = component_recv.N_local
+    mv_recv_buf = get_buffer(
+        (3*len(variables) + 2*component_recv.use_rungs)*N_particles_recv
+            + component_recv.use_rungs,
+        ('pipeline recv', slot),
+    )
+    ptr_recv_buf = cython.address(mv_recv_buf[:])
+    n_recv = 0
+    for variable in variables:
+        if variable == 'pos':
+            ptr_recv = component_recv.pos
+        else:  # variable == 'mom'
+            ptr_recv = component_recv.mom
+        for i in range(3*N_particles_recv):
+            ptr_recv[i] = ptr_recv_buf[n_recv]
+            n_recv += 1
+    if component_recv.use_rungs:
+        rung_indices = component_recv.rung_indices
+        for i in range(N_particles_recv):
+            rung_indices[i] = int(ptr_recv_buf[n_recv])
+            n_recv += 1
+        rung_indices_jumped = component_recv.rung_indices_jumped
+        for i in range(N_particles_recv):
+            rung_indices_jumped[i] = int(ptr_recv_buf[n_recv])
+            n_recv += 1
+        tally_buffer_rungs(component_recv, int(ptr_recv_buf[n_recv]))
+    # Equip the buffer component with its own tiling
+    sort_buffer_component(
+        component_recv, tiling_name, interaction_name, source,
+        pipeline_tile_indices_send_prev[slot],
+    )
+    pipeline_tile_indices_send_prev[slot] = tile_indices_recv
+    return component_recv
+
+# Function which starts the communication of the Δ buffers of the
+# given variables of the buffer component component_send back to the
+# process of rank dest from which its particles came, while receiving
+# the Δ values for the local particles within the tiles given by
+# tile_indices_send of component_recv from the process of rank source.
+# This is the non-blocking counterpart to sendrecv_component() when
+# called with a component_recv. The Δ values of component_send are
+# copied to a separate buffer, so that the buffer component may be
+# nullified and reused as soon as this function returns. The returned
+# record of the pending communication must be passed to
+# sendrecv_Δ_finish(), which completes the communication and applies
+# the received Δ values to component_recv. At most one such
+# communication may be pending at any one time.
+@cython.header(
+    # Arguments
+    component_send='Component',
+    variables=list,  # list of str's
+    pairing_level=str,
+    interaction_name=str,
+    tile_indices_send='Py_ssize_t[::1]',
+    dest='int',
+    source='int',
+    component_recv='Component',
+    use_Δ_recv='bint',
+    # Locals
+    N_particles='Py_ssize_t',
+    N_particles_recv='Py_ssize_t',
+    i='Py_ssize_t',
+    mv_recv_buf='double[::1]',
+    mv_send_buf='double[::1]',
+    n_send='Py_ssize_t',
+    ptr_send='double*',
+    ptr_send_buf='double*',
+    requests=list,
+    rung_index='signed char',
+    rungs_N='Py_ssize_t*',
+    tile_index='Py_ssize_t',
+    tile_indices_send_ptr='Py_ssize_t*',
+    tiles_rungs_N='Py_ssize_t**',
+    tiling_name=str,
+    tiling_recv='Tiling',
+    variable=str,
+    returns=tuple,
+)
+def sendrecv_Δ_start(
+    component_send, variables, pairing_level, interaction_name,
+    tile_indices_send, dest, source, component_recv, use_Δ_recv=True,
+):
+    if component_send.representation != 'particles':
+        abort('The sendrecv_Δ_start function is only implemented for particle components')
+    for variable in variables:
+        if variable == 'pos':
+            abort('Δpos not implemented')
+        elif variable != 'mom':
+            abort(
+                f'Variable "{variable}" supplied to sendrecv_Δ_start() '
+                f'but only "mom" is implemented.'
+            )
+    # No communication is needed if the destination and source is
+    # really the local process.
+    if dest == rank == source:
+        return (component_recv, [], variables, '', tile_indices_send, use_Δ_recv, None)
+    # Determine which tiling to use
+    if pairing_level == 'tile':
+        tiling_name = f'{interaction_name} (tiles)'
+    else:  # pairing_level == 'domain'
+        tiling_name = 'trivial'
+    # All particles of the buffer component are sent back, while we
+    # receive Δ values for all local particles within the tiles given by
+    # tile_indices_send, i.e. the particles which were originally sent.
+    N_particles = component_send.N_local
+    tiling_recv = component_recv.tilings[tiling_name]
+    tiles_rungs_N = tiling_recv.tiles_rungs_N
+    tile_indices_send_ptr = cython.address(tile_indices_send[:])
+    N_particles_recv = 0
+    for tile_index in range(tile_indices_send.shape[0]):
+        tile_index = tile_indices_send_ptr[tile_index]
+        rungs_N    = tiles_rungs_N        [tile_index]
+        for rung_index in range(
+            ℤ[component_recv.lowest_populated_rung],
+            ℤ[component_recv.highest_populated_rung + 1],
+        ):
+            N_particles_recv += rungs_N[rung_index]
+    # Copy the Δ values into a contiguous send buffer
+    mv_send_buf = get_buffer(3*len(variables)*N_particles, 'pipeline Δ send')
+    ptr_send_buf = cython.address(mv_send_buf[:])
+    n_send = 0
+    for variable in variables:
+        ptr_send = component_send.Δmom  # variable == 'mom'
+        for i in range(3*N_particles):
+            ptr_send_buf[n_send] = ptr_send[i]
+            n_send += 1
+    # Post the non-blocking communication, using a tag distinct from
+    # those used by sendrecv_component_start().
+    mv_recv_buf = get_buffer(3*len(variables)*N_particles_recv, 'pipeline Δ recv')
+    requests = [
+        comm_pipeline.Irecv(buf_and_dtype(mv_recv_buf), source=source, tag=2),
+        comm_pipeline.Isend(buf_and_dtype(mv_send_buf[:n_send]), dest=dest, tag=2),
+    ]
+    return (
+        component_recv, requests, variables, tiling_name,
+        tile_indices_send, use_Δ_recv, mv_recv_buf,
+    )
+
+# Function which completes a communication started by
+# sendrecv_Δ_start(), adding the received Δ values to the Δ buffers
+# of the receiving component, or directly to its data if use_Δ_recv
+# is False.
+@cython.header(
+    # Arguments
+    pending=tuple,
+    # Locals
+    N_particles_recv='Py_ssize_t',
+    component_recv='Component',
+    mv_recv_buf='double[::1]',
+    n_recv='Py_ssize_t',
+    ptr_recv='double*',
+    requests=list,
+    tile_indices_send='Py_ssize_t[::1]',
+    tiling_name=str,
+    use_Δ_recv='bint',
+    variable=str,
+    variables=list,
+    returns='void',
+)
+def sendrecv_Δ_finish(pending):
+    (
+        component_recv, requests, variables, tiling_name,
+        tile_indices_send, use_Δ_recv, mv_recv_buf,
+    ) = pending
+    # Nothing has been communicated if the destination and source
+    # was really the local process.
+    if not requests:
+        return
+    MPI.Request.Waitall(requests)
+    # Apply the received Δ values
+    N_particles_recv = mv_recv_buf.shape[0]//(3*len(variables))
+    n_recv = 0
+    for variable in variables:
+        # variable == 'mom'
+        if use_Δ_recv:
+            ptr_recv = component_recv.Δmom
+        else:
+            ptr_recv = component_recv.mom
+        copy_particles_in_tiles(
+            component_recv,
+            component_recv.tilings[tiling_name], tile_indices_send,
+            cython.address(mv_recv_buf[n_recv:]), ptr_recv,
+            add=True,
+        )
+        n_recv += 3*N_particles_recv
+
+# Declare global variables used by the sendrecv_component_start(),
+# sendrecv_component_finish(), sendrecv_Δ_start() and sendrecv_Δ_finish()
+# functions. A duplicate of the global communicator is used for the
+# pipelined communication.
+cython.declare(
+    comm_pipeline=object,  # mpi4py.MPI.Intracomm
+    pipeline_buffers=list,
+    pipeline_slot='int',
+    pipeline_tile_indices_send_prev=list,
+)
+comm_pipeline = comm.Dup()
+pipeline_buffers = [None, None]
+pipeline_slot = 0
+pipeline_tile_indices_send_prev = [None, None]
+
+# Function for removing the tilings of the buffer components used by
+# the sendrecv_component*() functions, as these depend on the domain
+# decomposition. Tilings whose names contain any of the given
+# substrings are kept.
+@cython.pheader(
+    # Arguments
+    keep=tuple,
+    # Locals
+    buffer=object,  # Component or None
+    tiling_name=str,
+    returns='void',
+)
+def clear_buffer_tilings(keep=()):
+    global tile_indices_send_prev
+    for buffer in [component_buffer] + pipeline_buffers:
+        if buffer is None:
+            continue
+        for tiling_name in list(buffer.tilings.keys()):
+            if tiling_name == 'trivial' or any([s in tiling_name for s in keep]):
+                continue
+            buffer.tilings.pop(tiling_name)
+    tile_indices_send_prev = None
+    pipeline_tile_indices_send_prev[:] = [None, None]
+
 # Helper function for the sendrecv_component() function,
 # handling copying of particle data within specified tiles to a buffer.
 @cython.header(
@@ -1674,6 +2155,9 @@ def get_buffer(size_or_shape=-1, buffer_name=0, nullify=False):
     A buffer with the given name does not have to exist beforehand.
     A given buffer will be reallocated (enlarged) if necessary.
     If nullify is True, all elements of the buffer will be set to 0.
+    Buffers not requested since the last call to manage_memory() (see
+    mesh.py) may be freed by the memory manager, and so references to
+    buffers should not be kept past such calls.
     """
     global buffers
     # Get shape and size from argument
@@ -1715,6 +2199,8 @@ def get_buffer(size_or_shape=-1, buffer_name=0, nullify=False):
         buffers[N_buffers - 1] = buffer
         buffer_mv = cast(buffer, 'double[:size]')
         buffers_mv[buffer_name] = buffer_mv
+    # Record the use of this buffer for the memory manager
+    buffers_last_use[buffer_name] = buffers_epoch
     # Nullify the buffer, if required
     if nullify:
         for i in range(size):
@@ -1758,6 +2244,66 @@ buffers[0] = buffer
 buffer_mv = cast(buffer, 'double[:1]')
 buffers_mv = {}
 buffers_mv[0] = buffer_mv
+# The memory epoch is advanced by the memory manager at points where no
+# references to buffers are held. Buffers with a last use earlier
+# than the current epoch are thus idle.
+cython.declare(buffers_epoch='Py_ssize_t', buffers_last_use=dict)
+buffers_epoch = 0
+buffers_last_use = {0: 0}
+
+# Function which frees one of the global buffers
+@cython.header(
+    # Arguments
+    buffer_name=object,  # Any hashable object
+    # Local
+    N_buffers='Py_ssize_t',
+    i='Py_ssize_t',
+    index='Py_ssize_t',
+    key=object,  # Any hashable object
+    returns='void',
+)
+def free_buffer(buffer_name):
+    if buffer_name not in buffers_mv:
+        abort(f'Cannot free buffer "{buffer_name}" as it does not exist')
+    index = 0
+    for key in buffers_mv:
+        if key == buffer_name:
+            break
+        index += 1
+    free(buffers[index])
+    # Shift the remaining buffer pointers so that their order matches
+    # the order of the keys in buffers_mv.
+    N_buffers = len(buffers_mv)
+    for i in range(index, N_buffers - 1):
+        buffers[i] = buffers[i + 1]
+    buffers_mv.pop(buffer_name)
+    buffers_last_use.pop(buffer_name, None)
+
+# Function returning the memory usage of the global buffers, as a dict
+# mapping buffer names to (size in bytes, memory epoch of last use).
+@cython.header(
+    # Locals
+    buffer_mv='double[::1]',
+    buffer_name=object,  # Any hashable object
+    usage=dict,
+    returns=dict,
+)
+def get_buffers_usage():
+    usage = {}
+    for buffer_name, buffer_mv in buffers_mv.items():
+        usage[buffer_name] = (
+            buffer_mv.shape[0]*ℤ[C2np['double']().itemsize],
+            buffers_last_use.get(buffer_name, 0),
+        )
+    return usage
+
+# Function for advancing the memory epoch of the global buffers,
+# rendering all buffers idle.
+@cython.header(returns='Py_ssize_t')
+def advance_buffers_epoch():
+    global buffers_epoch
+    buffers_epoch += 1
+    return buffers_epoch
 
 # Function computing basic domain information
 # and collecting them into a namespace.
@@ -1802,10 +2348,172 @@ def get_domain_info():
         size_z_inv = np.nextafter(size_z_inv, ထ)
     while boxsize*size_z_inv >= subdivisions[2]:
         size_z_inv = np.nextafter(size_z_inv, -ထ)
+    # The cuts between the domains along each dimension. These are
+    # placed on a lattice with a resolution (number of lattice units
+    # across the box) for each dimension, with the cuts themselves
+    # stored in lattice units. Initially the lattice coincides with
+    # the uniform domain decomposition. A non-uniform decomposition
+    # may later be installed by set_domain_decomposition().
+    dynamic = False
+    resolution = subdivisions.copy()
+    cuts_units = [arange(subdivisions[dim] + 1, dtype=C2np['int']) for dim in range(3)]
+    cuts_x = asarray(cuts_units[0])*size_x
+    cuts_y = asarray(cuts_units[1])*size_y
+    cuts_z = asarray(cuts_units[2])*size_z
     # Return everything collected into a common namespace
     domain_info = types.SimpleNamespace(**locals())
     return domain_info
 
+# Function for installing a new (generally non-uniform) domain
+# decomposition, given as the cuts between the domains along each
+# dimension in units of the lattice with the given resolution.
+# The domain layout (which process governs which domain) is unchanged,
+# and so the cuts along each dimension are shared by all domains.
+# The namespace returned by get_domain_info() is updated in-place.
+# Note that all domain grids and tilings must be reconstructed and all
+# particles exchanged after a change of the domain decomposition.
+@cython.pheader(
+    # Arguments
+    resolution='int[::1]',
+    cuts_units=list,
+    # Locals
+    cuts=object,  # np.ndarray
+    dim='int',
+    domain_info=object,  # types.SimpleNamespace
+    returns='void',
+)
+def set_domain_decomposition(resolution, cuts_units):
+    global domain_dynamic, domain_cuts_x, domain_cuts_y, domain_cuts_z
+    domain_info = get_domain_info()
+    for dim in range(3):
+        cuts = asarray(cuts_units[dim], dtype=C2np['int'])
+        if (
+               cuts.shape[0] != domain_subdivisions[dim] + 1
+            or cuts[0] != 0
+            or cuts[cuts.shape[0] - 1] != resolution[dim]
+            or np.any(np.diff(cuts) < 1)
+        ):
+            abort(
+                f'Invalid domain cuts {cuts} along dimension {dim} '
+                f'with resolution {resolution[dim]}'
+            )
+    domain_info.dynamic = True
+    domain_info.resolution = asarray(resolution, dtype=C2np['int']).copy()
+    domain_info.cuts_units = [
+        asarray(cuts_units[dim], dtype=C2np['int']).copy() for dim in range(3)
+    ]
+    domain_info.cuts_x = domain_info.cuts_units[0]*(boxsize/domain_info.resolution[0])
+    domain_info.cuts_y = domain_info.cuts_units[1]*(boxsize/domain_info.resolution[1])
+    domain_info.cuts_z = domain_info.cuts_units[2]*(boxsize/domain_info.resolution[2])
+    # Update the start and end coordinates and the size
+    # of the local domain.
+    domain_info.bgn_x = domain_info.cuts_x[domain_layout_local_indices[0]    ]
+    domain_info.bgn_y = domain_info.cuts_y[domain_layout_local_indices[1]    ]
+    domain_info.bgn_z = domain_info.cuts_z[domain_layout_local_indices[2]    ]
+    domain_info.end_x = domain_info.cuts_x[domain_layout_local_indices[0] + 1]
+    domain_info.end_y = domain_info.cuts_y[domain_layout_local_indices[1] + 1]
+    domain_info.end_z = domain_info.cuts_z[domain_layout_local_indices[2] + 1]
+    domain_info.size_x = domain_info.end_x - domain_info.bgn_x
+    domain_info.size_y = domain_info.end_y - domain_info.bgn_y
+    domain_info.size_z = domain_info.end_z - domain_info.bgn_z
+    # Update the global variables used by which_domain(),
+    # padding the cuts with ∓ထ.
+    domain_dynamic = True
+    domain_cuts_x = get_padded_cuts(domain_info.cuts_x)
+    domain_cuts_y = get_padded_cuts(domain_info.cuts_y)
+    domain_cuts_z = get_padded_cuts(domain_info.cuts_z)
+
+# Function returning the start coordinates
+# of the domain governed by the process of the given rank.
+@cython.header(
+    # Arguments
+    rank_other='int',
+    # Locals
+    domain_layout_other=tuple,
+    returns='double[::1]',
+)
+def get_domain_bgn(rank_other):
+    domain_layout_other = np.unravel_index(rank_other, domain_subdivisions)
+    return asarray(
+        (
+            domain_info.cuts_x[domain_layout_other[0]],
+            domain_info.cuts_y[domain_layout_other[1]],
+            domain_info.cuts_z[domain_layout_other[2]],
+        ),
+        dtype=C2np['double'],
+    )
+
+# Helper function for set_domain_decomposition()
+@cython.header(
+    # Arguments
+    cuts='double[::1]',
+    # Locals
+    cuts_padded='double[::1]',
+    returns='double[::1]',
+)
+def get_padded_cuts(cuts):
+    cuts_padded = asarray(cuts).copy()
+    cuts_padded[0] = -ထ
+    cuts_padded[cuts_padded.shape[0] - 1] = ထ
+    return cuts_padded
+
+# Function for computing domain cuts along a single dimension,
+# distributing the given cost equally between the domains.
+# The costs are given as a histogram over the lattice units along the
+# dimension, with the returned cuts in lattice units as well.
+# Each domain is required to span at least width_min lattice units.
+@cython.pheader(
+    # Arguments
+    costs='double[::1]',
+    n='int',
+    width_min='int',
+    # Locals
+    cost_total='double',
+    costs_cumulative=object,  # np.ndarray
+    cut='Py_ssize_t',
+    cut_max='Py_ssize_t',
+    cut_min='Py_ssize_t',
+    cuts='int[::1]',
+    j='int',
+    resolution='Py_ssize_t',
+    target='double',
+    returns='int[::1]',
+)
+def balance_domain_cuts(costs, n, width_min):
+    resolution = costs.shape[0]
+    if width_min < 1:
+        width_min = 1
+    if n*width_min > resolution:
+        abort(
+            f'Cannot cut {resolution} lattice units into {n} domains '
+            f'each spanning at least {width_min} units'
+        )
+    costs_cumulative = np.concatenate(([0], np.cumsum(costs)))
+    cost_total = costs_cumulative[resolution]
+    cuts = empty(n + 1, dtype=C2np['int'])
+    cuts[0] = 0
+    cuts[n] = resolution
+    for j in range(1, n):
+        # Place the cut at the lattice unit where the cumulative cost
+        # is closest to the target. Without any cost at all,
+        # fall back to a uniform decomposition.
+        if cost_total > 0:
+            target = j*cost_total/n
+            cut = np.searchsorted(costs_cumulative, target)
+            if cut > 0 and (
+                target - costs_cumulative[cut - 1] < costs_cumulative[cut] - target
+            ):
+                cut -= 1
+        else:
+            cut = (j*resolution)//n
+        # Respect the minimum width of all domains
+        cut_min = cuts[j - 1] + width_min
+        cut_max = resolution - (n - j)*width_min
+        cut = pairmax(cut, cut_min)
+        cut = pairmin(cut, cut_max)
+        cuts[j] = cut
+    return cuts
+
 
 
 # Get local domain information
@@ -1816,21 +2524,23 @@ cython.declare(
     domain_subdivisions_21='int',
     domain_layout='int[:, :, ::1]',
     domain_layout_local_indices='int[::1]',
-    domain_size_x='double',
-    domain_size_y='double',
-    domain_size_z='double',
     domain_size_x_inv='double',
     domain_size_y_inv='double',
     domain_size_z_inv='double',
+    domain_dynamic='bint',
+    domain_cuts_x='double[::1]',
+    domain_cuts_y='double[::1]',
+    domain_cuts_z='double[::1]',
 )
 domain_subdivisions         = domain_info.subdivisions
 domain_subdivisions_2       = domain_info.subdivisions[2]
 domain_subdivisions_21      = domain_info.subdivisions[1]*domain_info.subdivisions[2]
 domain_layout               = domain_info.layout
 domain_layout_local_indices = domain_info.layout_local_indices
-domain_size_x               = domain_info.size_x
-domain_size_y               = domain_info.size_y
-domain_size_z               = domain_info.size_z
 domain_size_x_inv           = domain_info.size_x_inv
 domain_size_y_inv           = domain_info.size_y_inv
 domain_size_z_inv           = domain_info.size_z_inv
+domain_dynamic              = domain_info.dynamic
+domain_cuts_x               = get_padded_cuts(domain_info.cuts_x)
+domain_cuts_y               = get_padded_cuts(domain_info.cuts_y)
+domain_cuts_z               = get_padded_cuts(domain_info.cuts_z)
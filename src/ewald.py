@@ -26,10 +26,11 @@ from commons import *
 
 # Cython imports
 cimport(
-    'from mesh import               '
-    '    interpolate_in_vectorgrid, '
-    '    tabulate_vectorgrid,       '
+    'from communication import '
+    '    partition,            '
+    '    smart_mpi,            '
 )
+cimport('from mesh import interpolate_in_vectorgrid')
 
 
 
@@ -48,7 +49,7 @@ cimport(
     force_x='double',
     force_y='double',
     force_z='double',
-    h2='int',
+    kvectors_ptr='double*',
     kx='double',
     ky='double',
     kz='double',
@@ -57,6 +58,7 @@ cimport(
     sumindex_x='int',
     sumindex_y='int',
     sumindex_z='int',
+    ℓ='Py_ssize_t',
     returns='double*',
 )
 def summation(x, y, z):
@@ -103,21 +105,19 @@ def summation(x, y, z):
                 force_x += dist_x*scalarpart
                 force_y += dist_y*scalarpart
                 force_z += dist_z*scalarpart
-    # The long range (Fourier space) sum
-    for sumindex_x in range(h_lower, h_upper):
-        kx = 2*π*sumindex_x
-        for sumindex_y in range(h_lower, h_upper):
-            ky = 2*π*sumindex_y
-            for sumindex_z in range(h_lower, h_upper):
-                h2 = ℤ[ℤ[sumindex_x**2] + sumindex_y**2] + sumindex_z**2
-                if h2 > maxh2 or h2 == 0:
-                    continue
-                kz = 2*π*sumindex_z
-                k2 = ℝ[ℝ[kx**2] + ky**2] + kz**2
-                scalarpart = -4*π/k2*exp(-k2*ℝ[rs**2])*sin(kx*x + ky*y + kz*z)
-                force_x += kx*scalarpart
-                force_y += ky*scalarpart
-                force_z += kz*scalarpart
+    # The long range (Fourier space) sum. The contributions from the
+    # wave vectors k⃗ and -k⃗ are identical, and so we only sum over
+    # half of the wave vectors, the amplitudes of which already include
+    # the factor of 2 as well as the k⃗ dependent scalar factor.
+    kvectors_ptr = cython.address(kvectors[:, :])
+    for ℓ in range(kvectors.shape[0]):
+        kx = kvectors_ptr[4*ℓ + 0]
+        ky = kvectors_ptr[4*ℓ + 1]
+        kz = kvectors_ptr[4*ℓ + 2]
+        scalarpart = kvectors_ptr[4*ℓ + 3]*sin(kx*x + ky*y + kz*z)
+        force_x += kx*scalarpart
+        force_y += ky*scalarpart
+        force_z += kz*scalarpart
     # Pack and return Ewald force
     ewald_force[0] = force_x
     ewald_force[1] = force_y
@@ -227,16 +227,96 @@ def get_ewald_grid():
             grid = empty(shape, dtype=C2np['double'])
         Bcast(grid)
     else:
-        # No tabulated Ewald grid found. Compute it. The factor 0.5
-        # ensures that only the first octant of the box is tabulated.
+        # No tabulated Ewald grid found. Compute it.
         grid = tabulate()
     return grid
 
 # Function for tabulation of the Ewald grid
-@cython.pheader(grid='double[:, :, :, ::1]', returns='double[:, :, :, ::1]')
+@cython.pheader(
+    # Locals
+    dim='int',
+    factor='double',
+    force_x='double',
+    force_y='double',
+    force_z='double',
+    grid='double[:, :, :, ::1]',
+    grid_local='double[::1]',
+    grid_unique='double[::1]',
+    i='Py_ssize_t',
+    index='Py_ssize_t',
+    j='Py_ssize_t',
+    k='Py_ssize_t',
+    n_points='Py_ssize_t',
+    n_points_local='Py_ssize_t',
+    start_local='Py_ssize_t',
+    vector_value='double*',
+    ℓ='Py_ssize_t',
+    returns='double[:, :, :, ::1]',
+)
 def tabulate():
+    """Only the first octant of the box is tabulated, with
+    grid[i, j, k] = summation(i*factor, j*factor, k*factor)
+    and factor = 0.5/(ewald_gridsize - 1). As the periodic lattice of
+    images is cubic, permuting the coordinates of a point permutes
+    the components of the Ewald correction in the same manner.
+    We thus only compute the correction at the grid points with
+    i >= j >= k (about a sixth of all points), distributed fairly
+    among the processes. The full grid is then filled in on all
+    processes, after which it is saved to disk by the master process.
+    """
     masterprint(f'Tabulating Ewald grid of size {ewald_gridsize} ...')
-    grid = tabulate_vectorgrid(ewald_gridsize, summation, 0.5/(ewald_gridsize - 1), filename)
+    factor = 0.5/(ewald_gridsize - 1)
+    # Partition the unique grid points among the processes
+    n_points = ewald_gridsize*(ewald_gridsize + 1)*(ewald_gridsize + 2)//6
+    start_local, n_points_local = partition(n_points)
+    # Tabulate the local unique grid points
+    grid_local = empty(3*n_points_local, dtype=C2np['double'])
+    index = 0
+    for i in range(ewald_gridsize):
+        for j in range(i + 1):
+            for k in range(j + 1):
+                if start_local <= index < ℤ[start_local + n_points_local]:
+                    vector_value = summation(i*factor, j*factor, k*factor)
+                    ℓ = 3*(index - start_local)
+                    for dim in range(3):
+                        grid_local[ℓ + dim] = vector_value[dim]
+                index += 1
+    # Gather all unique grid points on all processes
+    grid_unique = empty(3*n_points, dtype=C2np['double'])
+    smart_mpi(grid_local, grid_unique, mpifun='allgatherv')
+    # Fill in the full grid from the unique grid points
+    grid = empty([ewald_gridsize]*3 + [3], dtype=C2np['double'])
+    index = 0
+    for i in range(ewald_gridsize):
+        for j in range(i + 1):
+            for k in range(j + 1):
+                force_x = grid_unique[3*index + 0]
+                force_y = grid_unique[3*index + 1]
+                force_z = grid_unique[3*index + 2]
+                grid[i, j, k, 0] = force_x
+                grid[i, j, k, 1] = force_y
+                grid[i, j, k, 2] = force_z
+                grid[i, k, j, 0] = force_x
+                grid[i, k, j, 1] = force_z
+                grid[i, k, j, 2] = force_y
+                grid[j, i, k, 0] = force_y
+                grid[j, i, k, 1] = force_x
+                grid[j, i, k, 2] = force_z
+                grid[j, k, i, 0] = force_y
+                grid[j, k, i, 1] = force_z
+                grid[j, k, i, 2] = force_x
+                grid[k, i, j, 0] = force_z
+                grid[k, i, j, 1] = force_x
+                grid[k, i, j, 2] = force_y
+                grid[k, j, i, 0] = force_z
+                grid[k, j, i, 1] = force_y
+                grid[k, j, i, 2] = force_x
+                index += 1
+    # Save grid to disk, stored as a flat array
+    if master:
+        os.makedirs(os.path.dirname(filename), exist_ok=True)
+        with open_hdf5(filename, mode='w') as hdf5_file:
+            hdf5_file.create_dataset('data', data=asarray(grid).reshape(-1))
     masterprint('done')
     return grid
 
@@ -269,3 +349,23 @@ h_lower = -isqrt(maxh2)
 h_upper = +isqrt(maxh2) + 1
 n_lower = -int(maxdist + 1)
 n_upper = +int(maxdist + 1) + 1
+
+# Wave vectors k⃗ = 2π*h⃗ used for the Fourier space sum of the
+# summation function, together with their amplitudes
+# 2*(-4π/k²)*exp(-k²*rs²). Of each pair (k⃗, -k⃗), only the one
+# with the (lexicographically) positive h⃗ is included.
+cython.declare(kvectors='double[:, ::1]')
+kvectors = asarray(
+    [
+        (
+            2*π*hx, 2*π*hy, 2*π*hz,
+            -8*π/(4*π**2*(hx**2 + hy**2 + hz**2))
+                *exp(-4*π**2*(hx**2 + hy**2 + hz**2)*rs**2),
+        )
+        for hx in range(h_lower, h_upper)
+        for hy in range(h_lower, h_upper)
+        for hz in range(h_lower, h_upper)
+        if 0 < hx**2 + hy**2 + hz**2 <= maxh2 and (hx, hy, hz) > (0, 0, 0)
+    ],
+    dtype=C2np['double'],
+)
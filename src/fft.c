@@ -108,7 +108,8 @@ struct fftw_return_struct fftw_setup(
     ptrdiff_t gridsize_k,
     char* fftw_wisdom_rigor,
     int fftw_wisdom_reuse,
-    char* wisdom_filename
+    char* wisdom_filename,
+    int nthreads
 ) {
     /* Arguments to this function:
      * - Linear gridsize of dimension 1.
@@ -118,6 +119,9 @@ struct fftw_return_struct fftw_setup(
      *   of the wisdom. In order of patience:
      *     "estimate", "measure", "patient", "exhaustive".
      * - Flag specifying whether or not to use pre-existing FFTW wisdom.
+     * - Path to the wisdom file.
+     * - Number of threads with which to carry out the transforms.
+     *   This has no effect unless FFTW is built with OpenMP support.
      */
 
     /* Size of last dimension with padding */
@@ -134,6 +138,21 @@ struct fftw_return_struct fftw_setup(
     else if (strcmp(fftw_wisdom_rigor, "exhaustive") == 0)
         rigor_flag = FFTW_EXHAUSTIVE;
 
+    /* Initialize threaded FFTW, which must be done prior to
+     * initializing parallel FFTW and only once. The number of threads
+     * used within each process is then set for all subsequent planning.
+     */
+    #ifdef FFTW_THREADS
+        static int threads_initialized = 0;
+        if (!threads_initialized) {
+            fftw_init_threads();
+            threads_initialized = 1;
+        }
+        fftw_plan_with_nthreads(nthreads < 1 ? 1 : nthreads);
+    #else
+        (void) nthreads;
+    #endif
+
     /* Initialize parallel FFTW (note that MPI_Init should not be
      * called, as MPI is already running via MPI4Py).
      * This function may be called multiple times in one MPI session
@@ -288,3 +307,243 @@ void fftw_clean(
     fftw_destroy_plan(plan_backward);
     fftw_mpi_cleanup();
 }
+
+
+
+/* Single-precision transforms
+ *
+ * The functions fftw_setup_single and fftw_execute_single implement
+ * single-precision transforms of the double-precision slabs allocated
+ * by fftw_setup. Prior to a transform, the slab is converted in-place
+ * to single precision, occupying the first half of its memory, with
+ * the transform itself (including the distributed transpositions)
+ * then carried out in single precision. Afterwards the slab is
+ * converted back to double precision, again in-place. The memory
+ * footprint is thus that of the double-precision slab, with only the
+ * arithmetic and communication of the transform itself reduced. As
+ * the local slab sizes (counted in elements) do not depend on the
+ * precision, the same slab decomposition applies to both. The plans
+ * are created using a temporary single-precision grid and then executed
+ * on the converted slabs through the FFTW new-array execute interface.
+ * Single-precision transforms are only available if a single-precision
+ * FFTW library (--enable-float) is found at compile time, in which
+ * case FFTW_SINGLE is defined.
+ */
+
+struct fftw_single_struct {
+    fftwf_plan plan_forward;
+    fftwf_plan plan_backward;
+};
+
+/* Returns 1 if single-precision transforms are available, 0 if not */
+int fftw_single_available(void) {
+    #ifdef FFTW_SINGLE
+        return 1;
+    #else
+        return 0;
+    #endif
+}
+
+/* This function creates single-precision forwards and backwards
+ * plans, usable with any slab of the given grid size. The arguments
+ * are as for fftw_setup.
+ */
+struct fftw_single_struct fftw_setup_single(
+    ptrdiff_t gridsize_i,
+    ptrdiff_t gridsize_j,
+    ptrdiff_t gridsize_k,
+    char* fftw_wisdom_rigor,
+    int fftw_wisdom_reuse,
+    char* wisdom_filename,
+    int nthreads
+) {
+    struct fftw_single_struct fftw_struct = {NULL, NULL};
+    #ifdef FFTW_SINGLE
+        int rank;
+        MPI_Comm_rank(MPI_COMM_WORLD, &rank);
+        int master_rank = 0;
+        int master = (rank == master_rank);
+        ptrdiff_t gridsize_padding = 2*(gridsize_k/2 + 1);
+        unsigned rigor_flag = FFTW_ESTIMATE;
+        if (strcmp(fftw_wisdom_rigor, "measure") == 0)
+            rigor_flag = FFTW_MEASURE;
+        else if (strcmp(fftw_wisdom_rigor, "patient") == 0)
+            rigor_flag = FFTW_PATIENT;
+        else if (strcmp(fftw_wisdom_rigor, "exhaustive") == 0)
+            rigor_flag = FFTW_EXHAUSTIVE;
+        #ifdef FFTW_THREADS
+            static int threads_initialized = 0;
+            if (!threads_initialized) {
+                fftwf_init_threads();
+                threads_initialized = 1;
+            }
+            fftwf_plan_with_nthreads(nthreads < 1 ? 1 : nthreads);
+        #else
+            (void) nthreads;
+        #endif
+        fftwf_mpi_init();
+        /* Temporary grid used for the planning */
+        ptrdiff_t gridsize_local_i, gridstart_local_i;
+        ptrdiff_t gridsize_local_j, gridstart_local_j;
+        float* grid = fftwf_alloc_real(fftwf_mpi_local_size_3d_transposed(
+            gridsize_i,
+            gridsize_j,
+            gridsize_padding,
+            MPI_COMM_WORLD,
+            &gridsize_local_i,
+            &gridstart_local_i,
+            &gridsize_local_j,
+            &gridstart_local_j
+        ));
+        /* Read in previous wisdom and broadcast it */
+        int reused = 0;
+        if (fftw_wisdom_reuse) {
+            if (master)
+                reused = fftwf_import_wisdom_from_filename(wisdom_filename);
+            fftwf_mpi_broadcast_wisdom(MPI_COMM_WORLD);
+        }
+        MPI_Bcast(&reused, 1, MPI_INT, master_rank, MPI_COMM_WORLD);
+        /* Create the two plans */
+        fftw_struct.plan_forward = fftwf_mpi_plan_dft_r2c_3d(
+            gridsize_i,
+            gridsize_j,
+            gridsize_k,
+            grid,
+            (fftwf_complex*) grid,
+            MPI_COMM_WORLD,
+            rigor_flag | FFTW_MPI_TRANSPOSED_OUT
+        );
+        fftw_struct.plan_backward = fftwf_mpi_plan_dft_c2r_3d(
+            gridsize_i,
+            gridsize_j,
+            gridsize_k,
+            (fftwf_complex*) grid,
+            grid,
+            MPI_COMM_WORLD,
+            rigor_flag | FFTW_MPI_TRANSPOSED_IN
+        );
+        fftwf_free(grid);
+        /* Agree on the wisdom and save it to disk if it is new */
+        fftwf_mpi_gather_wisdom(MPI_COMM_WORLD);
+        fftwf_mpi_broadcast_wisdom(MPI_COMM_WORLD);
+        if (master && fftw_wisdom_reuse && ! reused) {
+            fftwf_export_wisdom_to_filename(wisdom_filename);
+        }
+    #else
+        (void) gridsize_i;
+        (void) gridsize_j;
+        (void) gridsize_k;
+        (void) fftw_wisdom_rigor;
+        (void) fftw_wisdom_reuse;
+        (void) wisdom_filename;
+        (void) nthreads;
+    #endif
+    return fftw_struct;
+}
+
+/* Number of leading slab elements converted serially between
+ * precisions, before the conversion is carried out in parallel.
+ */
+#define PRECISION_CONVERSION_SERIAL 4096
+
+/* Helper functions converting the slab of the given local size in-place
+ * between double and single precision, using nthreads threads.
+ * The conversions are done through memcpy on the raw bytes, as the two
+ * representations share memory. When narrowing, element i is written
+ * to bytes [4i, 4i + 4), within the double elements [i/2, i/2 + 1).
+ * Once the elements [0, m) have been narrowed, the elements [m, 2m)
+ * are thus written to the double elements [m/2, m), which have already
+ * been read and do not overlap with [m, 2m). Each such doubling stage
+ * can then be carried out in parallel. When widening, the same stages
+ * are carried out in reverse order.
+ */
+static void convert_to_single(double* grid, ptrdiff_t size, int nthreads) {
+    char* bytes = (char*) grid;
+    double value_double;
+    float value_float;
+    ptrdiff_t i, m, m_end;
+    m = (size < PRECISION_CONVERSION_SERIAL ? size : PRECISION_CONVERSION_SERIAL);
+    for (i = 0; i < m; i++) {
+        memcpy(&value_double, bytes + i*sizeof(double), sizeof(double));
+        value_float = (float) value_double;
+        memcpy(bytes + i*sizeof(float), &value_float, sizeof(float));
+    }
+    for (; m < size; m = m_end) {
+        m_end = (2*m < size ? 2*m : size);
+        #pragma omp parallel for num_threads(nthreads) schedule(static) \
+            private(value_double, value_float)
+        for (i = m; i < m_end; i++) {
+            memcpy(&value_double, bytes + i*sizeof(double), sizeof(double));
+            value_float = (float) value_double;
+            memcpy(bytes + i*sizeof(float), &value_float, sizeof(float));
+        }
+    }
+}
+static void convert_to_double(double* grid, ptrdiff_t size, int nthreads) {
+    char* bytes = (char*) grid;
+    double value_double;
+    float value_float;
+    ptrdiff_t i, m, m_end;
+    /* Find the beginning of the last doubling stage */
+    m = (size < PRECISION_CONVERSION_SERIAL ? size : PRECISION_CONVERSION_SERIAL);
+    while (2*m < size)
+        m *= 2;
+    for (m_end = size; m_end > PRECISION_CONVERSION_SERIAL; m_end = m, m /= 2) {
+        #pragma omp parallel for num_threads(nthreads) schedule(static) \
+            private(value_double, value_float)
+        for (i = m; i < m_end; i++) {
+            memcpy(&value_float, bytes + i*sizeof(float), sizeof(float));
+            value_double = (double) value_float;
+            memcpy(bytes + i*sizeof(double), &value_double, sizeof(double));
+        }
+    }
+    for (i = m_end - 1; i >= 0; i--) {
+        memcpy(&value_float, bytes + i*sizeof(float), sizeof(float));
+        value_double = (double) value_float;
+        memcpy(bytes + i*sizeof(double), &value_double, sizeof(double));
+    }
+}
+
+/* This function carries out a single-precision transform of the
+ * double-precision slab of the given local size (number of elements),
+ * using one of the plans from fftw_setup_single. The conversions
+ * between precisions are carried out using nthreads threads.
+ */
+void fftw_execute_single(
+    fftwf_plan plan,
+    double* grid,
+    ptrdiff_t size,
+    int forward,
+    int nthreads
+) {
+    #ifdef FFTW_SINGLE
+        convert_to_single(grid, size, nthreads);
+        if (forward)
+            fftwf_mpi_execute_dft_r2c(plan, (float*) grid, (fftwf_complex*) grid);
+        else
+            fftwf_mpi_execute_dft_c2r(plan, (fftwf_complex*) grid, (float*) grid);
+        convert_to_double(grid, size, nthreads);
+    #else
+        (void) plan;
+        (void) grid;
+        (void) size;
+        (void) forward;
+        (void) nthreads;
+    #endif
+}
+
+/* Destroys single-precision plans obtained from fftw_setup_single */
+void fftw_destroy_single(
+    fftwf_plan plan_forward,
+    fftwf_plan plan_backward
+) {
+    #ifdef FFTW_SINGLE
+        if (plan_forward != NULL)
+            fftwf_destroy_plan(plan_forward);
+        if (plan_backward != NULL)
+            fftwf_destroy_plan(plan_backward);
+    #else
+        (void) plan_forward;
+        (void) plan_backward;
+    #endif
+}
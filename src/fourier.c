@@ -0,0 +1,259 @@
+/*
+This file is part of CO𝘕CEPT, the cosmological 𝘕-body code in Python.
+Copyright © 2015–2024 Jeppe Mosgaard Dakin.
+
+CO𝘕CEPT is free software: You can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+CO𝘕CEPT is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with CO𝘕CEPT. If not, see https://www.gnu.org/licenses/
+
+The author of CO𝘕CEPT can be contacted at dakin(at)phys.au.dk
+The latest version of CO𝘕CEPT is available at
+https://github.com/jmd-dk/concept/
+*/
+
+
+
+#include <float.h>
+#include <math.h>
+
+/* This file defines the function fourier_slab_threaded, which
+ * carries out a combined deconvolution, interlacing, differentiation
+ * and Green's function multiplication of a Fourier space slab, using
+ * a team of OpenMP threads within each MPI process. It is the threaded
+ * counterpart to the fourier_loop() iterator of the mesh module as
+ * used by fourier_operate() and laplacian_inverse(), visiting the same
+ * Fourier modes and applying the same factors. The local slab is split
+ * along its outermost (j) dimension, so that each thread operates on
+ * its own contiguous part of the slab.
+ */
+
+/* Note on the slab layout
+ *
+ * In Fourier space, the slab is indexed as
+ *   slab[(j*gridsize + i)*(gridsize + 2) + 2*kk]
+ * with j the local index along the distributed dimension. Modes on
+ * either of the three Nyquist planes are skipped, as are the modes at
+ * ki = kj = kk = 0 when a Green's function is applied (k² = 0).
+ */
+
+void fourier_slab_threaded(
+    int nthreads,
+    double* slab,
+    Py_ssize_t gridsize,
+    Py_ssize_t slab_size_j,
+    Py_ssize_t slab_start_j,
+    int deconv_order,
+    double deconv_factor,
+    double interlace_factor,
+    int interlace,
+    double theta_i,
+    double theta_j,
+    double theta_k,
+    int diff_dim,
+    double k_fundamental,
+    int green,
+    double green_factor,
+    double green_exponent
+) {
+    /* Arguments to this function:
+     * - Number of threads to use.
+     * - The local Fourier space slab.
+     * - The global grid size, the local size of the slab along the
+     *   distributed j-dimension and the global j-index of its start.
+     * - The deconvolution order (0 for no deconvolution) and the
+     *   factor π/gridsize converting grid units to the argument of the
+     *   1D NGP deconvolution factor.
+     * - The interlacing factor (1/number of sub-lattices), whether the
+     *   complex phase is to be rotated for interlacing and the angles
+     *   -2π/gridsize*shift along each dimension.
+     * - The dimension along which to differentiate (-1 for none)
+     *   and the fundamental wave number 2π/boxsize.
+     * - Whether to apply a Green's function, in which case each mode
+     *   is further multiplied by
+     *     green_factor/k2*exp(green_exponent*k2)
+     *   with k2 the squared wave vector length in grid units.
+     */
+    Py_ssize_t nyquist = gridsize/2;
+    Py_ssize_t size_k = gridsize + 2;
+    Py_ssize_t j;
+    #pragma omp parallel for num_threads(nthreads) schedule(static)
+    for (j = 0; j < slab_size_j; j++) {
+        Py_ssize_t j_global = slab_start_j + j;
+        if (j_global == nyquist)
+            continue;
+        Py_ssize_t kj = j_global - (j_global > nyquist ? gridsize : 0);
+        double deconv_j_numer = kj*deconv_factor + DBL_EPSILON;
+        double deconv_j_denom = sin(deconv_j_numer);
+        Py_ssize_t i;
+        for (i = 0; i < gridsize; i++) {
+            if (i == nyquist)
+                continue;
+            Py_ssize_t ki = i - (i > nyquist ? gridsize : 0);
+            double deconv_i_numer = ki*deconv_factor + DBL_EPSILON;
+            double deconv_ij_numer = deconv_i_numer*deconv_j_numer;
+            double deconv_ij_denom = sin(deconv_i_numer)*deconv_j_denom;
+            double* slab_ij = slab + (j*gridsize + i)*size_k;
+            Py_ssize_t kk;
+            for (kk = 0; kk < nyquist; kk++) {
+                Py_ssize_t k2 = kj*kj + ki*ki + kk*kk;
+                if (green && k2 == 0)
+                    continue;
+                /* Deconvolution and interlacing factor */
+                double factor = 1;
+                if (deconv_order) {
+                    double deconv_k_numer = kk*deconv_factor + DBL_EPSILON;
+                    factor = pow(
+                         (deconv_ij_numer*deconv_k_numer)
+                        /(deconv_ij_denom*sin(deconv_k_numer)),
+                        deconv_order
+                    );
+                }
+                factor *= interlace_factor;
+                double re = slab_ij[2*kk    ];
+                double im = slab_ij[2*kk + 1];
+                /* Rotate the complex phase due to interlacing */
+                if (interlace) {
+                    double theta = (ki*theta_i + kj*theta_j) + kk*theta_k;
+                    double cos_theta = cos(theta);
+                    double sin_theta = sin(theta);
+                    double re_rotated = re*cos_theta - im*sin_theta;
+                    im = re*sin_theta + im*cos_theta;
+                    re = re_rotated;
+                }
+                /* Differentiate by multiplying by the imaginary unit
+                 * and the given component of k⃗ in physical units.
+                 */
+                if (diff_dim != -1) {
+                    Py_ssize_t kl = (diff_dim == 0 ? ki : (diff_dim == 1 ? kj : kk));
+                    factor *= k_fundamental*kl;
+                    double re_diff = -im;
+                    im = re;
+                    re = re_diff;
+                }
+                /* Green's function */
+                if (green) {
+                    factor *= green_factor/k2;
+                    if (green_exponent != 0)
+                        factor *= exp(green_exponent*k2);
+                }
+                slab_ij[2*kk    ] = re*factor;
+                slab_ij[2*kk + 1] = im*factor;
+            }
+        }
+    }
+}
+
+
+
+/* The function fourier_slab_fused_threaded is a fused variant of
+ * fourier_slab_threaded. Rather than operating in-place, it reads each
+ * mode of the (density) slab once and writes the three components of
+ * the gradient of the resulting potential into three separate force
+ * slabs, applying deconvolution, interlacing and the Green's function
+ * along the way. Modes not visited (the origin and the Nyquist planes)
+ * are left untouched in the force slabs.
+ */
+void fourier_slab_fused_threaded(
+    int nthreads,
+    double* slab,
+    double* slab_x,
+    double* slab_y,
+    double* slab_z,
+    Py_ssize_t gridsize,
+    Py_ssize_t slab_size_j,
+    Py_ssize_t slab_start_j,
+    int deconv_order,
+    double deconv_factor,
+    double interlace_factor,
+    int interlace,
+    double theta_i,
+    double theta_j,
+    double theta_k,
+    double k_fundamental,
+    double green_factor,
+    double green_exponent
+) {
+    /* Arguments to this function are as for fourier_slab_threaded,
+     * except for the three output force slabs and the absence of
+     * diff_dim and green, as all three dimensions are differentiated
+     * and the Green's function is always applied.
+     */
+    Py_ssize_t nyquist = gridsize/2;
+    Py_ssize_t size_k = gridsize + 2;
+    Py_ssize_t j;
+    #pragma omp parallel for num_threads(nthreads) schedule(static)
+    for (j = 0; j < slab_size_j; j++) {
+        Py_ssize_t j_global = slab_start_j + j;
+        if (j_global == nyquist)
+            continue;
+        Py_ssize_t kj = j_global - (j_global > nyquist ? gridsize : 0);
+        double deconv_j_numer = kj*deconv_factor + DBL_EPSILON;
+        double deconv_j_denom = sin(deconv_j_numer);
+        Py_ssize_t i;
+        for (i = 0; i < gridsize; i++) {
+            if (i == nyquist)
+                continue;
+            Py_ssize_t ki = i - (i > nyquist ? gridsize : 0);
+            double deconv_i_numer = ki*deconv_factor + DBL_EPSILON;
+            double deconv_ij_numer = deconv_i_numer*deconv_j_numer;
+            double deconv_ij_denom = sin(deconv_i_numer)*deconv_j_denom;
+            Py_ssize_t offset = (j*gridsize + i)*size_k;
+            double* slab_ij = slab + offset;
+            double* slab_x_ij = slab_x + offset;
+            double* slab_y_ij = slab_y + offset;
+            double* slab_z_ij = slab_z + offset;
+            Py_ssize_t kk;
+            for (kk = 0; kk < nyquist; kk++) {
+                Py_ssize_t k2 = kj*kj + ki*ki + kk*kk;
+                if (k2 == 0)
+                    continue;
+                /* Deconvolution, interlacing and Green's function */
+                double factor = 1;
+                if (deconv_order) {
+                    double deconv_k_numer = kk*deconv_factor + DBL_EPSILON;
+                    factor = pow(
+                         (deconv_ij_numer*deconv_k_numer)
+                        /(deconv_ij_denom*sin(deconv_k_numer)),
+                        deconv_order
+                    );
+                }
+                factor *= interlace_factor*green_factor/k2;
+                if (green_exponent != 0)
+                    factor *= exp(green_exponent*k2);
+                double re = slab_ij[2*kk    ];
+                double im = slab_ij[2*kk + 1];
+                /* Rotate the complex phase due to interlacing */
+                if (interlace) {
+                    double theta = (ki*theta_i + kj*theta_j) + kk*theta_k;
+                    double cos_theta = cos(theta);
+                    double sin_theta = sin(theta);
+                    double re_rotated = re*cos_theta - im*sin_theta;
+                    im = re*sin_theta + im*cos_theta;
+                    re = re_rotated;
+                }
+                /* Differentiate along all three dimensions by
+                 * multiplying by the imaginary unit and the components
+                 * of k⃗ in physical units.
+                 */
+                factor *= k_fundamental;
+                re *= factor;
+                im *= factor;
+                slab_x_ij[2*kk    ] = -im*ki;
+                slab_x_ij[2*kk + 1] =  re*ki;
+                slab_y_ij[2*kk    ] = -im*kj;
+                slab_y_ij[2*kk + 1] =  re*kj;
+                slab_z_ij[2*kk    ] = -im*kk;
+                slab_z_ij[2*kk + 1] =  re*kk;
+            }
+        }
+    }
+}
@@ -1402,9 +1402,9 @@ def project_render2D(grid, projection, axis, extent):
     # disregarding ghost points, for now.
     domain_bgn_indices = asarray(
         [
-            int(round(domain_bgn_x/cellsize)),
-            int(round(domain_bgn_y/cellsize)),
-            int(round(domain_bgn_z/cellsize)),
+            int(round(domain_info.bgn_x/cellsize)),
+            int(round(domain_info.bgn_y/cellsize)),
+            int(round(domain_info.bgn_z/cellsize)),
         ],
         dtype=C2np['Py_ssize_t'],
     )
@@ -3507,13 +3507,5 @@ def save_render3D(declaration, img, filename, n_dumps):
 
 # Get local domain information
 domain_info = get_domain_info()
-cython.declare(
-    domain_layout_local_indices='int[::1]',
-    domain_bgn_x='double',
-    domain_bgn_y='double',
-    domain_bgn_z='double',
-)
+cython.declare(domain_layout_local_indices='int[::1]')
 domain_layout_local_indices = domain_info.layout_local_indices
-domain_bgn_x                = domain_info.bgn_x
-domain_bgn_y                = domain_info.bgn_y
-domain_bgn_z                = domain_info.bgn_z
@@ -31,8 +31,60 @@ cimport(
     '    combine_softening_lengths, '
     '    get_softened_r3inv,        '
     '    particle_particle,         '
+    '    subtile_subtile,           '
+)
+cimport(
+    'from tree import    '
+    '    NeighbourList,  '
+    '    Octree,         '
+    '    get_octree,     '
 )
 
+# Import declarations from shortrange.c
+pxd("""
+# Threaded short-range tile-tile interaction from shortrange.c
+cdef extern from "shortrange.c":
+    void shortrange_tiles_threaded(
+        int nthreads,
+        double* pos_r,
+        double* dmom_r,
+        signed char* rung_indices_jumped_r,
+        Py_ssize_t*** tiles_r,
+        Py_ssize_t** tiles_rungs_N_r,
+        signed char* tiles_contain_particles_r,
+        Py_ssize_t* layout_1Dto3D_r,
+        double* tiling_location_r,
+        signed char lowest_active_rung_r,
+        signed char lowest_populated_rung_r,
+        signed char highest_populated_rung_r,
+        double* pos_s,
+        double* dmom_s,
+        signed char* rung_indices_jumped_s,
+        Py_ssize_t*** tiles_s,
+        Py_ssize_t** tiles_rungs_N_s,
+        signed char* tiles_contain_particles_s,
+        Py_ssize_t* layout_1Dto3D_s,
+        double* tiling_location_s,
+        signed char lowest_active_rung_s,
+        signed char lowest_populated_rung_s,
+        signed char highest_populated_rung_s,
+        double* tile_extent,
+        Py_ssize_t* tile_indices_receiver,
+        Py_ssize_t tile_indices_receiver_N,
+        Py_ssize_t** tile_indices_supplier_paired,
+        Py_ssize_t* tile_indices_supplier_paired_N,
+        bint only_supply,
+        bint local,
+        bint single,
+        const double* factors,
+        const double* table,
+        double r2_max,
+        double table_scaling,
+        int table_order,
+        double boxsize,
+    )
+""")
+
 
 
 # Function for computing the gravitational factor
@@ -204,6 +256,10 @@ def gravity_pairwise(
     if indexᵖ_j != -1:
         particle_particle_t_final = time()
         subtiling_r.computation_time += particle_particle_t_final - particle_particle_t_begin
+    # Stop the timing of the last receiver tile,
+    # for use with adaptive subtiling.
+    if 𝔹[pairing_level == 'tile']:
+        receiver.tilings[f'{interaction_name} (tiles)'].time_tile(-1)
 
 # Function implementing pairwise gravity (short-range only)
 @cython.header(
@@ -220,44 +276,63 @@ def gravity_pairwise(
     tile_indices_supplier_paired_N='Py_ssize_t*',
     extra_args=dict,
     # Locals
-    apply_to_i='bint',
-    apply_to_j='bint',
-    factor_i='double',
-    factor_j='double',
+    batch_N_inactive_r='Py_ssize_t',
+    batch_N_inactive_s='Py_ssize_t',
+    batch_N_r='Py_ssize_t',
+    batch_N_s='Py_ssize_t',
+    batch_index_r='Py_ssize_t',
+    batch_index_s='Py_ssize_t',
+    batch_index_s_bgn='Py_ssize_t',
+    factor='double',
     factors='const double*',
-    forcex_ij='double',
-    forcey_ij='double',
-    forcez_ij='double',
-    indexᵖ_j='Py_ssize_t',
-    indexˣ_i='Py_ssize_t',
-    indexˣ_j='Py_ssize_t',
+    indexᵖ='Py_ssize_t',
+    indexˣ='Py_ssize_t',
+    local_interaction_flag_1='bint',
+    lowest_active_rung_r='signed char',
+    lowest_active_rung_s='signed char',
     particle_particle_t_begin='double',
     particle_particle_t_final='double',
     periodic_offset_x='double',
     periodic_offset_y='double',
     periodic_offset_z='double',
+    pos_r='double*',
+    pos_s='double*',
     r2='double',
-    r2_index_scaling='double',
     r2_max='double',
-    rung_index_i='signed char',
-    rung_index_j='signed char',
-    rung_index_s='signed char',
+    rung='Py_ssize_t*',
+    rung_N='Py_ssize_t',
+    rung_index='signed char',
+    rung_index_r_bgn='signed char',
+    rung_index_r_end='signed char',
+    rung_index_s_bgn='signed char',
+    rung_index_s_end='signed char',
+    rung_indices_jumped_r='signed char*',
     rung_indices_jumped_s='signed char*',
+    rung_particle_index='Py_ssize_t',
+    rungs_N_r='Py_ssize_t*',
+    rungs_N_s='Py_ssize_t*',
     shortrange_factor='double',
-    shortrange_index='Py_ssize_t',
     softening='double',
+    subtile_contain_jumping_r='bint',
     subtile_contain_jumping_s='bint',
+    subtile_r='Py_ssize_t**',
+    subtile_s='Py_ssize_t**',
     subtiling_r='Tiling',
     table='const double*',
-    total_factor='double',
     x_ji='double',
+    x_ref='double',
+    xi='double',
     y_ji='double',
+    y_ref='double',
+    yi='double',
     z_ji='double',
+    z_ref='double',
+    zi='double',
     Δmom_r='double*',
     Δmom_s='double*',
-    Δmomx='double',
-    Δmomy='double',
-    Δmomz='double',
+    Δmomx_i='double',
+    Δmomy_i='double',
+    Δmomz_i='double',
     returns='void',
 )
 def gravity_pairwise_shortrange(
@@ -265,12 +340,51 @@ def gravity_pairwise_shortrange(
     tile_indices_receiver, tile_indices_supplier_paired, tile_indices_supplier_paired_N,
     extra_args,
 ):
-    # Extract momentum update buffers
+    # Local interactions (the same component within the same domain)
+    # make use of cached neighbour lists when a skin is specified.
+    if 𝔹[shortrange_skin > 0] and 𝔹[pairing_level == 'tile'] and receiver.use_rungs:
+        if not only_supply and receiver.name == supplier.name and rank == rank_supplier:
+            gravity_pairwise_shortrange_verlet(
+                interaction_name, receiver, ᔑdt_rungs,
+                tile_indices_receiver, tile_indices_supplier_paired, tile_indices_supplier_paired_N,
+            )
+            return
+    # When running with several threads per process, the tile-tile
+    # interactions are handed over to the threaded implementation.
+    if 𝔹[num_threads > 1] and 𝔹[pairing_level == 'tile']:
+        gravity_pairwise_shortrange_threaded(
+            interaction_name, receiver, supplier, ᔑdt_rungs, rank_supplier, only_supply,
+            tile_indices_receiver, tile_indices_supplier_paired, tile_indices_supplier_paired_N,
+        )
+        return
+    # Rather than iterating over individual particle pairs, we iterate
+    # over pairs of receiver and supplier subtiles. For each such pair,
+    # the positions of the receiver and supplier particles are gathered
+    # into contiguous batch buffers (one array per coordinate). The
+    # interaction between all particles within the two batches is then
+    # carried out in a tight double loop, after which the accumulated
+    # momentum updates are scattered back into Δmom, once per particle.
+    # As the gathering runs over the rungs in ascending order, the
+    # particles on inactive rungs all occupy the beginning of the
+    # batches, which allows us to skip pairs of inactive particles
+    # by simply starting the inner loop further ahead.
+    # Extract particle variables from the receiver and supplier
+    pos_r = receiver.pos
+    pos_s = supplier.pos
     Δmom_r = receiver.Δmom
     Δmom_s = supplier.Δmom
-    # Extract jumped rung indices of the supplier
-    # (the receiver is handled by particles_particles() below).
+    rung_indices_jumped_r = receiver.rung_indices_jumped
     rung_indices_jumped_s = supplier.rung_indices_jumped
+    lowest_active_rung_r = receiver.lowest_active_rung
+    lowest_active_rung_s = supplier.lowest_active_rung
+    # Range of receiver and supplier rungs
+    if only_supply:
+        rung_index_r_bgn = lowest_active_rung_r
+    else:
+        rung_index_r_bgn = receiver.lowest_populated_rung
+    rung_index_r_end = receiver.highest_populated_rung + 1
+    rung_index_s_bgn = supplier.lowest_populated_rung
+    rung_index_s_end = supplier.highest_populated_rung + 1
     # Get table of softened gravitational short-range forces
     softening = combine_softening_lengths(
         receiver.softening_length,
@@ -284,74 +398,1164 @@ def gravity_pairwise_shortrange(
     factors = compute_factors(receiver, supplier, ᔑdt_rungs)
     # Maximum r² beyond which the interaction is ignored
     r2_max = ℝ[shortrange_range**2]
-    # Factor used to scale r² to produce an index into the table
-    r2_index_scaling = ℝ[(shortrange_table_size - 1)/shortrange_table_maxr2]
-    # Loop over all (receiver, supplier) particle pairs (i, j)
-    indexᵖ_j = -1
-    for indexˣ_i, indexᵖ_j, indexˣ_j, rung_index_i, rung_index_s, x_ji, y_ji, z_ji, periodic_offset_x, periodic_offset_y, periodic_offset_z, apply_to_i, apply_to_j, factor_i, subtile_contain_jumping_s, particle_particle_t_begin, subtiling_r in particle_particle(
+    # Loop over all (receiver, supplier) subtile pairs
+    subtiling_r = None
+    for subtile_r, rungs_N_r, subtile_contain_jumping_r, subtile_s, rungs_N_s, subtile_contain_jumping_s, local_interaction_flag_1, periodic_offset_x, periodic_offset_y, periodic_offset_z, particle_particle_t_begin, subtiling_r in subtile_subtile(
         receiver, supplier, pairing_level,
         tile_indices_receiver, tile_indices_supplier_paired, tile_indices_supplier_paired_N,
-        rank_supplier, interaction_name, only_supply, factors, forcerange=shortrange_range,
+        rank_supplier, interaction_name, only_supply, forcerange=shortrange_range,
     ):
-        # Translate coordinates so that they
-        # correspond to the nearest image.
-        with unswitch(6):
-            if periodic_offset_x or periodic_offset_y or periodic_offset_z:
-                x_ji += periodic_offset_x
-                y_ji += periodic_offset_y
-                z_ji += periodic_offset_z
-        # If the particle pair is separated by a distance larger
-        # than the range of the short-range force,
-        # ignore this interaction completely.
-        r2 = x_ji**2 + y_ji**2 + z_ji**2
-        if r2 > r2_max:
-            continue
-        # Compute the short-range force. Here the "force" is in units
-        # of inverse length squared, given by
-        #   force = -r⃗/r³ (x/sqrt(π) exp(-x²/4) + erfc(x/2)),
-        # where x = r/scale with scale the long/short-range
-        # force split scale.
-        # We have this whole expression except for r⃗ already tabulated.
-        # This tabulation has baked in softening of r⁻³.
-        shortrange_index = int(r2*r2_index_scaling)
-        shortrange_factor = table[shortrange_index]
-        # Momentum change of particle i due to particle j
-        with unswitch(3):
-            if apply_to_i:
-                total_factor = factor_i*shortrange_factor
-                Δmomx = x_ji*total_factor
-                Δmomy = y_ji*total_factor
-                Δmomz = z_ji*total_factor
-                Δmom_r[indexˣ_i + 0] += Δmomx
-                Δmom_r[indexˣ_i + 1] += Δmomy
-                Δmom_r[indexˣ_i + 2] += Δmomz
-        # Momentum change of particle j due to particle i
-        with unswitch(8):
-            if 𝔹[not only_supply]:
-                with unswitch(2):
-                    if apply_to_j:
-                        with unswitch(4):
-                            if subtile_contain_jumping_s:
-                                rung_index_j = rung_indices_jumped_s[indexᵖ_j]
-                            else:
-                                rung_index_j = rung_index_s
-                        with unswitch(3):
-                            if apply_to_i:
-                                if rung_index_i == rung_index_j:
-                                    Δmom_s[indexˣ_j + 0] -= Δmomx
-                                    Δmom_s[indexˣ_j + 1] -= Δmomy
-                                    Δmom_s[indexˣ_j + 2] -= Δmomz
-                                    continue
-                        factor_j = factors[rung_index_j]
-                        total_factor = factor_j*shortrange_factor
-                        Δmom_s[indexˣ_j + 0] -= x_ji*total_factor
-                        Δmom_s[indexˣ_j + 1] -= y_ji*total_factor
-                        Δmom_s[indexˣ_j + 2] -= z_ji*total_factor
+        # Ensure sufficiently large batch buffers
+        batch_N_r = 0
+        for rung_index in range(rung_index_r_bgn, rung_index_r_end):
+            batch_N_r += rungs_N_r[rung_index]
+        batch_N_s = 0
+        for rung_index in range(rung_index_s_bgn, rung_index_s_end):
+            batch_N_s += rungs_N_s[rung_index]
+        if batch_N_r > batch_size or batch_N_s > batch_size:
+            resize_batch_buffers(pairmax(batch_N_r, batch_N_s))
+        # Gather the receiver particles into the batch buffers.
+        # For each particle we also store the factor with which its
+        # momentum update should be multiplied, which is zero for
+        # particles on inactive rungs.
+        x_ref = y_ref = z_ref = 0
+        batch_index_r = 0
+        batch_N_inactive_r = 0
+        for rung_index in range(rung_index_r_bgn, rung_index_r_end):
+            rung_N = rungs_N_r[rung_index]
+            if rung_N == 0:
+                continue
+            rung = subtile_r[rung_index]
+            with unswitch(2):
+                if 𝔹[not only_supply]:
+                    if rung_index < lowest_active_rung_r:
+                        batch_N_inactive_r += rung_N
+            for rung_particle_index in range(rung_N):
+                indexᵖ = rung[rung_particle_index]
+                indexˣ = 3*indexᵖ
+                batch_indexˣ_r[batch_index_r] = indexˣ
+                with unswitch(3):
+                    if 𝔹[shortrange_single]:
+                        # In single precision, positions are taken
+                        # relative to the first receiver particle, so
+                        # that the (small) separations between the
+                        # particles retain their precision.
+                        if batch_index_r == 0:
+                            x_ref = pos_r[indexˣ + 0]
+                            y_ref = pos_r[indexˣ + 1]
+                            z_ref = pos_r[indexˣ + 2]
+                        batch_x32_r[batch_index_r] = pos_r[indexˣ + 0] - x_ref
+                        batch_y32_r[batch_index_r] = pos_r[indexˣ + 1] - y_ref
+                        batch_z32_r[batch_index_r] = pos_r[indexˣ + 2] - z_ref
+                    else:
+                        batch_x_r[batch_index_r] = pos_r[indexˣ + 0]
+                        batch_y_r[batch_index_r] = pos_r[indexˣ + 1]
+                        batch_z_r[batch_index_r] = pos_r[indexˣ + 2]
+                factor = 0
+                if rung_index >= lowest_active_rung_r:
+                    with unswitch(3):
+                        if subtile_contain_jumping_r:
+                            factor = factors[rung_indices_jumped_r[indexᵖ]]
+                        else:
+                            factor = factors[rung_index]
+                batch_factor_r[batch_index_r] = factor
+                batch_index_r += 1
+        # Gather the supplier particles into the batch buffers,
+        # with the periodic offset folded into the positions.
+        # The supplier particles only receive momentum updates
+        # when only_supply is False.
+        batch_index_s = 0
+        batch_N_inactive_s = 0
+        for rung_index in range(rung_index_s_bgn, rung_index_s_end):
+            rung_N = rungs_N_s[rung_index]
+            if rung_N == 0:
+                continue
+            rung = subtile_s[rung_index]
+            if rung_index < lowest_active_rung_s:
+                batch_N_inactive_s += rung_N
+            for rung_particle_index in range(rung_N):
+                indexᵖ = rung[rung_particle_index]
+                indexˣ = 3*indexᵖ
+                batch_indexˣ_s[batch_index_s] = indexˣ
+                with unswitch(3):
+                    if 𝔹[shortrange_single]:
+                        batch_x32_s[batch_index_s] = pos_s[indexˣ + 0] - periodic_offset_x - x_ref
+                        batch_y32_s[batch_index_s] = pos_s[indexˣ + 1] - periodic_offset_y - y_ref
+                        batch_z32_s[batch_index_s] = pos_s[indexˣ + 2] - periodic_offset_z - z_ref
+                        batch_Δx32_s[batch_index_s] = 0
+                        batch_Δy32_s[batch_index_s] = 0
+                        batch_Δz32_s[batch_index_s] = 0
+                    else:
+                        batch_x_s[batch_index_s] = pos_s[indexˣ + 0] - periodic_offset_x
+                        batch_y_s[batch_index_s] = pos_s[indexˣ + 1] - periodic_offset_y
+                        batch_z_s[batch_index_s] = pos_s[indexˣ + 2] - periodic_offset_z
+                        batch_Δx_s[batch_index_s] = 0
+                        batch_Δy_s[batch_index_s] = 0
+                        batch_Δz_s[batch_index_s] = 0
+                factor = 0
+                with unswitch(3):
+                    if 𝔹[not only_supply]:
+                        if rung_index >= lowest_active_rung_s:
+                            with unswitch(2):
+                                if subtile_contain_jumping_s:
+                                    factor = factors[rung_indices_jumped_s[indexᵖ]]
+                                else:
+                                    factor = factors[rung_index]
+                batch_factor_s[batch_index_s] = factor
+                batch_index_s += 1
+        # Carry out the interaction between the two batches,
+        # in single or double precision.
+        if 𝔹[shortrange_single]:
+            interact_batches_single(
+                batch_N_r, batch_N_s, batch_N_inactive_r, batch_N_inactive_s,
+                local_interaction_flag_1, only_supply, table, Δmom_r, Δmom_s,
+            )
+        else:
+            # Loop over all receiver particles in the batch
+            for batch_index_r in range(batch_N_r):
+                # Inactive receiver particles need only be paired with
+                # active supplier particles. For local interactions
+                # (same component, domain, tile and subtile), the receiver
+                # batch is the tail of the supplier batch, and so we need
+                # to make sure not to double count the particle pairs.
+                batch_index_s_bgn = 0
+                if batch_index_r < batch_N_inactive_r:
+                    batch_index_s_bgn = batch_N_inactive_s
+                with unswitch(1):
+                    if local_interaction_flag_1:
+                        batch_index_s_bgn = pairmax(
+                            batch_index_s_bgn,
+                            batch_index_r + 1 + ℤ[batch_N_s - batch_N_r],
+                        )
+                xi = batch_x_r[batch_index_r]
+                yi = batch_y_r[batch_index_r]
+                zi = batch_z_r[batch_index_r]
+                Δmomx_i = 0
+                Δmomy_i = 0
+                Δmomz_i = 0
+                # Tight loop over the supplier particles in the batch.
+                # Pairs separated by more than the range of the short-range
+                # force are masked out rather than branched upon.
+                for batch_index_s in range(batch_index_s_bgn, batch_N_s):
+                    x_ji = xi - batch_x_s[batch_index_s]
+                    y_ji = yi - batch_y_s[batch_index_s]
+                    z_ji = zi - batch_z_s[batch_index_s]
+                    r2 = x_ji**2 + y_ji**2 + z_ji**2
+                    # Compute the short-range force. Here the "force" is in
+                    # units of inverse length squared, given by
+                    #   force = -r⃗/r³ (x/sqrt(π) exp(-x²/4) + erfc(x/2)),
+                    # where x = r/scale with scale the long/short-range
+                    # force split scale. We have this whole expression
+                    # except for r⃗ already tabulated. This tabulation has
+                    # baked in softening of r⁻³.
+                    shortrange_factor = (
+                        (r2 <= r2_max)*lookup_shortrange_table(table, pairmin(r2, r2_max))
+                    )
+                    Δmomx_i += x_ji*shortrange_factor
+                    Δmomy_i += y_ji*shortrange_factor
+                    Δmomz_i += z_ji*shortrange_factor
+                    with unswitch(2):
+                        if 𝔹[not only_supply]:
+                            batch_Δx_s[batch_index_s] -= x_ji*shortrange_factor
+                            batch_Δy_s[batch_index_s] -= y_ji*shortrange_factor
+                            batch_Δz_s[batch_index_s] -= z_ji*shortrange_factor
+                # Scatter momentum change of receiver particle
+                factor = batch_factor_r[batch_index_r]
+                if factor != 0:
+                    indexˣ = batch_indexˣ_r[batch_index_r]
+                    Δmom_r[indexˣ + 0] += factor*Δmomx_i
+                    Δmom_r[indexˣ + 1] += factor*Δmomy_i
+                    Δmom_r[indexˣ + 2] += factor*Δmomz_i
+            # Scatter momentum changes of supplier particles
+            with unswitch(1):
+                if 𝔹[not only_supply]:
+                    for batch_index_s in range(batch_N_inactive_s, batch_N_s):
+                        factor = batch_factor_s[batch_index_s]
+                        indexˣ = batch_indexˣ_s[batch_index_s]
+                        Δmom_s[indexˣ + 0] += factor*batch_Δx_s[batch_index_s]
+                        Δmom_s[indexˣ + 1] += factor*batch_Δy_s[batch_index_s]
+                        Δmom_s[indexˣ + 2] += factor*batch_Δz_s[batch_index_s]
     # Add computation time to the running total,
     # for use with automatic subtiling refinement.
-    if indexᵖ_j != -1:
+    if subtiling_r is not None:
         particle_particle_t_final = time()
         subtiling_r.computation_time += particle_particle_t_final - particle_particle_t_begin
+    # Stop the timing of the last receiver tile,
+    # for use with adaptive subtiling.
+    if 𝔹[pairing_level == 'tile']:
+        receiver.tilings[f'{interaction_name} (tiles)'].time_tile(-1)
+
+# Function for (re)allocating the batch buffers used by
+# the gravity_pairwise_shortrange() function,
+# so that they can hold at least the given number of particles.
+@cython.header(
+    # Arguments
+    size='Py_ssize_t',
+    returns='void',
+)
+def resize_batch_buffers(size):
+    global batch_size
+    global batch_indexˣ_r, batch_x_r, batch_y_r, batch_z_r, batch_factor_r
+    global batch_indexˣ_s, batch_x_s, batch_y_s, batch_z_s, batch_factor_s
+    global batch_Δx_s, batch_Δy_s, batch_Δz_s
+    global batch_x32_r, batch_y32_r, batch_z32_r
+    global batch_x32_s, batch_y32_s, batch_z32_s
+    global batch_Δx32_s, batch_Δy32_s, batch_Δz32_s
+    # Over-allocate a bit, reducing the number of future reallocations
+    size = int(1.25*size) + 1
+    batch_size = size
+    batch_indexˣ_r = realloc(batch_indexˣ_r, size*sizeof('Py_ssize_t'))
+    batch_factor_r = realloc(batch_factor_r, size*sizeof('double'))
+    batch_indexˣ_s = realloc(batch_indexˣ_s, size*sizeof('Py_ssize_t'))
+    batch_factor_s = realloc(batch_factor_s, size*sizeof('double'))
+    # Only the position and momentum update buffers
+    # of the used precision are needed.
+    if shortrange_single:
+        batch_x32_r  = realloc(batch_x32_r , size*sizeof('float'))
+        batch_y32_r  = realloc(batch_y32_r , size*sizeof('float'))
+        batch_z32_r  = realloc(batch_z32_r , size*sizeof('float'))
+        batch_x32_s  = realloc(batch_x32_s , size*sizeof('float'))
+        batch_y32_s  = realloc(batch_y32_s , size*sizeof('float'))
+        batch_z32_s  = realloc(batch_z32_s , size*sizeof('float'))
+        batch_Δx32_s = realloc(batch_Δx32_s, size*sizeof('float'))
+        batch_Δy32_s = realloc(batch_Δy32_s, size*sizeof('float'))
+        batch_Δz32_s = realloc(batch_Δz32_s, size*sizeof('float'))
+    else:
+        batch_x_r    = realloc(batch_x_r   , size*sizeof('double'))
+        batch_y_r    = realloc(batch_y_r   , size*sizeof('double'))
+        batch_z_r    = realloc(batch_z_r   , size*sizeof('double'))
+        batch_x_s    = realloc(batch_x_s   , size*sizeof('double'))
+        batch_y_s    = realloc(batch_y_s   , size*sizeof('double'))
+        batch_z_s    = realloc(batch_z_s   , size*sizeof('double'))
+        batch_Δx_s   = realloc(batch_Δx_s  , size*sizeof('double'))
+        batch_Δy_s   = realloc(batch_Δy_s  , size*sizeof('double'))
+        batch_Δz_s   = realloc(batch_Δz_s  , size*sizeof('double'))
+# Batch buffers used by the gravity_pairwise_shortrange() function.
+# The single precision position and momentum update buffers replace
+# the double precision ones when the short-range interaction is
+# carried out in single precision.
+cython.declare(
+    batch_size='Py_ssize_t',
+    batch_indexˣ_r='Py_ssize_t*',
+    batch_x_r='double*',
+    batch_y_r='double*',
+    batch_z_r='double*',
+    batch_factor_r='double*',
+    batch_indexˣ_s='Py_ssize_t*',
+    batch_x_s='double*',
+    batch_y_s='double*',
+    batch_z_s='double*',
+    batch_factor_s='double*',
+    batch_Δx_s='double*',
+    batch_Δy_s='double*',
+    batch_Δz_s='double*',
+    batch_x32_r='float*',
+    batch_y32_r='float*',
+    batch_z32_r='float*',
+    batch_x32_s='float*',
+    batch_y32_s='float*',
+    batch_z32_s='float*',
+    batch_Δx32_s='float*',
+    batch_Δy32_s='float*',
+    batch_Δz32_s='float*',
+)
+batch_size = 0
+batch_indexˣ_r = malloc(1*sizeof('Py_ssize_t'))
+batch_x_r      = malloc(1*sizeof('double'))
+batch_y_r      = malloc(1*sizeof('double'))
+batch_z_r      = malloc(1*sizeof('double'))
+batch_factor_r = malloc(1*sizeof('double'))
+batch_indexˣ_s = malloc(1*sizeof('Py_ssize_t'))
+batch_x_s      = malloc(1*sizeof('double'))
+batch_y_s      = malloc(1*sizeof('double'))
+batch_z_s      = malloc(1*sizeof('double'))
+batch_factor_s = malloc(1*sizeof('double'))
+batch_Δx_s     = malloc(1*sizeof('double'))
+batch_Δy_s     = malloc(1*sizeof('double'))
+batch_Δz_s     = malloc(1*sizeof('double'))
+batch_x32_r    = malloc(1*sizeof('float'))
+batch_y32_r    = malloc(1*sizeof('float'))
+batch_z32_r    = malloc(1*sizeof('float'))
+batch_x32_s    = malloc(1*sizeof('float'))
+batch_y32_s    = malloc(1*sizeof('float'))
+batch_z32_s    = malloc(1*sizeof('float'))
+batch_Δx32_s   = malloc(1*sizeof('float'))
+batch_Δy32_s   = malloc(1*sizeof('float'))
+batch_Δz32_s   = malloc(1*sizeof('float'))
+
+# Function carrying out the interaction between the particles within
+# the batch buffers of the gravity_pairwise_shortrange() function,
+# in single precision. The batch positions have already been gathered
+# into the single precision buffers, relative to the first receiver
+# particle. The momentum updates of the supplier particles are
+# accumulated in single precision as well, with the updates of both the
+# receiver and the supplier particles scattered directly into Δmom.
+@cython.header(
+    # Arguments
+    batch_N_r='Py_ssize_t',
+    batch_N_s='Py_ssize_t',
+    batch_N_inactive_r='Py_ssize_t',
+    batch_N_inactive_s='Py_ssize_t',
+    local_interaction_flag_1='bint',
+    only_supply='bint',
+    table='const double*',
+    Δmom_r='double*',
+    Δmom_s='double*',
+    # Locals
+    batch_index_r='Py_ssize_t',
+    batch_index_s='Py_ssize_t',
+    batch_index_s_bgn='Py_ssize_t',
+    factor='double',
+    indexˣ='Py_ssize_t',
+    r2='float',
+    r2_max='float',
+    shortrange_factor='float',
+    x_ji='float',
+    xi='float',
+    y_ji='float',
+    yi='float',
+    z_ji='float',
+    zi='float',
+    Δmomx_i='float',
+    Δmomy_i='float',
+    Δmomz_i='float',
+    returns='void',
+)
+def interact_batches_single(
+    batch_N_r, batch_N_s, batch_N_inactive_r, batch_N_inactive_s,
+    local_interaction_flag_1, only_supply, table, Δmom_r, Δmom_s,
+):
+    if batch_N_r == 0:
+        return
+    # Loop over all receiver particles in the batch,
+    # as in gravity_pairwise_shortrange().
+    r2_max = ℝ[shortrange_range**2]
+    for batch_index_r in range(batch_N_r):
+        batch_index_s_bgn = 0
+        if batch_index_r < batch_N_inactive_r:
+            batch_index_s_bgn = batch_N_inactive_s
+        with unswitch(1):
+            if local_interaction_flag_1:
+                batch_index_s_bgn = pairmax(
+                    batch_index_s_bgn,
+                    batch_index_r + 1 + ℤ[batch_N_s - batch_N_r],
+                )
+        xi = batch_x32_r[batch_index_r]
+        yi = batch_y32_r[batch_index_r]
+        zi = batch_z32_r[batch_index_r]
+        Δmomx_i = 0
+        Δmomy_i = 0
+        Δmomz_i = 0
+        for batch_index_s in range(batch_index_s_bgn, batch_N_s):
+            x_ji = xi - batch_x32_s[batch_index_s]
+            y_ji = yi - batch_y32_s[batch_index_s]
+            z_ji = zi - batch_z32_s[batch_index_s]
+            r2 = x_ji**2 + y_ji**2 + z_ji**2
+            shortrange_factor = (
+                (r2 <= r2_max)*lookup_shortrange_table(table, pairmin(r2, r2_max))
+            )
+            Δmomx_i += x_ji*shortrange_factor
+            Δmomy_i += y_ji*shortrange_factor
+            Δmomz_i += z_ji*shortrange_factor
+            with unswitch(2):
+                if 𝔹[not only_supply]:
+                    batch_Δx32_s[batch_index_s] -= x_ji*shortrange_factor
+                    batch_Δy32_s[batch_index_s] -= y_ji*shortrange_factor
+                    batch_Δz32_s[batch_index_s] -= z_ji*shortrange_factor
+        # Scatter momentum change of receiver particle
+        factor = batch_factor_r[batch_index_r]
+        if factor != 0:
+            indexˣ = batch_indexˣ_r[batch_index_r]
+            Δmom_r[indexˣ + 0] += factor*Δmomx_i
+            Δmom_r[indexˣ + 1] += factor*Δmomy_i
+            Δmom_r[indexˣ + 2] += factor*Δmomz_i
+    # Scatter momentum changes of supplier particles
+    if not only_supply:
+        for batch_index_s in range(batch_N_inactive_s, batch_N_s):
+            factor = batch_factor_s[batch_index_s]
+            indexˣ = batch_indexˣ_s[batch_index_s]
+            Δmom_s[indexˣ + 0] += factor*batch_Δx32_s[batch_index_s]
+            Δmom_s[indexˣ + 1] += factor*batch_Δy32_s[batch_index_s]
+            Δmom_s[indexˣ + 2] += factor*batch_Δz32_s[batch_index_s]
+
+# Function implementing pairwise gravity (short-range only)
+# using a team of threads within the local process.
+@cython.header(
+    # Arguments
+    interaction_name=str,
+    receiver='Component',
+    supplier='Component',
+    ᔑdt_rungs=dict,
+    rank_supplier='int',
+    only_supply='bint',
+    tile_indices_receiver='Py_ssize_t[::1]',
+    tile_indices_supplier_paired='Py_ssize_t**',
+    tile_indices_supplier_paired_N='Py_ssize_t*',
+    # Locals
+    factors='const double*',
+    layout_1Dto3D_r='Py_ssize_t[:, ::1]',
+    layout_1Dto3D_s='Py_ssize_t[:, ::1]',
+    local='bint',
+    softening='double',
+    t_begin='double',
+    table='const double*',
+    tiling_name=str,
+    tiling_r='Tiling',
+    tiling_s='Tiling',
+    returns='void',
+)
+def gravity_pairwise_shortrange_threaded(
+    interaction_name, receiver, supplier, ᔑdt_rungs, rank_supplier, only_supply,
+    tile_indices_receiver, tile_indices_supplier_paired, tile_indices_supplier_paired_N,
+):
+    """This function carries out the same interaction as
+    gravity_pairwise_shortrange(), but distributes the receiver tiles
+    over a team of num_threads threads. The work is done by the
+    shortrange_tiles_threaded() C function, which operates directly on
+    the tiles (no subtiles) and colours these so that threads never
+    update the momenta of the same particles. In single precision, each
+    thread gathers the supplier tiles into its own single-precision
+    buffers, as in gravity_pairwise_shortrange().
+    """
+    t_begin = time()
+    # Get table of softened gravitational short-range forces
+    softening = combine_softening_lengths(
+        receiver.softening_length,
+        supplier.softening_length,
+    )
+    table = get_shortrange_table(softening)
+    # Get array of factors used for momentum updates
+    factors = compute_factors(receiver, supplier, ᔑdt_rungs)
+    # Extract the coarse tilings
+    tiling_name = f'{interaction_name} (tiles)'
+    tiling_r = receiver.tilings[tiling_name]
+    tiling_s = supplier.tilings[tiling_name]
+    layout_1Dto3D_r = tiling_r.layout_1Dto3D
+    layout_1Dto3D_s = tiling_s.layout_1Dto3D
+    # Flag specifying whether the receiver and supplier are really
+    # the same component within the same domain.
+    local = (receiver.name == supplier.name and rank == rank_supplier)
+    # Carry out the threaded interaction
+    shortrange_tiles_threaded(
+        num_threads,
+        receiver.pos,
+        receiver.Δmom,
+        receiver.rung_indices_jumped,
+        tiling_r.tiles,
+        tiling_r.tiles_rungs_N,
+        tiling_r.contain_particles,
+        cython.address(layout_1Dto3D_r[:, :]),
+        cython.address(tiling_r.location[:]),
+        receiver.lowest_active_rung,
+        receiver.lowest_populated_rung,
+        receiver.highest_populated_rung,
+        supplier.pos,
+        supplier.Δmom,
+        supplier.rung_indices_jumped,
+        tiling_s.tiles,
+        tiling_s.tiles_rungs_N,
+        tiling_s.contain_particles,
+        cython.address(layout_1Dto3D_s[:, :]),
+        cython.address(tiling_s.location[:]),
+        supplier.lowest_active_rung,
+        supplier.lowest_populated_rung,
+        supplier.highest_populated_rung,
+        cython.address(tiling_r.tile_extent[:]),
+        cython.address(tile_indices_receiver[:]),
+        tile_indices_receiver.shape[0],
+        tile_indices_supplier_paired,
+        tile_indices_supplier_paired_N,
+        only_supply,
+        local,
+        shortrange_single,
+        factors,
+        table,
+        ℝ[shortrange_range**2],
+        shortrange_table_scaling,
+        shortrange_table_order,
+        boxsize,
+    )
+    # Add computation time to the running total. As the subtiles are
+    # not used, this is stored on the tiling and so does not enter
+    # the automatic subtiling refinement.
+    tiling_r.computation_time += time() - t_begin
+
+# Function implementing pairwise gravity (short-range only) between
+# the particles of a single component within the local domain,
+# using cached neighbour lists.
+@cython.header(
+    # Arguments
+    interaction_name=str,
+    component='Component',
+    ᔑdt_rungs=dict,
+    tile_indices_receiver='Py_ssize_t[::1]',
+    tile_indices_supplier_paired='Py_ssize_t**',
+    tile_indices_supplier_paired_N='Py_ssize_t*',
+    # Locals
+    active_j='bint',
+    factor_i='double',
+    factor_j='double',
+    factors='const double*',
+    i='Py_ssize_t',
+    j='Py_ssize_t',
+    lowest_active_rung='signed char',
+    member='Py_ssize_t',
+    members='Py_ssize_t*',
+    members_bgn_r='Py_ssize_t',
+    members_bgn_s='Py_ssize_t',
+    members_end_r='Py_ssize_t',
+    members_end_s='Py_ssize_t',
+    neighbour='Py_ssize_t',
+    neighbour_list='NeighbourList',
+    neighbours='Py_ssize_t*',
+    neighbours_bgn='Py_ssize_t*',
+    pos='double*',
+    r2='double',
+    rung_indices='signed char*',
+    rung_indices_jumped='signed char*',
+    same_tile='bint',
+    shortrange_factor='double',
+    softening='double',
+    t_begin='double',
+    table='const double*',
+    tile_index_r='Py_ssize_t',
+    tile_index_s='Py_ssize_t',
+    tile_indices_supplier='Py_ssize_t*',
+    tile_indices_supplier_N='Py_ssize_t',
+    tiling='Tiling',
+    x_ji='double',
+    xi='double',
+    y_ji='double',
+    yi='double',
+    z_ji='double',
+    zi='double',
+    Δmom='double*',
+    Δmomx_i='double',
+    Δmomy_i='double',
+    Δmomz_i='double',
+    returns='void',
+)
+def gravity_pairwise_shortrange_verlet(
+    interaction_name, component, ᔑdt_rungs,
+    tile_indices_receiver, tile_indices_supplier_paired, tile_indices_supplier_paired_N,
+):
+    """Within a base time step, the short-range interaction is carried
+    out once for each rung sub-step. Rather than re-testing all
+    particle pairs within neighbouring subtiles at each sub-step, we
+    here make use of neighbour lists containing all particle pairs
+    within the force range plus a skin, as found when the lists were
+    built. The lists are kept across sub-steps and base time steps and
+    only rebuilt when some particle has moved more than half the skin,
+    or when the particles or tiling have otherwise changed. The pairs
+    are still checked against the force range, but the vast majority
+    of the candidate pairs are never visited.
+    """
+    t_begin = time()
+    pos = component.pos
+    Δmom = component.Δmom
+    rung_indices = component.rung_indices
+    rung_indices_jumped = component.rung_indices_jumped
+    lowest_active_rung = component.lowest_active_rung
+    # Get table of softened gravitational short-range forces
+    softening = combine_softening_lengths(
+        component.softening_length,
+        component.softening_length,
+    )
+    table = get_shortrange_table(softening)
+    # Get array of factors used for momentum updates
+    factors = compute_factors(component, component, ᔑdt_rungs)
+    # Fetch the neighbour lists of this component,
+    # discarding these if no longer valid.
+    tiling = component.tilings[f'{interaction_name} (tiles)']
+    neighbour_list = neighbour_lists.get(component.name)
+    if neighbour_list is None:
+        neighbour_list = NeighbourList(shortrange_range, shortrange_skin)
+        neighbour_lists[component.name] = neighbour_list
+    if not neighbour_list.is_valid(
+        pos, component.N_local,
+        cython.address(tiling.location[:]),
+        cython.address(tiling.tile_extent[:]),
+        cython.address(tiling.shape[:]),
+    ):
+        neighbour_list.reset(
+            pos, component.N_local,
+            cython.address(tiling.location[:]),
+            cython.address(tiling.tile_extent[:]),
+            cython.address(tiling.shape[:]),
+        )
+    # Loop over the requested tiles in the receiver
+    for tile_index_r in range(ℤ[tile_indices_receiver.shape[0]]):
+        tile_indices_supplier   = tile_indices_supplier_paired  [tile_index_r]
+        tile_indices_supplier_N = tile_indices_supplier_paired_N[tile_index_r]
+        tile_index_r = tile_indices_receiver[tile_index_r]
+        # Loop over the requested tiles in the supplier
+        for tile_index_s in range(tile_indices_supplier_N):
+            tile_index_s = tile_indices_supplier[tile_index_s]
+            same_tile = (tile_index_r == tile_index_s)
+            members_bgn_r, members_end_r, members_bgn_s, members_end_s = (
+                neighbour_list.get_block(tile_index_r, tile_index_s)
+            )
+            members        = neighbour_list.members
+            neighbours_bgn = neighbour_list.neighbours_bgn
+            neighbours     = neighbour_list.neighbours
+            # Let each active receiver particle interact with all of its
+            # neighbours. Pairs of active particles are handled once.
+            for member in range(members_bgn_r, members_end_r):
+                i = members[member]
+                if rung_indices[i] < lowest_active_rung:
+                    continue
+                factor_i = factors[rung_indices_jumped[i]]
+                xi = pos[3*i + 0]
+                yi = pos[3*i + 1]
+                zi = pos[3*i + 2]
+                Δmomx_i = 0
+                Δmomy_i = 0
+                Δmomz_i = 0
+                for neighbour in range(neighbours_bgn[member], neighbours_bgn[member + 1]):
+                    j = neighbours[neighbour]
+                    active_j = (rung_indices[j] >= lowest_active_rung)
+                    if same_tile and active_j and j < i:
+                        continue
+                    x_ji = xi - pos[3*j + 0]
+                    y_ji = yi - pos[3*j + 1]
+                    z_ji = zi - pos[3*j + 2]
+                    x_ji -= boxsize*floor(x_ji*ℝ[1/boxsize] + 0.5)
+                    y_ji -= boxsize*floor(y_ji*ℝ[1/boxsize] + 0.5)
+                    z_ji -= boxsize*floor(z_ji*ℝ[1/boxsize] + 0.5)
+                    r2 = x_ji**2 + y_ji**2 + z_ji**2
+                    if r2 > ℝ[shortrange_range**2]:
+                        continue
+                    shortrange_factor = lookup_shortrange_table(table, r2)
+                    Δmomx_i += x_ji*shortrange_factor
+                    Δmomy_i += y_ji*shortrange_factor
+                    Δmomz_i += z_ji*shortrange_factor
+                    if active_j:
+                        factor_j = factors[rung_indices_jumped[j]]
+                        Δmom[3*j + 0] -= factor_j*x_ji*shortrange_factor
+                        Δmom[3*j + 1] -= factor_j*y_ji*shortrange_factor
+                        Δmom[3*j + 2] -= factor_j*z_ji*shortrange_factor
+                Δmom[3*i + 0] += factor_i*Δmomx_i
+                Δmom[3*i + 1] += factor_i*Δmomy_i
+                Δmom[3*i + 2] += factor_i*Δmomz_i
+            # Let each active supplier particle interact with its
+            # inactive neighbours within the receiver tile, the pairs
+            # with active neighbours having been handled above.
+            # Note that here the roles of i and j are swapped.
+            for member in range(members_bgn_s, members_end_s):
+                i = members[member]
+                if rung_indices[i] < lowest_active_rung:
+                    continue
+                factor_i = factors[rung_indices_jumped[i]]
+                xi = pos[3*i + 0]
+                yi = pos[3*i + 1]
+                zi = pos[3*i + 2]
+                Δmomx_i = 0
+                Δmomy_i = 0
+                Δmomz_i = 0
+                for neighbour in range(neighbours_bgn[member], neighbours_bgn[member + 1]):
+                    j = neighbours[neighbour]
+                    if rung_indices[j] >= lowest_active_rung:
+                        continue
+                    x_ji = xi - pos[3*j + 0]
+                    y_ji = yi - pos[3*j + 1]
+                    z_ji = zi - pos[3*j + 2]
+                    x_ji -= boxsize*floor(x_ji*ℝ[1/boxsize] + 0.5)
+                    y_ji -= boxsize*floor(y_ji*ℝ[1/boxsize] + 0.5)
+                    z_ji -= boxsize*floor(z_ji*ℝ[1/boxsize] + 0.5)
+                    r2 = x_ji**2 + y_ji**2 + z_ji**2
+                    if r2 > ℝ[shortrange_range**2]:
+                        continue
+                    shortrange_factor = lookup_shortrange_table(table, r2)
+                    Δmomx_i += x_ji*shortrange_factor
+                    Δmomy_i += y_ji*shortrange_factor
+                    Δmomz_i += z_ji*shortrange_factor
+                Δmom[3*i + 0] += factor_i*Δmomx_i
+                Δmom[3*i + 1] += factor_i*Δmomy_i
+                Δmom[3*i + 2] += factor_i*Δmomz_i
+    # Add computation time to the running total. As the subtiles are
+    # not used, this is stored on the tiling and so does not enter
+    # the automatic subtiling refinement.
+    tiling.computation_time += time() - t_begin
+# Neighbour lists used by the gravity_pairwise_shortrange_verlet()
+# function, stored by component name.
+cython.declare(neighbour_lists=dict)
+neighbour_lists = {}
+
+# Function implementing tree gravity (short-range only),
+# used by the TreePM method.
+@cython.header(
+    # Arguments
+    interaction_name=str,
+    receiver='Component',
+    supplier='Component',
+    ᔑdt_rungs=dict,
+    rank_supplier='int',
+    only_supply='bint',
+    pairing_level=str,
+    tile_indices_receiver='Py_ssize_t[::1]',
+    tile_indices_supplier_paired='Py_ssize_t**',
+    tile_indices_supplier_paired_N='Py_ssize_t*',
+    extra_args=dict,
+    # Locals
+    dim='int',
+    factors='const double*',
+    local='bint',
+    periodic_offset='double*',
+    softening='double',
+    t_begin='double',
+    table='const double*',
+    tile_contain_particles_r='signed char',
+    tile_contain_particles_s='signed char',
+    tile_extent='double*',
+    tile_index_r='Py_ssize_t',
+    tile_index_s='Py_ssize_t',
+    tile_index3D_r='Py_ssize_t*',
+    tile_index3D_s='Py_ssize_t*',
+    tile_indices_supplier='Py_ssize_t*',
+    tile_indices_supplier_N='Py_ssize_t',
+    tile_location_r='double*',
+    tile_location_s='double',
+    tile_separation='double',
+    tiles_contain_particles_r='signed char*',
+    tiles_contain_particles_s='signed char*',
+    tiling_location_r='double*',
+    tiling_location_s='double*',
+    tiling_name=str,
+    tiling_r='Tiling',
+    tiling_s='Tiling',
+    tree_r='Octree',
+    tree_s='Octree',
+    trees_N='Py_ssize_t',
+    trees_r=dict,
+    trees_s=dict,
+    returns='void',
+)
+def gravity_tree_shortrange(
+    interaction_name, receiver, supplier, ᔑdt_rungs, rank_supplier, only_supply, pairing_level,
+    tile_indices_receiver, tile_indices_supplier_paired, tile_indices_supplier_paired_N,
+    extra_args,
+):
+    """Rather than pairing up the particles of neighbouring tiles
+    directly, an octree is built for each tile taking part in the
+    interaction. The active particles within a tile then walk the trees
+    of the neighbouring tiles, using the monopole of sufficiently
+    distant nodes as determined by the opening angle. As the tree walk
+    is not symmetric in the receiving and supplying particles, the
+    supplier particles (when not only_supply) walk the receiver trees
+    separately. The long-range part of the force is handled by the
+    usual P³M particle-mesh machinery.
+    """
+    t_begin = time()
+    # Get table of softened gravitational short-range forces
+    softening = combine_softening_lengths(
+        receiver.softening_length,
+        supplier.softening_length,
+    )
+    table = get_shortrange_table(softening)
+    # Get array of factors used for momentum updates
+    factors = compute_factors(receiver, supplier, ᔑdt_rungs)
+    # Extract tiling variables
+    tiling_name = f'{interaction_name} (tiles)'
+    tiling_r = receiver.tilings[tiling_name]
+    tiling_s = supplier.tilings[tiling_name]
+    tiling_location_r         = cython.address(tiling_r.location[:])
+    tiling_location_s         = cython.address(tiling_s.location[:])
+    tile_extent               = cython.address(tiling_r.tile_extent[:])
+    tiles_contain_particles_r = tiling_r.contain_particles
+    tiles_contain_particles_s = tiling_s.contain_particles
+    # Flag specifying whether the receiver and supplier are really
+    # the same component within the same domain.
+    local = (receiver.name == supplier.name and rank == rank_supplier)
+    # The trees of the receiver and supplier tiles are built as needed
+    # and stored in the dicts below, keyed by the tile index.
+    trees_r = {}
+    trees_s = {}
+    trees_N = 0
+    periodic_offset = tree_periodic_offset
+    tile_location_r = tree_tile_location_r
+    # Loop over the requested tiles in the receiver
+    for tile_index_r in range(ℤ[tile_indices_receiver.shape[0]]):
+        # Lookup supplier tile indices with which to pair the current
+        # receiver tile, then make tile_index_r an actual receiver
+        # tile index.
+        tile_indices_supplier   = tile_indices_supplier_paired  [tile_index_r]
+        tile_indices_supplier_N = tile_indices_supplier_paired_N[tile_index_r]
+        tile_index_r = tile_indices_receiver[tile_index_r]
+        tile_contain_particles_r = tiles_contain_particles_r[tile_index_r]
+        if tile_contain_particles_r == 0:
+            continue
+        tile_index3D_r = tiling_r.tile_index3D(tile_index_r)
+        for dim in range(3):
+            tile_location_r[dim] = tiling_location_r[dim] + tile_index3D_r[dim]*tile_extent[dim]
+        # Loop over the requested tiles in the supplier
+        for tile_index_s in range(tile_indices_supplier_N):
+            tile_index_s = tile_indices_supplier[tile_index_s]
+            tile_contain_particles_s = tiles_contain_particles_s[tile_index_s]
+            if tile_contain_particles_s == 0:
+                continue
+            # Skip tile pair if no particle is to receive a kick
+            if tile_contain_particles_r < 2:
+                with unswitch(2):
+                    if only_supply:
+                        continue
+                if tile_contain_particles_s < 2:
+                    continue
+            # Determine the periodic particle offset
+            tile_index3D_s = tiling_s.tile_index3D(tile_index_s)
+            for dim in range(3):
+                tile_location_s = (
+                    tiling_location_s[dim] + tile_index3D_s[dim]*tile_extent[dim]
+                )
+                tile_separation = tile_location_s - tile_location_r[dim]
+                if tile_separation > ℝ[0.5*boxsize]:
+                    periodic_offset[dim] = boxsize
+                elif tile_separation < ℝ[-0.5*boxsize]:
+                    periodic_offset[dim] = ℝ[-boxsize]
+                else:
+                    periodic_offset[dim] = 0
+            # Let the active receiver particles
+            # walk the tree of the supplier tile.
+            if tile_contain_particles_r >= 2:
+                tree_s = trees_s.get(tile_index_s)
+                if tree_s is None:
+                    tree_s = get_octree(trees_N)
+                    trees_N += 1
+                    tree_s.build(
+                        supplier.pos,
+                        tiling_s.tiles[tile_index_s],
+                        tiling_s.tiles_rungs_N[tile_index_s],
+                        supplier.lowest_populated_rung,
+                        supplier.highest_populated_rung + 1,
+                    )
+                    trees_s[tile_index_s] = tree_s
+                tree_walk_tile(
+                    receiver, tiling_r, tile_index_r, tree_s, factors, True, table, softening,
+                    periodic_offset[0], periodic_offset[1], periodic_offset[2],
+                )
+            # Let the active supplier particles walk the tree of the
+            # receiver tile. For local interactions within a single
+            # tile, this has already been taken care of above.
+            with unswitch(2):
+                if only_supply:
+                    continue
+            if tile_contain_particles_s < 2:
+                continue
+            with unswitch(2):
+                if local:
+                    if tile_index_r == tile_index_s:
+                        continue
+            tree_r = trees_r.get(tile_index_r)
+            if tree_r is None:
+                tree_r = get_octree(trees_N)
+                trees_N += 1
+                tree_r.build(
+                    receiver.pos,
+                    tiling_r.tiles[tile_index_r],
+                    tiling_r.tiles_rungs_N[tile_index_r],
+                    receiver.lowest_populated_rung,
+                    receiver.highest_populated_rung + 1,
+                )
+                trees_r[tile_index_r] = tree_r
+            tree_walk_tile(
+                supplier, tiling_s, tile_index_s, tree_r, factors, True, table, softening,
+                -periodic_offset[0], -periodic_offset[1], -periodic_offset[2],
+            )
+    # Add computation time to the running total. As the subtiles are
+    # not used, this is stored on the tiling and so does not enter
+    # the automatic subtiling refinement.
+    tiling_r.computation_time += time() - t_begin
+# Arrays used by the gravity_tree_shortrange() function
+cython.declare(
+    tree_periodic_offset='double*',
+    tree_tile_location_r='double*',
+)
+tree_periodic_offset = malloc(3*sizeof('double'))
+tree_tile_location_r = malloc(3*sizeof('double'))
+
+# Helper function for the gravity_tree_shortrange() and
+# gravity_tree_nonperiodic() functions, letting all active particles
+# within the given tile walk the given tree, applying the resulting
+# momentum updates. When shortrange is True, the short-range force
+# is computed using the given table. Otherwise, the full (non-periodic)
+# force is computed using the given softening length.
+@cython.header(
+    # Arguments
+    component='Component',
+    tiling='Tiling',
+    tile_index='Py_ssize_t',
+    tree='Octree',
+    factors='const double*',
+    shortrange='bint',
+    table='const double*',
+    softening='double',
+    periodic_offset_x='double',
+    periodic_offset_y='double',
+    periodic_offset_z='double',
+    # Locals
+    factor='double',
+    force='double*',
+    indexᵖ='Py_ssize_t',
+    indexˣ='Py_ssize_t',
+    pos='double*',
+    rung='Py_ssize_t*',
+    rung_N='Py_ssize_t',
+    rung_index='signed char',
+    rung_indices_jumped='signed char*',
+    rung_particle_index='Py_ssize_t',
+    rungs_N='Py_ssize_t*',
+    tile='Py_ssize_t**',
+    tile_contain_jumping='bint',
+    Δmom='double*',
+    returns='void',
+)
+def tree_walk_tile(
+    component, tiling, tile_index, tree, factors, shortrange, table, softening,
+    periodic_offset_x, periodic_offset_y, periodic_offset_z,
+):
+    pos = component.pos
+    Δmom = component.Δmom
+    rung_indices_jumped = component.rung_indices_jumped
+    tile = tiling.tiles[tile_index]
+    rungs_N = tiling.tiles_rungs_N[tile_index]
+    tile_contain_jumping = (tiling.contain_particles[tile_index] == 3)
+    # Loop over the active particles of the tile
+    for rung_index in range(
+        component.lowest_active_rung, ℤ[component.highest_populated_rung + 1],
+    ):
+        rung_N = rungs_N[rung_index]
+        if rung_N == 0:
+            continue
+        rung = tile[rung_index]
+        for rung_particle_index in range(rung_N):
+            indexᵖ = rung[rung_particle_index]
+            indexˣ = 3*indexᵖ
+            with unswitch(2):
+                if shortrange:
+                    force = tree_walk_shortrange(
+                        tree,
+                        pos[indexˣ + 0] + periodic_offset_x,
+                        pos[indexˣ + 1] + periodic_offset_y,
+                        pos[indexˣ + 2] + periodic_offset_z,
+                        table,
+                    )
+                else:
+                    force = tree_walk_nonperiodic(
+                        tree, pos[indexˣ + 0], pos[indexˣ + 1], pos[indexˣ + 2], softening,
+                    )
+            with unswitch(2):
+                if tile_contain_jumping:
+                    factor = factors[rung_indices_jumped[indexᵖ]]
+                else:
+                    factor = factors[rung_index]
+            Δmom[indexˣ + 0] += factor*force[0]
+            Δmom[indexˣ + 1] += factor*force[1]
+            Δmom[indexˣ + 2] += factor*force[2]
+
+# Function walking the given tree, computing the short-range force
+# (excluding the particle masses) at the given position,
+# due to all particles within the tree.
+@cython.header(
+    # Arguments
+    tree='Octree',
+    x='double',
+    y='double',
+    z='double',
+    table='const double*',
+    # Locals
+    child='Py_ssize_t',
+    extent='double',
+    forcex='double',
+    forcey='double',
+    forcez='double',
+    half_extent='double',
+    i='Py_ssize_t',
+    indexˣ='Py_ssize_t',
+    node='Py_ssize_t',
+    node_centre='double*',
+    node_com='double*',
+    outside_x='double',
+    outside_y='double',
+    outside_z='double',
+    particles='Py_ssize_t*',
+    pos='double*',
+    r2='double',
+    shortrange_factor='double',
+    x_ji='double',
+    y_ji='double',
+    z_ji='double',
+    returns='double*',
+)
+def tree_walk_shortrange(tree, x, y, z, table):
+    """The nodes of the tree are accepted according to the standard
+    Barnes-Hut criterion extent/distance < opening angle, with the
+    distance measured to the centre of mass of the node. Nodes
+    containing the position itself are always opened, while nodes
+    lying entirely beyond the range of the short-range force are
+    skipped altogether. The returned force should be multiplied by
+    G*mass_r*mass_s*Δt/a to obtain the momentum update.
+    """
+    forcex = forcey = forcez = 0
+    pos = tree.pos
+    particles = tree.particles
+    node_centre = tree.node_centre
+    node_com = tree.node_com
+    node = 0
+    if tree.size == 0:
+        node = -1
+    while node != -1:
+        # Skip nodes lying entirely beyond the range
+        # of the short-range force.
+        extent = tree.node_extent[node]
+        half_extent = 0.5*extent
+        outside_x = pairmax(abs(x - node_centre[3*node + 0]) - half_extent, 0.)
+        outside_y = pairmax(abs(y - node_centre[3*node + 1]) - half_extent, 0.)
+        outside_z = pairmax(abs(z - node_centre[3*node + 2]) - half_extent, 0.)
+        if outside_x**2 + outside_y**2 + outside_z**2 > ℝ[shortrange_range**2]:
+            node = tree.node_next[node]
+            continue
+        child = tree.node_child[node]
+        if child == -1:
+            # Leaf node. Sum up the contributions from each particle.
+            # Should the particle at the given position itself be
+            # part of the leaf, it contributes nothing as x_ji = 0.
+            for i in range(tree.node_bgn[node], tree.node_end[node]):
+                indexˣ = 3*particles[i]
+                x_ji = x - pos[indexˣ + 0]
+                y_ji = y - pos[indexˣ + 1]
+                z_ji = z - pos[indexˣ + 2]
+                r2 = x_ji**2 + y_ji**2 + z_ji**2
+                if r2 > ℝ[shortrange_range**2]:
+                    continue
+                shortrange_factor = lookup_shortrange_table(table, r2)
+                forcex += x_ji*shortrange_factor
+                forcey += y_ji*shortrange_factor
+                forcez += z_ji*shortrange_factor
+            node = tree.node_next[node]
+            continue
+        # Open the node if the position is within it
+        if outside_x == 0 and outside_y == 0 and outside_z == 0:
+            node = child
+            continue
+        # Open the node if it is not sufficiently distant
+        x_ji = x - node_com[3*node + 0]
+        y_ji = y - node_com[3*node + 1]
+        z_ji = z - node_com[3*node + 2]
+        r2 = x_ji**2 + y_ji**2 + z_ji**2
+        if extent**2 >= ℝ[shortrange_opening_angle**2]*r2:
+            node = child
+            continue
+        # Accept the monopole of the node
+        if r2 <= ℝ[shortrange_range**2]:
+            shortrange_factor = (
+                (tree.node_end[node] - tree.node_bgn[node])*lookup_shortrange_table(table, r2)
+            )
+            forcex += x_ji*shortrange_factor
+            forcey += y_ji*shortrange_factor
+            forcez += z_ji*shortrange_factor
+        node = tree.node_next[node]
+    tree_force[0] = forcex
+    tree_force[1] = forcey
+    tree_force[2] = forcez
+    return tree_force
+# Array used by the tree_walk_shortrange()
+# and tree_walk_nonperiodic() functions.
+cython.declare(tree_force='double*')
+tree_force = malloc(3*sizeof('double'))
+
+# Function walking the given tree, computing the softened, non-periodic
+# force (excluding the particle masses) at the given position,
+# due to all particles within the tree.
+@cython.header(
+    # Arguments
+    tree='Octree',
+    x='double',
+    y='double',
+    z='double',
+    softening='double',
+    # Locals
+    child='Py_ssize_t',
+    extent='double',
+    forcex='double',
+    forcey='double',
+    forcez='double',
+    half_extent='double',
+    i='Py_ssize_t',
+    indexˣ='Py_ssize_t',
+    node='Py_ssize_t',
+    node_centre='double*',
+    node_com='double*',
+    particles='Py_ssize_t*',
+    pos='double*',
+    r2='double',
+    r3_inv_softened='double',
+    x_ji='double',
+    y_ji='double',
+    z_ji='double',
+    returns='double*',
+)
+def tree_walk_nonperiodic(tree, x, y, z, softening):
+    """This is the Barnes-Hut counterpart to
+    gravity_pairwise_nonperiodic(). Nodes are accepted using the same
+    opening criterion as in tree_walk_shortrange(), though with the
+    separate treenonperiodic_opening_angle. As the force has infinite
+    range, no nodes are skipped. The returned force should
+    be multiplied by G*mass_r*mass_s*Δt/a to obtain the momentum update.
+    """
+    forcex = forcey = forcez = 0
+    pos = tree.pos
+    particles = tree.particles
+    node_centre = tree.node_centre
+    node_com = tree.node_com
+    node = 0
+    if tree.size == 0:
+        node = -1
+    while node != -1:
+        child = tree.node_child[node]
+        if child == -1:
+            # Leaf node. Sum up the contributions from each particle.
+            # Should the particle at the given position itself be
+            # part of the leaf, it contributes nothing as x_ji = 0.
+            for i in range(tree.node_bgn[node], tree.node_end[node]):
+                indexˣ = 3*particles[i]
+                x_ji = x - pos[indexˣ + 0]
+                y_ji = y - pos[indexˣ + 1]
+                z_ji = z - pos[indexˣ + 2]
+                r2 = x_ji**2 + y_ji**2 + z_ji**2
+                r3_inv_softened = get_softened_r3inv(r2, softening)
+                forcex -= x_ji*r3_inv_softened
+                forcey -= y_ji*r3_inv_softened
+                forcez -= z_ji*r3_inv_softened
+            node = tree.node_next[node]
+            continue
+        # Open the node if the position is within it
+        extent = tree.node_extent[node]
+        half_extent = 0.5*extent
+        if (    abs(x - node_centre[3*node + 0]) <= half_extent
+            and abs(y - node_centre[3*node + 1]) <= half_extent
+            and abs(z - node_centre[3*node + 2]) <= half_extent
+        ):
+            node = child
+            continue
+        # Open the node if it is not sufficiently distant
+        x_ji = x - node_com[3*node + 0]
+        y_ji = y - node_com[3*node + 1]
+        z_ji = z - node_com[3*node + 2]
+        r2 = x_ji**2 + y_ji**2 + z_ji**2
+        if extent**2 >= ℝ[treenonperiodic_opening_angle**2]*r2:
+            node = child
+            continue
+        # Accept the monopole of the node
+        r3_inv_softened = (
+            (tree.node_end[node] - tree.node_bgn[node])*get_softened_r3inv(r2, softening)
+        )
+        forcex -= x_ji*r3_inv_softened
+        forcey -= y_ji*r3_inv_softened
+        forcez -= z_ji*r3_inv_softened
+        node = tree.node_next[node]
+    tree_force[0] = forcex
+    tree_force[1] = forcey
+    tree_force[2] = forcez
+    return tree_force
 
 # Function that tabulates the gravitational short-range force,
 # including softening.
@@ -360,17 +1564,20 @@ def gravity_pairwise_shortrange(
     softening='double',
     # Locals
     i='Py_ssize_t',
+    offset='Py_ssize_t',
     r='double',
     r2='double',
+    r2_tabulation='double[::1]',
     r3_inv='double',
     r3_inv_softened='double',
-    r_tabulation='double[::1]',
     table='double[::1]',
     table_ptr='double*',
+    table_size='Py_ssize_t',
     x='double',
     returns='const double*',
 )
 def get_shortrange_table(softening):
+    global shortrange_tables_data
     # This function tabulates the short-range factor
     #   -r⁻³(x/sqrt(π)exp(-x²/4) + erfc(x/2)),
     # though in a softened version.
@@ -383,28 +1590,40 @@ def get_shortrange_table(softening):
     #   = -r⁻³(x/sqrt(π)exp(-x²/4) + erfc(x/2) - 1) - r⁻³_softened
     # We only need the tabulation for 0 <= r <= range, where range
     # is the maximum reach of the short-range force.
-    # All tables are cached.
+    # All tables are cached, stored one after the other within the
+    # single contiguous shortrange_tables_data array, so that the
+    # tables of several softening lengths (e.g. for the different
+    # component pairs in multi-component simulations) stay close in
+    # memory. As this array grows when new tables are added, a returned
+    # pointer is only valid until the next call to this function
+    # with a new softening length.
     # Look up table in the cache
-    table = shortrange_tables.get(softening)
-    if table is not None:
+    offset = shortrange_tables.get(softening, -1)
+    if offset != -1:
         # Table found
-        table_ptr = cython.address(table[:])
+        table_ptr = cython.address(shortrange_tables_data[offset:])
         return table_ptr
-    # The distances at which the tabulation will be carried out,
-    # quadratically spaced.
-    r_tabulation = np.sqrt(
-        linspace(
-            0,
-            shortrange_table_maxr2,
-            shortrange_table_size,
-        )
+    # The squared distances at which the tabulation will be carried
+    # out, linearly spaced. The table elements are looked up using
+    # lookup_shortrange_table(). For NGP lookup, the i'th element of
+    # the table really corresponds to the value at r²[i+½], so that
+    # lookups can be performed by cheap floor (int casting) indexing.
+    # For linear interpolation, the i'th element corresponds to the
+    # value at r²[i]. For cubic interpolation, the i'th element
+    # corresponds to the value at r²[i-1], with an additional element
+    # at each end.
+    table_size = shortrange_table_size + 2*(shortrange_table_order == 4)
+    r2_tabulation = ℝ[shortrange_table_maxr2/(shortrange_table_size - 1)]*(
+        arange(table_size, dtype=C2np['double'])
+        + 0.5*(shortrange_table_order == 1)
+        - 1.0*(shortrange_table_order == 4)
     )
-    # Create the table. The i'th element of table really corresponds
-    # to the value at r[i+½]. Nearest grid point lookups
-    # can then be performed by cheap floor (int casting) indexing.
-    table = empty(shortrange_table_size, dtype=C2np['double'])
-    for i in range(shortrange_table_size - 1):
-        r2 = 0.5*(r_tabulation[i]**2 + r_tabulation[i+1]**2)
+    table = empty(table_size, dtype=C2np['double'])
+    for i in range(table_size):
+        r2 = r2_tabulation[i]
+        if r2 <= 0:
+            # For r → 0 the unsoftened part approaches a finite value
+            continue
         r = sqrt(r2)
         x = r*ℝ[1/shortrange_scale]
         r3_inv = 1/(r2*r)
@@ -413,29 +1632,89 @@ def get_shortrange_table(softening):
             - r3_inv*(1/sqrt(π)*x*exp(-ℝ[0.5*x]**2) + (erfc(ℝ[0.5*x]) - 1))
             - r3_inv_softened
         )
-    # The last element in table is not populated above.
-    # This element is guaranteed to never be accessed as it would
-    # require an r > shortrange_range due to the way
-    # shortrange_table_maxr2 is constructed. To demonstrate our
-    # trust in this, we here assign it NaN.
-    table[shortrange_table_size - 1] = NaN
-    # Store in cache and return pointer by calling this function anew
-    shortrange_tables[softening] = table
+    if shortrange_table_order == 1:
+        # The last element in table is not populated correctly above.
+        # This element is guaranteed to never be accessed as it would
+        # require an r > shortrange_range due to the way
+        # shortrange_table_maxr2 is constructed. To demonstrate our
+        # trust in this, we here assign it NaN.
+        table[table_size - 1] = NaN
+    else:
+        # Assign the element at r = 0 using the limit
+        #   -r⁻³(x/sqrt(π)exp(-x²/4) + erfc(x/2) - 1) → 1/(6sqrt(π)scale³),
+        # while the element at r² < 0 needed for cubic interpolation is
+        # found through linear extrapolation.
+        i = (shortrange_table_order == 4)
+        table[i] = 1/(6*sqrt(π)*shortrange_scale**3) - get_softened_r3inv(0, softening)
+        if i == 1:
+            table[0] = 2*table[1] - table[2]
+    # Append the table to the shared array of tables
+    # and return pointer by calling this function anew.
+    shortrange_tables[softening] = shortrange_tables_data.shape[0]
+    shortrange_tables_data = np.concatenate((shortrange_tables_data, table))
     return get_shortrange_table(softening)
-# Global variables used by the get_shortrange_table()
-# and gravity_pairwise_shortrange() functions.
+
+# Function returning the tabulated short-range factor at the squared
+# distance r2, using the interpolation specified by the
+# 'table interpolation' sub-parameter of shortrange_params.
+@cython.header(
+    # Arguments
+    table='const double*',
+    r2='double',
+    # Locals
+    i='Py_ssize_t',
+    t='double',
+    u='double',
+    returns='double',
+)
+def lookup_shortrange_table(table, r2):
+    u = r2*shortrange_table_scaling
+    i = int(u)
+    if 𝔹[shortrange_table_order == 1]:
+        # Nearest grid point
+        return table[i]
+    t = u - i
+    if 𝔹[shortrange_table_order == 2]:
+        # Linear interpolation
+        return table[i] + t*(table[i + 1] - table[i])
+    # Cubic (Catmull-Rom) interpolation
+    return table[i + 1] + 0.5*t*(
+        (table[i + 2] - table[i])
+        + t*(
+            (2*table[i] - 5*table[i + 1] + 4*table[i + 2] - table[i + 3])
+            + t*(3*(table[i + 1] - table[i + 2]) + table[i + 3] - table[i])
+        )
+    )
+
+# Global variables used by the get_shortrange_table(),
+# lookup_shortrange_table(), gravity_pairwise_shortrange()
+# and tree_walk_shortrange() functions.
 cython.declare(
     shortrange_scale='double',
     shortrange_range='double',
     shortrange_table_size='Py_ssize_t',
     shortrange_table_maxr2='double',
+    shortrange_table_scaling='double',
+    shortrange_table_order='int',
     shortrange_tables=dict,
+    shortrange_tables_data='double[::1]',
+    shortrange_opening_angle='double',
+    shortrange_skin='double',
+    shortrange_single='bint',
 )
 shortrange_scale      = shortrange_params['gravity']['scale'    ]
 shortrange_range      = shortrange_params['gravity']['range'    ]
 shortrange_table_size = shortrange_params['gravity']['tablesize']
 shortrange_table_maxr2 = (1 + 1/shortrange_table_size)*shortrange_range**2
+shortrange_table_scaling = (shortrange_table_size - 1)/shortrange_table_maxr2
+shortrange_table_order = {'ngp': 1, 'linear': 2, 'cubic': 4}[
+    shortrange_params['gravity']['table interpolation']
+]
 shortrange_tables = {}
+shortrange_tables_data = empty(0, dtype=C2np['double'])
+shortrange_opening_angle = shortrange_params['gravity']['opening angle']
+shortrange_skin = shortrange_params['gravity']['skin']
+shortrange_single = (shortrange_params['gravity']['precision'] == 'single')
 
 # Function implementing pairwise gravity (non-periodic)
 @cython.nounswitching
@@ -557,3 +1836,92 @@ def gravity_pairwise_nonperiodic(
     if indexᵖ_j != -1:
         particle_particle_t_final = time()
         subtiling_r.computation_time += particle_particle_t_final - particle_particle_t_begin
+    # Stop the timing of the last receiver tile,
+    # for use with adaptive subtiling.
+    if 𝔹[pairing_level == 'tile']:
+        receiver.tilings[f'{interaction_name} (tiles)'].time_tile(-1)
+
+# Function implementing non-periodic gravity using a tree
+@cython.header(
+    # Arguments
+    interaction_name=str,
+    receiver='Component',
+    supplier='Component',
+    ᔑdt_rungs=dict,
+    rank_supplier='int',
+    only_supply='bint',
+    pairing_level=str,
+    tile_indices_receiver='Py_ssize_t[::1]',
+    tile_indices_supplier_paired='Py_ssize_t**',
+    tile_indices_supplier_paired_N='Py_ssize_t*',
+    extra_args=dict,
+    # Locals
+    factors='const double*',
+    local='bint',
+    softening='double',
+    t_begin='double',
+    tiling_r='Tiling',
+    tiling_s='Tiling',
+    tree_r='Octree',
+    tree_s='Octree',
+    returns='void',
+)
+def gravity_tree_nonperiodic(
+    interaction_name, receiver, supplier, ᔑdt_rungs, rank_supplier, only_supply, pairing_level,
+    tile_indices_receiver, tile_indices_supplier_paired, tile_indices_supplier_paired_N,
+    extra_args,
+):
+    """This is the Barnes-Hut alternative to the direct summation of
+    gravity_pairwise_nonperiodic(), reducing the computational cost
+    from O(N²) to O(N log N). As the interaction is carried out at the
+    domain level, the trivial tiling with its single tile is used.
+    The active receiver particles walk a tree built from all supplier
+    particles, and vice versa when not only_supply. The accuracy is
+    controlled through the treenonperiodic_opening_angle parameter.
+    """
+    t_begin = time()
+    # Get common softening length
+    softening = combine_softening_lengths(
+        receiver.softening_length,
+        supplier.softening_length,
+    )
+    # Get array of factors used for momentum updates
+    factors = compute_factors(receiver, supplier, ᔑdt_rungs)
+    # Extract the trivial tilings
+    tiling_r = receiver.tilings['trivial']
+    tiling_s = supplier.tilings['trivial']
+    # Flag specifying whether the receiver and supplier are really
+    # the same component within the same domain.
+    local = (receiver.name == supplier.name and rank == rank_supplier)
+    # Let the active receiver particles walk the supplier tree
+    if tiling_r.contain_particles[0] >= 2 and tiling_s.contain_particles[0] > 0:
+        tree_s = get_octree(0)
+        tree_s.build(
+            supplier.pos,
+            tiling_s.tiles[0],
+            tiling_s.tiles_rungs_N[0],
+            supplier.lowest_populated_rung,
+            supplier.highest_populated_rung + 1,
+        )
+        tree_walk_tile(
+            receiver, tiling_r, 0, tree_s, factors, False, NULL, softening, 0, 0, 0,
+        )
+    # Let the active supplier particles walk the receiver tree. For
+    # local interactions, this has already been taken care of above.
+    if (
+        not only_supply and not local
+        and tiling_s.contain_particles[0] >= 2 and tiling_r.contain_particles[0] > 0
+    ):
+        tree_r = get_octree(1)
+        tree_r.build(
+            receiver.pos,
+            tiling_r.tiles[0],
+            tiling_r.tiles_rungs_N[0],
+            receiver.lowest_populated_rung,
+            receiver.highest_populated_rung + 1,
+        )
+        tree_walk_tile(
+            supplier, tiling_s, 0, tree_r, factors, False, NULL, softening, 0, 0, 0,
+        )
+    # Add computation time to the running total
+    tiling_r.computation_time += time() - t_begin
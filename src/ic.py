@@ -29,8 +29,14 @@ cimport(
     'from communication import '
     '    exchange,             '
     '    get_buffer,           '
+    '    get_buffers_usage,    '
+)
+cimport(
+    'from integration import '
+    '    cosmic_time,        '
+    '    hubble,             '
+    '    scale_factor,       '
 )
-cimport('from integration import hubble')
 cimport(
     'from linear import                         '
     '    compute_cosmo,                         '
@@ -40,6 +46,7 @@ cimport(
 cimport(
     'from mesh import              '
     '    Lattice,                  '
+    '    bytes2str,                '
     '    domain_decompose,         '
     '    domain_loop,              '
     '    fft,                      '
@@ -48,16 +55,35 @@ cimport(
     '    fourier_diff,             '
     '    fourier_loop,             '
     '    free_fftw_slab,           '
+    '    get_domain_grid_bounds,   '
     '    get_fftw_slab,            '
     '    get_gridshape_local,      '
+    '    get_slabs_usage,          '
+    '    get_slabshape_local,      '
+    '    has_fftw_slab,            '
     '    laplacian_inverse,        '
     '    resize_grid,              '
     '    nullify_modes,            '
     '    slab_decompose,           '
 )
 
-# Pure Python imports
-from communication import get_domain_info
+# Import declarations from noise.c
+pxd("""
+# Threaded counter-based primordial noise from noise.c
+cdef extern from "noise.c":
+    void primordial_noise_threaded(
+        int nthreads,
+        double* slab,
+        Py_ssize_t gridsize,
+        Py_ssize_t slab_size_j,
+        Py_ssize_t slab_start_j,
+        unsigned long long key_amplitudes,
+        unsigned long long key_phases,
+        bint fixed_amplitude,
+        double phase_shift,
+        double pi,
+    )
+""")
 
 
 
@@ -275,6 +301,58 @@ def random_gaussian(scale=1, size=1):
 def random_rayleigh(scale=1, size=1):
     return random_general('rayleigh', size, scale)
 
+# Counter-based pseudo-random number generator, returning a uniform
+# random number in the half-open interval (0, 1] as a pure function of
+# the key and the counter (stream, ki, kj, kk). No state is carried
+# between calls, so any number in the sequence can be generated directly
+# without drawing the ones before it. The underlying bijection is the
+# Philox4x32-10 of Salmon et al. (2011), with the counter made up of
+# four 32-bit words and the key of two. The 64-bit integer arithmetic is
+# explicitly masked so that compiled and pure Python mode agree.
+@cython.header(
+    # Arguments
+    key='unsigned long long int',
+    stream='Py_ssize_t',
+    ki='Py_ssize_t',
+    kj='Py_ssize_t',
+    kk='Py_ssize_t',
+    # Locals
+    c0='unsigned long long int',
+    c1='unsigned long long int',
+    c2='unsigned long long int',
+    c3='unsigned long long int',
+    i='int',
+    k0='unsigned long long int',
+    k1='unsigned long long int',
+    p0='unsigned long long int',
+    p1='unsigned long long int',
+    x='unsigned long long int',
+    returns='double',
+)
+def random_counter_based(key, stream, ki, kj, kk):
+    # Set up counter and key words
+    c0 = ki     & 0xFFFFFFFF
+    c1 = kj     & 0xFFFFFFFF
+    c2 = kk     & 0xFFFFFFFF
+    c3 = stream & 0xFFFFFFFF
+    k0 = key         & 0xFFFFFFFF
+    k1 = (key >> 32) & 0xFFFFFFFF
+    # Perform the Philox rounds
+    for i in range(10):
+        p0 = 0xD2511F53*c0
+        p1 = 0xCD9E8D57*c2
+        c0 = (p1 >> 32) ^ c1 ^ k0
+        c1 = p1 & 0xFFFFFFFF
+        c2 = (p0 >> 32) ^ c3 ^ k1
+        c3 = p0 & 0xFFFFFFFF
+        # Bump key
+        k0 = (k0 + 0x9E3779B9) & 0xFFFFFFFF
+        k1 = (k1 + 0xBB67AE85) & 0xFFFFFFFF
+    # Construct 53-bit integer from the first two output words
+    # and convert to a double in (0, 1].
+    x = ((c0 << 21) | (c1 >> 11)) & 0x1FFFFFFFFFFFFF
+    return (x + 1)*ℝ[1/2.0**53]
+
 # Function for fully realizing a particle component,
 # of for realising one or more variables on a fluid component.
 @cython.pheader(
@@ -285,6 +363,7 @@ def random_rayleigh(scale=1, size=1):
     variables=object,  # str or int, or sequence of strs and/or ints
     multi_indices=object,  # int, str, tuple or list
     use_gridˣ='bint',
+    component_h5=object,  # h5py.Group
     # Locals
     fluidvar_name=str,
     gauge=str,
@@ -297,6 +376,7 @@ def random_rayleigh(scale=1, size=1):
 def realize(
     component,
     a=-1, a_next=-1, variables=None, multi_indices=None, use_gridˣ=False,
+    component_h5=None,
 ):
     if a == -1:
         a = universals.a
@@ -332,8 +412,13 @@ def realize(
             abort(f'Cannot perform particle realization with a_next = {a_next}')
         if multi_indices is not None:
             abort('Only complete particle realization is allowed')
-        # Realise particle positions and momenta in all three dimensions
-        realize_particles(component, a)
+        # Realise particle positions and momenta in all three
+        # dimensions, possibly streaming them directly to the snapshot
+        # group component_h5. Only when streaming may a subset of
+        # the variables be realised.
+        if component_h5 is None and set(variables) != {0, 1}:
+            abort('Only complete particle realization is allowed')
+        realize_particles(component, a, component_h5, variables)
         return
     for variable in variables:
         if variable > component.boltzmann_order + (component.boltzmann_closure == 'class'):
@@ -402,19 +487,23 @@ def realize_fluid(component, a, a_next, variable, multi_index, use_gridˣ=False)
         abort(f'realize_fluid() called with non-fluid component {component.name}')
     # Resize particle data attributes
     gridsize = component.gridsize
-    shape = tuple([gridsize//domain_subdivisions[dim] for dim in range(3)])
+    shape = tuple(asarray(get_gridshape_local(gridsize)) - 2*nghosts)
     component.resize(shape)
     # If an approximation should be used for the realisation,
     # do so and return now.
     if realize_approximative(component, a, variable, multi_index, use_gridˣ):
         return
-    # Fetch amplitudes
-    amplitudes = get_amplitudes(gridsize, component, a, a_next, variable, multi_index)
+    # Fetch amplitudes. Linear fluid scalars are realised repeatedly,
+    # and so their amplitudes are tabulated in time.
+    fluidscalar = component.fluidvars[variable][multi_index]
+    amplitudes = get_amplitudes(
+        gridsize, component, a, a_next, variable, multi_index,
+        tabulate=fluidscalar.is_linear,
+    )
     # Realise the fluid scalar variable
     slab = realize_grid(gridsize, component, a, amplitudes, variable, multi_index=multi_index)
     # Communicate the fluid realisation in the slabs to the designated
     # fluid scalar grid. This also populates the ghost points.
-    fluidscalar = component.fluidvars[variable][multi_index]
     domain_decompose(slab, fluidscalar.gridˣ_mv if use_gridˣ else fluidscalar.grid_mv)
     # Transform the realised fluid variable to the actual quantity used
     # in the non-linear fluid equations. Include ghost points.
@@ -521,6 +610,8 @@ def realize_approximative(component, a, variable, multi_index, use_gridˣ=False)
     variable='int',
     multi_index=object,  # int, str or tuple
     factor='double',
+    tabulate='bint',
+    gauge=str,
     # Locals
     amplitudes='double[::1]',
     amplitudes_ptr='double*',
@@ -539,7 +630,10 @@ def realize_approximative(component, a, variable, multi_index, use_gridˣ=False)
     weight=str,
     returns='double[::1]',
 )
-def get_amplitudes(gridsize, component, a, a_next=-1, variable=-1, multi_index=None, factor=1):
+def get_amplitudes(
+    gridsize, component, a, a_next=-1, variable=-1, multi_index=None, factor=1,
+    tabulate=False, gauge=None,
+):
     """This function returns an array of tabulated amplitudes for use
     with realisations. Realisations from the primordial noise looks like
       ℱₓ⁻¹[T(a) ζ(k) K(k⃗) ℛ(k⃗)]
@@ -554,6 +648,13 @@ def get_amplitudes(gridsize, component, a, a_next=-1, variable=-1, multi_index=N
     and so in this case what is tabulated is T(k)/T_δϱ(k) with the
     additional Fourier normalization of gridsize**(-3), due to the
     forward FFT.
+    For realisations carried out repeatedly throughout the simulation
+    (i.e. of linear fluid variables), tabulate should be True, in
+    which case the amplitudes are interpolated from a time-indexed
+    table (see get_amplitudes_tabulated()) rather than being
+    recomputed from the transfer function at every call.
+    The gauge defaults to that of the realisation options
+    of the component.
     """
     # Get transfer function spline. For realisations that should be
     # averaged over some time interval, we fist need to determine the
@@ -563,6 +664,8 @@ def get_amplitudes(gridsize, component, a, a_next=-1, variable=-1, multi_index=N
     if variable == -1:
         abort(f'get_amplitudes() called with variable = {variable}')
     options = component.realization_options
+    if gauge is None:
+        gauge = options['gauge']
     use_primordial = (
         variable == 0
         or variable <= component.boltzmann_order
@@ -584,8 +687,14 @@ def get_amplitudes(gridsize, component, a, a_next=-1, variable=-1, multi_index=N
             weight = 'a**(-3*w_eff)'
         else:
             abort(f'Unknown variable "{variable}" passed to get_amplitudes()')
+    # Look up tabulated amplitudes. As the table only extends to a = 1,
+    # later times are handled directly.
+    if tabulate and pairmax(a, a_next) <= 1:
+        return get_amplitudes_tabulated(
+            gridsize, component, a, a_next, variable, multi_index, factor, weight, gauge,
+        )
     transfer_spline, cosmoresults = compute_transfer(
-        component, variable, gridsize, multi_index, a, a_next, options['gauge'],
+        component, variable, gridsize, multi_index, a, a_next, gauge,
         weight=weight, backscale=options['backscale']*(variable == 0),
     )
     # Get transfer function spline of δ in the case of
@@ -593,7 +702,7 @@ def get_amplitudes(gridsize, component, a, a_next=-1, variable=-1, multi_index=N
     if not use_primordial:
         transfer_spline_δ, cosmoresults_δ = compute_transfer(
             component, 0, gridsize,
-            a=a, gauge=options['gauge'],
+            a=a, gauge=gauge,
         )
     # Fetch grid for storing amplitudes
     nyquist = gridsize//2
@@ -626,6 +735,169 @@ def get_amplitudes(gridsize, component, a, a_next=-1, variable=-1, multi_index=N
                 )
     return amplitudes
 
+# Function for obtaining the amplitudes of get_amplitudes() through
+# interpolation in a time-indexed table.
+@cython.header(
+    # Arguments
+    gridsize='Py_ssize_t',
+    component='Component',
+    a='double',
+    a_next='double',
+    variable='int',
+    multi_index=object,  # int, str or tuple
+    factor='double',
+    weight=str,
+    gauge=str,
+    # Locals
+    a_q='double',
+    amplitudes='double[::1]',
+    amplitudes_ptr='double*',
+    coefficient='double',
+    coefficients=dict,
+    coefficients_a=dict,
+    coefficients_tables=dict,
+    gauge_table=str,
+    k2='Py_ssize_t',
+    k2_max='Py_ssize_t',
+    key=tuple,
+    n='Py_ssize_t',
+    n_min='Py_ssize_t',
+    node='double[::1]',
+    node_ptr='double*',
+    nyquist='Py_ssize_t',
+    q='Py_ssize_t',
+    t='double',
+    t_next='double',
+    table=dict,
+    w_eff='double',
+    weight_q='double',
+    weights_sum='double',
+    returns='double[::1]',
+)
+def get_amplitudes_tabulated(
+    gridsize, component, a, a_next, variable, multi_index, factor, weight, gauge,
+):
+    """The (non-averaged) amplitudes are tabulated at nodes
+    a = exp(n/amplitudes_table_density) for integer n ≤ 0, with the
+    amplitudes at a given a obtained through cubic Lagrange
+    interpolation in ln(a) between the four surrounding nodes. If a
+    weight is given, the weighted average over [a, a_next] is computed
+    using Gauss–Legendre quadrature in cosmic time, as is done using
+    splines by TransferFunction.as_function_of_k(). As both the
+    interpolation and the quadrature are linear in the node amplitudes,
+    they reduce to a single weighted sum over the nodes. The nodes are
+    computed as they are needed, while nodes left behind (at smaller a)
+    are dropped.
+    When averaging in 𝘕-body gauge, only the synchronous gauge transfer
+    function is averaged, with the gauge transformation evaluated at a
+    (see compute_transfer()). The averaged amplitudes are then
+      ⟨Aˢ⟩ + Aᴺᵇ(a) - Aˢ(a),
+    requiring a separate table of synchronous gauge amplitudes.
+    """
+    # Find the interpolation coefficients of the nodes at a
+    coefficients_a = {}
+    add_amplitudes_table_coefficients(coefficients_a, a, 1)
+    if weight is None:
+        coefficients_tables = {gauge: coefficients_a}
+    else:
+        # Find the coefficients of the nodes for the average
+        coefficients = {}
+        t, t_next = cosmic_time(a), cosmic_time(a_next)
+        weights_sum = 0
+        for q in range(amplitudes_table_quadrature[0].shape[0]):
+            a_q = scale_factor(
+                0.5*(t + t_next) + 0.5*(t_next - t)*amplitudes_table_quadrature[0][q]
+            )
+            w_eff = component.w_eff(a=a_q)
+            if weight == 'a**(-3*w_eff-1)':
+                weight_q = a_q**(-3*w_eff - 1)
+            elif weight == 'a**(3*w_eff-2)':
+                weight_q = a_q**(3*w_eff - 2)
+            elif weight == 'a**(-3*w_eff)':
+                weight_q = a_q**(-3*w_eff)
+            else:
+                abort(f'weight "{weight}" not implemented in get_amplitudes_tabulated()')
+            weight_q *= amplitudes_table_quadrature[1][q]
+            add_amplitudes_table_coefficients(coefficients, a_q, weight_q)
+            weights_sum += weight_q
+        for n in coefficients:
+            coefficients[n] /= weights_sum
+        if gauge == 'nbody':
+            # Average the synchronous gauge amplitudes only,
+            # adding in the gauge transformation at a.
+            for n, coefficient in coefficients_a.items():
+                coefficients[n] = coefficients.get(n, 0) - coefficient
+            coefficients_tables = {gauge: coefficients_a, 'synchronous': coefficients}
+        else:
+            coefficients_tables = {gauge: coefficients}
+    # Sum up the weighted nodes of each table
+    nyquist = gridsize//2
+    k2_max = 3*(nyquist - 1)**2
+    amplitudes = zeros(k2_max + 1, dtype=C2np['double'])
+    amplitudes_ptr = cython.address(amplitudes[:])
+    for gauge_table, coefficients in coefficients_tables.items():
+        key = (component.name, variable, str(multi_index), gridsize, gauge_table)
+        table = amplitudes_tables.setdefault(key, {})
+        # Compute missing nodes and drop nodes left behind
+        for n in coefficients:
+            if n not in table:
+                table[n] = get_amplitudes(
+                    gridsize, component, exp(n/amplitudes_table_density),
+                    variable=variable, multi_index=multi_index, gauge=gauge_table,
+                )
+        n_min = min(coefficients)
+        for n in list(table):
+            if n < n_min - 4:
+                table.pop(n)
+        for n, coefficient in coefficients.items():
+            node = table[n]
+            node_ptr = cython.address(node[:])
+            coefficient *= factor
+            for k2 in range(k2_max + 1):
+                amplitudes_ptr[k2] += coefficient*node_ptr[k2]
+    return amplitudes
+# Tables of amplitudes used by get_amplitudes_tabulated(), mapping
+# (component name, variable, multi_index, grid size, gauge) to dicts of node
+# amplitudes, along with the number of nodes per e-fold of the scale
+# factor and the Gauss–Legendre quadrature used for time-averaging.
+cython.declare(
+    amplitudes_tables=dict,
+    amplitudes_table_density='double',
+    amplitudes_table_quadrature=tuple,
+)
+amplitudes_tables = {}
+amplitudes_table_density = 20
+amplitudes_table_quadrature = tuple(np.polynomial.legendre.leggauss(4))
+
+# Helper function for get_amplitudes_tabulated(), adding the Lagrange
+# interpolation coefficients of the four nodes surrounding a,
+# multiplied by weight, to the passed coefficients.
+@cython.header(
+    # Arguments
+    coefficients=dict,
+    a='double',
+    weight='double',
+    # Locals
+    coefficient='double',
+    i='Py_ssize_t',
+    j='Py_ssize_t',
+    n_bgn='Py_ssize_t',
+    x='double',
+    returns='void',
+)
+def add_amplitudes_table_coefficients(coefficients, a, weight):
+    # The nodes are placed at integer values of x. The stencil is
+    # shifted to the left if needed so that we never need nodes
+    # at a > 1, which may not be covered by the cosmology.
+    x = log(a)*amplitudes_table_density
+    n_bgn = pairmin(int(floor(x)) - 1, -3)
+    for i in range(4):
+        coefficient = weight
+        for j in range(4):
+            if j != i:
+                coefficient *= (x - (n_bgn + j))/(i - j)
+        coefficients[n_bgn + i] = coefficients.get(n_bgn + i, 0) + coefficient
+
 # Function for realising a single grid. Scalar, vector and rank-2 tensor
 # realisations are supported.
 @cython.pheader(
@@ -840,9 +1112,13 @@ def get_slab_structure(
                 'a'        : a,
                 'use_gridˣ': use_gridˣ,
             }
-        # Can we reuse existing slab?
+        # Can we reuse existing slab? This requires the slab to not
+        # have been freed since it was populated (see manage_memory()).
         if name is not None:
-            reuse = (slab_structure_infos.get((gridsize, name)) == info)
+            reuse = (
+                slab_structure_infos.get((gridsize, name)) == info
+                and has_fftw_slab(gridsize, name)
+            )
             # Record structure slab information for later calls
             slab_structure_infos[gridsize, name] = info
         # Fetch structure slab
@@ -886,6 +1162,8 @@ slab_structure_infos = {}
     phase_shift='double',
     # Locals
     gridsize='Py_ssize_t',
+    conj='double',
+    i='Py_ssize_t',
     i_conj='Py_ssize_t',
     im='double',
     im_conj='double',
@@ -898,10 +1176,14 @@ slab_structure_infos = {}
     j_conj='Py_ssize_t',
     j_global='Py_ssize_t',
     j_global_conj='Py_ssize_t',
+    key_amplitudes='unsigned long long int',
+    key_phases='unsigned long long int',
     ki='Py_ssize_t',
     ki_conj='Py_ssize_t',
+    ki_source='Py_ssize_t',
     kj='Py_ssize_t',
     kj_conj='Py_ssize_t',
+    kj_source='Py_ssize_t',
     kk='Py_ssize_t',
     lower_x_zdc='bint',
     lower_x_zdc_conj='bint',
@@ -989,22 +1271,34 @@ def generate_primordial_noise(slab, fixed_amplitude=False, phase_shift=0):
         in the slice at -kj. Whenever such a point is hit in the -kj
         slice, the value is conjugated and imprinted onto the reflected
         point in the slice at kj.
-    Note that the two schemes provide different realisations.
+    - The 'counter' scheme: Each process loops contiguously over its
+      local slab. Rather than drawing from streams, the random numbers
+      are computed directly as a pure function of the seed and the mode
+      (ki, kj, kk), using the counter-based random_counter_based().
+      The Rayleigh amplitude and uniform phase are obtained from
+      one uniform number each through the inverse transforms
+        r = √(-log(u₀))  (Rayleigh with scale 1/√2)
+        θ = -π + 2π*u₁,
+      neither of which involves rejection.
+      - The Hermitian symmetry is implemented by computing the noise of
+        each point within the upper x part of the z DC plane from its
+        reflected point in the lower x part and conjugating it.
+    Note that the three schemes provide different realisations.
     The origin will be nullified but the Nyquist planes will be left
     untouched (these should be nullified beforehand or elsewhere).
-    Both schemes visit the grid points in order of the Fourier
-    space-filling curve, from the origin outwards. This enables us to
-    simply use the random numbers in the order they are drawn, but at
-    the cost of writing to the grid points in an order that is not
-    contiguous (except for small clusters of contiguous points).
-    A different technique would be to loop contiguously over the slab,
-    while jumping around in the random streams. While many pseudo-random
-    number generators do allow for such jumps, this cannot be used in a
-    consistent fashion here, as the generation of e.g. Rayleigh
-    distributed random numbers involves rejection, leading to the
-    generation of one Rayleigh number really jumping the state of the
-    generator two (or more) numbers ahead, which cannot be predicted
-    without actually drawning the number.
+    The simple and distributed schemes visit the grid points in order of
+    the Fourier space-filling curve, from the origin outwards. This
+    enables us to simply use the random numbers in the order they are
+    drawn, but at the cost of writing to the grid points in an order
+    that is not contiguous (except for small clusters of contiguous
+    points). Looping contiguously over the slab while jumping around in
+    the (stateful) random streams cannot be done in a consistent
+    fashion, as the generation of e.g. Rayleigh distributed random
+    numbers involves rejection, leading to the generation of one
+    Rayleigh number really jumping the state of the generator two (or
+    more) numbers ahead, which cannot be predicted without actually
+    drawning the number. The counter scheme sidesteps this by having
+    no generator state at all.
     """
     slab_size_j, slab_size_i, slab_size_k = asarray(slab).shape
     gridsize = slab_size_i
@@ -1156,6 +1450,68 @@ def generate_primordial_noise(slab, fixed_amplitude=False, phase_shift=0):
                     index_conj = (j_conj*slab_size_i + i_conj)*slab_size_k  # k = 0
                     slab_ptr[index_conj    ] = +re_conj
                     slab_ptr[index_conj + 1] = -im_conj
+    elif primordial_noise_imprinting == 'counter':
+        # Each process loops contiguously over its own slab, computing
+        # the noise at each grid point directly from the counter-based
+        # generator keyed on the seed and the mode (ki, kj, kk).
+        # Points within the upper x part of the z DC plane are assigned
+        # the conjugated noise of their reflection point (-ki, -kj, 0),
+        # which is simply computed in place.
+        key_amplitudes = random_seeds['primordial amplitudes']
+        key_phases     = random_seeds['primordial phases']
+        # With multiple threads, the work is done by the
+        # primordial_noise_threaded() C function,
+        # which implements the exact same scheme.
+        if 𝔹[num_threads > 1]:
+            primordial_noise_threaded(
+                num_threads, slab_ptr, gridsize, slab_size_j, ℤ[slab_size_j*rank],
+                key_amplitudes, key_phases, fixed_amplitude, phase_shift, π,
+            )
+        else:
+            for j in range(slab_size_j):
+                j_global = ℤ[slab_size_j*rank] + j
+                # Skip Nyquist plane
+                if j_global == nyquist:
+                    continue
+                kj = j_global - (-(j_global >= nyquist) & gridsize)
+                for i in range(slab_size_i):
+                    # Skip Nyquist plane
+                    if i == nyquist:
+                        continue
+                    ki = i - (-(i >= nyquist) & gridsize)
+                    index = (j*slab_size_i + i)*slab_size_k
+                    lower_x_zdc = (ki < 0) | ((ki == 0) & (kj < 0))
+                    # Loop over kk, skipping the Nyquist plane
+                    for kk in range(nyquist):
+                        # Determine the source mode of the noise
+                        ki_source = ki
+                        kj_source = kj
+                        conj = +1
+                        if kk == 0 and not lower_x_zdc:
+                            ki_source = -ki
+                            kj_source = -kj
+                            conj = -1
+                        # Compute random numbers from the counter-based
+                        # generator, transforming the uniform numbers in
+                        # (0, 1] to Rayleigh distributed amplitudes with
+                        # scale 1/√2 and uniform phases in (-π, π].
+                        r = 1
+                        with unswitch:
+                            if not fixed_amplitude:
+                                r = sqrt(-log(
+                                    random_counter_based(key_amplitudes, 0, ki_source, kj_source, kk)
+                                ))
+                        θ = -π + τ*random_counter_based(key_phases, 1, ki_source, kj_source, kk)
+                        # Finalize random noise
+                        with unswitch:
+                            if phase_shift:
+                                θ += phase_shift
+                        re = r*cos(θ)
+                        im = r*sin(θ)
+                        # Imprint random noise onto grid point
+                        slab_ptr[index    ] = re
+                        slab_ptr[index + 1] = conj*im
+                        index += 2
     else:
         abort(f'primordial_noise_imprinting = "{primordial_noise_imprinting}" not implemented')
     # Nullify origin (random number was imprinted onto it in the above)
@@ -1167,36 +1523,54 @@ def generate_primordial_noise(slab, fixed_amplitude=False, phase_shift=0):
     # Arguments
     component='Component',
     a='double',
+    component_h5=object,  # h5py.Group
+    variables=object,  # sequence of ints or None
     # Locals
     buffer_gridsize='Py_ssize_t',
     buffer_name=object,  # int or str or None
     buffer_number='int',
     cosmoresults=object,  # CosmoResults
+    dtype=object,
     gridsize='Py_ssize_t',
     gridsize_dealias='Py_ssize_t',
     growth_factors=dict,
-    i='int',
     id_bgn='Py_ssize_t',
+    id_max='Py_ssize_t',
     indexʳ='Py_ssize_t',
     indexᵖ_bgn='Py_ssize_t',
     lattice='Lattice',
     n_different_sized='Py_ssize_t',
+    name=str,
     n_local='Py_ssize_t',
     n_particles='Py_ssize_t',
     nongaussianity='double',
     options=object,  # ParticleRealizationOptions
     particle_components=list,
+    plan=object,  # LPTPlan
     pos='double*',
+    slot='double[:, :, ::1]',
+    slots=list,
+    stage=object,  # LPTStage
     tmpgrid0='double[:, :, ::1]',
-    tmpgrid0_dealias='double[:, :, ::1]',
     tmpgrid1='double[:, :, ::1]',
-    tmpgrid1_dealias='double[:, :, ::1]',
+    variable='int',
     Φ1='double[:, :, ::1]',
     Φ2='double[:, :, ::1]',
     Φ3='double[:, :, ::1]',
     returns='void',
 )
-def realize_particles(component, a):
+def realize_particles(component, a, component_h5=None, variables=None):
+    """When component_h5 is given, the particles are not kept in
+    memory but streamed directly to this (CO𝘕CEPT snapshot) HDF5 group,
+    with only a chunk of particle_stream_chunk_size particles residing
+    in memory at a time. The particle data is then accumulated within
+    the datasets on disk. Only the memory of the particle data is saved
+    in this way, as the potentials and displacement fields are still
+    realised on full slabs and grids. Only the variables given
+    (0 for positions, 1 for momenta, defaulting to both) are streamed.
+    The datasets are chunked by column, so that adding in each
+    displacement field only reads and writes the affected column.
+    """
     options = ParticleRealizationOptions(
         component.realization_options['backscale'],
         component.realization_options['lpt'],
@@ -1220,7 +1594,10 @@ def realize_particles(component, a):
             f'with N = {component.N}, as N is not evenly divisible by {nprocs} processes'
         )
     component.N_local = component.N//nprocs
-    component.resize(component.N_local)
+    if component_h5 is None:
+        component.resize(component.N_local)
+    else:
+        component.resize(pairmin(component.N_local, particle_stream_chunk_size))
     # Prepare lattice options
     if not component.preic_lattice:
         abort(
@@ -1313,20 +1690,58 @@ def realize_particles(component, a):
     if options.lpt >= 3:
         # For 3LPT we need 1 additional potential grid
         Φ3, buffer_number = get_lpt_grid(gridsize, buffer_number)
-    # If dealiasing is to be used, additionally fetch
-    # two enlarged grids for use with Orszag's 3/2 rule.
-    gridsize_dealias = gridsize
-    tmpgrid0_dealias = tmpgrid0
-    tmpgrid1_dealias = tmpgrid1
-    if options.dealias:
-        gridsize_dealias = (gridsize_dealias*3)//2
-        gridsize_dealias += gridsize_dealias & 1
-        tmpgrid0_dealias, buffer_number = get_lpt_grid(gridsize_dealias, buffer_number)
-        tmpgrid1_dealias, buffer_number = get_lpt_grid(gridsize_dealias, buffer_number)
+    # For 2LPT and 3LPT, plan the construction of the potentials and
+    # fetch the slots in which to store real space derivatives of the
+    # potentials. Without dealiasing, the temporary grids are used as
+    # the first two slots. If dealiasing is to be used, the slots are
+    # instead enlarged grids for use with Orszag's 3/2 rule.
+    slots = []
+    if options.lpt >= 2:
+        gridsize_dealias = gridsize
+        if options.dealias:
+            gridsize_dealias = (gridsize_dealias*3)//2
+            gridsize_dealias += gridsize_dealias & 1
+        else:
+            slots += [tmpgrid0, tmpgrid1]
+        plan = plan_lpt(options.lpt, gridsize, gridsize_dealias)
+        masterprint(
+            f'Planned {options.lpt}LPT using {plan.n_fft} FFTs, '
+            f'with a peak of {plan.n_slabs} slabs ({bytes2str(plan.nbytes)})'
+        )
+        while len(slots) < plan.n_slots:
+            slot, buffer_number = get_lpt_grid(gridsize_dealias, buffer_number)
+            slots.append(slot)
     # Realise particles, one lattice at a time
     n_particles = gridsize**3
     indexᵖ_bgn = 0
     id_bgn = n_particles_realized['particles_tally']
+    # Set up datasets for streamed particle data. The particles of each
+    # process occupy a contiguous range of rows.
+    if component_h5 is not None:
+        if variables is None:
+            variables = [0, 1]
+        particle_stream['offset'] = component.N_local*rank
+        for variable, name in enumerate(('pos', 'mom')):
+            if variable in variables:
+                particle_stream[name] = component_h5.create_dataset(
+                    name, (component.N, 3), dtype=C2np['double'],
+                    chunks=(pairmin(component.N, particle_stream_chunk_size), 1),
+                )
+        if component.use_ids:
+            # Store IDs using as few bits as possible,
+            # as done by ConceptSnapshot.save().
+            id_max = id_bgn + component.N - 1
+            if id_max >= 2**32:
+                dtype = np.uint64
+            elif id_max >= 2**16:
+                dtype = np.uint32
+            elif id_max >= 2**8:
+                dtype = np.uint16
+            else:
+                dtype = np.uint8
+            particle_stream['ids'] = component_h5.create_dataset(
+                'ids', (component.N, ), dtype=dtype,
+            )
     for lattice in lattice:
         # Initialise particles on the lattice
         masterprint(
@@ -1349,34 +1764,35 @@ def realize_particles(component, a):
         )
         masterprint('done')
         # We now have Φ1 in Fourier space
-        notes = {}  # for keeping track of temporary grid contents
         if options.lpt >= 2:
             # Carry out 2LPT
             masterprint('Carrying out 2LPT ...')
             carryout_2lpt(
                 component, a, growth_factors, indexᵖ_bgn,
-                Φ1, Φ2, tmpgrid0, tmpgrid0_dealias, tmpgrid1, tmpgrid1_dealias, notes,
+                Φ1, Φ2, plan.stages[0], slots, tmpgrid0,
             )
             masterprint('done')
             # We now have Φ1 and Φ2 in Fourier space
         if options.lpt >= 3:
+            # Carry out 3LPT, with the 'a', 'b' and 'c' terms
+            # in the order given by the plan.
             masterprint('Carrying out 3LPT ...')
-            # Carry out 3LPT ('a' term)
-            carryout_3lpt_a(
-                component, a, growth_factors, indexᵖ_bgn,
-                Φ1, Φ3, tmpgrid0, tmpgrid0_dealias, tmpgrid1, tmpgrid1_dealias, notes,
-            )
-            # Carry out 3LPT ('b' term)
-            carryout_3lpt_b(
-                component, a, growth_factors, indexᵖ_bgn,
-                Φ1, Φ2, Φ3, tmpgrid0, tmpgrid0_dealias, tmpgrid1, tmpgrid1_dealias, notes,
-            )
-            # Carry out 3LPT ('c' term)
-            for i in range(3):
-                carryout_3lpt_c(
-                    component, a, growth_factors, indexᵖ_bgn,
-                    Φ1, Φ2, Φ3, i, tmpgrid0, tmpgrid0_dealias, tmpgrid1, tmpgrid1_dealias, notes,
-                )
+            for stage in plan.stages[1:]:
+                if stage.name == '3a':
+                    carryout_3lpt_a(
+                        component, a, growth_factors, indexᵖ_bgn,
+                        Φ1, Φ3, stage, slots, tmpgrid0,
+                    )
+                elif stage.name == '3b':
+                    carryout_3lpt_b(
+                        component, a, growth_factors, indexᵖ_bgn,
+                        Φ1, Φ2, Φ3, stage, slots, tmpgrid0,
+                    )
+                else:
+                    carryout_3lpt_c(
+                        component, a, growth_factors, indexᵖ_bgn,
+                        Φ1, Φ2, Φ3, int(stage.name[2]), stage, slots, tmpgrid0,
+                    )
             masterprint('done')
         # Prepare for next lattice
         id_bgn += n_particles
@@ -1391,6 +1807,14 @@ def realize_particles(component, a):
             lpt_grids_info.appendleft((buffer_gridsize, buffer_name))
         else:
             free_fftw_slab(buffer_gridsize, buffer_name)
+    # When streaming, all particle data now resides on disk
+    # (with toroidal boundaries already ensured).
+    if component_h5 is not None:
+        particle_stream.clear()
+        component.N_local = 0
+        component.resize(1)
+        masterprint('done')
+        return
     # Ensure toroidal boundaries and exchange
     # particles among the processes.
     pos = component.pos
@@ -1402,6 +1826,12 @@ ParticleRealizationOptions = collections.namedtuple(
     'ParticleRealizationOptions',
     ['backscale', 'lpt', 'dealias', 'nongaussianity', 'structure'],
 )
+# Datasets and process offset used by realize_particles() when
+# streaming particle data directly to a snapshot, along with the maximum
+# number of particles to keep in memory at a time while doing so.
+cython.declare(particle_stream=dict, particle_stream_chunk_size='Py_ssize_t')
+particle_stream = {}
+particle_stream_chunk_size = 2**20
 # Record updated by the realize_particles() function
 cython.declare(n_particles_realized=dict)
 n_particles_realized = {
@@ -1517,35 +1947,34 @@ def carryout_1lpt(
     indexᵖ_bgn='Py_ssize_t',
     Φ1='double[:, :, ::1]',
     Φ2='double[:, :, ::1]',
-    tmpgrid0='double[:, :, ::1]',
-    tmpgrid0_dealias='double[:, :, ::1]',
-    tmpgrid1='double[:, :, ::1]',
-    tmpgrid1_dealias='double[:, :, ::1]',
+    stage=object,  # LPTStage
+    slots=list,
+    staging='double[:, :, ::1]',
     # Locals
     dealias='bint',
     fft_factor='double',
-    grids=dict,
     gridsize='Py_ssize_t',
     gridsize_dealias='Py_ssize_t',
     i='int',
-    notes=dict,
     potential_factor='double',
+    slot='double[:, :, ::1]',
     tmpgrid='double[:, :, ::1]',
-    tmpgrid_name=str,
     velocity_factor='double',
     Ψ2ᵢ='double[:, :, ::1]',
     returns='void',
 )
 def carryout_2lpt(
     component, a, growth_factors, indexᵖ_bgn,
-    Φ1, Φ2, tmpgrid0, tmpgrid0_dealias, tmpgrid1, tmpgrid1_dealias, notes,
+    Φ1, Φ2, stage, slots, staging,
 ):
-    """For 2LPT we need the pre-computed Φ1 and 2 temporary grids.
-    Once this function returns, the Φ2 potential
-    will be populated in k space.
+    """For 2LPT we need the pre-computed Φ1, the slots and staging grid
+    as given by the LPT plan (see plan_lpt()) and the planned stage.
+    Once this function returns, the Φ2 potential will be populated
+    in k space.
     """
-    gridsize = tmpgrid0.shape[1]
-    gridsize_dealias = tmpgrid0_dealias.shape[1]
+    slot = slots[0]
+    gridsize = Φ2.shape[1]
+    gridsize_dealias = slot.shape[1]
     dealias = (gridsize_dealias > gridsize)
     fft_factor = float(gridsize_dealias)**(-3)
     potential_factor = fft_factor*growth_factors['D2']/growth_factors['D1']**2
@@ -1560,19 +1989,8 @@ def carryout_2lpt(
     #       + Φ⁽¹⁾,₂₀²
     #   )
     # where all growth factors are taken to be positive.
-    grids = {
-        'Φ⁽¹⁾': Φ1,
-        'Φ⁽²⁾': Φ2,
-        'tmp0': (tmpgrid0, tmpgrid0_dealias),
-        'tmp1': (tmpgrid1, tmpgrid1_dealias),
-    }
     masterprint('Building potential ...')
-    handle_lpt_term('Φ⁽²⁾  = Φ⁽¹⁾,₀₀ Φ⁽¹⁾,₁₁', grids, notes, factor=-1)
-    handle_lpt_term('Φ⁽²⁾ -= Φ⁽¹⁾,₁₁ Φ⁽¹⁾,₂₂', grids, notes)
-    handle_lpt_term('Φ⁽²⁾ -= Φ⁽¹⁾,₂₂ Φ⁽¹⁾,₀₀', grids, notes)
-    handle_lpt_term('Φ⁽²⁾ += Φ⁽¹⁾,₀₁²',        grids, notes)
-    handle_lpt_term('Φ⁽²⁾ += Φ⁽¹⁾,₁₂²',        grids, notes)
-    handle_lpt_term('Φ⁽²⁾ += Φ⁽¹⁾,₂₀²',        grids, notes)
+    build_lpt_potential(Φ2, stage, {'Φ⁽¹⁾': Φ1}, slots, staging)
     if not dealias:
         fft(Φ2, 'forward')
     laplacian_inverse(Φ2, potential_factor)
@@ -1580,8 +1998,9 @@ def carryout_2lpt(
     # Construct displacement field from potential,
     # displace and boost particles.
     masterprint('Displacing positions and boosting momenta ...')
-    tmpgrid_name, tmpgrid, _ = get_tmpgrid(grids)
-    notes.pop(tmpgrid_name, None)
+    tmpgrid = staging
+    if stage.index_displace != -1:
+        tmpgrid = slots[stage.index_displace]
     for i in range(3):
         Ψ2ᵢ = diff_ifft(Φ2, tmpgrid, tmpgrid, i)
         displace_particles(component, Ψ2ᵢ, a, indexᵖ_bgn, 0, i)
@@ -1597,34 +2016,32 @@ def carryout_2lpt(
     indexᵖ_bgn='Py_ssize_t',
     Φ1='double[:, :, ::1]',
     Φ3a='double[:, :, ::1]',
-    tmpgrid0='double[:, :, ::1]',
-    tmpgrid0_dealias='double[:, :, ::1]',
-    tmpgrid1='double[:, :, ::1]',
-    tmpgrid1_dealias='double[:, :, ::1]',
-    notes=dict,
+    stage=object,  # LPTStage
+    slots=list,
+    staging='double[:, :, ::1]',
     # Locals
     dealias='bint',
     fft_factor='double',
-    grids=dict,
     gridsize='Py_ssize_t',
     gridsize_dealias='Py_ssize_t',
     i='int',
     potential_factor='double',
+    slot='double[:, :, ::1]',
     tmpgrid='double[:, :, ::1]',
-    tmpgrid_name=str,
     velocity_factor='double',
     Ψ3aᵢ='double[:, :, ::1]',
     returns='void',
 )
 def carryout_3lpt_a(
     component, a, growth_factors, indexᵖ_bgn,
-    Φ1, Φ3a, tmpgrid0, tmpgrid0_dealias, tmpgrid1, tmpgrid1_dealias, notes,
+    Φ1, Φ3a, stage, slots, staging,
 ):
     """For 3LPT ('a' term) we need the pre-computed Φ⁽¹⁾
-    and 2 temporary grids.
+    and the slots and staging grid as given by the LPT plan.
     """
-    gridsize = tmpgrid0.shape[1]
-    gridsize_dealias = tmpgrid0_dealias.shape[1]
+    slot = slots[0]
+    gridsize = Φ3a.shape[1]
+    gridsize_dealias = slot.shape[1]
     dealias = (gridsize_dealias > gridsize)
     fft_factor = float(gridsize_dealias)**(-3)
     potential_factor = fft_factor*growth_factors['D3a']/growth_factors['D1']**3
@@ -1638,18 +2055,8 @@ def carryout_3lpt_a(
     #       + Φ⁽¹⁾,₀₁² Φ⁽¹⁾,₂₂
     #   )
     # where all growth factors are taken to be positive.
-    grids = {
-        'Φ⁽¹⁾': Φ1,
-        'Φ⁽³ᵃ⁾': Φ3a,
-        'tmp0': (tmpgrid0, tmpgrid0_dealias),
-        'tmp1': (tmpgrid1, tmpgrid1_dealias),
-    }
     masterprint('Building potential (a) ...')
-    handle_lpt_term('Φ⁽³ᵃ⁾  = Φ⁽¹⁾,₂₀² Φ⁽¹⁾,₁₁',        grids, notes)
-    handle_lpt_term('Φ⁽³ᵃ⁾ -= Φ⁽¹⁾,₁₁ Φ⁽¹⁾,₂₂ Φ⁽¹⁾,₀₀', grids, notes)
-    handle_lpt_term('Φ⁽³ᵃ⁾ += Φ⁽¹⁾,₀₀ Φ⁽¹⁾,₁₂²',        grids, notes)
-    handle_lpt_term('Φ⁽³ᵃ⁾ -= Φ⁽¹⁾,₁₂ Φ⁽¹⁾,₂₀ Φ⁽¹⁾,₀₁', grids, notes, factor=2)
-    handle_lpt_term('Φ⁽³ᵃ⁾ += Φ⁽¹⁾,₀₁² Φ⁽¹⁾,₂₂',        grids, notes)
+    build_lpt_potential(Φ3a, stage, {'Φ⁽¹⁾': Φ1}, slots, staging)
     if not dealias:
         fft(Φ3a, 'forward')
     laplacian_inverse(Φ3a, potential_factor)
@@ -1657,8 +2064,9 @@ def carryout_3lpt_a(
     # Construct displacement field from potential,
     # displace and boost particles.
     masterprint('Displacing positions and boosting momenta ...')
-    tmpgrid_name, tmpgrid, _ = get_tmpgrid(grids)
-    notes.pop(tmpgrid_name, None)
+    tmpgrid = staging
+    if stage.index_displace != -1:
+        tmpgrid = slots[stage.index_displace]
     for i in range(3):
         Ψ3aᵢ = diff_ifft(Φ3a, tmpgrid, tmpgrid, i)
         displace_particles(component, Ψ3aᵢ, a, indexᵖ_bgn, 0, i)
@@ -1675,34 +2083,32 @@ def carryout_3lpt_a(
     Φ1='double[:, :, ::1]',
     Φ2='double[:, :, ::1]',
     Φ3b='double[:, :, ::1]',
-    tmpgrid0='double[:, :, ::1]',
-    tmpgrid0_dealias='double[:, :, ::1]',
-    tmpgrid1='double[:, :, ::1]',
-    tmpgrid1_dealias='double[:, :, ::1]',
-    notes=dict,
+    stage=object,  # LPTStage
+    slots=list,
+    staging='double[:, :, ::1]',
     # Locals
     dealias='bint',
     fft_factor='double',
-    grids=dict,
     gridsize='Py_ssize_t',
     gridsize_dealias='Py_ssize_t',
     i='int',
     potential_factor='double',
+    slot='double[:, :, ::1]',
     tmpgrid='double[:, :, ::1]',
-    tmpgrid_name=str,
     velocity_factor='double',
     Ψ3bᵢ='double[:, :, ::1]',
     returns='void',
 )
 def carryout_3lpt_b(
     component, a, growth_factors, indexᵖ_bgn,
-    Φ1, Φ2, Φ3b, tmpgrid0, tmpgrid0_dealias, tmpgrid1, tmpgrid1_dealias, notes,
+    Φ1, Φ2, Φ3b, stage, slots, staging,
 ):
     """For 3LPT ('b' term) we need the pre-computed Φ⁽¹⁾ and Φ⁽²⁾
-    and 2 temporary grids.
+    and the slots and staging grid as given by the LPT plan.
     """
-    gridsize = tmpgrid0.shape[1]
-    gridsize_dealias = tmpgrid0_dealias.shape[1]
+    slot = slots[0]
+    gridsize = Φ3b.shape[1]
+    gridsize_dealias = slot.shape[1]
     dealias = (gridsize_dealias > gridsize)
     fft_factor = float(gridsize_dealias)**(-3)
     potential_factor = fft_factor*growth_factors['D3b']/(growth_factors['D1']*growth_factors['D2'])
@@ -1720,23 +2126,8 @@ def carryout_3lpt_b(
     #       + Φ⁽²⁾,₁₂ Φ⁽¹⁾,₁₂
     #   )
     # where all growth factors are taken to be positive.
-    grids = {
-        'Φ⁽¹⁾': Φ1,
-        'Φ⁽²⁾': Φ2,
-        'Φ⁽³ᵇ⁾': Φ3b,
-        'tmp0': (tmpgrid0, tmpgrid0_dealias),
-        'tmp1': (tmpgrid1, tmpgrid1_dealias),
-    }
     masterprint('Building potential (b) ...')
-    handle_lpt_term('Φ⁽³ᵇ⁾  = Φ⁽¹⁾,₂₂ Φ⁽²⁾,₀₀', grids, notes, factor=-0.5)
-    handle_lpt_term('Φ⁽³ᵇ⁾ -= Φ⁽²⁾,₀₀ Φ⁽¹⁾,₁₁', grids, notes, factor=0.5)
-    handle_lpt_term('Φ⁽³ᵇ⁾ -= Φ⁽¹⁾,₁₁ Φ⁽²⁾,₂₂', grids, notes, factor=0.5)
-    handle_lpt_term('Φ⁽³ᵇ⁾ -= Φ⁽²⁾,₂₂ Φ⁽¹⁾,₀₀', grids, notes, factor=0.5)
-    handle_lpt_term('Φ⁽³ᵇ⁾ -= Φ⁽¹⁾,₀₀ Φ⁽²⁾,₁₁', grids, notes, factor=0.5)
-    handle_lpt_term('Φ⁽³ᵇ⁾ -= Φ⁽²⁾,₁₁ Φ⁽¹⁾,₂₂', grids, notes, factor=0.5)
-    handle_lpt_term('Φ⁽³ᵇ⁾ += Φ⁽²⁾,₂₀ Φ⁽¹⁾,₂₀', grids, notes)
-    handle_lpt_term('Φ⁽³ᵇ⁾ += Φ⁽²⁾,₀₁ Φ⁽¹⁾,₀₁', grids, notes)
-    handle_lpt_term('Φ⁽³ᵇ⁾ += Φ⁽²⁾,₁₂ Φ⁽¹⁾,₁₂', grids, notes)
+    build_lpt_potential(Φ3b, stage, {'Φ⁽¹⁾': Φ1, 'Φ⁽²⁾': Φ2}, slots, staging)
     if not dealias:
         fft(Φ3b, 'forward')
     laplacian_inverse(Φ3b, potential_factor)
@@ -1744,8 +2135,9 @@ def carryout_3lpt_b(
     # Construct displacement field from potential,
     # displace and boost particles.
     masterprint('Displacing positions and boosting momenta ...')
-    tmpgrid_name, tmpgrid, _ = get_tmpgrid(grids)
-    notes.pop(tmpgrid_name, None)
+    tmpgrid = staging
+    if stage.index_displace != -1:
+        tmpgrid = slots[stage.index_displace]
     for i in range(3):
         Ψ3bᵢ = diff_ifft(Φ3b, tmpgrid, tmpgrid, i)
         displace_particles(component, Ψ3bᵢ, a, indexᵖ_bgn, 0, i)
@@ -1764,36 +2156,34 @@ def carryout_3lpt_b(
     Φ2='double[:, :, ::1]',
     A3cᵢ='double[:, :, ::1]',
     i='int',
-    tmpgrid0='double[:, :, ::1]',
-    tmpgrid0_dealias='double[:, :, ::1]',
-    tmpgrid1='double[:, :, ::1]',
-    tmpgrid1_dealias='double[:, :, ::1]',
-    notes=dict,
+    stage=object,  # LPTStage
+    slots=list,
+    staging='double[:, :, ::1]',
     # Locals
     dealias='bint',
     fft_factor='double',
-    grids=dict,
     gridsize='Py_ssize_t',
     gridsize_dealias='Py_ssize_t',
     j='int',
     k='int',
     potential_factor='double',
     sign='double',
+    slot='double[:, :, ::1]',
     tmpgrid='double[:, :, ::1]',
-    tmpgrid_name=str,
     velocity_factor='double',
     Ψ3cⱼ='double[:, :, ::1]',
     returns='void',
 )
 def carryout_3lpt_c(
     component, a, growth_factors, indexᵖ_bgn,
-    Φ1, Φ2, A3cᵢ, i, tmpgrid0, tmpgrid0_dealias, tmpgrid1, tmpgrid1_dealias, notes,
+    Φ1, Φ2, A3cᵢ, i, stage, slots, staging,
 ):
     """For 3LPT ('c' term; A3cᵢ) we need the pre-computed Φ⁽¹⁾ and Φ⁽²⁾
-    and 2 temporary grids.
+    and the slots and staging grid as given by the LPT plan.
     """
-    gridsize = tmpgrid0.shape[1]
-    gridsize_dealias = tmpgrid0_dealias.shape[1]
+    slot = slots[0]
+    gridsize = A3cᵢ.shape[1]
+    gridsize_dealias = slot.shape[1]
     dealias = (gridsize_dealias > gridsize)
     fft_factor = float(gridsize_dealias)**(-3)
     potential_factor = fft_factor*growth_factors['D3c']/(growth_factors['D1']*growth_factors['D2'])
@@ -1809,25 +2199,11 @@ def carryout_3lpt_c(
     # The displacement field is
     #   Ψ⁽³ᶜ⁾ᵢ = Aₖ,ⱼ - Aⱼ,ₖ
     # All growth factors are taken to be positive.
-    grids = {
-        'Φ⁽¹⁾': Φ1,
-        'Φ⁽²⁾': Φ2,
-        'Aᵢ⁽³ᶜ⁾': A3cᵢ,
-        'tmp0': (tmpgrid0, tmpgrid0_dealias),
-        'tmp1': (tmpgrid1, tmpgrid1_dealias),
-    }
     masterprint(
         'Building potential (c, {}) ...'
         .format(''.join(np.roll(list('xyz'), -i)[1:]))
     )
-    j = (i + 1)%3
-    k = (i + 2)%3
-    handle_lpt_term('Aᵢ⁽³ᶜ⁾  = Φ⁽²⁾,ⱼⱼ Φ⁽¹⁾,ⱼₖ', grids, notes, i, j, k)
-    handle_lpt_term('Aᵢ⁽³ᶜ⁾ -= Φ⁽¹⁾,ⱼₖ Φ⁽²⁾,ₖₖ', grids, notes, i, j, k)
-    handle_lpt_term('Aᵢ⁽³ᶜ⁾ -= Φ⁽¹⁾,ᵢⱼ Φ⁽²⁾,ᵢₖ', grids, notes, i, j, k)
-    handle_lpt_term('Aᵢ⁽³ᶜ⁾ -= Φ⁽¹⁾,ⱼⱼ Φ⁽²⁾,ⱼₖ', grids, notes, i, j, k)
-    handle_lpt_term('Aᵢ⁽³ᶜ⁾ += Φ⁽²⁾,ⱼₖ Φ⁽¹⁾,ₖₖ', grids, notes, i, j, k)
-    handle_lpt_term('Aᵢ⁽³ᶜ⁾ += Φ⁽²⁾,ᵢⱼ Φ⁽¹⁾,ᵢₖ', grids, notes, i, j, k)
+    build_lpt_potential(A3cᵢ, stage, {'Φ⁽¹⁾': Φ1, 'Φ⁽²⁾': Φ2}, slots, staging)
     if not dealias:
         fft(A3cᵢ, 'forward')
     laplacian_inverse(A3cᵢ, potential_factor)
@@ -1835,8 +2211,9 @@ def carryout_3lpt_c(
     # Construct displacement field from potential,
     # displace and boost particles.
     masterprint('Displacing positions and boosting momenta ...')
-    tmpgrid_name, tmpgrid, _ = get_tmpgrid(grids)
-    notes.pop(tmpgrid_name, None)
+    tmpgrid = staging
+    if stage.index_displace != -1:
+        tmpgrid = slots[stage.index_displace]
     for j in range(3):
         if j == i:
             continue
@@ -1847,83 +2224,130 @@ def carryout_3lpt_c(
         displace_particles(component, Ψ3cⱼ, a, indexᵖ_bgn, 1, j, velocity_factor)
     masterprint('done')
 
-# Function handling each term of the full expression for an
-# LPT potential, taking in a symbolic expression,
-# parsing it and performing the grid operations.
+# Symbolic real space expressions for the terms of the 2LPT and 3LPT
+# potentials, along with their numerical factors. For the 'c' term of
+# 3LPT, the indices ᵢ, ⱼ and ₖ are to be replaced with i, (i + 1)%3 and
+# (i + 2)%3 for each component i of the vector potential Aᵢ⁽³ᶜ⁾.
+# The terms are parsed into stages by get_lpt_terms().
+cython.declare(lpt_exprs=dict, lpt_terms=dict)
+lpt_exprs = {
+    '2': [
+        ('Φ⁽²⁾  = Φ⁽¹⁾,₀₀ Φ⁽¹⁾,₁₁', -1),
+        ('Φ⁽²⁾ -= Φ⁽¹⁾,₁₁ Φ⁽¹⁾,₂₂',  1),
+        ('Φ⁽²⁾ -= Φ⁽¹⁾,₂₂ Φ⁽¹⁾,₀₀',  1),
+        ('Φ⁽²⁾ += Φ⁽¹⁾,₀₁²',         1),
+        ('Φ⁽²⁾ += Φ⁽¹⁾,₁₂²',         1),
+        ('Φ⁽²⁾ += Φ⁽¹⁾,₂₀²',         1),
+    ],
+    '3a': [
+        ('Φ⁽³ᵃ⁾  = Φ⁽¹⁾,₂₀² Φ⁽¹⁾,₁₁',        1),
+        ('Φ⁽³ᵃ⁾ -= Φ⁽¹⁾,₁₁ Φ⁽¹⁾,₂₂ Φ⁽¹⁾,₀₀', 1),
+        ('Φ⁽³ᵃ⁾ += Φ⁽¹⁾,₀₀ Φ⁽¹⁾,₁₂²',        1),
+        ('Φ⁽³ᵃ⁾ -= Φ⁽¹⁾,₁₂ Φ⁽¹⁾,₂₀ Φ⁽¹⁾,₀₁', 2),
+        ('Φ⁽³ᵃ⁾ += Φ⁽¹⁾,₀₁² Φ⁽¹⁾,₂₂',        1),
+    ],
+    '3b': [
+        ('Φ⁽³ᵇ⁾  = Φ⁽¹⁾,₂₂ Φ⁽²⁾,₀₀', -0.5),
+        ('Φ⁽³ᵇ⁾ -= Φ⁽²⁾,₀₀ Φ⁽¹⁾,₁₁',  0.5),
+        ('Φ⁽³ᵇ⁾ -= Φ⁽¹⁾,₁₁ Φ⁽²⁾,₂₂',  0.5),
+        ('Φ⁽³ᵇ⁾ -= Φ⁽²⁾,₂₂ Φ⁽¹⁾,₀₀',  0.5),
+        ('Φ⁽³ᵇ⁾ -= Φ⁽¹⁾,₀₀ Φ⁽²⁾,₁₁',  0.5),
+        ('Φ⁽³ᵇ⁾ -= Φ⁽²⁾,₁₁ Φ⁽¹⁾,₂₂',  0.5),
+        ('Φ⁽³ᵇ⁾ += Φ⁽²⁾,₂₀ Φ⁽¹⁾,₂₀',  1),
+        ('Φ⁽³ᵇ⁾ += Φ⁽²⁾,₀₁ Φ⁽¹⁾,₀₁',  1),
+        ('Φ⁽³ᵇ⁾ += Φ⁽²⁾,₁₂ Φ⁽¹⁾,₁₂',  1),
+    ],
+    '3c': [
+        ('Aᵢ⁽³ᶜ⁾  = Φ⁽²⁾,ⱼⱼ Φ⁽¹⁾,ⱼₖ', 1),
+        ('Aᵢ⁽³ᶜ⁾ -= Φ⁽¹⁾,ⱼₖ Φ⁽²⁾,ₖₖ', 1),
+        ('Aᵢ⁽³ᶜ⁾ -= Φ⁽¹⁾,ᵢⱼ Φ⁽²⁾,ᵢₖ', 1),
+        ('Aᵢ⁽³ᶜ⁾ -= Φ⁽¹⁾,ⱼⱼ Φ⁽²⁾,ⱼₖ', 1),
+        ('Aᵢ⁽³ᶜ⁾ += Φ⁽²⁾,ⱼₖ Φ⁽¹⁾,ₖₖ', 1),
+        ('Aᵢ⁽³ᶜ⁾ += Φ⁽²⁾,ᵢⱼ Φ⁽¹⁾,ᵢₖ', 1),
+    ],
+}
+lpt_terms = {}
+
+# Function returning the parsed terms of a given stage of the LPT,
+# being one of '2', '3a', '3b', '3c0', '3c1', '3c2'.
+@cython.header(
+    # Arguments
+    stage_name=str,
+    # Locals
+    expr=str,
+    factor='double',
+    i='int',
+    terms=list,
+    returns=list,
+)
+def get_lpt_terms(stage_name):
+    terms = lpt_terms.get(stage_name)
+    if terms is not None:
+        return terms
+    terms = []
+    if stage_name.startswith('3c'):
+        i = int(stage_name[2])
+        for expr, factor in lpt_exprs['3c']:
+            terms.append(parse_lpt_expr(expr, factor, i, (i + 1)%3, (i + 2)%3))
+    else:
+        for expr, factor in lpt_exprs[stage_name]:
+            terms.append(parse_lpt_expr(expr, factor))
+    lpt_terms[stage_name] = terms
+    return terms
+
+# Function for parsing a term of the full expression for an
+# LPT potential.
 @cython.pheader(
     # Arguments
     expr=str,
-    grids=dict,
-    notes=dict,
+    factor='double',
     i='int',
     j='int',
     k='int',
-    factor='double',
     # Locals
     assignop=str,
-    basegrid='double[:, :, ::1]',
-    basegrid_dealias='double[:, :, ::1]',
-    basegrid_dealias_ptr='double*',
-    basegrid_name=str,
-    basegrid_ptr='double*',
-    dealias='bint',
-    fft_factor='double',
-    grid='double[:, :, ::1]',
-    grid_dealias='double[:, :, ::1]',
-    gridsize='Py_ssize_t',
-    gridsize_dealias='Py_ssize_t',
+    diff=str,
     ijk_mapping=dict,
-    index='Py_ssize_t',
+    key=tuple,
+    lhs=str,
     n='int',
     n_pot='int',
-    name=str,
-    name_reuse=str,
-    reuse='bint',
-    size='Py_ssize_t',
-    size_dealias='Py_ssize_t',
-    term=list,
-    tmpgrid='double[:, :, ::1]',
-    tmpgrid_dealias='double[:, :, ::1]',
-    tmpgrid_dealias_ptr='double*',
-    tmpgrid_name=str,
-    tmpgrid_ptr='double*',
-    Φ_in='double[:, :, ::1]',
-    Φ_out='double[:, :, ::1]',
-    Φ_out_ptr='double*',
-    returns='void',
+    operands=list,
+    pot=str,
+    powers=dict,
+    rhs=str,
+    returns=tuple,
 )
-def handle_lpt_term(expr, grids, notes, i=0, j=0, k=0, factor=1):
+def parse_lpt_expr(expr, factor=1, i=0, j=0, k=0):
     """A real-space expression like
-      Φ⁽³ᵃ⁾ = Φ⁽¹⁾,₀₀ Φ⁽¹⁾,₁₁ Φ⁽¹⁾,₂₂
-    is evaluated from the passed grids (must be in Fourier space).
-    The resulting grid will be in real space unless dealiasing is used.
-    Indices ᵢ, ⱼ and ₖ are replaced with the passed values.
-    The differentiated grids will be constructed in turn, using the
-    output and temporary grids supplied. If dealiasing is to be used,
-    we will apply it after every multiplication of a pair of grids,
-    i.e. twice for the above example. This is however only an
-    approximation; exact dealiasing is obtained from a single dealiasing
-    step but from a grid that is enlarged by a factor 2 instead of 3/2,
-    which we do no implement.
+      Φ⁽³ᵃ⁾ += Φ⁽¹⁾,₀₀ Φ⁽¹⁾,₁₂²
+    is parsed into the factor (negated for -=) and a tuple of the
+    distinct differentiated potentials along with their powers,
+      ((('Φ⁽¹⁾', 0, 0), 1), (('Φ⁽¹⁾', 1, 2), 2)),
+    with the indices of differentiation sorted. Indices ᵢ, ⱼ and ₖ are
+    replaced with the passed values. Whether the term is to be assigned
+    or added to the output potential is not part of the parsed term,
+    as this is determined by the order in which the terms are evaluated.
     """
     # Ensure Unicode input
     expr = unicode(expr).replace(' ', '')
-    for name in list(grids):
-        grids[unicode(name)] = grids.pop(name)
     # Parse expr
     assignops = ['+=', '-=', '=']
     for assignop in assignops:
         if assignop in expr:
             break
     else:
-        abort(f'Invalid expression passed to handle_lpt_term(): {expr}')
+        abort(f'Invalid expression passed to parse_lpt_expr(): {expr}')
     lhs, rhs = expr.split(assignop)
+    if assignop == '-=':
+        factor *= -1
     ijk_mapping = {
         unicode('ᵢ'): unicode_subscripts[str(i)],
         unicode('ⱼ'): unicode_subscripts[str(j)],
         unicode('ₖ'): unicode_subscripts[str(k)],
     }
-    term = []
+    powers = {}
+    n_pot = 0
     for pot in rhs.split(unicode('Φ'))[1:]:
         pot = unicode('Φ') + pot
         for n in range(10):
@@ -1934,144 +2358,479 @@ def handle_lpt_term(expr, grids, notes, i=0, j=0, k=0, factor=1):
         else:
             n = 1
         pot, diff = pot.split(',')  # assumes diff in all sub-expressions
-        pot = (pot, ) + tuple(sorted([
+        key = (pot, ) + tuple(sorted([
             int(unicode_subscripts_inv[ijk_mapping.get(s, s)])
             for s in diff
         ]))
-        term += [pot]*n
-    n_pot = len(term)
+        powers[key] = powers.get(key, 0) + n
+        n_pot += n
     if n_pot < 2:
-        abort(f'handle_lpt_term() got expr = "{expr}" containing {n_pot} < 2 potentials')
-    # General grid information
-    grid, grid_dealias = grids['tmp0']
-    size = grid.shape[0]*grid.shape[1]*grid.shape[2]
-    size_dealias = grid_dealias.shape[0]*grid_dealias.shape[1]*grid_dealias.shape[2]
-    gridsize = grid.shape[1]
-    gridsize_dealias = grid_dealias.shape[1]
-    dealias = gridsize_dealias > gridsize
-    # If dealiasing is to be performed, we do so after every grid
-    # multiplication, of which there are (n_pot - 1). The last one is
-    # handled specially, as we simultaneously shrink the grid.
-    # The remaining (n_pot - 2) comed with an fft_factor.
-    if dealias:
-        fft_factor = float(gridsize_dealias)**(-3)
-        factor *= fft_factor**(n_pot - 2)
-    # Get output grid in which to accumulate the evaluated term
-    Φ_out = grids[lhs]
-    Φ_out_ptr = cython.address(Φ_out[:, :, :])
-    # We want to reuse grids from previous calls as much as possible.
-    # The current contents of the temporary grids are written down in
-    # the notes. If the first grid needed is present amongst the
-    # temporary grids, reuse that. If not, and the second (unique) grid
-    # is present, reuse that. Swap the order of grids accordingly.
-    pots_unique = []
-    for pot in term:
-        if pot not in pots_unique:
-            pots_unique.append(pot)
-    for n, pot in enumerate(pots_unique[:2]):
-        if pot not in notes.values():
-            continue
-        for name_reuse in notes:
-            if notes[name_reuse] == pot:
-                # If this is the first potential, place the reusable
-                # grid in the front (will be used as base grid). If not,
-                # place the reusable grid in the back (will be used as
-                # temporary grid).
-                for name in list(grids):
-                    if (n == 0 and name != name_reuse) or (n != 0 and name == name_reuse):
-                        grids[name] = grids.pop(name)
-                break
-        break
-    # Obtain the first occuring potential within the expression,
-    # differentiated as needed. This will be stored in the base grid.
-    basegrid_name, basegrid, basegrid_dealias = get_tmpgrid(grids)
-    basegrid_ptr = cython.address(basegrid[:, :, :])
-    basegrid_dealias_ptr = cython.address(basegrid_dealias[:, :, :])
-    pot = term[0]
-    Φ_in, i, j = expand_pot(pot, grids)
-    if notes.get(basegrid_name) != pot:
-        diff_ifft(Φ_in, basegrid, basegrid_dealias, i, j)
+        abort(f'parse_lpt_expr() got expr = "{expr}" containing {n_pot} < 2 potentials')
+    operands = [(key, powers[key]) for key in powers]
+    return factor, tuple(operands)
+
+# Function for planning the construction of the 2LPT and 3LPT potentials
+@cython.pheader(
+    # Arguments
+    lpt='int',
+    gridsize='Py_ssize_t',
+    gridsize_dealias='Py_ssize_t',
+    # Locals
+    dealias='bint',
+    key=tuple,
+    keys=set,
+    n_fft='Py_ssize_t',
+    n_fft_min='Py_ssize_t',
+    n_fixed='Py_ssize_t',
+    n_slots='Py_ssize_t',
+    n_slots_max='Py_ssize_t',
+    nbytes='Py_ssize_t',
+    nbytes_available='Py_ssize_t',
+    nbytes_slot='Py_ssize_t',
+    operands=tuple,
+    stage_name=str,
+    stage_names=tuple,
+    stage_names_perm=tuple,
+    stages=list,
+    stages_best=list,
+    stages_planned=list,
+    returns=object,  # LPTPlan
+)
+def plan_lpt(lpt, gridsize, gridsize_dealias):
+    """The 2LPT and 3LPT potentials are built from products of the
+    second-order derivatives Φ⁽¹⁾,ᵢⱼ and Φ⁽²⁾,ᵢⱼ, each of which has to
+    be transformed to real space (costing an FFT) before use. As these
+    derivatives are shared between many terms, both within and across
+    the potentials, they are cached in real space slabs, referred to as
+    slots, with one slot at a time used for accumulating the product of
+    the current term. The contents of the slots are managed using
+    Bélády's algorithm (evicting the derivative needed the furthest into
+    the future), with the order of the 3LPT potentials (and of the terms
+    within each potential) chosen as to minimise the number of FFTs.
+    The number of slots is the smallest one achieving this minimum
+    within the memory_budget, with the memory of buffers and slabs
+    already in use (besides the LPT grids themselves) subtracted from
+    the budget. At least 2 slots are needed, which is also the number
+    of slots used by the evaluation of the potentials prior to this
+    planning. Without a memory_budget, this minimal
+    number of slots is used, so that memory is only traded for fewer
+    FFTs when a budget is explicitly set.
+    The returned LPTPlan contains the planned stages, along with the
+    number of slots, FFTs and slabs (the latter including the grids for
+    the potentials as well) and the memory taken up by the slabs.
+    """
+    dealias = (gridsize_dealias > gridsize)
+    stage_names = ('2', )
+    if lpt == 3:
+        stage_names += ('3a', '3b', '3c0', '3c1', '3c2')
+    # With a slot for every distinct derivative in addition to the
+    # accumulating slot, no derivative ever needs to be recomputed.
+    keys = set()
+    for stage_name in stage_names:
+        for _, operands in get_lpt_terms(stage_name):
+            for key, _ in operands:
+                keys.add(key)
+    n_slots_max = len(keys) + 1
+    # Besides the slots, we need the potentials as well as two
+    # temporary grids (of the non-enlarged grid size). Without
+    # dealiasing, these temporary grids are used as the first two slots.
+    nbytes = get_slab_nbytes(gridsize)
+    nbytes_slot = get_slab_nbytes(gridsize_dealias)
+    n_fixed = 2 + (lpt == 3) + 2*dealias
+    # Only make use of additional slots when a memory budget is set
+    if memory_budget <= 0:
+        n_slots_max = 2
     else:
-        # Reuse base grid as is
-        pass
-    notes.pop(basegrid_name, None)
-    # Obtain grid for temporary storage
-    tmpgrid_name, tmpgrid, tmpgrid_dealias = get_tmpgrid(grids)
-    tmpgrid_ptr = cython.address(tmpgrid[:, :, :])
-    tmpgrid_dealias_ptr = cython.address(tmpgrid_dealias[:, :, :])
-    # Multiply remaining grids into base grid
-    for n, pot in enumerate(term[1:], 1):
-        # Obtain the next grid
-        if n == 1 and pot == term[0]:
-            # Squared sub-expression at the beginning.
-            # Copy base grid into temporary grid. We could avoid this
-            # copying, but doing it allows for later reusage.
-            tmpgrid_dealias[...] = basegrid_dealias
-        elif notes.get(tmpgrid_name) != pot:
-            # Construct grid
-            Φ_in, i, j = expand_pot(pot, grids)
-            diff_ifft(Φ_in, tmpgrid, tmpgrid_dealias, i, j)
-        else:
-            # Reuse temporary grid as is
-            pass
-        # Note down the contents of the temporary grid
-        notes[tmpgrid_name] = pot
-        # Multiply into base grid
-        for index in range(size_dealias):
-            basegrid_dealias_ptr[index] *= tmpgrid_dealias_ptr[index]
-        # Perform explicit dealiasing if not at the last potential
-        if dealias and n < n_pot - 1:
-            fft(basegrid_dealias, 'forward')
-            nullify_modes(basegrid_dealias, f'beyond cube of |k| < {gridsize//2}')
-            fft(basegrid_dealias, 'backward')
-    # Shrink the base grid if using dealiasing
-    # (counts as the last dealiasing).
-    if dealias:
-        fft(basegrid_dealias, 'forward')
-        resize_grid(
-            basegrid_dealias, gridsize, 'fourier',
-            output_slab_or_buffer_name=basegrid,
+        nbytes_available = int(memory_budget) - get_nbytes_in_use(gridsize, lpt)
+        n_slots_max = pairmin(
+            n_slots_max,
+            (nbytes_available - n_fixed*nbytes)//nbytes_slot,
         )
-        # Note that we stay in Fourier space
-    # Move constructed term from base grid
-    # to output grid and apply factor.
-    for index in range(size):
-        with unswitch:
-            if assignop == '=':
-                with unswitch:
-                    if factor == 1:
-                        Φ_out_ptr[index] = basegrid_ptr[index]
-                    else:
-                        Φ_out_ptr[index] = factor*basegrid_ptr[index]
-            elif assignop == '+=':
-                with unswitch:
-                    if factor == 1:
-                        Φ_out_ptr[index] += basegrid_ptr[index]
-                    else:
-                        Φ_out_ptr[index] += factor*basegrid_ptr[index]
-            elif assignop == '-=':
-                with unswitch:
-                    if factor == 1:
-                        Φ_out_ptr[index] -= basegrid_ptr[index]
-                    else:
-                        Φ_out_ptr[index] -= factor*basegrid_ptr[index]
-# Helper functions for handle_lpt_term(()
-def expand_pot(pot, grids):
-    i, j = (pot + (-1, ))[1:3]
-    Φ_in = grids[pot[0]]
-    return Φ_in, i, j
-def get_tmpgrid(grids):
-    # Returns the first tmpgrid inside the grids dict.
-    # This grid will be moved to the end, so that the
-    # tmpgrids are being cycled through.
-    for name in grids:
-        if name.startswith('tmp'):
+        if n_slots_max < 2:
+            masterwarn(
+                f'The {lpt}LPT requires at least {bytes2str(n_fixed*nbytes + 2*nbytes_slot)} '
+                f'of slabs, exceeding what is left of the memory budget '
+                f'({bytes2str(max(nbytes_available, 0))} of {bytes2str(memory_budget)})'
+            )
+            n_slots_max = 2
+    # Find the order of the 3LPT potentials leading to the fewest FFTs,
+    # with the terms within each potential ordered greedily.
+    n_fft_min = -1
+    for stage_names_perm in itertools.permutations(stage_names[1:]):
+        stages = order_lpt_terms(stage_names[:1] + stage_names_perm, n_slots_max)
+        stages_planned, n_fft = simulate_lpt(stages, n_slots_max, dealias)
+        if n_fft_min == -1 or n_fft < n_fft_min:
+            n_fft_min = n_fft
+            stages_best = stages
+    # Find the smallest number of slots achieving the fewest FFTs
+    for n_slots in range(2, n_slots_max + 1):
+        stages_planned, n_fft = simulate_lpt(stages_best, n_slots, dealias)
+        if n_fft == n_fft_min:
             break
-    else:
-        abort('get_tmpgrid(): No temporary grids available')
-    grid, grid_dealias = grids.pop(name)
-    grids[name] = (grid, grid_dealias)
-    return name, grid, grid_dealias
+    return LPTPlan(
+        stages_planned, n_slots, n_fft,
+        n_fixed + n_slots, n_fixed*nbytes + n_slots*nbytes_slot,
+    )
+# Planned construction of the LPT potentials as returned by plan_lpt().
+# The stages (of type LPTStage) are given in the order in which they are
+# to be carried out, each with a list of terms. A term is specified by
+# its factor, the index of the accumulating slot and a list of
+# operations ('load', 'copy', 'mul', 'dealias') to carry out
+# (see build_lpt_potential()). The index of the slot to use for
+# displacing the particles is -1 if the staging grid is to be used.
+LPTPlan = collections.namedtuple(
+    'LPTPlan', ['stages', 'n_slots', 'n_fft', 'n_slabs', 'nbytes'],
+)
+LPTStage = collections.namedtuple(
+    'LPTStage', ['name', 'terms', 'index_displace'],
+)
+
+# Helper function for plan_lpt(), returning the number of bytes taken up
+# by a slab of the given grid size, on the process with the largest slab.
+@cython.header(
+    # Arguments
+    gridsize='Py_ssize_t',
+    # Locals
+    shape=tuple,
+    returns='Py_ssize_t',
+)
+def get_slab_nbytes(gridsize):
+    shape = get_slabshape_local(gridsize)
+    return allreduce(shape[0]*shape[1]*shape[2]*sizeof('double'), op=MPI.MAX)
+
+# Helper function for plan_lpt(), returning the number of bytes taken up
+# by buffers and slabs currently in use, on the process with the largest
+# such usage. The potentials and temporary grids of the given grid size
+# already fetched by realize_particles() are excluded, as these are
+# accounted for by the plan itself.
+@cython.header(
+    # Arguments
+    gridsize='Py_ssize_t',
+    lpt='int',
+    # Locals
+    buffer_name=object,  # int or str
+    key=tuple,
+    keys_lpt=set,
+    nbytes='Py_ssize_t',
+    usage='Py_ssize_t',
+    returns='Py_ssize_t',
+)
+def get_nbytes_in_use(gridsize, lpt):
+    # The LPT grids are the global slab followed by numbered slabs,
+    # one for each potential and temporary grid beyond the first.
+    keys_lpt = {(gridsize, 'slab_global')}
+    for buffer_name in range(3 + (lpt == 3)):
+        keys_lpt.add((gridsize, buffer_name))
+    usage = 0
+    for nbytes, _ in get_buffers_usage().values():
+        usage += nbytes
+    for key, (nbytes, _) in get_slabs_usage().items():
+        if key not in keys_lpt:
+            usage += nbytes
+    return allreduce(usage, op=MPI.MAX)
+
+# Helper function for plan_lpt(), ordering the terms within each stage
+@cython.header(
+    # Arguments
+    stage_names=tuple,
+    n_slots='Py_ssize_t',
+    # Locals
+    key=tuple,
+    keys_recent=list,
+    keys_window=list,
+    operands=tuple,
+    score='Py_ssize_t',
+    score_best='Py_ssize_t',
+    stage_name=str,
+    stages=list,
+    term=tuple,
+    term_best=tuple,
+    terms=list,
+    terms_ordered=list,
+    returns=list,
+)
+def order_lpt_terms(stage_names, n_slots):
+    """The terms within each stage are ordered greedily, with the next
+    term always being the one making use of the largest number of the
+    most recently used derivatives (those which are likely to still be
+    cached within the n_slots - 1 slots not used for accumulation),
+    falling back to the original order. A list of (stage name, terms)
+    is returned.
+    """
+    stages = []
+    keys_recent = []
+    for stage_name in stage_names:
+        terms = list(get_lpt_terms(stage_name))
+        terms_ordered = []
+        while terms:
+            keys_window = keys_recent[pairmax(0, len(keys_recent) - (n_slots - 1)):]
+            score_best = -1
+            for term in terms:
+                score = 0
+                for key, _ in term[1]:
+                    score += (key in keys_window)
+                if score > score_best:
+                    score_best = score
+                    term_best = term
+            terms.remove(term_best)
+            terms_ordered.append(term_best)
+            for key, _ in term_best[1]:
+                if key in keys_recent:
+                    keys_recent.remove(key)
+                keys_recent.append(key)
+        stages.append((stage_name, terms_ordered))
+    return stages
+
+# Helper function for plan_lpt(), simulating the construction of the
+# potentials of the given (ordered) stages using n_slots slots.
+@cython.header(
+    # Arguments
+    stages=list,
+    n_slots='Py_ssize_t',
+    dealias='bint',
+    # Locals
+    access='Py_ssize_t',
+    access_last=dict,
+    accesses=list,
+    contents=list,
+    factor='double',
+    index='Py_ssize_t',
+    index_acc='Py_ssize_t',
+    index_displace='Py_ssize_t',
+    index_slot='Py_ssize_t',
+    key=tuple,
+    n='Py_ssize_t',
+    n_access='Py_ssize_t',
+    n_fft='Py_ssize_t',
+    n_mul='Py_ssize_t',
+    n_pot='Py_ssize_t',
+    next_access=list,
+    next_use=list,
+    operands=tuple,
+    ops=list,
+    power='int',
+    stage_name=str,
+    stages_planned=list,
+    terms=list,
+    terms_planned=list,
+    returns=tuple,
+)
+def simulate_lpt(stages, n_slots, dealias):
+    """The planned stages are returned together with the total number
+    of FFTs, which include those of the loaded derivatives, the
+    dealiasing, the forward transformation of each potential and the
+    displacement fields.
+    """
+    # Flatten all accesses to derivatives and find the next access
+    # to the same derivative for each of them.
+    accesses = []
+    for stage_name, terms in stages:
+        for factor, operands in terms:
+            for key, power in operands:
+                accesses.append(key)
+    n_access = len(accesses)
+    next_access = [n_access]*n_access
+    access_last = {}
+    for access in range(n_access - 1, -1, -1):
+        key = accesses[access]
+        next_access[access] = access_last.get(key, n_access)
+        access_last[key] = access
+    # Carry out the simulation, keeping track of the derivative stored
+    # in each slot (None for no derivative) as well as of its next use.
+    contents = [None]*n_slots
+    next_use = [n_access]*n_slots
+    access = 0
+    n_fft = 0
+    stages_planned = []
+    for stage_name, terms in stages:
+        terms_planned = []
+        for factor, operands in terms:
+            ops = []
+            n_pot = 0
+            for key, power in operands:
+                n_pot += power
+            n_mul = 0
+            index_acc = -1
+            for n, (key, power) in enumerate(operands):
+                # Fetch the slot holding the derivative,
+                # loading the derivative into a slot if needed.
+                if key in contents:
+                    index_slot = contents.index(key)
+                else:
+                    index_slot = get_lpt_victim(next_use, index_acc)
+                    contents[index_slot] = key
+                    ops.append(('load', key, index_slot))
+                    n_fft += 1
+                next_use[index_slot] = next_access[access]
+                access += 1
+                if n == 0:
+                    # Pick the slot to accumulate the product within,
+                    # preferring the slot of the first derivative
+                    # (avoiding a copy).
+                    index_acc = index_slot
+                    for index in range(n_slots):
+                        if next_use[index] > next_use[index_acc]:
+                            index_acc = index
+                    if index_acc != index_slot:
+                        ops.append(('copy', index_slot))
+                    contents[index_acc] = None
+                    next_use[index_acc] = n_access
+                    index_slot = index_acc
+                    power -= 1
+                # Multiply into accumulating slot, dealiasing after
+                # every multiplication but the last.
+                for _ in range(power):
+                    ops.append(('mul', index_slot))
+                    n_mul += 1
+                    if dealias and n_mul < n_pot - 1:
+                        ops.append(('dealias', ))
+                        n_fft += 2
+            # Store the term, with dealiasing requiring
+            # a transformation for the final shrinking.
+            n_fft += dealias
+            terms_planned.append((factor, index_acc, ops))
+        # Without dealiasing the potential must be transformed to
+        # Fourier space, with the displacement fields constructed
+        # within a slot. With dealiasing, the staging grid is used.
+        index_displace = -1
+        if not dealias:
+            n_fft += 1
+            index_displace = get_lpt_victim(next_use, -1)
+            contents[index_displace] = None
+            next_use[index_displace] = n_access
+        n_fft += 2 if stage_name.startswith('3c') else 3
+        stages_planned.append(LPTStage(stage_name, terms_planned, index_displace))
+    return stages_planned, n_fft
+
+# Helper function for simulate_lpt(), returning the index of the slot
+# which content is needed the furthest into the future,
+# excluding the slot with index index_exclude.
+@cython.header(
+    # Arguments
+    next_use=list,
+    index_exclude='Py_ssize_t',
+    # Locals
+    index='Py_ssize_t',
+    index_victim='Py_ssize_t',
+    returns='Py_ssize_t',
+)
+def get_lpt_victim(next_use, index_exclude):
+    index_victim = -1
+    for index in range(len(next_use)):
+        if index == index_exclude:
+            continue
+        if index_victim == -1 or next_use[index] > next_use[index_victim]:
+            index_victim = index
+    return index_victim
+
+# Function constructing an LPT potential by carrying out the planned
+# operations of a stage.
+@cython.pheader(
+    # Arguments
+    Φ_out='double[:, :, ::1]',
+    stage=object,  # LPTStage
+    grids=dict,
+    slots=list,
+    staging='double[:, :, ::1]',
+    # Locals
+    acc='double[:, :, ::1]',
+    acc_ptr='double*',
+    dealias='bint',
+    factor='double',
+    fft_factor='double',
+    gridsize='Py_ssize_t',
+    gridsize_dealias='Py_ssize_t',
+    index='Py_ssize_t',
+    index_acc='Py_ssize_t',
+    key=tuple,
+    n_term='Py_ssize_t',
+    name=str,
+    op=tuple,
+    ops=list,
+    size='Py_ssize_t',
+    size_dealias='Py_ssize_t',
+    slot='double[:, :, ::1]',
+    slot_ptr='double*',
+    src='double[:, :, ::1]',
+    src_ptr='double*',
+    Φ_out_ptr='double*',
+    returns='void',
+)
+def build_lpt_potential(Φ_out, stage, grids, slots, staging):
+    """The terms of the stage are evaluated from the passed grids
+    (mapping potential names to potentials, which must be in Fourier
+    space) and summed into Φ_out. Real space derivatives of the
+    potentials are constructed in and reused from the slots, as planned
+    by plan_lpt(). If the slots are larger than Φ_out, dealiasing is
+    performed using Orszag's 3/2 rule, applied after every
+    multiplication of a pair of grids. This is however only an
+    approximation; exact dealiasing is obtained from a single
+    dealiasing step but from a grid that is enlarged by a factor 2
+    instead of 3/2, which we do no implement. Here the staging grid
+    (of the same size as Φ_out) is used for the enlargement and
+    shrinking of grids. The resulting Φ_out will be in real space
+    unless dealiasing is used.
+    """
+    # Ensure Unicode names
+    for name in list(grids):
+        grids[unicode(name)] = grids.pop(name)
+    # General grid information
+    slot = slots[0]
+    size = Φ_out.shape[0]*Φ_out.shape[1]*Φ_out.shape[2]
+    size_dealias = slot.shape[0]*slot.shape[1]*slot.shape[2]
+    gridsize = Φ_out.shape[1]
+    gridsize_dealias = slot.shape[1]
+    dealias = (gridsize_dealias > gridsize)
+    fft_factor = float(gridsize_dealias)**(-3)
+    Φ_out_ptr = cython.address(Φ_out[:, :, :])
+    for n_term, (factor, index_acc, ops) in enumerate(stage.terms):
+        acc = slots[index_acc]
+        acc_ptr = cython.address(acc[:, :, :])
+        for op in ops:
+            if op[0] == 'load':
+                # Construct real space derivative within slot
+                key = op[1]
+                slot = slots[op[2]]
+                diff_ifft(
+                    grids[key[0]], (staging if dealias else slot), slot, key[1], key[2],
+                )
+            elif op[0] == 'copy':
+                # Copy derivative into accumulating slot
+                slot = slots[op[1]]
+                acc[...] = slot
+            elif op[0] == 'mul':
+                # Multiply derivative into accumulating slot
+                slot = slots[op[1]]
+                slot_ptr = cython.address(slot[:, :, :])
+                for index in range(size_dealias):
+                    acc_ptr[index] *= slot_ptr[index]
+            elif op[0] == 'dealias':
+                # Perform explicit dealiasing. Each of these comes with
+                # an fft_factor, while the last dealiasing is taken
+                # care of by the shrinking below.
+                fft(acc, 'forward')
+                nullify_modes(acc, f'beyond cube of |k| < {gridsize//2}')
+                fft(acc, 'backward')
+                factor *= fft_factor
+        # Shrink the accumulating slot if using dealiasing
+        # (counts as the last dealiasing).
+        src = acc
+        if dealias:
+            fft(acc, 'forward')
+            resize_grid(
+                acc, gridsize, 'fourier',
+                output_slab_or_buffer_name=staging,
+            )
+            src = staging
+            # Note that we stay in Fourier space
+        # Move constructed term to output grid and apply factor
+        src_ptr = cython.address(src[:, :, :])
+        for index in range(size):
+            with unswitch:
+                if n_term == 0:
+                    Φ_out_ptr[index] = factor*src_ptr[index]
+                else:
+                    Φ_out_ptr[index] += factor*src_ptr[index]
 
 # Helper function for performing differentiation and inverse Fourier
 # transformation of a Fourier space slab, with enlargement for use with
@@ -2119,6 +2878,7 @@ def diff_ifft(Φ, out, out_dealias, i, j=-1, factor=1):
     i='Py_ssize_t',
     ids='Py_ssize_t*',
     indexᵖ='Py_ssize_t',
+    indexᵖ_stream='Py_ssize_t',
     indexʳ='Py_ssize_t',
     indexˣ='Py_ssize_t',
     j='Py_ssize_t',
@@ -2130,6 +2890,7 @@ def diff_ifft(Φ, out, out_dealias, i, j=-1, factor=1):
     posyˣ='double*',
     poszˣ='double*',
     shape=tuple,
+    streaming='bint',
     x='double',
     y='double',
     z='double',
@@ -2149,7 +2910,10 @@ def preinitialize_particles(component, n_particles=-1, indexᵖ_bgn=0, id_bgn=0,
     Setting shift to a 3-tuple like (½, ½, ½) displaces the lattice by
     this amount, in grid units.
     The particle data should be allocated on the component prior to
-    calling this function.
+    calling this function. When streaming particle data to disk (see
+    realize_particles()), the particles are instead pre-initialised
+    within the component buffers one chunk at a time, with each filled
+    chunk stored before the next one is begun.
     The return value is the local number of particles that
     have been pre-initialized.
     """
@@ -2170,9 +2934,19 @@ def preinitialize_particles(component, n_particles=-1, indexᵖ_bgn=0, id_bgn=0,
     n_local = np.prod(shape)
     if component.N_local < indexᵖ_bgn + n_local:
         abort('Component passed to preinitialize_particles() is too small')
-    domain_bgn_i = domain_layout_local_indices[0]*ℤ[shape[0]]
-    domain_bgn_j = domain_layout_local_indices[1]*ℤ[shape[1]]
-    domain_bgn_k = domain_layout_local_indices[2]*ℤ[shape[2]]
+    domain_bgn_i, domain_bgn_j, domain_bgn_k = get_domain_grid_bounds(gridsize, rank)[:3]
+    # Nullify momenta. When streaming, the momentum buffer is nullified
+    # in its entirety, as it is stored anew for each chunk.
+    mom = component.mom
+    streaming = bool(particle_stream)
+    indexᵖ_stream = indexᵖ_bgn
+    if streaming:
+        indexᵖ_bgn = 0
+        for indexʳ in range(3*component.N_allocated):
+            mom[indexʳ] = 0
+    else:
+        for indexʳ in range(3*indexᵖ_bgn, 3*(indexᵖ_bgn + n_local)):
+            mom[indexʳ] = 0
     # Position the particles at the lattice points (at the centre of the
     # lattice cells when running in cell centered mode), shifted in
     # accordance with the passed lattice.
@@ -2214,10 +2988,19 @@ def preinitialize_particles(component, n_particles=-1, indexᵖ_bgn=0, id_bgn=0,
                         )
                         ids[indexᵖ] = particle_id
                         indexᵖ += 1
-    # Nullify momenta
-    mom = component.mom
-    for indexʳ in range(3*indexᵖ_bgn, 3*(indexᵖ_bgn + n_local)):
-        mom[indexʳ] = 0
+                # Store filled chunk of streamed particle data
+                with unswitch:
+                    if streaming:
+                        if indexˣ == ℤ[3*component.N_allocated]:
+                            store_preinitialized_chunk(
+                                component, indexᵖ_stream, component.N_allocated,
+                            )
+                            indexᵖ_stream += component.N_allocated
+                            indexᵖ = 0
+                            indexˣ = 0
+    # Store remaining chunk of streamed particle data
+    if streaming:
+        store_preinitialized_chunk(component, indexᵖ_stream, indexˣ//3)
     # Return the number of particles that have been pre-initialized
     # on this process.
     return n_local
@@ -2239,9 +3022,14 @@ def preinitialize_particles(component, n_particles=-1, indexᵖ_bgn=0, id_bgn=0,
     i='Py_ssize_t',
     index='Py_ssize_t',
     indexʳ='Py_ssize_t',
+    indexᵖ_stream='Py_ssize_t',
     j='Py_ssize_t',
     k='Py_ssize_t',
     mass='double',
+    n_chunk='Py_ssize_t',
+    n_local='Py_ssize_t',
+    name=str,
+    streaming='bint',
     ψᵢ='double[:, :, ::1]',
     ψᵢ_ptr='double*',
     returns='void',
@@ -2259,33 +3047,124 @@ def displace_particles(component, slab, a, indexᵖ_bgn, variable, dim, factor=1
     if variable == 0:
         # Positions, Δxᵢ = ψᵢ
         data = component.pos
+        name = 'pos'
     elif variable == 1:
         # Momenta; momᵢ = a*m*uᵢ.
         # The current mass is the set mass (always defined a = 1),
         # scaled according to w_eff(a).
         data = component.mom
+        name = 'mom'
         mass = a**(-3*component.w_eff(a=a))*component.mass
         factor *= a*mass
     else:
         abort(f'displace_particles() got variable = {variable} ∉ {{0, 1}}')
-    # Displace particle positions or boost particle velocities
+    # When streaming particle data to disk (see realize_particles()),
+    # the particle data is loaded into the beginning of the component
+    # buffers one chunk at a time, with each chunk stored back to disk
+    # once it has been displaced.
     indexʳ = dim + 3*indexᵖ_bgn
+    streaming = bool(particle_stream)
+    if streaming:
+        if name not in particle_stream:
+            # This variable is not to be saved
+            return
+        n_local = (
+              (ψᵢ.shape[0] - ℤ[2*nghosts])
+            * (ψᵢ.shape[1] - ℤ[2*nghosts])
+            * (ψᵢ.shape[2] - ℤ[2*nghosts])
+        )
+        indexᵖ_stream = indexᵖ_bgn
+        n_chunk = pairmin(component.N_allocated, n_local)
+        stream_particle_chunk(component, name, indexᵖ_stream, n_chunk, dim=dim)
+        indexʳ = dim
+    # Displace particle positions or boost particle velocities
     gridsize = slab.shape[1]
     for index, i, j, k in domain_loop(gridsize, skip_ghosts=True):
+        with unswitch:
+            if streaming:
+                if indexʳ == ℤ[dim + 3*component.N_allocated]:
+                    stream_particle_chunk(
+                        component, name, indexᵖ_stream, n_chunk, store=True, dim=dim,
+                    )
+                    indexᵖ_stream += n_chunk
+                    n_chunk = pairmin(
+                        component.N_allocated, indexᵖ_bgn + n_local - indexᵖ_stream,
+                    )
+                    stream_particle_chunk(component, name, indexᵖ_stream, n_chunk, dim=dim)
+                    indexʳ = dim
         with unswitch:
             if factor == 1:
                 data[indexʳ] += ψᵢ_ptr[index]
             else:
                 data[indexʳ] += factor*ψᵢ_ptr[index]
         indexʳ += 3
+    if streaming:
+        stream_particle_chunk(component, name, indexᵖ_stream, n_chunk, store=True, dim=dim)
 
+# Function for transferring a chunk of particle data between the
+# component buffers and the datasets on disk, when streaming particle
+# data directly to a snapshot (see realize_particles()).
+@cython.header(
+    # Arguments
+    component='Component',
+    name=str,
+    indexᵖ_bgn='Py_ssize_t',
+    n='Py_ssize_t',
+    store='bint',
+    dim='int',
+    # Locals
+    columns=object,  # int or slice
+    dataset=object,  # h5py.Dataset
+    indexʳ='Py_ssize_t',
+    pos='double*',
+    row_bgn='Py_ssize_t',
+    row_end='Py_ssize_t',
+    returns='void',
+)
+def stream_particle_chunk(component, name, indexᵖ_bgn, n, store=False, dim=-1):
+    """The n particles starting at the process-local index indexᵖ_bgn
+    are loaded from (or stored to, if store is True) the streamed
+    dataset given by name ('pos', 'mom' or 'ids'), using the first n
+    particles of the component buffers. For positions and momenta, only
+    the column given by dim is transferred, unless dim is -1. Positions
+    are wrapped into the box prior to being stored. IDs can only
+    be stored.
+    """
+    dataset = particle_stream[name]
+    row_bgn = particle_stream['offset'] + indexᵖ_bgn
+    row_end = row_bgn + n
+    columns = (slice(None) if dim == -1 else dim)
+    if name == 'pos':
+        if store:
+            pos = component.pos
+            for indexʳ in range(pairmax(dim, 0), 3*n, 1 + 2*(dim != -1)):
+                pos[indexʳ] = mod(pos[indexʳ], boxsize)
+            dataset[row_bgn:row_end, columns] = asarray(component.pos_mv3)[:n, columns]
+        else:
+            asarray(component.pos_mv3)[:n, columns] = dataset[row_bgn:row_end, columns]
+    elif name == 'mom':
+        if store:
+            dataset[row_bgn:row_end, columns] = asarray(component.mom_mv3)[:n, columns]
+        else:
+            asarray(component.mom_mv3)[:n, columns] = dataset[row_bgn:row_end, columns]
+    elif name == 'ids' and store:
+        dataset[row_bgn:row_end] = asarray(component.ids_mv).view(np.uint64)[:n]
+    else:
+        abort(f'stream_particle_chunk() cannot handle name = "{name}" with store = {store}')
 
-
-# Get local domain information
-domain_info = get_domain_info()
-cython.declare(
-    domain_subdivisions='int[::1]',
-    domain_layout_local_indices='int[::1]',
+# Function for storing a chunk of freshly pre-initialised particles
+# when streaming particle data directly to a snapshot.
+@cython.header(
+    # Arguments
+    component='Component',
+    indexᵖ_bgn='Py_ssize_t',
+    n='Py_ssize_t',
+    # Locals
+    name=str,
+    returns='void',
 )
-domain_subdivisions         = domain_info.subdivisions
-domain_layout_local_indices = domain_info.layout_local_indices
+def store_preinitialized_chunk(component, indexᵖ_bgn, n):
+    for name in ('pos', 'mom', 'ids'):
+        if name not in particle_stream:
+            continue
+        stream_particle_chunk(component, name, indexᵖ_bgn, n, store=True)
@@ -29,6 +29,10 @@ cimport(
     'from communication import     '
     '    rank_neighbouring_domain, '
     '    sendrecv_component,       '
+    '    sendrecv_component_finish,'
+    '    sendrecv_component_start, '
+    '    sendrecv_Δ_finish,        '
+    '    sendrecv_Δ_start,         '
 )
 cimport('from ewald import get_ewald_grid')
 cimport(
@@ -40,6 +44,8 @@ cimport(
     '    fft,                                 '
     '    fourier_loop,                        '
     '    fourier_operate,                     '
+    '    fourier_operate_fused,               '
+    '    fourier_operate_threaded,            '
     '    get_fftw_slab,                       '
     '    interpolate_domaingrid_to_particles, '
     '    interpolate_upstream,                '
@@ -48,11 +54,14 @@ cimport(
 cimport(
     'from species import                        '
     '    accept_or_reject_subtiling_refinement, '
+    '    get_adaptive_subtiling_level,          '
+    '    get_domain_tile_bounds,                '
+    '    get_tiling_global_shape,               '
+    '    init_subtiling,                        '
     '    tentatively_refine_subtiling,          '
 )
 
 # Pure Python imports
-from communication import get_domain_info
 from mesh import group_components
 
 
@@ -116,6 +125,7 @@ ctypedef void (*func_interaction)(
     subtiling_name_2=str,
     supplier='Component',
     tile_sorted=set,
+    tiling='Tiling',
     tiling_name=str,
     returns='void',
 )
@@ -280,6 +290,15 @@ def component_component(
         computation_time += subtiling.computation_time
         subtiling.computation_time_total += subtiling.computation_time
         subtiling.computation_time = 0
+        # Interaction functions not making use of the subtiles store
+        # their computation time on the tiling instead. This is tallied
+        # up separately, keeping it out of the automatic
+        # subtiling refinement.
+        with unswitch:
+            if 𝔹[pairing_level == 'tile']:
+                tiling = receiver.tilings[tiling_name]
+                tiling.computation_time_total += tiling.computation_time
+                tiling.computation_time = 0
     # All interactions are now done. If the measured computation time
     # should be used for automatic subtiling refinement, store this
     # outside of this function.
@@ -361,6 +380,12 @@ subtilings_under_tentative_refinement = set()
 subtiling_shape_rejected = zeros(3, dtype=C2np['Py_ssize_t'])
 subtiling_shapes_judged = empty(3*nprocs, dtype=C2np['Py_ssize_t']) if master else None
 
+# Function returning whether the subtiling of any interaction
+# is currently under tentative refinement.
+@cython.pheader(returns='bint')
+def subtiling_refinement_ongoing():
+    return bool(subtilings_under_tentative_refinement)
+
 # Generic function implementing domain-domain pairing
 @cython.header(
     # Arguments
@@ -381,6 +406,9 @@ subtiling_shapes_judged = empty(3*nprocs, dtype=C2np['Py_ssize_t']) if master el
     interact='bint',
     only_supply_communication='bint',
     only_supply_passed='bint',
+    pending=tuple,
+    pending_Δ=tuple,
+    pipelined='bint',
     rank_recv='int',
     rank_send='int',
     ranks_recv='int[::1]',
@@ -390,6 +418,8 @@ subtiling_shapes_judged = empty(3*nprocs, dtype=C2np['Py_ssize_t']) if master el
     tile_indices='Py_ssize_t[:, ::1]',
     tile_indices_receiver='Py_ssize_t[::1]',
     tile_indices_supplier='Py_ssize_t[::1]',
+    tile_indices_supplier_extrl='Py_ssize_t[::1]',
+    tile_indices_supplier_next='Py_ssize_t[:, ::1]',
     tile_indices_supplier_paired='Py_ssize_t**',
     tile_indices_supplier_paired_N='Py_ssize_t*',
     tile_pairings_index='Py_ssize_t',
@@ -416,7 +446,7 @@ def domain_domain(
     other domain.
     """
     # To satisfy the compiler
-    tile_indices_receiver = tile_indices_supplier = None
+    tile_indices_receiver = tile_indices_supplier = tile_indices_supplier_extrl = None
     tile_indices_supplier_paired = tile_indices_supplier_paired_N = NULL
     # Flag specifying whether or not this interaction is instantaneous.
     # For instantaneous interactions, we need to apply the updates to
@@ -453,6 +483,16 @@ def domain_domain(
     # On each process, the local receiver and the external
     # (received) supplier_extrl then interact.
     supplier_local = supplier
+    # For non-instantaneous interactions, the communication of the
+    # supplier particles needed for the next domain pair is overlapped
+    # with the computation of the current domain pair. This is not
+    # possible for instantaneous interactions, as here the supplier data
+    # is altered by the interaction of the current domain pair.
+    # Likewise, the sending back of the Δ buffers (see below) of one
+    # domain pair is completed only after the interaction of the next
+    # domain pair (with a send back) has been computed.
+    pipelined = (not instantaneous and nprocs > 1)
+    pending = pending_Δ = None
     for domain_pair_nr in range(ranks_send.shape[0]):
         # Process ranks to send to and receive from
         rank_send = ranks_send[domain_pair_nr]
@@ -514,7 +554,10 @@ def domain_domain(
         # the supplier. For pairing_level == 'domain', communicate all
         # local particles. For pairing_level == 'tile', we only need to
         # communicate particles within the tiles that are going to
-        # interact during the current domain-domain pairing.
+        # interact during the current domain-domain pairing. The
+        # indices of the sent local supplier tiles and of the received
+        # external supplier tiles are the same, except for
+        # non-uniform domains.
         with unswitch:
             if 𝔹[pairing_level == 'tile']:
                 # Find interacting tiles
@@ -522,18 +565,56 @@ def domain_domain(
                     interaction_name, receiver,
                     only_supply_communication, domain_pair_nr,
                 )
-                tile_indices_receiver = tile_indices[0, :]
-                tile_indices_supplier = tile_indices[1, :]
+                tile_indices_receiver       = tile_indices[0, :]
+                tile_indices_supplier       = tile_indices[1, :]
+                tile_indices_supplier_extrl = tile_indices[2, :]
             else:  # pairing_level == 'domain'
                 # For domain level pairing we make use of
                 # the trivial tiling, containing a single tile.
                 tile_indices_receiver = tile_indices_supplier = tile_indices_trivial
+                tile_indices_supplier_extrl = tile_indices_trivial
                 tile_indices_supplier_paired = tile_indices_trivial_paired
                 tile_indices_supplier_paired_N = tile_indices_trivial_paired_N
-        supplier_extrl = sendrecv_component(
-            supplier_local, dependent, pairing_level, interaction_name, tile_indices_supplier,
-            dest=rank_send, source=rank_recv,
-        )
+        if pipelined:
+            # Complete the communication of the supplier for this
+            # domain pair, started during the previous domain pair.
+            # Then immediately start the communication for the next
+            # domain pair, so that this takes place in the background
+            # while the interaction for the current domain pair
+            # is being computed.
+            if domain_pair_nr == 0:
+                pending = sendrecv_component_start(
+                    supplier_local, dependent, pairing_level, interaction_name,
+                    tile_indices_supplier, dest=rank_send, source=rank_recv,
+                    tile_indices_recv=tile_indices_supplier_extrl,
+                )
+            supplier_extrl = sendrecv_component_finish(pending)
+            if domain_pair_nr + 1 < ranks_send.shape[0]:
+                if 𝔹[pairing_level == 'tile']:
+                    tile_indices_supplier_next = domain_domain_tile_indices(
+                        interaction_name, receiver,
+                        only_supply_communication, domain_pair_nr + 1,
+                    )
+                    pending = sendrecv_component_start(
+                        supplier_local, dependent, pairing_level, interaction_name,
+                        tile_indices_supplier_next[1, :],
+                        dest=ranks_send[domain_pair_nr + 1],
+                        source=ranks_recv[domain_pair_nr + 1],
+                        tile_indices_recv=tile_indices_supplier_next[2, :],
+                    )
+                else:  # pairing_level == 'domain'
+                    pending = sendrecv_component_start(
+                        supplier_local, dependent, pairing_level, interaction_name,
+                        tile_indices_trivial,
+                        dest=ranks_send[domain_pair_nr + 1],
+                        source=ranks_recv[domain_pair_nr + 1],
+                    )
+        else:
+            supplier_extrl = sendrecv_component(
+                supplier_local, dependent, pairing_level, interaction_name, tile_indices_supplier,
+                dest=rank_send, source=rank_recv,
+                tile_indices_recv=tile_indices_supplier_extrl,
+            )
         # Let the local receiver interact with the external
         # supplier_extrl. This will update the affected variable buffers
         # (e.g. Δmom for gravity) of the local receiver, and of the
@@ -551,7 +632,7 @@ def domain_domain(
                         only_supply_communication,
                         domain_pair_nr,
                         tile_indices_receiver,
-                        tile_indices_supplier,
+                        tile_indices_supplier_extrl,
                     )
                     tile_indices_supplier_paired   = tile_pairings_cache  [tile_pairings_index]
                     tile_indices_supplier_paired_N = tile_pairings_N_cache[tile_pairings_index]
@@ -579,15 +660,31 @@ def domain_domain(
             # For instantaneous interactions, the received Δ values
             # should be added directly to the data of the
             # local supplier_local.
-            sendrecv_component(
-                supplier_extrl, affected, pairing_level,
-                interaction_name, tile_indices_supplier,
-                dest=rank_recv, source=rank_send, component_recv=supplier_local,
-                use_Δ_recv=(not instantaneous),
-            )
+            if pipelined:
+                # Complete the sending back of the previous domain pair
+                # and start that of the current domain pair, leaving it
+                # to take place in the background while the next
+                # domain pair is being computed.
+                if pending_Δ is not None:
+                    sendrecv_Δ_finish(pending_Δ)
+                pending_Δ = sendrecv_Δ_start(
+                    supplier_extrl, affected, pairing_level,
+                    interaction_name, tile_indices_supplier,
+                    dest=rank_recv, source=rank_send, component_recv=supplier_local,
+                )
+            else:
+                sendrecv_component(
+                    supplier_extrl, affected, pairing_level,
+                    interaction_name, tile_indices_supplier,
+                    dest=rank_recv, source=rank_send, component_recv=supplier_local,
+                    use_Δ_recv=(not instantaneous),
+                )
             # Nullify the Δ buffers of the external supplier_extrl,
             # leaving this with no leftover junk.
             supplier_extrl.nullify_Δ(affected, only_active=False)
+    # Complete any remaining sending back of Δ buffers
+    if pending_Δ is not None:
+        sendrecv_Δ_finish(pending_Δ)
 # Tile indices for the trivial tiling,
 # used by the domain_domain function.
 cython.declare(
@@ -732,7 +829,12 @@ domain_domain_communication_dict = {}
 
 # Function returning the indices of the tiles of the local receiver and
 # supplier which take part in tile-tile interactions under the
-# domain-domain pairing with number domain_pair_nr.
+# domain-domain pairing with number domain_pair_nr. The three rows of
+# the returned array hold the indices of the receiver tiles, the
+# indices of the local supplier tiles to be sent and the indices of the
+# external supplier tiles to be received, the latter as seen by the
+# tiling of the process from which they are received. For a uniform
+# domain decomposition, the last two rows are identical.
 @cython.header(
     # Arguments
     interaction_name=str,
@@ -744,7 +846,11 @@ domain_domain_communication_dict = {}
     domain_pair_offsets='Py_ssize_t[:, ::1]',
     domain_pair_offset='Py_ssize_t[::1]',
     key=tuple,
+    rank_domain='int',
+    rank_recv='int',
+    row='int',
     sign='int',
+    tile_bounds=tuple,
     tile_indices='Py_ssize_t[:, ::1]',
     tile_indices_all=list,
     tile_indices_component='Py_ssize_t[::1]',
@@ -771,21 +877,31 @@ def domain_domain_tile_indices(interaction_name, component, only_supply, domain_
     domain_pair_offsets = domain_domain_communication_dict[
         'tile', only_supply, 'domain_pair_offsets']
     domain_pair_offset = domain_pair_offsets[domain_pair_nr, :]
+    rank_recv = domain_domain_communication_dict['tile', only_supply][1][domain_pair_nr]
     tiling_name = f'{interaction_name} (tiles)'
     tiling = component.tilings[tiling_name]
     tile_layout = tiling.layout
     tile_indices_list = []
-    for sign in range(-1, 2, 2):
+    for row in range(3):
+        # The receiver tiles (first row) are located at the boundary
+        # facing the domain from which the supplier is received, while
+        # the supplier tiles (second and third row) are located at the
+        # boundary facing the domain to which the supplier is sent.
+        # Only tiles within the domain (as opposed to the padding of
+        # tilings of non-uniform domains) are included.
+        sign = (-1 if row == 0 else +1)
+        rank_domain = (rank_recv if row == 2 else rank)
+        tile_bounds = get_domain_tile_bounds(tiling_name, rank_domain)
         for dim in range(3):
             if domain_pair_offset[dim] == -sign:
                 tile_layout_slice_start[dim] = 0
                 tile_layout_slice_end[dim]   = 1
             elif domain_pair_offset[dim] == 0:
                 tile_layout_slice_start[dim] = 0
-                tile_layout_slice_end[dim]   = tile_layout.shape[dim]
+                tile_layout_slice_end[dim]   = tile_bounds[3 + dim] - tile_bounds[dim]
             elif domain_pair_offset[dim] == +sign:
-                tile_layout_slice_start[dim] = tile_layout.shape[dim] - 1
-                tile_layout_slice_end[dim]   = tile_layout.shape[dim]
+                tile_layout_slice_start[dim] = tile_bounds[3 + dim] - tile_bounds[dim] - 1
+                tile_layout_slice_end[dim]   = tile_bounds[3 + dim] - tile_bounds[dim]
         tile_indices_component = asarray(tile_layout[
             tile_layout_slice_start[0]:tile_layout_slice_end[0],
             tile_layout_slice_start[1]:tile_layout_slice_end[1],
@@ -836,6 +952,8 @@ domain_domain_tile_indices_dict = {}
     tile_index_3D_global_s=tuple,
     tile_index_r='Py_ssize_t',
     tile_index_s='Py_ssize_t',
+    tile_bounds_r=tuple,
+    tile_counts=object,  # np.ndarray
     tile_indices_supplier_paired='Py_ssize_t[::1]',
     tile_indices_supplier_paired_ptr='Py_ssize_t*',
     tile_layout='Py_ssize_t[:, :, ::1]',
@@ -861,12 +979,12 @@ def get_tile_pairings(
     # for each receiver tile. The type of this data structure will
     # change during the computation.
     tile_indices_receiver_supplier = [[] for i in range(tile_indices_receiver.shape[0])]
-    # Get the shape of the local (domain) tile layout,
-    # as well as of the global (box) tile layout.
+    # Get the local (domain) tile layout,
+    # as well as the tile bounds of the local domain.
     tiling_name = f'{interaction_name} (tiles)'
     tiling = component.tilings[tiling_name]
     tile_layout = tiling.layout
-    tile_layout_shape = asarray(asarray(tile_layout).shape)
+    tile_bounds_r = get_domain_tile_bounds(tiling_name, rank)
     # The general computation below takes a long time when dealing with
     # many tiles. By far the worst case is when all tiles in the local
     # domain should be paired with themselves, which is the case for
@@ -883,26 +1001,30 @@ def get_tile_pairings(
                 f'get_tile_pairings() got tile_indices_receiver != tile_indices_supplier '
                 f'at domain_pair_nr == 0'
             )
+        # Only the tiles within the local domain are paired, which for
+        # non-uniform domains excludes the padding of the tiling.
+        tile_counts = asarray(tile_bounds_r[3:]) - asarray(tile_bounds_r[:3])
         i = 0
-        for         l in range(ℤ[tile_layout.shape[0]]):
-            for     m in range(ℤ[tile_layout.shape[1]]):
-                for n in range(ℤ[tile_layout.shape[2]]):
-                    if i != tile_layout[l, m, n]:
+        for         l in range(ℤ[tile_counts[0]]):
+            for     m in range(ℤ[tile_counts[1]]):
+                for n in range(ℤ[tile_counts[2]]):
+                    tile_index_r = tile_layout[l, m, n]
+                    if tile_index_r != tile_indices_receiver[i]:
                         abort(
                             f'It looks as though the tile layout of {component.name} is incorrect'
                         )
                     neighbourtile_indices_supplier = tile_indices_receiver_supplier[i]
                     for l_offset in range(-1, 2):
                         l_s = l + l_offset
-                        if l_s == -1 or l_s == ℤ[tile_layout.shape[0]]:
+                        if l_s == -1 or l_s == ℤ[tile_counts[0]]:
                             continue
                         for m_offset in range(-1, 2):
                             m_s = m + m_offset
-                            if m_s == -1 or m_s == ℤ[tile_layout.shape[1]]:
+                            if m_s == -1 or m_s == ℤ[tile_counts[1]]:
                                 continue
                             for n_offset in range(-1, 2):
                                 n_s = n + n_offset
-                                if n_s == -1 or n_s == ℤ[tile_layout.shape[2]]:
+                                if n_s == -1 or n_s == ℤ[tile_counts[2]]:
                                     continue
                                 tile_index_s = tile_layout[l_s, m_s, n_s]
                                 # As domain_pair_nr == 0, all tiles in
@@ -910,7 +1032,7 @@ def get_tile_pairings(
                                 # others. To not double count, we
                                 # disregard the pairing if the supplier
                                 # tile index is lower than the receiver
-                                # tile index (i). However, if
+                                # tile index. However, if
                                 # only_supply is True, there is no
                                 # double counting to be considered (the
                                 # two components are presumably
@@ -918,7 +1040,7 @@ def get_tile_pairings(
                                 # disregard the pairing.
                                 with unswitch:
                                     if not only_supply:
-                                        if tile_index_s < i:
+                                        if tile_index_s < tile_index_r:
                                             continue
                                 neighbourtile_indices_supplier.append(tile_index_s)
                     tile_indices_receiver_supplier[i] = asarray(
@@ -929,20 +1051,14 @@ def get_tile_pairings(
         # Get relative offsets of the domains currently being paired
         domain_pair_offset = domain_domain_communication_dict[
             'tile', only_supply, 'domain_pair_offsets'][domain_pair_nr, :]
-        # Get the indices of the global domain layout matching the
-        # receiver (local) domain and supplier domain.
-        domain_layout_receiver_indices = asarray(
-            np.unravel_index(rank, domain_subdivisions)
-        )
-        domain_layout_supplier_indices = asarray(
-            np.unravel_index(rank_supplier, domain_subdivisions)
-        )
-        global_tile_layout_shape = asarray(
-            asarray(domain_subdivisions)*tile_layout_shape,
-            dtype=C2np['Py_ssize_t'],
+        # Get the global 3D tile indices at which the receiver (local)
+        # domain and supplier domain begin, as well as the shape of the
+        # global (box) tile layout.
+        global_tile_layout_shape = get_tiling_global_shape(tiling_name)
+        tile_index_3D_r_start = asarray(tile_bounds_r[:3])
+        tile_index_3D_s_start = asarray(
+            get_domain_tile_bounds(tiling_name, rank_supplier)[:3]
         )
-        tile_index_3D_r_start = domain_layout_receiver_indices*tile_layout_shape
-        tile_index_3D_s_start = domain_layout_supplier_indices*tile_layout_shape
         # Construct dict mapping global supplier 3D indices to their
         # local 1D counterparts.
         suppliertile_indices_3D_global_to_1D_local = {}
@@ -1098,20 +1214,44 @@ tile_pairings_cache_size = 0
 tile_pairings_cache   = malloc(tile_pairings_cache_size*sizeof('Py_ssize_t**'))
 tile_pairings_N_cache = malloc(tile_pairings_cache_size*sizeof('Py_ssize_t*'))
 
+# Function for clearing the caches of the domain_domain_tile_indices()
+# and get_tile_pairings() functions, which depend on the domain
+# decomposition. This must be called whenever the domain
+# decomposition changes.
+@cython.pheader(
+    # Locals
+    tile_pairings_index='Py_ssize_t',
+    returns='void',
+)
+def clear_tile_pairings():
+    global tile_pairings_cache_size
+    domain_domain_tile_indices_dict.clear()
+    for tile_pairings_index in range(tile_pairings_cache_size):
+        free(tile_pairings_cache  [tile_pairings_index])
+        free(tile_pairings_N_cache[tile_pairings_index])
+    tile_pairings_cache_size = 0
+    tile_pairings_cache_indices.clear()
+    tile_indices_receiver_supplier_dict.clear()
+
 # Function responsible for constructing pairings between subtiles within
 # the supplied subtiling, including the corresponding subtiles in the 26
 # neighbour tiles. Subtiles further away than the supplied forcerange
-# will not be paired.
+# will not be paired. With adaptive subtiling, the supplier tiles may
+# be subdivided differently from the receiver tile, in which case the
+# supplier subtiling is passed as subtiling_s. A tile paired with itself
+# must always make use of a single subtiling shape.
 @cython.header(
     # Arguments
     subtiling='Tiling',
     forcerange='double',
     only_supply='bint',
+    subtiling_s='Tiling',
     # Locals
     all_pairings='Py_ssize_t***',
     all_pairings_N='Py_ssize_t**',
     dim='int',
     extent_over_range_dim='double',
+    gap='double',
     key=tuple,
     key_quick=tuple,
     pairing_index='Py_ssize_t',
@@ -1120,9 +1260,12 @@ tile_pairings_N_cache = malloc(tile_pairings_cache_size*sizeof('Py_ssize_t*'))
     pairings_r='Py_ssize_t*',
     r_dim='Py_ssize_t',
     r2='double',
+    same_shape='bint',
     same_tile='bint',
     shape='Py_ssize_t[::1]',
+    shape_s='Py_ssize_t[::1]',
     size='Py_ssize_t',
+    size_s='Py_ssize_t',
     subtile_index_r='Py_ssize_t',
     subtile_index_s='Py_ssize_t',
     subtile_index3D='Py_ssize_t*',
@@ -1130,6 +1273,7 @@ tile_pairings_N_cache = malloc(tile_pairings_cache_size*sizeof('Py_ssize_t*'))
     subtile_index3D_s='Py_ssize_t*',
     subtile_pairings_index='Py_ssize_t',
     tile_extent='double[::1]',
+    tile_extent_s='double[::1]',
     tile_pair_index='int',
     tiles_offset='Py_ssize_t[::1]',
     tiles_offset_i='Py_ssize_t',
@@ -1138,13 +1282,15 @@ tile_pairings_N_cache = malloc(tile_pairings_cache_size*sizeof('Py_ssize_t*'))
     tiles_offset_ptr='Py_ssize_t*',
     returns='Py_ssize_t',
 )
-def get_subtile_pairings(subtiling, forcerange, only_supply):
+def get_subtile_pairings(subtiling, forcerange, only_supply, subtiling_s=None):
     global subtile_pairings_cache, subtile_pairings_N_cache, subtile_pairings_cache_size
+    if subtiling_s is None:
+        subtiling_s = subtiling
     # Lookup index of the required subtile pairings in the global cache.
     # We first try a quick lookup using a key containing the passed
-    # subtiling instance. The attributes (e.g. shape and extent)
+    # subtiling instances. The attributes (e.g. shape and extent)
     # on a subtiling instance must then never be redefined.
-    key_quick = (subtiling, forcerange, only_supply)
+    key_quick = (subtiling, subtiling_s, forcerange, only_supply)
     subtile_pairings_index = subtile_pairings_cache_indices.get(
         key_quick,
         subtile_pairings_cache_size,
@@ -1160,7 +1306,8 @@ def get_subtile_pairings(subtiling, forcerange, only_supply):
         extent_over_range_dim = subtiling.extent[dim]*ℝ[1/forcerange]
         extent_over_range[dim] = float(f'{extent_over_range_dim:.12g}')
     shape = subtiling.shape
-    key = (tuple(shape), tuple(extent_over_range), forcerange, only_supply)
+    shape_s = subtiling_s.shape
+    key = (tuple(shape), tuple(shape_s), tuple(extent_over_range), forcerange, only_supply)
     subtile_pairings_index = subtile_pairings_cache_indices.get(key, subtile_pairings_cache_size)
     if subtile_pairings_index < subtile_pairings_cache_size:
         # Found in cache. Add the missing, quick key.
@@ -1169,7 +1316,10 @@ def get_subtile_pairings(subtiling, forcerange, only_supply):
     # No cached results found. Create subtile pairings
     # for each of the 27 cases of neighbour tiles.
     size = subtiling.size
+    size_s = subtiling_s.size
     tile_extent = subtiling.tile_extent
+    tile_extent_s = subtiling_s.tile_extent
+    same_shape = (shape[0] == shape_s[0] and shape[1] == shape_s[1] and shape[2] == shape_s[2])
     all_pairings   = malloc(27*sizeof('Py_ssize_t**'))
     all_pairings_N = malloc(27*sizeof('Py_ssize_t*'))
     tiles_offset      = empty(3, dtype=C2np['Py_ssize_t'])
@@ -1221,32 +1371,49 @@ def get_subtile_pairings(subtiling, forcerange, only_supply):
                     # Allocate memory for subtile pairings with this
                     # particular receiver subtile.
                     # We give it the maximum possible needed memory.
-                    pairings_r = malloc(size*sizeof('Py_ssize_t'))
+                    pairings_r = malloc(size_s*sizeof('Py_ssize_t'))
                     # Pair receiver subtile with every supplier subtile,
                     # unless the tile is being paired with itself.
                     # In that case, we need to not double count the
                     # subtile pairing (while still pairing every subtile
                     # with themselves).
                     pairing_index = 0
-                    for subtile_index_s in range(subtile_index_r if same_tile else 0, size):
-                        subtile_index3D_s = subtiling.tile_index3D(subtile_index_s)
+                    for subtile_index_s in range(subtile_index_r if same_tile else 0, size_s):
+                        subtile_index3D_s = subtiling_s.tile_index3D(subtile_index_s)
                         # Measure (squared) distance between the subtile
                         # pair and reject if larger than the passed
                         # forcerange.
                         r2 = 0
-                        for dim in range(3):
-                            # Distance between the same point in the two
-                            # subtiles along the dim'th dimension,
-                            # in subtile grid units.
-                            r_dim = abs(subtile_index3D_r[dim] - subtile_index3D_s[dim])
-                            if r_dim > 0:
-                                # The two subtiles are offset along the
-                                # dim'th dimension. Subtract one unit
-                                # from the length, making the length
-                                # between the closest two points
-                                # in the two subtiles.
-                                r_dim -= 1
-                            r2 += (r_dim*tile_extent[dim])**2
+                        with unswitch:
+                            if same_shape:
+                                for dim in range(3):
+                                    # Distance between the same point in
+                                    # the two subtiles along the dim'th
+                                    # dimension, in subtile grid units.
+                                    r_dim = abs(subtile_index3D_r[dim] - subtile_index3D_s[dim])
+                                    if r_dim > 0:
+                                        # The two subtiles are offset
+                                        # along the dim'th dimension.
+                                        # Subtract one unit from the
+                                        # length, making the length
+                                        # between the closest two points
+                                        # in the two subtiles.
+                                        r_dim -= 1
+                                    r2 += (r_dim*tile_extent[dim])**2
+                            else:
+                                for dim in range(3):
+                                    # The subtile grids do not line up,
+                                    # so we measure the physical gap
+                                    # between the two subtiles along the
+                                    # dim'th dimension directly.
+                                    gap = pairmax(
+                                        subtile_index3D_s[dim]*tile_extent_s[dim]
+                                            - (subtile_index3D_r[dim] + 1)*tile_extent[dim],
+                                        subtile_index3D_r[dim]*tile_extent[dim]
+                                            - (subtile_index3D_s[dim] + 1)*tile_extent_s[dim],
+                                    )
+                                    if gap > 0:
+                                        r2 += gap**2
                         if r2 > ℝ[forcerange**2]:
                             continue
                         # Add this supplier subtile to the list of
@@ -1348,6 +1515,7 @@ def get_neighbourtile_pair_index(tiles_offset_i, tiles_offset_j, tiles_offset_k)
             'subtile_pairings_cache',
             'subtile_pairings_N_cache',
         'get_neighbourtile_pair_index',
+        'get_adaptive_subtiling',
     ),
 )
 def particle_particle(
@@ -1363,12 +1531,14 @@ def particle_particle(
         forcerange='double',
         # Locals
         N_subtiles='Py_ssize_t',
+        adaptive='bint',
         all_subtile_pairings='Py_ssize_t***',
         all_subtile_pairings_N='Py_ssize_t**',
         dim='int',
         highest_populated_rung_r='signed char',
         highest_populated_rung_s='signed char',
         indexᵖ_i='Py_ssize_t',
+        local_component='bint',
         local_interaction_flag_0='bint',
         local_interaction_flag_1='bint',
         local_interaction_flag_2='bint',
@@ -1418,6 +1588,7 @@ def particle_particle(
         subtiling_name_2=str,
         subtiling_s='Tiling',
         subtiling_s_2='Tiling',
+        subtiling_tile_r='Tiling',
         tile_contain_onlyinactive_r='bint',
         tile_contain_particles_r='signed char',
         tile_contain_particles_s='signed char',
@@ -1488,8 +1659,16 @@ def particle_particle(
     tile_extent               = cython.address(tiling_r.tile_extent[:])  # the same for receiver and supplier
     tiles_r                   = tiling_r.tiles
     tiles_contain_particles_r = tiling_r.contain_particles
-    # Extract subtiling variables from receiver
+    # Extract subtiling variables from receiver. With adaptive
+    # subtiling, the subtiling and the timing of each receiver tile
+    # are handled as in subtile_subtile().
+    adaptive = (
+        subtiling_name != 'trivial'
+        and shortrange_params[interaction_name]['subtiling'][0] == 'adaptive'
+    )
+    tiling_r.timed_tile_index = -1
     subtiling_r = receiver.tilings[subtiling_name]
+    subtiling_tile_r = subtiling_r
     subtiles_r                   = subtiling_r.tiles
     subtiles_contain_particles_r = subtiling_r.contain_particles
     N_subtiles                   = subtiling_r.size  # The same for receiver and supplier
@@ -1514,7 +1693,8 @@ def particle_particle(
     # trivial tiling, the re-sorting has no effect, and so we do not
     # have to worry.
     subtiling_s = supplier.tilings[subtiling_name]
-    if 𝔹[receiver.name == supplier.name and rank == rank_supplier and subtiling_name != 'trivial']:
+    local_component = (receiver.name == supplier.name and rank == rank_supplier)
+    if 𝔹[local_component and subtiling_name != 'trivial']:
         subtiling_name_2 = f'{interaction_name} (subtiles 2)'
         if subtiling_name_2 not in supplier.tilings:
             supplier.tilings.pop(subtiling_name)
@@ -1578,15 +1758,26 @@ def particle_particle(
                 if tile_contain_particles_r < 2:
                     continue
         tile_contain_onlyinactive_r = (tile_contain_particles_r == 1)
+        # Pick out the subtiling matching the particle content
+        # of the receiver tile, and start the timing of this tile.
+        with unswitch(1):
+            if adaptive:
+                tiling_r.time_tile(tile_index_r)
+                subtiling_tile_r = get_adaptive_subtiling(
+                    receiver, interaction_name, tiling_r, tile_index_r, False,
+                )
+                subtiles_r                   = subtiling_tile_r.tiles
+                subtiles_contain_particles_r = subtiling_tile_r.contain_particles
+                N_subtiles                   = subtiling_tile_r.size
         # Sort particles within the receiver tile into subtiles
         tile_index3D_r = tiling_r.tile_index3D(tile_index_r)
         for dim in range(3):
             tile_location_r_ptr[dim] = (
                 tiling_location_r[dim] + tile_index3D_r[dim]*tile_extent[dim]
             )
-        subtiling_r.relocate(tile_location_r)
-        subtiling_r.sort(tiling_r, tile_index_r)
-        subtiles_rungs_N_r = subtiling_r.tiles_rungs_N
+        subtiling_tile_r.relocate(tile_location_r)
+        subtiling_tile_r.sort(tiling_r, tile_index_r)
+        subtiles_rungs_N_r = subtiling_tile_r.tiles_rungs_N
         # Loop over the requested tiles in the supplier
         for tile_index_s in range(tile_indices_supplier_N):
             tile_index_s = tile_indices_supplier[tile_index_s]
@@ -1600,6 +1791,21 @@ def particle_particle(
                 if tile_contain_onlyinactive_r:
                     if tile_contain_particles_s == 1:
                         continue
+            # Pick out the subtiling matching the particle content of
+            # the supplier tile, together with the subtile pairings
+            # between this and the receiver subtiling.
+            with unswitch(2):
+                if adaptive:
+                    subtiling_s = get_adaptive_subtiling(
+                        supplier, interaction_name, tiling_s, tile_index_s, local_component,
+                    )
+                    subtiles_s                   = subtiling_s.tiles
+                    subtiles_contain_particles_s = subtiling_s.contain_particles
+                    subtile_pairings_index = get_subtile_pairings(
+                        subtiling_tile_r, forcerange, only_supply_communication, subtiling_s,
+                    )
+                    all_subtile_pairings = subtile_pairings_cache[subtile_pairings_index]
+                    all_subtile_pairings_N = subtile_pairings_N_cache[subtile_pairings_index]
             # Sort particles within the supplier tile into subtiles
             tile_index3D_s = tiling_s.tile_index3D(tile_index_s)
             for dim in range(3):
@@ -1635,7 +1841,7 @@ def particle_particle(
             subtile_pairings_N = all_subtile_pairings_N[tile_pair_index]
             # Flag specifying whether this is a local interaction
             local_interaction_flag_0 = (
-                𝔹[receiver.name == supplier.name and rank == rank_supplier]
+                local_component
                 and (tile_index_r == tile_index_s)
             )
             # Loop over all subtiles in the selected receiver tile
@@ -1807,6 +2013,380 @@ tile_location_r_ptr = cython.address(tile_location_r[:])
 tile_location_s_ptr = cython.address(tile_location_s[:])
 tiles_offset_ptr    = cython.address(tiles_offset[:])
 
+# Function returning the subtiling to use for the given tile when
+# adaptive subtiling is enabled. The refinement level of the subtiling
+# is set by the number of particles within the tile, so that densely
+# populated tiles are subdivided more finely than sparse ones. This
+# level is further adjusted by the offset found from the measured
+# computation time of the tile (see Tiling.adapt_subtiling_offsets()).
+# The subtilings of each level are instantiated on the component on
+# demand. When second is True, a separate instance is returned, needed
+# for the supplier when the receiver and supplier are the same
+# component within the same domain. See particle_particle().
+@cython.header(
+    # Arguments
+    component='Component',
+    interaction_name=str,
+    tiling='Tiling',
+    tile_index='Py_ssize_t',
+    second='bint',
+    # Locals
+    N_particles='Py_ssize_t',
+    level='int',
+    rung_index='signed char',
+    rungs_N='Py_ssize_t*',
+    subtiling='Tiling',
+    subtiling_name=str,
+    subtiling_name_2=str,
+    returns='Tiling',
+)
+def get_adaptive_subtiling(component, interaction_name, tiling, tile_index, second):
+    # Count up the particles within the tile
+    rungs_N = tiling.tiles_rungs_N[tile_index]
+    N_particles = 0
+    for rung_index in range(N_rungs):
+        N_particles += rungs_N[rung_index]
+    # Look up the subtiling of the appropriate level
+    level = get_adaptive_subtiling_level(
+        N_particles, tiling.tile_extent, shortrange_params[interaction_name]['subtiling'][1],
+        tiling.tiles_subtiling_offset[tile_index],
+    )
+    subtiling_name = f'{interaction_name} (subtiles, level {level})'
+    if not second:
+        return component.init_tiling(subtiling_name)
+    subtiling_name_2 = f'{interaction_name} (subtiles 2, level {level})'
+    subtiling = component.tilings.get(subtiling_name_2)
+    if subtiling is None:
+        subtiling = init_subtiling(component, subtiling_name)
+        component.tilings[subtiling_name_2] = subtiling
+    return subtiling
+
+# Generic function implementing subtile-subtile pairing.
+# This works just like particle_particle(), but instead of yielding
+# individual particle pairs it yields pairs of receiver and supplier
+# subtiles, leaving the loops over rungs and particles to the caller.
+# Note that this function returns a generator and so should only be
+# called within a loop.
+@cython.iterator(
+    depends=(
+        # Global variables used by subtile_subtile()
+        'periodic_offset',
+        'tile_location_r',
+        'tile_location_r_ptr',
+        'tile_location_s',
+        'tile_location_s_ptr',
+        'tiles_offset',
+        'tiles_offset_ptr',
+        # Functions used by subtile_subtile()
+        'get_subtile_pairings',
+            # Global variables used by get_subtile_pairings()
+            'extent_over_range',
+            'subtile_pairings_cache_indices',
+            'subtile_pairings_cache_size',
+            'subtile_pairings_cache',
+            'subtile_pairings_N_cache',
+        'get_neighbourtile_pair_index',
+        'get_adaptive_subtiling',
+    ),
+)
+def subtile_subtile(
+    receiver, supplier, pairing_level,
+    tile_indices_receiver, tile_indices_supplier_paired, tile_indices_supplier_paired_N,
+    rank_supplier, interaction_name, only_supply, forcerange=-1,
+):
+    # Cython declarations for variables used for the iteration,
+    # not including those to yield.
+    # Do not write these using the decorator syntax above this function.
+    cython.declare(
+        # Keyword arguments
+        forcerange='double',
+        # Locals
+        N_subtiles='Py_ssize_t',
+        adaptive='bint',
+        all_subtile_pairings='Py_ssize_t***',
+        all_subtile_pairings_N='Py_ssize_t**',
+        dim='int',
+        local_component='bint',
+        local_interaction_flag_0='bint',
+        only_supply_communication='bint',
+        periodic_offset_ptr='double*',
+        subtile_contain_onlyinactive_r='bint',
+        subtile_contain_particles_r='signed char',
+        subtile_contain_particles_s='signed char',
+        subtile_index_r='Py_ssize_t',
+        subtile_index_s='Py_ssize_t',
+        subtile_pairings='Py_ssize_t**',
+        subtile_pairings_N='Py_ssize_t*',
+        subtile_pairings_N_r='Py_ssize_t',
+        subtile_pairings_index='Py_ssize_t',
+        subtile_pairings_r='Py_ssize_t*',
+        subtiles_contain_particles_r='signed char*',
+        subtiles_contain_particles_s='signed char*',
+        subtiles_r='Py_ssize_t***',
+        subtiles_rungs_N_r='Py_ssize_t**',
+        subtiles_rungs_N_s='Py_ssize_t**',
+        subtiles_s='Py_ssize_t***',
+        subtiling_name=str,
+        subtiling_name_2=str,
+        subtiling_s='Tiling',
+        subtiling_s_2='Tiling',
+        subtiling_tile_r='Tiling',
+        tile_contain_onlyinactive_r='bint',
+        tile_contain_particles_r='signed char',
+        tile_contain_particles_s='signed char',
+        tile_extent='double*',
+        tile_index_r='Py_ssize_t',
+        tile_index_s='Py_ssize_t',
+        tile_index3D_r='Py_ssize_t*',
+        tile_index3D_s='Py_ssize_t*',
+        tile_indices_supplier='Py_ssize_t*',
+        tile_indices_supplier_N='Py_ssize_t',
+        tile_location_s_dim='double',
+        tile_pair_index='int',
+        tile_separation='double',
+        tiles_contain_particles_r='signed char*',
+        tiles_contain_particles_s='signed char*',
+        tiling_location_r='double*',
+        tiling_location_s='double*',
+        tiling_name=str,
+        tiling_r='Tiling',
+        tiling_s='Tiling',
+        # Yielded
+        subtile_r='Py_ssize_t**',
+        rungs_N_r='Py_ssize_t*',
+        subtile_contain_jumping_r='bint',
+        subtile_s='Py_ssize_t**',
+        rungs_N_s='Py_ssize_t*',
+        subtile_contain_jumping_s='bint',
+        local_interaction_flag_1='bint',
+        periodic_offset_x='double',
+        periodic_offset_y='double',
+        periodic_offset_z='double',
+        particle_particle_t_begin='double',
+        subtiling_r='Tiling',
+    )
+    # The names used to refer to the domain and tile level tiling
+    # (tiles and subtiles). In the case of pairing_level == 'domain',
+    # we always use the trivial tiling.
+    if 𝔹[pairing_level == 'tile']:
+        tiling_name    = f'{interaction_name} (tiles)'
+        subtiling_name = f'{interaction_name} (subtiles)'
+    else:  # pairing_level == 'domain':
+        tiling_name = subtiling_name = 'trivial'
+    # Extract tiling variables from receiver
+    tiling_r = receiver.tilings[tiling_name]
+    tiling_location_r         = cython.address(tiling_r.location[:])
+    tile_extent               = cython.address(tiling_r.tile_extent[:])  # the same for receiver and supplier
+    tiles_contain_particles_r = tiling_r.contain_particles
+    # Extract subtiling variables from receiver. With adaptive
+    # subtiling, each tile is sorted into a subtiling of its own
+    # refinement level (see get_adaptive_subtiling()), though the
+    # computation time is still recorded on the main subtiling.
+    # Additionally, the computation time of each receiver tile is
+    # measured on the tiling, with the timing of the last tile to be
+    # stopped by the caller through tiling_r.time_tile(-1).
+    adaptive = (
+        subtiling_name != 'trivial'
+        and shortrange_params[interaction_name]['subtiling'][0] == 'adaptive'
+    )
+    tiling_r.timed_tile_index = -1
+    subtiling_r = receiver.tilings[subtiling_name]
+    subtiling_tile_r = subtiling_r
+    subtiles_r                   = subtiling_r.tiles
+    subtiles_contain_particles_r = subtiling_r.contain_particles
+    N_subtiles                   = subtiling_r.size  # The same for receiver and supplier
+    # Extract tiling variables from supplier
+    tiling_s = supplier.tilings[tiling_name]
+    tiling_location_s         = cython.address(tiling_s.location[:])
+    tiles_contain_particles_s = tiling_s.contain_particles
+    # Extract subtiling variables from supplier, using a separate
+    # subtiling instance when the receiver and supplier are the same
+    # component within the same domain. See particle_particle().
+    subtiling_s = supplier.tilings[subtiling_name]
+    local_component = (receiver.name == supplier.name and rank == rank_supplier)
+    if 𝔹[local_component and subtiling_name != 'trivial']:
+        subtiling_name_2 = f'{interaction_name} (subtiles 2)'
+        if subtiling_name_2 not in supplier.tilings:
+            supplier.tilings.pop(subtiling_name)
+            subtiling_s_2 = supplier.init_tiling(subtiling_name)
+            supplier.tilings[subtiling_name  ] = subtiling_s
+            supplier.tilings[subtiling_name_2] = subtiling_s_2
+        subtiling_s = supplier.tilings[subtiling_name_2]
+    subtiles_s                   = subtiling_s.tiles
+    subtiles_contain_particles_s = subtiling_s.contain_particles
+    # Get subtile pairings between each
+    # of the 27 possible tile pairings.
+    only_supply_communication = (only_supply if receiver.name == supplier.name else True)
+    if forcerange == -1:
+        forcerange = get_shortrange_param((receiver, supplier), interaction_name, 'range')
+    subtile_pairings_index = get_subtile_pairings(
+        subtiling_r, forcerange, only_supply_communication,
+    )
+    all_subtile_pairings = subtile_pairings_cache[subtile_pairings_index]
+    all_subtile_pairings_N = subtile_pairings_N_cache[subtile_pairings_index]
+    # Local pointer into the global array of particle position offsets
+    # due to the periodicity.
+    periodic_offset_ptr = cython.address(periodic_offset[:])
+    # Default value used when only_supply is True
+    subtile_contain_onlyinactive_r = False
+    # The current time. This is yielded back to the caller,
+    # where time() - particle_particle_t_begin should be added to the
+    # computation_time of the receiver subtiling.
+    particle_particle_t_begin = time()
+    # Loop over the requested tiles in the receiver
+    for tile_index_r in range(ℤ[tile_indices_receiver.shape[0]]):
+        # Lookup supplier tile indices with which to pair the current
+        # receiver tile.
+        tile_indices_supplier   = tile_indices_supplier_paired  [tile_index_r]
+        tile_indices_supplier_N = tile_indices_supplier_paired_N[tile_index_r]
+        # Now make tile_index_r an actual receiver tile index
+        tile_index_r = tile_indices_receiver[tile_index_r]
+        # Skip tile if it does not contain any particles at all,
+        # or only inactive particles when only_supply is True.
+        tile_contain_particles_r = tiles_contain_particles_r[tile_index_r]
+        with unswitch(1):
+            if 𝔹[not only_supply]:
+                if tile_contain_particles_r == 0:
+                    continue
+            else:
+                if tile_contain_particles_r < 2:
+                    continue
+        tile_contain_onlyinactive_r = (tile_contain_particles_r == 1)
+        # Pick out the subtiling matching the particle content
+        # of the receiver tile, and start the timing of this tile.
+        with unswitch(1):
+            if adaptive:
+                tiling_r.time_tile(tile_index_r)
+                subtiling_tile_r = get_adaptive_subtiling(
+                    receiver, interaction_name, tiling_r, tile_index_r, False,
+                )
+                subtiles_r                   = subtiling_tile_r.tiles
+                subtiles_contain_particles_r = subtiling_tile_r.contain_particles
+                N_subtiles                   = subtiling_tile_r.size
+        # Sort particles within the receiver tile into subtiles
+        tile_index3D_r = tiling_r.tile_index3D(tile_index_r)
+        for dim in range(3):
+            tile_location_r_ptr[dim] = (
+                tiling_location_r[dim] + tile_index3D_r[dim]*tile_extent[dim]
+            )
+        subtiling_tile_r.relocate(tile_location_r)
+        subtiling_tile_r.sort(tiling_r, tile_index_r)
+        subtiles_rungs_N_r = subtiling_tile_r.tiles_rungs_N
+        # Loop over the requested tiles in the supplier
+        for tile_index_s in range(tile_indices_supplier_N):
+            tile_index_s = tile_indices_supplier[tile_index_s]
+            # Skip tile if it does not contain any particles at all
+            tile_contain_particles_s = tiles_contain_particles_s[tile_index_s]
+            if tile_contain_particles_s == 0:
+                continue
+            # If both the receiver and supplier tile contains particles
+            # on inactive rows only, we skip this tile pair.
+            with unswitch(1):
+                if tile_contain_onlyinactive_r:
+                    if tile_contain_particles_s == 1:
+                        continue
+            # Pick out the subtiling matching the particle content of
+            # the supplier tile, together with the subtile pairings
+            # between this and the receiver subtiling.
+            with unswitch(2):
+                if adaptive:
+                    subtiling_s = get_adaptive_subtiling(
+                        supplier, interaction_name, tiling_s, tile_index_s, local_component,
+                    )
+                    subtiles_s                   = subtiling_s.tiles
+                    subtiles_contain_particles_s = subtiling_s.contain_particles
+                    subtile_pairings_index = get_subtile_pairings(
+                        subtiling_tile_r, forcerange, only_supply_communication, subtiling_s,
+                    )
+                    all_subtile_pairings = subtile_pairings_cache[subtile_pairings_index]
+                    all_subtile_pairings_N = subtile_pairings_N_cache[subtile_pairings_index]
+            # Sort particles within the supplier tile into subtiles
+            tile_index3D_s = tiling_s.tile_index3D(tile_index_s)
+            for dim in range(3):
+                # While in this loop, also determine the tile offset
+                tiles_offset_ptr[dim] = ℤ[tile_index3D_s[dim]] - tile_index3D_r[dim]
+                # Set floating supplier tile location
+                tile_location_s_dim = (
+                    tiling_location_s[dim] + ℤ[tile_index3D_s[dim]]*tile_extent[dim]
+                )
+                tile_location_s_ptr[dim] = tile_location_s_dim
+                # While in this loop, also determine
+                # the periodic particle offset.
+                tile_separation = tile_location_s_dim - tile_location_r_ptr[dim]
+                if tile_separation > ℝ[0.5*boxsize]:
+                    periodic_offset_ptr[dim] = boxsize
+                elif tile_separation < ℝ[-0.5*boxsize]:
+                    periodic_offset_ptr[dim] = ℝ[-boxsize]
+                else:
+                    periodic_offset_ptr[dim] = 0
+            subtiling_s.relocate(tile_location_s)
+            subtiling_s.sort(tiling_s, tile_index_s)
+            subtiles_rungs_N_s = subtiling_s.tiles_rungs_N
+            # Extract the values from periodic_offset_ptr
+            periodic_offset_x = periodic_offset_ptr[0]
+            periodic_offset_y = periodic_offset_ptr[1]
+            periodic_offset_z = periodic_offset_ptr[2]
+            # Get the needed subtile pairings for the selected receiver
+            # and supplier tiles (which should be neighbour tiles).
+            tile_pair_index = get_neighbourtile_pair_index(
+                tiles_offset_ptr[0], tiles_offset_ptr[1], tiles_offset_ptr[2],
+            )
+            subtile_pairings   = all_subtile_pairings  [tile_pair_index]
+            subtile_pairings_N = all_subtile_pairings_N[tile_pair_index]
+            # Flag specifying whether this is a local interaction
+            local_interaction_flag_0 = (
+                local_component
+                and (tile_index_r == tile_index_s)
+            )
+            # Loop over all subtiles in the selected receiver tile
+            for subtile_index_r in range(N_subtiles):
+                # Skip subtile if it does not contain
+                # any particles at all, or only inactive particles
+                # when only_supply is True.
+                subtile_contain_particles_r = subtiles_contain_particles_r[subtile_index_r]
+                with unswitch(3):
+                    if 𝔹[not only_supply]:
+                        if subtile_contain_particles_r == 0:
+                            continue
+                        subtile_contain_onlyinactive_r = (subtile_contain_particles_r == 1)
+                    else:
+                        if subtile_contain_particles_r < 2:
+                            continue
+                # Set and extract various receiver subtile variables
+                subtile_contain_jumping_r = (subtile_contain_particles_r == 3)
+                subtile_r            = subtiles_r        [subtile_index_r]
+                rungs_N_r            = subtiles_rungs_N_r[subtile_index_r]
+                subtile_pairings_r   = subtile_pairings  [subtile_index_r]
+                subtile_pairings_N_r = subtile_pairings_N[subtile_index_r]
+                # Loop over the needed supplier subtiles
+                for subtile_index_s in range(subtile_pairings_N_r):
+                    subtile_index_s = subtile_pairings_r[subtile_index_s]
+                    # Skip subtile if it does not contain
+                    # any particles at all.
+                    subtile_contain_particles_s = subtiles_contain_particles_s[subtile_index_s]
+                    if subtile_contain_particles_s == 0:
+                        continue
+                    # If both the receiver and supplier subtile contains
+                    # particles on inactive rows only, we skip this
+                    # subtile pair.
+                    with unswitch(4):
+                        if 𝔹[not only_supply]:
+                            with unswitch(1):
+                                if subtile_contain_onlyinactive_r:
+                                    if subtile_contain_particles_s == 1:
+                                        continue
+                    # Set and extract various supplier subtile variables
+                    subtile_contain_jumping_s = (subtile_contain_particles_s == 3)
+                    subtile_s = subtiles_s        [subtile_index_s]
+                    rungs_N_s = subtiles_rungs_N_s[subtile_index_s]
+                    # Flag specifying whether this is a local interaction
+                    local_interaction_flag_1 = (
+                        local_interaction_flag_0
+                        and (subtile_index_r == subtile_index_s)
+                    )
+                    # Yield the needed variables
+                    yield subtile_r, rungs_N_r, subtile_contain_jumping_r, subtile_s, rungs_N_s, subtile_contain_jumping_s, local_interaction_flag_1, periodic_offset_x, periodic_offset_y, periodic_offset_z, particle_particle_t_begin, subtiling_r
+
 # Function for converting a pair of softening lengths
 # into a single softening length.
 @cython.header(
@@ -1948,6 +2528,9 @@ def get_softened_r3inv(r2, ϵ):
     fluid_receivers=list,
     fluid_suppliers=list,
     fourier_diff='bint',
+    fuse='bint',
+    green_exponent='double',
+    green_factor='double',
     grid_downstream='double[:, :, ::1]',
     gridsize_downstream='Py_ssize_t',
     group=dict,
@@ -1964,6 +2547,7 @@ def get_softened_r3inv(r2, ϵ):
     only_particle_suppliers='bint',
     particle_receivers=list,
     particle_suppliers=list,
+    precision=str,
     receiver='Component',
     receivers_differentiations=list,
     receivers_gridsizes_downstream=list,
@@ -1972,6 +2556,7 @@ def get_softened_r3inv(r2, ϵ):
     slab_downstream_representation='double[:, :, ::1]',
     slab_global='double[:, :, ::1]',
     slab_global_ptr='double*',
+    slabs_grad=list,
     subgroup=list,
     subgroups=dict,
     supplier='Component',
@@ -2018,6 +2603,13 @@ def particle_mesh(
       the receivers, applying the force.
       The force application uses the prescription
         Δmom = -component.mass*∂ⁱφ*ᔑdt[ᔑdt_key].
+    If potential_options['fuse'] is set and all receivers use
+    Fourier-space differentiation of downstream potentials with the
+    same grid size as the global potential, the conversion to
+    potential, the downstream deconvolution and interlacing as well as
+    the differentiation along all three dimensions are carried out in a
+    single sweep over the global Fourier slabs, producing three
+    Fourier space force slabs at once.
     """
     if not receivers or not suppliers:
         return
@@ -2078,42 +2670,82 @@ def particle_mesh(
             deconvolve_downstream = False
             deconv_order_global += 1
     deconv_order_global *= interpolation_order
+    # Use the fused Fourier space pipeline if requested and possible,
+    # i.e. when each receiver obtains its force through Fourier space
+    # differentiation of the global potential itself.
+    fuse = (
+        potential_options['fuse']
+        and all_receiver_downstream_gridsizes_equal_global
+        and all([
+            receiver.potential_differentiations[force][method] == 0
+            for receiver in receivers
+        ])
+    )
+    # The Green's function for converting slab values to potential
+    # values is given by green_factor/k2*exp(green_exponent*k2),
+    # with k2 the squared wave vector length in grid units.
+    # The physical squared length of the wave vector is given by
+    # |k|² = (2π/boxsize)**2*k2. For potential == 'gravity' we have
+    # the Poisson equation, the factor of which is
+    #   -4πG/|k|²,
+    # while for potential == 'gravity long-range' we have the
+    # Poisson equation with a Gaussian cutoff, resulting in the factor
+    #   -4πG/|k|² * exp(-rₛ²*|k|²).
+    green_factor = -boxsize**2*G_Newton/π
+    green_exponent = 0
+    if potential == 'gravity long-range':
+        green_exponent = -(2*π/boxsize*shortrange_params['gravity']['scale'])**2
+    # The floating-point precision with which to carry out the FFTs
+    precision = potential_options['precision'][force][method]
     # Interpolate suppliers onto global Fourier slabs by first
     # interpolating them onto individual upstream grids, transforming to
     # Fourier space and then adding them together.
     slab_global = interpolate_upstream(
         suppliers, suppliers_gridsizes_upstream, gridsize_global, quantity, interpolation_order,
         ᔑdt, deconvolve_upstream, interlace_upstream,
-        output_space='Fourier',
+        output_space='Fourier', precision=precision,
     )
     slab_global_ptr = cython.address(slab_global[:, :, :])
     # Convert slab_global values to potential
     # and possibly perform upstream and/or downstream deconvolutions.
-    for index, ki, kj, kk, factor, θ in fourier_loop(
-        gridsize_global,
-        skip_origin=True, deconv_order=deconv_order_global,
-    ):
-        k2 = ℤ[ℤ[ℤ[kj**2] + ki**2] + kk**2]
-        # The potential factor, for converting the slab values
-        # to the desired potential.
-        with unswitch(5):
-            # The physical squared length of the wave
-            # vector is given by |k|² = (2π/boxsize)**2*k2.
-            if 𝔹[potential == 'gravity']:
-                # The Poisson equation, the factor of which is
-                #   -4πG/|k|².
-                factor *= ℝ[-boxsize**2*G_Newton/π]/k2
-            else:  # potential == 'gravity long-range'
-                # The Poisson equation with a Gaussian
-                # cutoff, resulting in the factor
-                #   -4πG/|k|² * exp(-rₛ²*|k|²).
-                factor *= (
-                    ℝ[-boxsize**2*G_Newton/π]/k2
-                    *exp(k2*ℝ[-(2*π/boxsize*shortrange_params['gravity']['scale'])**2])
-                )
-        # Apply factor from deconvolution and potential
-        slab_global_ptr[index    ] *= factor  # real part
-        slab_global_ptr[index + 1] *= factor  # imag part
+    # With multiple threads, this is done by fourier_operate_threaded(),
+    # with the potential factor applied as a Green's function.
+    # With the fused pipeline, this is instead postponed to the
+    # construction of the force slabs below, leaving slab_global
+    # unchanged.
+    if fuse:
+        pass
+    elif 𝔹[num_threads > 1]:
+        fourier_operate_threaded(
+            slab_global, deconv_order_global,
+            green=True, green_factor=green_factor, green_exponent=green_exponent,
+        )
+    else:
+        for index, ki, kj, kk, factor, θ in fourier_loop(
+            gridsize_global,
+            skip_origin=True, deconv_order=deconv_order_global,
+        ):
+            k2 = ℤ[ℤ[ℤ[kj**2] + ki**2] + kk**2]
+            # The potential factor, for converting the slab values
+            # to the desired potential.
+            with unswitch(5):
+                # The physical squared length of the wave
+                # vector is given by |k|² = (2π/boxsize)**2*k2.
+                if 𝔹[potential == 'gravity']:
+                    # The Poisson equation, the factor of which is
+                    #   -4πG/|k|².
+                    factor *= ℝ[-boxsize**2*G_Newton/π]/k2
+                else:  # potential == 'gravity long-range'
+                    # The Poisson equation with a Gaussian
+                    # cutoff, resulting in the factor
+                    #   -4πG/|k|² * exp(-rₛ²*|k|²).
+                    factor *= (
+                        ℝ[-boxsize**2*G_Newton/π]/k2
+                        *exp(k2*ℝ[-(2*π/boxsize*shortrange_params['gravity']['scale'])**2])
+                    )
+            # Apply factor from deconvolution and potential
+            slab_global_ptr[index    ] *= factor  # real part
+            slab_global_ptr[index + 1] *= factor  # imag part
     # Ensure nullified origin
     nullify_modes(slab_global, 'origin')
     masterprint('done')
@@ -2235,7 +2867,47 @@ def particle_mesh(
                     )
                     # Obtain the force grid either in Fourier
                     # or real space
-                    if fourier_diff:
+                    if fourier_diff and fuse:
+                        # Fused Fourier space pipeline. Construct all
+                        # three force slabs directly from the global
+                        # slab (which is left unchanged), in one sweep.
+                        masterprint(f'Obtaining the force {downstream_description}...')
+                        slabs_grad = [
+                            get_fftw_slab(
+                                gridsize_downstream, f'slab_force_{"xyz"[dim]}', 'origin, Nyquist',
+                            )
+                            for dim in range(3)
+                        ]
+                        fourier_operate_fused(
+                            slab_global,
+                            slabs_grad,
+                            deconv_order_global + deconv_order_downstream,
+                            lattice_downstream,
+                            green_factor,
+                            green_exponent,
+                        )
+                        masterprint('done')
+                        # For each dimension, transform the force to
+                        # real space and apply it.
+                        for dim in range(3):
+                            masterprint(f'Applying the {"xyz"[dim]}-force ...')
+                            masterprint(
+                                f'Transforming to real space force {downstream_description}...'
+                            )
+                            fft(slabs_grad[dim], 'backward', precision=precision)
+                            grid_downstream = domain_decompose(
+                                slabs_grad[dim],
+                                'grid_updownstream',
+                                do_ghost_communication=True,
+                            )
+                            masterprint('done')
+                            # Apply force
+                            apply_particle_mesh_force(
+                                grid_downstream, dim, group[representation], interpolation_order,
+                                ᔑdt, ᔑdt_key, lattice_downstream,
+                            )
+                            masterprint('done')
+                    elif fourier_diff:
                         # Fourier space differentiation.
                         # For each dimension, differentiate the grid
                         # to obtain the force and apply this force.
@@ -2264,7 +2936,7 @@ def particle_mesh(
                             masterprint(
                                 f'Transforming to real space force {downstream_description}...'
                             )
-                            fft(slab_downstream_subgroup, 'backward')
+                            fft(slab_downstream_subgroup, 'backward', precision=precision)
                             grid_downstream = domain_decompose(
                                 slab_downstream_subgroup,
                                 'grid_updownstream',
@@ -2299,7 +2971,7 @@ def particle_mesh(
                         masterprint(
                             f'Transforming to real space potential {downstream_description}...'
                         )
-                        fft(slab_downstream_subgroup, 'backward')
+                        fft(slab_downstream_subgroup, 'backward', precision=precision)
                         grid_downstream = domain_decompose(
                             slab_downstream_subgroup,
                             'grid_updownstream',
@@ -2425,6 +3097,14 @@ def shortrange_progress_message(force, method, receivers, extra_message=' (short
                 f'{force} interaction for {{{{{{}}}}}} via the P³M method{extra_message}'
                 .format(', '.join([component.name for component in receivers]))
             )
+    elif method == 'tree':
+        if len(receivers) == 1:
+            return f'{force} interaction for {receivers[0].name} via the TreePM method{extra_message}'
+        else:
+            return (
+                f'{force} interaction for {{{{{{}}}}}} via the TreePM method{extra_message}'
+                .format(', '.join([component.name for component in receivers]))
+            )
     elif method == 'pp':
         if len(receivers) == 1:
             return f'{force} interaction for {receivers[0].name} via the PP method'
@@ -2441,6 +3121,14 @@ def shortrange_progress_message(force, method, receivers, extra_message=' (short
                 f'{force} interaction for {{{{{{}}}}}} via the non-periodic PP method'
                 .format(', '.join([component.name for component in receivers]))
             )
+    elif method == 'treenonperiodic':
+        if len(receivers) == 1:
+            return f'{force} interaction for {receivers[0].name} via the non-periodic tree method'
+        else:
+            return (
+                f'{force} interaction for {{{{{{}}}}}} via the non-periodic tree method'
+                .format(', '.join([component.name for component in receivers]))
+            )
     else:
         abort(f'The method "{method}" is unknown to shortrange_progress_message()')
 
@@ -2460,12 +3148,12 @@ def find_interactions(components, interaction_type='any', instantaneous='both'):
       Include every interaction.
     - interaction_type == 'long-range':
       Include long-range interactions only, i.e. ones with a method of
-      either PM and P³M. Note that P³M interactions will also be
-      returned for interaction_type == 'short-range'.
+      either PM, P³M or TreePM. Note that P³M and TreePM interactions
+      will also be returned for interaction_type == 'short-range'.
     - interaction_type == 'short-range':
       Include short-range interactions only, i.e. any other than PM.
-      Note that P³M interactions will also be returned
-      for interaction_type == 'short-range'.
+      Note that P³M and TreePM interactions will also be returned
+      for interaction_type == 'long-range'.
     Furthermore you may specify instantaneous to filter out interactions
     that are (not) instantaneous:
     - instantaneous == 'both':
@@ -2603,7 +3291,7 @@ def find_interactions(components, interaction_type='any', instantaneous='both'):
     # considered, remove the unwanted interactions.
     if 'long' in interaction_type:
         for interaction in interactions_list:
-            if interaction.method not in {'pm', 'p3m'}:
+            if interaction.method not in {'pm', 'p3m', 'tree'}:
                 interaction.receivers[:] = []
         while cleanup():
             pass
@@ -2834,7 +3522,7 @@ PotentialInfo = collections.namedtuple(
 
 # Gravity
 cimport('from gravity import *')
-register('gravity', ['ppnonperiodic', 'pp', 'p3m', 'pm'], 'gravitational')
+register('gravity', ['ppnonperiodic', 'treenonperiodic', 'pp', 'p3m', 'tree', 'pm'], 'gravitational')
 @cython.pheader(
     # Arguments
     method=str,
@@ -2853,8 +3541,8 @@ register('gravity', ['ppnonperiodic', 'pp', 'p3m', 'pm'], 'gravitational')
 )
 def gravity(method, receivers, suppliers, ᔑdt, interaction_type, printout):
     force = 'gravity'
-    # Set up variables used by potential/grid (PM and P³M) methods
-    if method in {'pm', 'p3m'}:
+    # Set up variables used by potential/grid (PM, P³M and TreePM) methods
+    if method in {'pm', 'p3m', 'tree'}:
         potential_specs = get_potential_specs(force, method, receivers, suppliers)
         # The gravitational potential is given by the Poisson equation
         # ∇²φ = 4πGa²ρ = 4πGa**(-3*w_eff - 1)ϱ,
@@ -2928,6 +3616,37 @@ def gravity(method, receivers, suppliers, ᔑdt, interaction_type, printout):
             )
         if printout:
             masterprint('done')
+    elif method == 'tree':
+        # The tree-particle-mesh method
+        if printout:
+            extra_message = ''
+            if 𝔹['long' in interaction_type]:
+                extra_message = ' (long-range only)'
+            elif 𝔹['short' in interaction_type]:
+                extra_message = ' (short-range only)'
+            masterprint(
+                'Executing',
+                shortrange_progress_message(force, method, receivers, extra_message),
+                '...',
+            )
+        # The long-range PM part
+        if 𝔹['any' in interaction_type] or 𝔹['long' in interaction_type]:
+            potential = 'gravity long-range'
+            particle_mesh(
+                receivers, suppliers, potential_specs.gridsize, quantity, force, method, potential,
+                potential_specs.interpolation_order,
+                potential_specs.deconvolve.upstream, potential_specs.deconvolve.downstream,
+                potential_specs.interlace .upstream, potential_specs.interlace .downstream,
+                ᔑdt, ᔑdt_key,
+            )
+        # The short-range tree part
+        if 𝔹['any' in interaction_type] or 𝔹['short' in interaction_type]:
+            component_component(
+                force, receivers, suppliers, gravity_tree_shortrange, ᔑdt,
+                pairing_level='tile',
+            )
+        if printout:
+            masterprint('done')
     elif method == 'pp':
         # The particle-particle method with Ewald-periodicity
         if printout:
@@ -2957,6 +3676,20 @@ def gravity(method, receivers, suppliers, ᔑdt, interaction_type, printout):
         )
         if printout:
             masterprint('done')
+    elif method == 'treenonperiodic':
+        # The non-periodic tree (Barnes-Hut) method
+        if printout:
+            masterprint(
+                'Executing',
+                shortrange_progress_message(force, method, receivers),
+                '...',
+            )
+        component_component(
+            force, receivers, suppliers, gravity_tree_nonperiodic, ᔑdt,
+            pairing_level='domain',
+        )
+        if printout:
+            masterprint('done')
     elif master:
         abort(f'gravity() was called with the "{method}" method')
 
@@ -3035,10 +3768,3 @@ def lapse(method, receivers, suppliers, ᔑdt, interaction_type, printout):
             masterprint('done')
     elif master:
         abort(f'lapse() was called with the "{method}" method')
-
-
-
-# Get local domain information
-domain_info = get_domain_info()
-cython.declare(domain_subdivisions='int[::1]')
-domain_subdivisions = domain_info.subdivisions
@@ -0,0 +1,246 @@
+/*
+This file is part of CO𝘕CEPT, the cosmological 𝘕-body code in Python.
+Copyright © 2015–2024 Jeppe Mosgaard Dakin.
+
+CO𝘕CEPT is free software: You can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+CO𝘕CEPT is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with CO𝘕CEPT. If not, see https://www.gnu.org/licenses/
+
+The author of CO𝘕CEPT can be contacted at dakin(at)phys.au.dk
+The latest version of CO𝘕CEPT is available at
+https://github.com/jmd-dk/concept/
+*/
+
+
+
+
+/* This file defines the functions interpolate_particles_threaded and
+ * interpolate_grid_to_particles_threaded, which carry out particle to
+ * grid interpolation (mass assignment) and grid to particle
+ * interpolation (force gathering) using a team of OpenMP threads
+ * within each MPI process. They are the threaded counterparts to the
+ * interpolate_particles() and interpolate_domaingrid_to_particles()
+ * functions of the mesh module, implementing the same NGP, CIC, TSC
+ * and PCS weights as the set_weights_*() functions there.
+ */
+
+/* Note on race-free mass assignment
+ *
+ * The particles are visited tile by tile, using an interpolation
+ * tiling of the component (see init_interpolation_tiling() of the
+ * species module). Each tile is at least 6 grid cells wide, while a
+ * particle only touches grid cells within 2 cells of its position.
+ * Two tiles with 3D tile indices differing by at least 2 along some
+ * dimension thus never write to the same grid cells. We exploit this by
+ * colouring the tiles according to the parity of their 3D tile index,
+ * giving 2×2×2 = 8 colours. The colours are processed one after
+ * another, while all tiles of a given colour are distributed over the
+ * threads. No atomics or thread-private grids are then needed. The
+ * force gathering only writes to the particles themselves, and so is
+ * simply distributed over the particles.
+ */
+
+#define N_COLOURS 8
+#define ORDER_MAX 4
+
+/* Set the 1D interpolation weights of the given order (1: NGP,
+ * 2: CIC, 3: TSC, 4: PCS) for the scaled coordinate x, returning the
+ * grid index of the first weight. This mirrors the set_weights_*()
+ * functions of the mesh module.
+ */
+static inline Py_ssize_t set_weights(double x, int order, double* weights) {
+    Py_ssize_t index;
+    double dist;
+    if (order == 1) {
+        index = (Py_ssize_t)(x + 0.5);
+        weights[0] = 1;
+    }
+    else if (order == 2) {
+        index = (Py_ssize_t)x;
+        dist = x - index;
+        weights[0] = 1 - dist;
+        weights[1] = dist;
+    }
+    else if (order == 3) {
+        index = (Py_ssize_t)(x + 0.5);
+        dist = x - index;
+        index -= 1;
+        double dist2 = dist*dist;
+        double weight0 = 0.125 + 0.5*(dist2 - dist);
+        double weight1 = 0.75 - dist2;
+        weights[0] = weight0;
+        weights[1] = weight1;
+        weights[2] = 1 - weight0 - weight1;
+    }
+    else {
+        index = (Py_ssize_t)x - 1;
+        dist = x - index;
+        double tmp = 2 - dist;
+        double tmp2 = tmp*tmp;
+        double tmp3 = tmp*tmp2;
+        double weight0 = 1./6.*tmp3;
+        double weight2 = 2./3. - tmp2 + 0.5*tmp3;
+        double weight3 = 1./6.*(dist - 1)*(dist - 1)*(dist - 1);
+        weights[0] = weight0;
+        weights[1] = 1 - weight0 - weight2 - weight3;
+        weights[2] = weight2;
+        weights[3] = weight3;
+    }
+    return index;
+}
+
+void interpolate_particles_threaded(
+    int nthreads,
+    int order,
+    double* grid,
+    Py_ssize_t size_j,
+    Py_ssize_t size_k,
+    const double* pos,
+    const double* contribution_ptr,
+    double contribution,
+    double contribution_factor,
+    double offset_x,
+    double offset_y,
+    double offset_z,
+    double scaling,
+    Py_ssize_t*** tiles,
+    Py_ssize_t** tiles_rungs_N,
+    signed char* tiles_contain_particles,
+    Py_ssize_t* layout_1Dto3D,
+    Py_ssize_t tiling_size,
+    int n_rungs
+) {
+    /* Arguments to this function:
+     * - Number of threads to use.
+     * - Interpolation order (1: NGP, 2: CIC, 3: TSC, 4: PCS).
+     * - The domain grid (including ghost layers) to interpolate onto,
+     *   together with the sizes of its two last dimensions.
+     * - Particle positions.
+     * - Particle contributions. If contribution_ptr is NULL, the
+     *   constant contribution is used for all particles. Otherwise
+     *   the contribution of the particle with (3D) index indexx is
+     *   contribution_factor*contribution_ptr[indexx].
+     * - Offsets and scaling converting positions to grid units,
+     *   so that e.g. x = (pos_x - offset_x)*scaling.
+     * - The interpolation tiling data (tiles, rung occupation, tile
+     *   contents, 1D → 3D layout and number of tiles) together with
+     *   the number of rungs within each tile.
+     */
+    int colour;
+    Py_ssize_t tile_index;
+    for (colour = 0; colour < N_COLOURS; colour++) {
+        #pragma omp parallel for num_threads(nthreads) schedule(dynamic)
+        for (tile_index = 0; tile_index < tiling_size; tile_index++) {
+            /* Only handle non-empty tiles of the current colour */
+            Py_ssize_t* tile_index3D = layout_1Dto3D + 3*tile_index;
+            if (
+                  (tile_index3D[0]%2)*4
+                + (tile_index3D[1]%2)*2
+                + (tile_index3D[2]%2) != colour
+            )
+                continue;
+            if (tiles_contain_particles[tile_index] == 0)
+                continue;
+            Py_ssize_t** tile = tiles[tile_index];
+            Py_ssize_t* rungs_N = tiles_rungs_N[tile_index];
+            double weights_x[ORDER_MAX], weights_y[ORDER_MAX], weights_z[ORDER_MAX];
+            /* Loop over all particles in all rungs of the tile */
+            int rung_index;
+            for (rung_index = 0; rung_index < n_rungs; rung_index++) {
+                Py_ssize_t rung_N = rungs_N[rung_index];
+                if (rung_N == 0)
+                    continue;
+                Py_ssize_t* rung = tile[rung_index];
+                Py_ssize_t rung_particle_index;
+                for (rung_particle_index = 0; rung_particle_index < rung_N; rung_particle_index++) {
+                    Py_ssize_t indexx = 3*rung[rung_particle_index];
+                    double contribution_particle = contribution;
+                    if (contribution_ptr != NULL)
+                        contribution_particle = contribution_factor*contribution_ptr[indexx];
+                    /* Get, translate and scale the coordinates */
+                    double x = (pos[indexx + 0] - offset_x)*scaling;
+                    double y = (pos[indexx + 1] - offset_y)*scaling;
+                    double z = (pos[indexx + 2] - offset_z)*scaling;
+                    Py_ssize_t index_i = set_weights(x, order, weights_x);
+                    Py_ssize_t index_j = set_weights(y, order, weights_y);
+                    Py_ssize_t index_k = set_weights(z, order, weights_z);
+                    /* Assign the contribution to the grid */
+                    int i, j, k;
+                    for (i = 0; i < order; i++) {
+                        double weight_i = contribution_particle*weights_x[i];
+                        for (j = 0; j < order; j++) {
+                            double weight_ij = weight_i*weights_y[j];
+                            double* grid_ij = grid + ((index_i + i)*size_j + (index_j + j))*size_k + index_k;
+                            for (k = 0; k < order; k++)
+                                grid_ij[k] += weight_ij*weights_z[k];
+                        }
+                    }
+                }
+            }
+        }
+    }
+}
+
+void interpolate_grid_to_particles_threaded(
+    int nthreads,
+    int order,
+    const double* grid,
+    Py_ssize_t size_j,
+    Py_ssize_t size_k,
+    const double* pos,
+    double* ptr_dim,
+    Py_ssize_t N_local,
+    double offset_x,
+    double offset_y,
+    double offset_z,
+    double scaling,
+    double factor
+) {
+    /* Arguments to this function:
+     * - Number of threads to use.
+     * - Interpolation order (1: NGP, 2: CIC, 3: TSC, 4: PCS).
+     * - The domain grid (including ghost layers) to interpolate from,
+     *   together with the sizes of its two last dimensions.
+     * - Particle positions.
+     * - Particle data to update, indexed as ptr_dim[indexx] with
+     *   indexx the 3D index of the particle, together with the number
+     *   of local particles.
+     * - Offsets and scaling converting positions to grid units,
+     *   so that e.g. x = (pos_x - offset_x)*scaling.
+     * - Factor by which to multiply the interpolated values.
+     */
+    Py_ssize_t indexx;
+    #pragma omp parallel for num_threads(nthreads) schedule(static)
+    for (indexx = 0; indexx < 3*N_local; indexx += 3) {
+        double weights_x[ORDER_MAX], weights_y[ORDER_MAX], weights_z[ORDER_MAX];
+        /* Get, translate and scale the coordinates */
+        double x = (pos[indexx + 0] - offset_x)*scaling;
+        double y = (pos[indexx + 1] - offset_y)*scaling;
+        double z = (pos[indexx + 2] - offset_z)*scaling;
+        Py_ssize_t index_i = set_weights(x, order, weights_x);
+        Py_ssize_t index_j = set_weights(y, order, weights_y);
+        Py_ssize_t index_k = set_weights(z, order, weights_z);
+        /* Gather the weighted grid values */
+        double value = 0;
+        int i, j, k;
+        for (i = 0; i < order; i++) {
+            for (j = 0; j < order; j++) {
+                const double* grid_ij = grid + ((index_i + i)*size_j + (index_j + j))*size_k + index_k;
+                double value_ij = 0;
+                for (k = 0; k < order; k++)
+                    value_ij += grid_ij[k]*weights_z[k];
+                value += weights_x[i]*weights_y[j]*value_ij;
+            }
+        }
+        ptr_dim[indexx] += factor*value;
+    }
+}
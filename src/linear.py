@@ -1548,15 +1548,57 @@ class TransferFunction:
         # process method, one can show that the following is the maximum
         # possible number of intervals needed.
         self.n_intervals = 2*len(find_critical_times()) + 4
+        # The largest k at which the perturbations are trusted
+        self.k_max = self.find_k_max()
         # Construct splines of the transfer function as a function of a,
-        # for the k modes stored by this process.
-        self.k_max = class_k_max.get('all', ထ)
+        # for the k modes stored by this process. If the processed
+        # transfer function is available in the CLASS dump, it is
+        # loaded from there. Otherwise the processing is carried out,
+        # with the result saved to the CLASS dump for later reuse.
         self.factors   = empty((self.k_gridsize_local, self.n_intervals), dtype=C2np['double'])
         self.exponents = empty((self.k_gridsize_local, self.n_intervals), dtype=C2np['double'])
         self.splines   = empty((self.k_gridsize_local, self.n_intervals), dtype=object)
         self.a_values          = [None]*self.k_gridsize_local
         self.interval_boarders = [None]*self.k_gridsize_local
-        self.process()
+        if not self.load():
+            self.process()
+            self.save()
+
+    # Method returning the largest k at which the perturbations of this
+    # transfer function are trusted, as specified by class_k_max.
+    @cython.header(
+        # Locals
+        approximate_P_as_wρ='bint',
+        class_perturbation_name=str,
+        class_species=str,
+        k_max='double',
+        k_max_candidate='double',
+        key=str,
+        perturbation_key=str,
+        perturbation_keys=set,
+        returns='double',
+    )
+    def find_k_max(self):
+        class_perturbation_name = transferfunctions_registered[self.var_name].name_class
+        approximate_P_as_wρ = (self.var_name == 'δP' and self.component.approximations['P=wρ'])
+        # The k_max is dependent on the CLASS species
+        perturbation_keys = set()
+        for class_species in self.class_species.split('+'):
+            perturbation_keys.add(class_perturbation_name.format(class_species))
+        if self.var_name == 'δP':
+            for class_species in self.class_species.split('+'):
+                perturbation_keys.add(f'delta_{class_species}')
+                if not approximate_P_as_wρ:
+                    perturbation_keys.add(f'cs2_{class_species}')
+        k_max = class_k_max.get('all', ထ)
+        for perturbation_key in perturbation_keys:
+            for key, k_max_candidate in class_k_max.items():
+                if k_max_candidate < k_max:
+                    if perturbation_key == key:
+                        k_max = k_max_candidate
+                    elif re.search(key, perturbation_key):
+                        k_max = k_max_candidate
+        return k_max
 
     # Method for processing the transfer function data from CLASS.
     # The end result is the population self.splines, self.factors
@@ -1583,8 +1625,6 @@ class TransferFunction:
         interval_perturbation_values='double[::1]',
         k='Py_ssize_t',
         k_local='Py_ssize_t',
-        k_max_candidate='double',
-        key=str,
         largest_trusted_k='Py_ssize_t',
         missing_perturbations_warning=str,
         n_outliers='Py_ssize_t',
@@ -1595,8 +1635,6 @@ class TransferFunction:
         outliers_list=list,
         perturbation=object,  # np.ndarray or double
         perturbation_k=object,  # PerturbationDict
-        perturbation_key=str,
-        perturbation_keys=set,
         perturbation_values='double[::1]',
         perturbation_values_arr=object,  # np.ndarray
         perturbation_values_auxiliary='double[::1]',
@@ -1645,22 +1683,6 @@ class TransferFunction:
             class_species: True for class_species in self.class_species.split('+')
         }
         approximate_P_as_wρ = (self.var_name == 'δP' and self.component.approximations['P=wρ'])
-        # Update self.k_max dependent on the CLASS species
-        perturbation_keys = set()
-        for class_species in self.class_species.split('+'):
-            perturbation_keys.add(class_perturbation_name.format(class_species))
-        if self.var_name == 'δP':
-            for class_species in self.class_species.split('+'):
-                perturbation_keys.add(f'delta_{class_species}')
-                if not approximate_P_as_wρ:
-                    perturbation_keys.add(f'cs2_{class_species}')
-        for perturbation_key in perturbation_keys:
-            for key, k_max_candidate in class_k_max.items():
-                if k_max_candidate < self.k_max:
-                    if perturbation_key == key:
-                        self.k_max = k_max_candidate
-                    elif re.search(key, perturbation_key):
-                        self.k_max = k_max_candidate
         # Number of additional points on each side of the interval
         # to include when doing the detrending and splining.
         crossover = 3
@@ -2221,6 +2243,217 @@ class TransferFunction:
     def power_law(x, factor, exponent):
         return factor*x**exponent
 
+    # Method for saving the processed transfer function to the
+    # CLASS dump of the CosmoResults, so that later simulations using
+    # the same cosmology can skip the processing. The processed data of
+    # all processes is gathered at the master process, which then saves
+    # it as /transferfunctions/class_species/var_name/k.
+    @cython.header(
+        # Locals
+        approximate_P_as_wρ='bint',
+        k='Py_ssize_t',
+        k_local='Py_ssize_t',
+        key=str,
+        n_modes='Py_ssize_t',
+        path=str,
+        processed=dict,
+        rank_other='int',
+        transferfunction_h5=object,  # h5py.Group
+        val=object,  # np.ndarray
+    )
+    def save(self):
+        # Do not save anything if a filename was passed to the
+        # CosmoResults, in which case its id is None. Also, the
+        # processed δP perturbations depend on the equation of state of
+        # the component when the P=wρ approximation is enabled, and so
+        # we do not save these.
+        approximate_P_as_wρ = (self.var_name == 'δP' and self.component.approximations['P=wρ'])
+        if self.cosmoresults.id is None or approximate_P_as_wρ:
+            return
+        if not master:
+            if bcast():
+                return
+            send(self.k_gridsize_local, dest=master_rank)
+            for k_local in range(self.k_gridsize_local):
+                send(self.k_indices[k_local], dest=master_rank)
+                send(self.get_processed(k_local), dest=master_rank)
+            return
+        path = f'transferfunctions/{self.class_species}/{self.var_name}'
+        with open_hdf5(self.cosmoresults.filename, mode='a') as hdf5_file:
+            # Do not overwrite existing processed data
+            # matching that of this transfer function.
+            transferfunction_h5 = hdf5_file.get(path)
+            if bcast(
+                transferfunction_h5 is not None and self.is_reusable(transferfunction_h5)
+            ):
+                return
+            if transferfunction_h5 is not None:
+                del hdf5_file[path]
+            transferfunction_h5 = hdf5_file.create_group(path)
+            for rank_other in range(nprocs):
+                if rank_other == rank:
+                    n_modes = self.k_gridsize_local
+                else:
+                    n_modes = recv(source=rank_other)
+                for k_local in range(n_modes):
+                    if rank_other == rank:
+                        k = self.k_indices[k_local]
+                        processed = self.get_processed(k_local)
+                    else:
+                        k = recv(source=rank_other)
+                        processed = recv(source=rank_other)
+                    transferfunction_h5.create_group(str(k))
+                    for key, val in processed.items():
+                        transferfunction_h5[str(k)].create_dataset(key, data=val)
+            # The attributes are written last, marking the processed
+            # data as complete.
+            transferfunction_h5.attrs['a_begin'] = universals.a_begin
+            transferfunction_h5.attrs['k_max'] = self.k_max/units.Mpc**(-1)
+            transferfunction_h5.attrs['n_intervals'] = self.n_intervals
+            hdf5_file.flush()
+
+    # Method for loading the processed transfer function from the
+    # CLASS dump of the CosmoResults. If successful, True will be
+    # returned by all processes. Otherwise, False will be returned by
+    # all processes and the transfer function should be processed.
+    @cython.header(
+        # Locals
+        approximate_P_as_wρ='bint',
+        k='Py_ssize_t',
+        k_indices='Py_ssize_t[::1]',
+        k_local='Py_ssize_t',
+        processed=dict,
+        rank_other='int',
+        reusable='bint',
+        transferfunction_h5=object,  # h5py.Group
+        returns='bint',
+    )
+    def load(self):
+        # Loaded transfer functions cannot have their detrended
+        # perturbations plotted, so we always process the
+        # transfer function when such plots are requested.
+        approximate_P_as_wρ = (self.var_name == 'δP' and self.component.approximations['P=wρ'])
+        if not class_reuse or class_plot_perturbations or approximate_P_as_wρ:
+            return False
+        if not master:
+            if not bcast():
+                return False
+            send(asarray(self.k_indices), dest=master_rank)
+            for k_local in range(self.k_gridsize_local):
+                self.set_processed(k_local, recv(source=master_rank))
+            return bcast()
+        if not os.path.isfile(self.cosmoresults.filename):
+            return bcast(False)
+        with open_hdf5(self.cosmoresults.filename, mode='r') as hdf5_file:
+            transferfunction_h5 = hdf5_file.get(
+                f'transferfunctions/{self.class_species}/{self.var_name}'
+            )
+            reusable = (transferfunction_h5 is not None and self.is_reusable(transferfunction_h5))
+            if not bcast(reusable):
+                return False
+            masterprint(
+                f'Loading processed {self.var_name} perturbations '
+                + ('' if self.component is None else f'for {self.component.name} ')
+                + f'from "{self.cosmoresults.filename}" ...'
+            )
+            for rank_other in range(nprocs):
+                if rank_other == rank:
+                    k_indices = self.k_indices
+                else:
+                    k_indices = recv(source=rank_other)
+                for k_local in range(k_indices.shape[0]):
+                    k = k_indices[k_local]
+                    processed = {
+                        key: dset[...]
+                        for key, dset in transferfunction_h5[str(k)].items()
+                    }
+                    if rank_other == rank:
+                        self.set_processed(k_local, processed)
+                    else:
+                        send(processed, dest=rank_other)
+        masterprint('done')
+        return bcast(True)
+
+    # Helper methods for the save and load methods
+    @cython.header(
+        # Arguments
+        transferfunction_h5=object,  # h5py.Group
+        # Locals
+        returns='bint',
+    )
+    def is_reusable(self, transferfunction_h5):
+        # Processed data which does not match this transfer function,
+        # or which was not completely written, is not reusable.
+        if 'n_intervals' not in transferfunction_h5.attrs:
+            return False
+        return (
+                transferfunction_h5.attrs['n_intervals'] == self.n_intervals
+            and len(transferfunction_h5) == self.k_gridsize
+            and isclose(transferfunction_h5.attrs['a_begin'], universals.a_begin)
+            and isclose(transferfunction_h5.attrs['k_max'], self.k_max/units.Mpc**(-1))
+        )
+    @cython.header(
+        # Arguments
+        k_local='Py_ssize_t',
+        # Locals
+        spline='Spline',
+        splines=list,
+        returns=dict,
+    )
+    def get_processed(self, k_local):
+        # The splines of the intervals are stored as the concatenated
+        # x and y data along with the size of each interval.
+        splines = [spline for spline in self.splines[k_local, :] if spline is not None]
+        return {
+            'a': asarray(self.a_values[k_local]).copy(),
+            'interval_boarders': asarray(self.interval_boarders[k_local]).copy(),
+            'factors': asarray(self.factors[k_local, :]).copy(),
+            'exponents': asarray(self.exponents[k_local, :]).copy(),
+            'spline_sizes': asarray(
+                [spline.x.shape[0] for spline in splines], dtype=C2np['Py_ssize_t'],
+            ),
+            'spline_x': np.concatenate(
+                [empty(0, dtype=C2np['double'])] + [asarray(spline.x) for spline in splines]
+            ),
+            'spline_y': np.concatenate(
+                [empty(0, dtype=C2np['double'])] + [asarray(spline.y) for spline in splines]
+            ),
+        }
+    @cython.header(
+        # Arguments
+        k_local='Py_ssize_t',
+        processed=dict,
+        # Locals
+        i='Py_ssize_t',
+        index='Py_ssize_t',
+        k='Py_ssize_t',
+        size='Py_ssize_t',
+        spline_sizes='Py_ssize_t[::1]',
+        spline_x='double[::1]',
+        spline_y='double[::1]',
+    )
+    def set_processed(self, k_local, processed):
+        k = self.k_indices[k_local]
+        self.a_values[k_local] = processed['a']
+        self.interval_boarders[k_local] = processed['interval_boarders']
+        asarray(self.factors  )[k_local, :] = processed['factors']
+        asarray(self.exponents)[k_local, :] = processed['exponents']
+        spline_sizes = asarray(processed['spline_sizes'], dtype=C2np['Py_ssize_t'])
+        spline_x = processed['spline_x']
+        spline_y = processed['spline_y']
+        index = 0
+        for i in range(spline_sizes.shape[0]):
+            size = spline_sizes[i]
+            self.splines[k_local, i] = Spline(
+                spline_x[index:index+size],
+                spline_y[index:index+size],
+                f'detrended {self.class_species} {self.var_name} perturbations '
+                f'as function of a at k = {self.k_magnitudes[k]} {unit_length}⁻¹ '
+                f'in interval {i} (loaded from the CLASS dump)',
+                logx=True,
+            )
+            index += size
+
     # Method which finds out which scale factor interval a given scale
     # factor value lies within, given the local perturbation index.
     @cython.header(
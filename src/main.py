@@ -31,6 +31,14 @@ cimport(
     '    measure,         '
     '    powerspec,       '
 )
+cimport(
+    'from communication import   '
+    '    balance_domain_cuts,      '
+    '    clear_buffer_tilings,     '
+    '    exchange,                 '
+    '    report_exchange_cost,     '
+    '    set_domain_decomposition, '
+)
 cimport(
     'from graphics import '
     '    render2D,        '
@@ -45,11 +53,18 @@ cimport(
     '    scale_factor,         '
     '    scalefactor_integral, '
 )
+cimport(
+    'from mesh import              '
+    '    clear_domain_grid_caches, '
+    '    get_domain_gridsizes,     '
+    '    manage_memory,            '
+)
 cimport(
     'from snapshot import        '
     '    get_initial_conditions, '
     '    save,                   '
 )
+cimport('from species import adapt_subtilings, clear_tiling_shapes')
 cimport('from utilities import delegate')
 
 # Pure Python imports
@@ -76,6 +91,7 @@ import interactions
     output_filenames=dict,
     output_filenames_autosave=dict,
     recompute_Δt_max='bint',
+    shortrange_computation_time='double',
     static_timestepping_func=object,  # callable or None
     subtiling='Tiling',
     subtiling_computation_times=object,  # collections.defaultdict
@@ -149,6 +165,13 @@ def timeloop():
             if time_value_dump >= time_value_current:
                 dump_times_updated.append(dump_time)
         dump_times = dump_times_updated
+    elif initial_conditions_streaming:
+        # The realisation of particle components has been deferred
+        # until they are saved, at which point they are realised
+        # directly onto disk, never residing in memory as a whole.
+        # The only output possible is then a CO𝘕CEPT snapshot
+        # (including all such components) at the initial time.
+        check_streamed_output(dump_times)
     # Stow away passive components into a separate (global) list.
     # We should always keep it such that
     #   components + passive_components
@@ -201,6 +224,9 @@ def timeloop():
     # Mapping from (short-range) interaction names
     # to (subtile) computation times.
     subtiling_computation_times = collections.defaultdict(lambda: collections.defaultdict(float))
+    # Total short-range computation time since the last
+    # (possible) rebalancing of the domain decomposition.
+    shortrange_computation_time = 0
     # The main time loop
     masterprint('Beginning of main time loop')
     time_step = initial_time_step
@@ -233,9 +259,29 @@ def timeloop():
                             continue
                         subtiling_computation_times[component][match.group(1)
                             ] += subtiling.computation_time_total
+                        shortrange_computation_time += subtiling.computation_time_total
+                    # Short-range interactions not making use of the
+                    # subtiles store their computation time
+                    # on the tiling.
+                    for tiling_name, tiling in component.tilings.items():
+                        if tiling_name.endswith(' (tiles)'):
+                            shortrange_computation_time += tiling.computation_time_total
+                    # Feed the computation times measured for the
+                    # individual tiles back into the adaptive
+                    # subtiling levels.
+                    adapt_subtilings(component, time_step)
                 # Print out message at the end of each time step
+                # and manage the memory of buffers and slabs.
                 if time_step > initial_time_step:
                     print_timestep_footer(components)
+                    manage_memory(report=True)
+                # Periodically rebalance the domain decomposition
+                if 𝔹[domain_balancing['dynamic']] and time_step > initial_time_step:
+                    if (time_step - initial_time_step)%domain_balancing['period'] == 0:
+                        rebalance_domains(
+                            components + passive_components, shortrange_computation_time,
+                        )
+                        shortrange_computation_time = 0
                 # Reset all computation_time_total tiling attributes
                 for component in components:
                     for tiling in component.tilings.values():
@@ -668,6 +714,7 @@ def prepare_static_timestepping():
     bottleneck_hubble=str,
     component='Component',
     extreme_force=str,
+    extreme_method=str,
     force=str,
     gridsize='Py_ssize_t',
     key=tuple,
@@ -727,9 +774,9 @@ def get_base_timestep_size(components, static_timestepping_func=None):
       would take to traverse a PM grid cell for a particle/fluid element
       with the rms velocity of all particles/fluid elements within a
       given component.
-    - For particle components using the P³M method: The time it would
-      take to traverse the long/short-range force split scale for a
-      particle with the rms velocity of all particles within a
+    - For particle components using the P³M (or TreePM) method: The time
+      it would take to traverse the long/short-range force split scale
+      for a particle with the rms velocity of all particles within a
       given component.
     The return value is a tuple containing the maximum allowed Δt and a
     str stating which limiter is the bottleneck.
@@ -861,18 +908,19 @@ def get_base_timestep_size(components, static_timestepping_func=None):
         if component.representation == 'fluid' and component.is_linear(0):
             continue
         # Find P³M resolution for this component.
-        # The P³M method is only implemented for gravity.
+        # The P³M and TreePM methods are only implemented for gravity.
         scale = ထ
         for force, method in component.forces.items():
-            if method != 'p3m':
+            if method not in ('p3m', 'tree'):
                 continue
             if force != 'gravity':
                 abort(
-                    f'Force "{force}" with method "P³M" unknown to get_base_timestep_size()'
+                    f'Force "{force}" with method "{method}" unknown to get_base_timestep_size()'
                 )
             if ℝ[shortrange_params['gravity']['scale']] < scale:
                 scale = ℝ[shortrange_params['gravity']['scale']]
                 extreme_force = 'gravity'
+                extreme_method = ('P³M' if method == 'p3m' else 'TreePM')
         if scale == ထ:
             continue
         # Find rms velocity
@@ -889,7 +937,9 @@ def get_base_timestep_size(components, static_timestepping_func=None):
         Δt_p3m = fac_p3m*Δx_max/v_rms
         if Δt_p3m < Δt_max:
             Δt_max = Δt_p3m
-            bottleneck = f'the P³M method of the {extreme_force} force for {component.name}'
+            bottleneck = (
+                f'the {extreme_method} method of the {extreme_force} force for {component.name}'
+            )
     # Reduce the found Δt_max by Δt_initial_fac
     # if we are at a time which demands this reduction.
     if t in initial_fac_times:
@@ -1658,6 +1708,230 @@ def initialize_rung_populations(components, Δt):
     kick_short(components, Δt, fake=True)
     masterprint('done')
 
+# Function for rebalancing the domain decomposition according to the
+# measured short-range computation time. The domain cuts are placed on
+# a lattice commensurate with all domain grids and tilings, with the
+# cuts along each dimension placed so as to equalise the computational
+# cost of the resulting slices of the box. When no short-range
+# computation time is available, the number of particles is
+# balanced instead.
+@cython.header(
+    # Arguments
+    components=list,
+    computation_time='double',
+    # Locals
+    component='Component',
+    computation_times=object,  # np.ndarray
+    costs=object,  # np.ndarray
+    cuts_units=list,
+    dim='int',
+    factor='Py_ssize_t',
+    first='bint',
+    gridsize='Py_ssize_t',
+    gridsizes=set,
+    gridsizes_method=dict,
+    imbalance='double',
+    indices=object,  # np.ndarray
+    kind=str,
+    loads=object,  # np.ndarray
+    match=object,  # re.Match
+    N_local='Py_ssize_t',
+    particle_components=list,
+    resolution='int[::1]',
+    tiles_per_unit='Py_ssize_t',
+    tilesize='double',
+    tilesizes=list,
+    tiling_name=str,
+    use_time='bint',
+    weight='double',
+    width_min='int[::1]',
+    returns='void',
+)
+def rebalance_domains(components, computation_time):
+    if nprocs == 1 or domain_balancing_state.get('disabled'):
+        return
+    # Non-uniform domains are not implemented for fluid components
+    if any([component.representation == 'fluid' for component in components]):
+        masterwarn(
+            'Dynamic domain balancing is not available in the presence '
+            'of fluid components and will be switched off'
+        )
+        domain_balancing_state['disabled'] = True
+        return
+    # Subtilings under tentative refinement must not be replaced,
+    # so postpone any rebalancing until the refinement is judged.
+    if interactions.subtiling_refinement_ongoing():
+        return
+    particle_components = [
+        component for component in components if component.representation == 'particles'
+    ]
+    N_local = 0
+    for component in particle_components:
+        N_local += component.N_local
+    # Measure the load imbalance
+    computation_times = asarray(allgather(computation_time), dtype=C2np['double'])
+    use_time = (np.sum(computation_times) > 0)
+    if use_time:
+        loads = computation_times
+    else:
+        loads = asarray(allgather(N_local), dtype=C2np['double'])
+    if np.mean(loads) == 0:
+        return
+    imbalance = np.max(loads)/np.mean(loads) - 1
+    if imbalance <= domain_balancing['tolerance']:
+        return
+    # Collect the sizes of all tiles and domain grids in use
+    tilesizes = []
+    for component in particle_components:
+        for tiling_name in component.tilings:
+            match = re.fullmatch(r'(.+) \(tiles\)', tiling_name)
+            if match:
+                tilesizes.append(shortrange_params[match.group(1)]['tilesize'])
+    gridsizes = set(get_domain_gridsizes())
+    for component in particle_components:
+        for gridsizes_method in component.potential_gridsizes.values():
+            for gridsize_pair in gridsizes_method.values():
+                gridsizes |= set(any2list(gridsize_pair))
+        for kind in ('powerspec', 'bispec', 'render2D', 'render3D'):
+            gridsizes.add(getattr(component, f'{kind}_upstream_gridsize'))
+    gridsizes = {gridsize for gridsize in gridsizes if gridsize > 1}
+    # Choose the resolution of the lattice on which the domain cuts
+    # are placed, once and for all. Along each dimension, this is the
+    # largest multiple of the number of domain subdivisions which
+    # divides all grid sizes, while still being coarser than all tiles.
+    first = ('resolution' not in domain_balancing_state)
+    if first:
+        resolution = asarray(domain_subdivisions).copy()
+        for dim in range(3):
+            gridsize = (
+                np.gcd.reduce(list(gridsizes)) if gridsizes
+                else 64*domain_subdivisions[dim]
+            )
+            for factor in range(gridsize//domain_subdivisions[dim], 0, -1):
+                if gridsize%(domain_subdivisions[dim]*factor) != 0:
+                    continue
+                if tilesizes and (
+                    boxsize/(domain_subdivisions[dim]*factor)
+                    < np.max(tilesizes)*(1 - machine_ϵ)
+                ):
+                    continue
+                resolution[dim] = domain_subdivisions[dim]*factor
+                break
+        if np.all(asarray(resolution) == asarray(domain_subdivisions)):
+            masterwarn(
+                'Dynamic domain balancing is not possible as no lattice finer '
+                'than the domain decomposition is commensurate with all grids and '
+                'tilings. Dynamic domain balancing will be switched off.'
+            )
+            domain_balancing_state['disabled'] = True
+            return
+        domain_balancing_state['resolution'] = resolution
+    resolution = domain_balancing_state['resolution']
+    # Each domain must span enough lattice units to contain at least
+    # 3 tiles and 2*nghosts grid points along each dimension.
+    width_min = ones(3, dtype=C2np['int'])
+    for dim in range(3):
+        for tilesize in tilesizes:
+            tiles_per_unit = int((boxsize/resolution[dim])/tilesize*(1 + machine_ϵ))
+            width_min[dim] = pairmax(width_min[dim], -(-3//tiles_per_unit))
+        for gridsize in gridsizes:
+            width_min[dim] = pairmax(
+                width_min[dim], -(-ℤ[2*nghosts]*resolution[dim]//gridsize),
+            )
+    # Construct histograms of the cost along each dimension,
+    # with the cost of each local particle given by the mean
+    # local cost per particle.
+    weight = 0
+    if N_local > 0:
+        weight = (computation_time/N_local if use_time else 1)
+    cuts_units = []
+    for dim in range(3):
+        costs = zeros(resolution[dim], dtype=C2np['double'])
+        for component in particle_components:
+            indices = asarray(
+                asarray(component.pos_mv[:3*component.N_local])[dim::3]
+                *(resolution[dim]/boxsize),
+                dtype=C2np['Py_ssize_t'],
+            )
+            np.clip(indices, 0, resolution[dim] - 1, out=indices)
+            costs += weight*np.bincount(indices, minlength=resolution[dim])
+        Allreduce(MPI.IN_PLACE, costs)
+        if master:
+            cuts_units.append(
+                balance_domain_cuts(costs, domain_subdivisions[dim], width_min[dim])
+            )
+    cuts_units = bcast(cuts_units)
+    # Install the new domain decomposition and discard everything
+    # depending on the old one. The subtilings only depend on the
+    # extent of the tiles, which is left unchanged by all but the
+    # first rebalancing.
+    masterprint(f'Rebalancing domains (load imbalance: {imbalance:.1%}) ...')
+    set_domain_decomposition(resolution, cuts_units)
+    clear_domain_grid_caches()
+    clear_tiling_shapes(first)
+    interactions.clear_tile_pairings()
+    clear_buffer_tilings(() if first else (' (subtiles',))
+    for component in components:
+        for tiling_name in list(component.tilings.keys()):
+            if tiling_name == 'trivial' or (not first and ' (subtiles' in tiling_name):
+                continue
+            component.tilings.pop(tiling_name)
+    # Move the particles to their new domains
+    for component in particle_components:
+        exchange(component)
+    for dim in range(3):
+        masterprint(
+            f'Domain cuts along {"xyz"[dim]}: '
+            + ', '.join([
+                significant_figures(cut*boxsize/resolution[dim], 4, fmt='unicode')
+                for cut in cuts_units[dim]
+            ])
+            + f' {unit_length}',
+            indent=4,
+        )
+    masterprint('done')
+# State of the dynamic domain balancing
+cython.declare(domain_balancing_state=dict)
+domain_balancing_state = {}
+
+# Function checking that the output is compatible with initial
+# conditions streamed directly to disk.
+@cython.header(
+    # Arguments
+    dump_times=list,
+    # Locals
+    dump_time=object,  # collections.namedtuple
+    output_kinds_dump=list,
+    time_param=str,
+    time_value='double',
+    returns='void',
+)
+def check_streamed_output(dump_times):
+    if snapshot_type != 'concept':
+        abort(
+            f'Initial conditions can only be streamed to CO𝘕CEPT snapshots, '
+            f'but snapshot_type = "{snapshot_type}"'
+        )
+    dump_time = dump_times[0]
+    if len(dump_times) > 1 or (dump_time.t != universals.t and dump_time.a != universals.a):
+        abort(
+            'When streaming initial conditions (initial_conditions_streaming = True), '
+            'all output must take place at the initial time'
+        )
+    time_param = dump_time.time_param
+    time_value = {'t': dump_time.t, 'a': dump_time.a}[time_param]
+    output_kinds_dump = [
+        output_kind
+        for output_kind in output_kinds
+        if time_value in output_times[time_param][output_kind]
+    ]
+    if output_kinds_dump != ['snapshot']:
+        abort(
+            'When streaming initial conditions (initial_conditions_streaming = True), '
+            'only snapshot output is possible, but the following output is specified: '
+            + ', '.join(output_kinds_dump)
+        )
+
 # Function which dump all types of output
 @cython.header(
     # Arguments
@@ -1698,6 +1972,9 @@ def dump(components, output_filenames, dump_time, Δt=0):
         if time_param == 't':
             filename += unit_time
         output_func(components, filename)
+        # Different outputs may make use of slabs of different grid
+        # sizes, which should not all be kept around.
+        manage_memory()
     # Activate or terminate components after dumps
     for act in 𝕆[life_output_order[life_output_order.index('dump')+1:]]:
         if time_value in activation_termination_times[time_param]:
@@ -2177,6 +2454,9 @@ def print_timestep_footer(components):
                     masterprint(f'Load imbalance: {imbalance_str} (process {rank_max_load})')
     elif ...:
         ...
+    # Print out the cost of the particle exchanges
+    if 𝔹[print_exchange_cost]:
+        report_exchange_cost()
 # Arrays used by the print_timestep_footer() function
 cython.declare(direct_summation_times='double[::1]', imbalances='double[::1]')
 direct_summation_times = empty(nprocs, dtype=C2np['double']) if master else None
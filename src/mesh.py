@@ -27,18 +27,17 @@ from commons import *
 # Cython imports
 cimport(
     'from communication import '
-    '    communicate_ghosts,   '
-    '    get_buffer,           '
-    '    partition,            '
-    '    smart_mpi,            '
+    '    advance_buffers_epoch, '
+    '    communicate_ghosts,    '
+    '    free_buffer,           '
+    '    get_buffer,            '
+    '    get_buffers_usage,     '
+    '    smart_mpi,             '
 )
 
 # Pure Python imports
 from communication import get_domain_info
 
-# Function pointer types used in this module
-pxd('ctypedef double* (*func_dstar_ddd)(double, double, double)')
-
 # Import declarations from fft.c
 pxd("""
 # FFT functionality via FFTW from fft.c
@@ -63,11 +62,125 @@ cdef extern from "fft.c":
                                   char*     rigor,
                                   bint      fftw_wisdom_reuse,
                                   char*     wisdom_filename,
+                                  int       nthreads,
                                   )
     void fftw_execute(fftw_plan plan)
+    void fftw_destroy_plan(fftw_plan plan)
     void fftw_clean(double* grid, fftw_plan plan_forward,
                                   fftw_plan plan_backward)
     void fftw_free(double* grid)
+    # Single-precision plans and transforms
+    ctypedef struct fftwf_plan_struct:
+        pass
+    ctypedef fftwf_plan_struct *fftwf_plan
+    struct fftw_single_struct:
+        fftwf_plan plan_forward
+        fftwf_plan plan_backward
+    bint fftw_single_available()
+    fftw_single_struct fftw_setup_single(ptrdiff_t gridsize_i,
+                                         ptrdiff_t gridsize_j,
+                                         ptrdiff_t gridsize_k,
+                                         char*     rigor,
+                                         bint      fftw_wisdom_reuse,
+                                         char*     wisdom_filename,
+                                         int       nthreads,
+                                         )
+    void fftw_execute_single(fftwf_plan plan,
+                             double*    grid,
+                             ptrdiff_t  size,
+                             bint       forward,
+                             int        nthreads,
+                             )
+    void fftw_destroy_single(fftwf_plan plan_forward,
+                             fftwf_plan plan_backward,
+                             )
+""")
+
+# Import declarations from fourier.c
+pxd("""
+# Threaded Fourier space slab operations from fourier.c
+cdef extern from "fourier.c":
+    void fourier_slab_threaded(
+        int nthreads,
+        double* slab,
+        Py_ssize_t gridsize,
+        Py_ssize_t slab_size_j,
+        Py_ssize_t slab_start_j,
+        int deconv_order,
+        double deconv_factor,
+        double interlace_factor,
+        bint interlace,
+        double theta_i,
+        double theta_j,
+        double theta_k,
+        int diff_dim,
+        double k_fundamental,
+        bint green,
+        double green_factor,
+        double green_exponent,
+    )
+    void fourier_slab_fused_threaded(
+        int nthreads,
+        double* slab,
+        double* slab_x,
+        double* slab_y,
+        double* slab_z,
+        Py_ssize_t gridsize,
+        Py_ssize_t slab_size_j,
+        Py_ssize_t slab_start_j,
+        int deconv_order,
+        double deconv_factor,
+        double interlace_factor,
+        bint interlace,
+        double theta_i,
+        double theta_j,
+        double theta_k,
+        double k_fundamental,
+        double green_factor,
+        double green_exponent,
+    )
+""")
+
+# Import declarations from interpolation.c
+pxd("""
+# Threaded particle interpolation from interpolation.c
+cdef extern from "interpolation.c":
+    void interpolate_particles_threaded(
+        int nthreads,
+        int order,
+        double* grid,
+        Py_ssize_t size_j,
+        Py_ssize_t size_k,
+        const double* pos,
+        const double* contribution_ptr,
+        double contribution,
+        double contribution_factor,
+        double offset_x,
+        double offset_y,
+        double offset_z,
+        double scaling,
+        Py_ssize_t*** tiles,
+        Py_ssize_t** tiles_rungs_N,
+        signed char* tiles_contain_particles,
+        Py_ssize_t* layout_1Dto3D,
+        Py_ssize_t tiling_size,
+        int n_rungs,
+    )
+    void interpolate_grid_to_particles_threaded(
+        int nthreads,
+        int order,
+        const double* grid,
+        Py_ssize_t size_j,
+        Py_ssize_t size_k,
+        const double* pos,
+        double* ptr_dim,
+        Py_ssize_t N_local,
+        double offset_x,
+        double offset_y,
+        double offset_z,
+        double scaling,
+        double factor,
+    )
 """)
 
 
@@ -182,106 +295,6 @@ class Lattice:
         return self.__repr__()
 
 
-# Function for initialising and tabulating a cubic grid
-# with vector values.
-@cython.header(
-    # Arguments
-    gridsize='Py_ssize_t',
-    func=func_dstar_ddd,
-    factor='double',
-    filename=str,
-    # Locals
-    dim='Py_ssize_t',
-    grid='double[:, :, :, ::1]',
-    grid_local='double[::1]',
-    i='Py_ssize_t',
-    j='Py_ssize_t',
-    k='Py_ssize_t',
-    n_vectors='Py_ssize_t',
-    n_vectors_local='Py_ssize_t',
-    size='Py_ssize_t',
-    size_edge='Py_ssize_t',
-    size_face='Py_ssize_t',
-    size_local='Py_ssize_t',
-    start_local='Py_ssize_t',
-    vector_value='double*',
-    ℓ_local='Py_ssize_t',
-    ℓ='Py_ssize_t',
-    returns='double[:, :, :, ::1]',
-)
-def tabulate_vectorgrid(gridsize, func, factor, filename=''):
-    """This function tabulates a cubic grid of size
-    gridsize*gridsize*gridsize with vector values computed by
-    the function func, as
-    grid[i, j, k] = func(i*factor, j*factor, k*factor).
-    If filename is set, the tabulated grid is saved to a hdf5 file
-    with this name.
-    The grid is not distributed. Each process will end up with its own
-    copy of the entire grid.
-    The first point grid[0, 0, 0] corresponds to the origin of the box,
-    while the last point grid[gridsize - 1, gridsize - 1, gridsize - 1]
-    corresponds to the physical point ((gridsize - 1)/gridsize*boxsize,
-                                       (gridsize - 1)/gridsize*boxsize,
-                                       (gridsize - 1)/gridsize*boxsize).
-    This means that grid[gridsize, gridsize, gridsize] is the corner
-    of the box the furthers away from the origin. This point is not
-    represented in the grid because of the periodicity of the box,
-    which means that physically, this point is the same as the origin.
-    The mapping from grid indices to physical coordinates is thus
-      (i, j, k) → (
-        i/gridsize*boxsize,
-        j/gridsize*boxsize,
-        k/gridsize*boxsize,
-      )
-    Therefore, if you wish to tabulate a global (and periodic) field,
-    extending over the entire box, the factor argument should be
-    proportional to boxsize/gridsize. If you wish to only tabulate say
-    one octant of the box, this volume is no more periodic, and so
-    the factor should be proportional to 0.5*boxsize/(gridsize - 1).
-    """
-    # The number of elements in each point, edge, face and bulk
-    # (the total), when the grid is viewed as a 3D box of vectors.
-    size_edge = gridsize*3
-    size_face = gridsize*size_edge
-    size      = gridsize*size_face
-    # Initialise the global grid to be
-    # of shape gridsize*gridsize*gridsize*3.
-    # That is, grid is not really cubic, but rather four-dimensional.
-    grid = empty([gridsize, gridsize, gridsize, 3], dtype=C2np['double'])
-    # Partition the grid fairly among the processes.
-    # Each part is defined by a linear size and starting index.
-    n_vectors = gridsize**3
-    start_local, n_vectors_local = partition(n_vectors)
-    # Each point really consists of three elements
-    start_local *= 3
-    size_local = 3*n_vectors_local
-    # Make a linear array for storing the local part of the grid
-    grid_local = empty(size_local, dtype=C2np['double'])
-    # Tabulate the local grid
-    for ℓ_local in range(0, size_local, 3):
-        ℓ = start_local + ℓ_local
-        # The global 3D indices
-        i = ℓ//size_face
-        ℓ -= i*size_face
-        j = ℓ//size_edge
-        ℓ -= j*size_edge
-        k = ℓ//3
-        # Fill grid_local
-        vector_value = func(i*factor, j*factor, k*factor)
-        for dim in range(3):
-            grid_local[ℓ_local + dim] = vector_value[dim]
-    # Gather the tabulated local grid parts into the common, global grid
-    smart_mpi(grid_local, grid, mpifun='allgatherv')
-    # Save grid to disk using parallel HDF5
-    if filename:
-        if master:
-            os.makedirs(os.path.dirname(filename), exist_ok=True)
-        Barrier()
-        with open_hdf5(filename, mode='w', driver='mpio', comm=comm) as hdf5_file:
-            dset = hdf5_file.create_dataset('data', (size, ), dtype=C2np['double'])
-            dset[start_local:(start_local + size_local)] = grid_local
-    return grid
-
 # Function for doing lookup in a grid with vector values
 @cython.header(
     # Argument
@@ -380,6 +393,8 @@ def interpolate_domaingrid_to_particles(
     'mom' or 'Δmom') of the component, through interpolation in the grid
     of a given order. If the grid values should be multiplied by a
     factor prior to adding them to the variable, this may be specified.
+    With num_threads > 1, the particles are distributed over a team
+    of threads.
     """
     if not (1 <= order <= 4):
         abort(
@@ -405,25 +420,32 @@ def interpolate_domaingrid_to_particles(
     # Offsets needed for the interpolation.
     # Note that here we employ the reverse sign on the shifs compared
     # to in interpolate_particles().
-    cellsize = domain_size_x/(grid.shape[0] - ℤ[2*nghosts])  # we have cubic grid cells
+    cellsize = domain_info.size_x/(grid.shape[0] - ℤ[2*nghosts])  # we have cubic grid cells
     offset_x = (
-        + domain_bgn_x
+        + domain_info.bgn_x
         - (1 + machine_ϵ)*(nghosts - 0.5*cell_centered + lattice.shift[0])*cellsize
     )
     offset_y = (
-        + domain_bgn_y
+        + domain_info.bgn_y
         - (1 + machine_ϵ)*(nghosts - 0.5*cell_centered + lattice.shift[1])*cellsize
     )
     offset_z = (
-        + domain_bgn_z
+        + domain_info.bgn_z
         - (1 + machine_ϵ)*(nghosts - 0.5*cell_centered + lattice.shift[2])*cellsize
     )
-    # Interpolate onto each particle
+    # Interpolate onto each particle,
+    # possibly using multiple threads.
     posxˣ = component.posxˣ
     posyˣ = component.posyˣ
     poszˣ = component.poszˣ
     size_j, size_k = grid.shape[1], grid.shape[2]
     grid_ptr = cython.address(grid[:, :, :])
+    if 𝔹[num_threads > 1]:
+        interpolate_grid_to_particles_threaded(
+            num_threads, order, grid_ptr, size_j, size_k, posxˣ, ptr_dim, component.N_local,
+            offset_x, offset_y, offset_z, (1/cellsize)*(1 - machine_ϵ), factor,
+        )
+        return
     for indexˣ in range(0, 3*component.N_local, 3):
         # Get, translate and scale the coordinates so that
         # nghosts - ½ < r < shape[r] - nghosts - ½ for r ∈ {x, y, z}.
@@ -474,6 +496,7 @@ def interpolate_domaingrid_to_particles(
     output_space=str,
     output_as_slabs='bint',
     do_ghost_communication='bint',
+    precision=str,
     # Locals
     component='Component',
     fft_factor='double',
@@ -492,7 +515,7 @@ def interpolate_domaingrid_to_particles(
 def interpolate_upstream(
     components, gridsizes_upstream, gridsize_global, quantity, order,
     ᔑdt=None, deconvolve=True, interlace='sc', output_space='real',
-    output_as_slabs=False, do_ghost_communication=True,
+    output_as_slabs=False, do_ghost_communication=True, precision='double',
 ):
     """Given a list of components, a list of corresponding upstream grid
     sizes and a single global grid size, this function interpolates the
@@ -514,6 +537,9 @@ def interpolate_upstream(
     (either 'real' or 'Fourier'). If 'real', the domain grids will have
     properly populated ghost points if do_ghost_communication is True.
 
+    The floating-point precision of the FFTs may be set to either
+    'double' (default) or 'single' through the precision argument.
+
     The quantity argument determines what should be interpolated onto
     the grid(s). Valid values are:
     'ρ': The returned grid(s) will hold physical densities. Note that
@@ -592,6 +618,7 @@ def interpolate_upstream(
             # and add it to the global Fourier slabs.
             slab_global = add_upstream_to_global_slabs(
                 grid_upstream, slab_global, gridsize_upstream, gridsize_global,
+                precision=precision,
             )
         # Particle components
         if particle_components:
@@ -613,6 +640,7 @@ def interpolate_upstream(
                 slab_global = add_upstream_to_global_slabs(
                     grid_upstream, slab_global, gridsize_upstream, gridsize_global,
                     deconv_order=ℤ[deconvolve*order], lattice=lattice,
+                    precision=precision,
                 )
     # Global Fourier slabs complete. Note that we do not have to nullify
     # the Nyquist planes of these global slabs as we have nullified the
@@ -622,7 +650,7 @@ def interpolate_upstream(
     if output_space == 'fourier':
         return slab_global
     # Fourier transform the global slabs to real space
-    fft(slab_global, 'backward')
+    fft(slab_global, 'backward', precision=precision)
     # Return real space slabs if requested
     if output_as_slabs:
         return slab_global
@@ -644,6 +672,7 @@ def interpolate_upstream(
     gridsize_global='Py_ssize_t',
     deconv_order='int',
     lattice='Lattice',
+    precision=str,
     # Locals
     nullification=str,
     operation=str,
@@ -653,7 +682,7 @@ def interpolate_upstream(
 )
 def add_upstream_to_global_slabs(
     grid_upstream, slab_global, gridsize_upstream, gridsize_global,
-    deconv_order=0, lattice=None,
+    deconv_order=0, lattice=None, precision='double',
 ):
     # If the global slabs have yet to be initialised, we must do so
     # within this function. If at the same time the global and upstream
@@ -667,7 +696,7 @@ def add_upstream_to_global_slabs(
         None if use_upstream_as_global else 'slab_updownstream',
         prepare_fft=True,
     )
-    fft(slab_upstream, 'forward')
+    fft(slab_upstream, 'forward', precision=precision)
     # Ensure nullified Nyquist planes
     nullify_modes(slab_upstream, 'nyquist')
     # Perform deconvolution and interlacing on the upstream slabs
@@ -844,7 +873,7 @@ def resize_grid(
     input_space = input_space.lower()
     if input_space == 'real':
         grid = grid_or_slab
-        gridsize = (grid.shape[0] - ℤ[2*nghosts])*domain_subdivisions[0]
+        gridsize = get_gridsize_from_local(grid.shape[0] - ℤ[2*nghosts])
     elif input_space == 'fourier':
         slab = grid_or_slab
         gridsize = slab.shape[1]
@@ -1495,6 +1524,7 @@ subslabs_cache = {}
     grid_ptr='double*',
     index='Py_ssize_t',
     indexˣ='Py_ssize_t',
+    layout_1Dto3D='Py_ssize_t[:, ::1]',
     offset_x='double',
     offset_y='double',
     offset_z='double',
@@ -1503,6 +1533,8 @@ subslabs_cache = {}
     poszˣ='double*',
     size_j='Py_ssize_t',
     size_k='Py_ssize_t',
+    tiling='Tiling',
+    tiling_name=str,
     w_eff='double',
     x='double',
     y='double',
@@ -1529,6 +1561,9 @@ def interpolate_particles(
     the ghost cells to their physical cells, set do_ghost_communication
     to True. Note that even with do_ghost_communication set to True, the
     ghost cells will not end up with copies of the boundary values.
+    With num_threads > 1, the particles are interpolated by a team of
+    threads, visiting the tiles of an interpolation tiling of the
+    component (see init_interpolation_tiling() in the species module).
     """
     if not (1 <= order <= 4):
         abort(
@@ -1576,15 +1611,15 @@ def interpolate_particles(
         lattice = Lattice()
     cellsize = boxsize/gridsize
     offset_x = (
-        + domain_bgn_x
+        + domain_info.bgn_x
         - (1 + machine_ϵ)*(nghosts - 0.5*cell_centered - lattice.shift[0])*cellsize
     )
     offset_y = (
-        + domain_bgn_y
+        + domain_info.bgn_y
         - (1 + machine_ϵ)*(nghosts - 0.5*cell_centered - lattice.shift[1])*cellsize
     )
     offset_z = (
-        + domain_bgn_z
+        + domain_info.bgn_z
         - (1 + machine_ϵ)*(nghosts - 0.5*cell_centered - lattice.shift[2])*cellsize
     )
     # Interpolate each particle
@@ -1593,43 +1628,60 @@ def interpolate_particles(
     poszˣ = component.poszˣ
     size_j, size_k = grid.shape[1], grid.shape[2]
     grid_ptr = cython.address(grid[:, :, :])
-    for indexˣ in range(0, 3*component.N_local, 3):
-        # Get the total contribution from this particle
-        with unswitch:
-            if not constant_contribution:
-                contribution = contribution_factor*contribution_ptr[indexˣ]
-        # Get, translate and scale the coordinates so that
-        #   nghosts - ½ < r < shape[r] - nghosts - ½ for r ∈ {x, y, z}
-        # (in the case of no shifting).
-        x = (posxˣ[indexˣ] - offset_x)*ℝ[(1/cellsize)*(1 - machine_ϵ)]
-        y = (posyˣ[indexˣ] - offset_y)*ℝ[(1/cellsize)*(1 - machine_ϵ)]
-        z = (poszˣ[indexˣ] - offset_z)*ℝ[(1/cellsize)*(1 - machine_ϵ)]
-        # Carry out the interpolation according to the order
-        with unswitch:
-            if order == 1:  # NGP interpolation
-                for index, contribution_weighted in particle_interpolation_loop_NGP(
-                    x, y, z, size_j, size_k,
-                    contribution, apply_factor=True,
-                ):
-                    grid_ptr[index] += contribution_weighted
-            elif order == 2:  # CIC interpolation
-                for index, contribution_weighted in particle_interpolation_loop_CIC(
-                    x, y, z, size_j, size_k,
-                    contribution, apply_factor=True,
-                ):
-                    grid_ptr[index] += contribution_weighted
-            elif order == 3:  # TSC interpolation
-                for index, contribution_weighted in particle_interpolation_loop_TSC(
-                    x, y, z, size_j, size_k,
-                    contribution, apply_factor=True,
-                ):
-                    grid_ptr[index] += contribution_weighted
-            else:  # order == 4  # PCS interpolation
-                for index, contribution_weighted in particle_interpolation_loop_PCS(
-                    x, y, z, size_j, size_k,
-                    contribution, apply_factor=True,
-                ):
-                    grid_ptr[index] += contribution_weighted
+    # With multiple threads, the particles are sorted into an
+    # interpolation tiling, the tiles of which are then coloured so that
+    # threads never interpolate onto the same grid cells.
+    if 𝔹[num_threads > 1]:
+        tiling_name = f'interpolation (tiles, gridsize {gridsize})'
+        component.tile_sort(tiling_name)
+        tiling = component.tilings[tiling_name]
+        layout_1Dto3D = tiling.layout_1Dto3D
+        interpolate_particles_threaded(
+            num_threads, order, grid_ptr, size_j, size_k, posxˣ,
+            (NULL if constant_contribution else contribution_ptr),
+            contribution, contribution_factor,
+            offset_x, offset_y, offset_z, (1/cellsize)*(1 - machine_ϵ),
+            tiling.tiles, tiling.tiles_rungs_N, tiling.contain_particles,
+            cython.address(layout_1Dto3D[:, :]), tiling.size, N_rungs,
+        )
+    else:
+        for indexˣ in range(0, 3*component.N_local, 3):
+            # Get the total contribution from this particle
+            with unswitch:
+                if not constant_contribution:
+                    contribution = contribution_factor*contribution_ptr[indexˣ]
+            # Get, translate and scale the coordinates so that
+            #   nghosts - ½ < r < shape[r] - nghosts - ½ for r ∈ {x, y, z}
+            # (in the case of no shifting).
+            x = (posxˣ[indexˣ] - offset_x)*ℝ[(1/cellsize)*(1 - machine_ϵ)]
+            y = (posyˣ[indexˣ] - offset_y)*ℝ[(1/cellsize)*(1 - machine_ϵ)]
+            z = (poszˣ[indexˣ] - offset_z)*ℝ[(1/cellsize)*(1 - machine_ϵ)]
+            # Carry out the interpolation according to the order
+            with unswitch:
+                if order == 1:  # NGP interpolation
+                    for index, contribution_weighted in particle_interpolation_loop_NGP(
+                        x, y, z, size_j, size_k,
+                        contribution, apply_factor=True,
+                    ):
+                        grid_ptr[index] += contribution_weighted
+                elif order == 2:  # CIC interpolation
+                    for index, contribution_weighted in particle_interpolation_loop_CIC(
+                        x, y, z, size_j, size_k,
+                        contribution, apply_factor=True,
+                    ):
+                        grid_ptr[index] += contribution_weighted
+                elif order == 3:  # TSC interpolation
+                    for index, contribution_weighted in particle_interpolation_loop_TSC(
+                        x, y, z, size_j, size_k,
+                        contribution, apply_factor=True,
+                    ):
+                        grid_ptr[index] += contribution_weighted
+                else:  # order == 4  # PCS interpolation
+                    for index, contribution_weighted in particle_interpolation_loop_PCS(
+                        x, y, z, size_j, size_k,
+                        contribution, apply_factor=True,
+                    ):
+                        grid_ptr[index] += contribution_weighted
     # All particles interpolated. Some may have gotten interpolated
     # partly onto ghost points, which then need to be communicated.
     if do_ghost_communication:
@@ -1797,12 +1849,7 @@ def convert_particles_to_fluid(component, order, interlace='sc'):
     # Instantiate fluid grids spanning the local domains.
     # The newly allocated grids will be nullified.
     component.representation = 'fluid'
-    shape = tuple([component.gridsize//ds for ds in domain_subdivisions])
-    if any([component.gridsize != domain_subdivisions[dim]*shape[dim] for dim in range(3)]):
-        abort(
-            f'The grid size of {component.name} is {component.gridsize} '
-            f'which cannot be equally shared among {nprocs} processes'
-        )
+    shape = tuple(asarray(get_gridshape_local(component.gridsize)) - 2*nghosts)
     component.resize(shape)
     # Do the particle → fluid interpolation
     gridsize = component.gridsize
@@ -1885,6 +1932,7 @@ def convert_particles_to_fluid(component, order, interlace='sc'):
     # Locals
     dim='int',
     gridshape_local=tuple,
+    indices=tuple,
     returns=tuple,
 )
 def get_gridshape_local(gridsize):
@@ -1893,20 +1941,33 @@ def get_gridshape_local(gridsize):
     if gridshape_local is not None:
         return gridshape_local
     # The global grid will be cut into domains according to the
-    # domain_subdivisions. The cut along each dimension has to leave
-    # the local grids with integer gridsize.
+    # domain decomposition. The cut along each dimension has to leave
+    # the local grids with integer gridsize. For a non-uniform domain
+    # decomposition, the cuts are placed on a lattice which must then
+    # be commensurate with the grid.
     for dim in range(3):
-        if gridsize%domain_subdivisions[dim] != 0:
+        if gridsize%domain_info.resolution[dim] == 0:
+            continue
+        if domain_info.dynamic:
             abort(
                 f'A grid of global gridsize {gridsize} is to be distributed '
-                f'across the processes, but {gridsize}×{gridsize}×{gridsize} '
-                f'cannot be divided according to the domain decomposition '
-                f'{domain_subdivisions[0]}×{domain_subdivisions[1]}×{domain_subdivisions[2]}.'
+                f'across the processes, but the domain cuts are placed on a lattice '
+                f'of resolution {domain_info.resolution[0]}×{domain_info.resolution[1]}×'
+                f'{domain_info.resolution[2]} which is not commensurate with the grid. '
+                f'Consider disabling dynamic domain balancing (the "dynamic" item of '
+                f'the domain_balancing parameter).'
             )
+        abort(
+            f'A grid of global gridsize {gridsize} is to be distributed '
+            f'across the processes, but {gridsize}×{gridsize}×{gridsize} '
+            f'cannot be divided according to the domain decomposition '
+            f'{domain_subdivisions[0]}×{domain_subdivisions[1]}×{domain_subdivisions[2]}.'
+        )
     # We have nghosts ghost points on both sides of the local grid,
     # for all dimensions.
+    indices = get_domain_grid_bounds(gridsize, rank)
     gridshape_local = tuple([
-        gridsize//domain_subdivisions[dim] + ℤ[2*nghosts] for dim in range(3)
+        indices[3 + dim] - indices[dim] + ℤ[2*nghosts] for dim in range(3)
     ])
     for dim in range(3):
         if gridshape_local[dim] < ℤ[4*nghosts]:
@@ -1924,6 +1985,22 @@ def get_gridshape_local(gridsize):
 cython.declare(gridshape_local_cache=dict)
 gridshape_local_cache = {}
 
+# Function returning the global gridsize of a grid,
+# given the local size (excluding ghost points) along the x dimension.
+@cython.header(
+    # Arguments
+    size_local='Py_ssize_t',
+    # Locals
+    width='Py_ssize_t',
+    returns='Py_ssize_t',
+)
+def get_gridsize_from_local(size_local):
+    width = (
+        + domain_info.cuts_units[0][domain_layout_local_indices[0] + 1]
+        - domain_info.cuts_units[0][domain_layout_local_indices[0]    ]
+    )
+    return size_local*domain_info.resolution[0]//width
+
 # Function for getting the shape of a slab
 @cython.header(
     # Arguments
@@ -1942,41 +2019,44 @@ def get_slabshape_local(gridsize):
     return shape
 
 # Function that compute a lot of information needed by the
-# slab_decompose and domain_decompose functions.
+# slab_decompose and domain_decompose functions. For each process,
+# the returned arrays hold the local index ranges of the part of the
+# local domain grid overlapping with the slab of that process, as well
+# as the local index ranges of the part of the local slab overlapping
+# with the domain of that process. Empty overlaps are represented by
+# equal start and end indices. As this information is computed from the
+# global domain decomposition, no communication is needed.
 @cython.header(
     # Arguments
     domain_grid='double[:, :, ::1]',
     slab='double[:, :, ::1]',
     # Locals
-    N_domain2slabs_communications='Py_ssize_t',
     domain_bgn_i='Py_ssize_t',
-    domain_bgn_j='Py_ssize_t',
-    domain_bgn_k='Py_ssize_t',
     domain_end_i='Py_ssize_t',
-    domain_end_j='Py_ssize_t',
-    domain_end_k='Py_ssize_t',
-    domain_grid_noghosts='double[:, :, :]',
     domain_grid_shape=tuple,
     domain_sendrecv_i_end='int[::1]',
     domain_sendrecv_i_start='int[::1]',
-    domain_size_i='Py_ssize_t',
-    domain_size_j='Py_ssize_t',
-    domain_size_k='Py_ssize_t',
-    domain2slabs_recvsend_ranks='int[::1]',
-    index='Py_ssize_t',
+    gridsize='Py_ssize_t',
     info=tuple,
-    rank_recv='int',
-    rank_send='int',
-    recvtuple=tuple,
-    sendtuple=tuple,
+    other_bgn_i='Py_ssize_t',
+    other_bgn_j='Py_ssize_t',
+    other_bgn_k='Py_ssize_t',
+    other_end_i='Py_ssize_t',
+    other_end_j='Py_ssize_t',
+    other_end_k='Py_ssize_t',
+    overlap_bgn_i='Py_ssize_t',
+    overlap_end_i='Py_ssize_t',
+    rank_other='int',
+    slab_bgn_i='Py_ssize_t',
+    slab_end_i='Py_ssize_t',
+    slab_sendrecv_i_end='int[::1]',
+    slab_sendrecv_i_start='int[::1]',
     slab_sendrecv_j_end='int[::1]',
     slab_sendrecv_j_start='int[::1]',
     slab_sendrecv_k_end='int[::1]',
     slab_sendrecv_k_start='int[::1]',
     slab_shape=tuple,
     slab_size_i='Py_ssize_t',
-    slabs2domain_sendrecv_ranks='int[::1]',
-    ℓ='Py_ssize_t',
     returns=tuple,
 )
 def prepare_decomposition(domain_grid, slab):
@@ -1987,105 +2067,55 @@ def prepare_decomposition(domain_grid, slab):
     info = decomposition_info.get((domain_grid_shape, slab_shape))
     if info:
         return info
-    # Memoryview of the domain grid without the ghost layers
-    domain_grid_noghosts = domain_grid[
-        nghosts:(domain_grid.shape[0] - nghosts),
-        nghosts:(domain_grid.shape[1] - nghosts),
-        nghosts:(domain_grid.shape[2] - nghosts),
-    ]
-    # The size (number of grid points) of the truly local part of the
-    # domain grid, excluding ghost layers, for each dimension.
-    domain_size_i = domain_grid_noghosts.shape[0]
-    domain_size_j = domain_grid_noghosts.shape[1]
-    domain_size_k = domain_grid_noghosts.shape[2]
-    # The global start and end indices of the local domain
-    # in the global grid.
-    domain_bgn_i = domain_layout_local_indices[0]*domain_size_i
-    domain_bgn_j = domain_layout_local_indices[1]*domain_size_j
-    domain_bgn_k = domain_layout_local_indices[2]*domain_size_k
-    domain_end_i = domain_bgn_i + domain_size_i
-    domain_end_j = domain_bgn_j + domain_size_j
-    domain_end_k = domain_bgn_k + domain_size_k
     # When in real space, the slabs are distributed over the first
     # dimension. Give the size of the slab in this dimension a name.
+    gridsize = slab.shape[1]
     slab_size_i = slab.shape[0]
-    # Find local i-indices to send and to which process by
-    # shifting a piece of the number line in order to match
-    # the communication pattern used.
-    domain_sendrecv_i_start = np.roll(
-        asarray(
-            [
-                ℓ - domain_bgn_i
-                for ℓ in range(domain_bgn_i, domain_end_i, slab_size_i)
-            ],
-            dtype=C2np['int'],
-        ),
-        -rank,
-    )
-    domain_sendrecv_i_end = np.roll(
-        asarray(
-            [
-                ℓ - domain_bgn_i + slab_size_i
-                for ℓ in range(domain_bgn_i, domain_end_i, slab_size_i)
-            ],
-            dtype=C2np['int'],
-        ),
-        -rank,
-    )
-    slabs2domain_sendrecv_ranks = np.roll(
-        asarray(
-            [
-                ℓ//slab_size_i
-                for ℓ in range(domain_bgn_i, domain_end_i, slab_size_i)
-            ],
-            dtype=C2np['int'],
-        ),
-        -rank,
-    )
-    # Communicate the start and end (j, k)-indices of the slab,
-    # where parts of the local domains should be received into.
-    slab_sendrecv_j_start       = empty(nprocs, dtype=C2np['int'])
-    slab_sendrecv_k_start       = empty(nprocs, dtype=C2np['int'])
-    slab_sendrecv_j_end         = empty(nprocs, dtype=C2np['int'])
-    slab_sendrecv_k_end         = empty(nprocs, dtype=C2np['int'])
-    domain2slabs_recvsend_ranks = empty(nprocs, dtype=C2np['int'])
-    index = 0
-    for ℓ in range(nprocs):
-        # Process ranks to send/receive to/from
-        rank_send = mod(rank + ℓ, nprocs)
-        rank_recv = mod(rank - ℓ, nprocs)
-        # Send the global y and z start and end indices of the domain
-        # to be send, if anything should be send to process rank_send.
-        # Otherwise send None.
-        sendtuple = (
-            (domain_bgn_j, domain_bgn_k, domain_end_j, domain_end_k)
-            if rank_send in asarray(slabs2domain_sendrecv_ranks) else None
-        )
-        recvtuple = sendrecv(sendtuple, dest=rank_send, source=rank_recv)
-        if recvtuple is not None:
-            slab_sendrecv_j_start[index]       = recvtuple[0]
-            slab_sendrecv_k_start[index]       = recvtuple[1]
-            slab_sendrecv_j_end[index]         = recvtuple[2]
-            slab_sendrecv_k_end[index]         = recvtuple[3]
-            domain2slabs_recvsend_ranks[index] = rank_recv
-            index += 1
-    # Cut off the tails
-    slab_sendrecv_j_start = slab_sendrecv_j_start[:index]
-    slab_sendrecv_k_start = slab_sendrecv_k_start[:index]
-    slab_sendrecv_j_end = slab_sendrecv_j_end[:index]
-    slab_sendrecv_k_end = slab_sendrecv_k_end[:index]
-    domain2slabs_recvsend_ranks = domain2slabs_recvsend_ranks[:index]
-    # The maximum number of communications it takes to communicate
-    # the domain grid to the slabs (or vice versa).
-    N_domain2slabs_communications = np.max([slabs2domain_sendrecv_ranks.shape[0],
-                                            domain2slabs_recvsend_ranks.shape[0]])
+    # The global start and end i-indices of the local domain
+    # and of the local slab.
+    domain_bgn_i, _, _, domain_end_i, _, _ = get_domain_grid_bounds(gridsize, rank)
+    slab_bgn_i = rank*slab_size_i
+    slab_end_i = slab_bgn_i + slab.shape[0]
+    # Find the overlaps with each of the processes
+    domain_sendrecv_i_start = zeros(nprocs, dtype=C2np['int'])
+    domain_sendrecv_i_end   = zeros(nprocs, dtype=C2np['int'])
+    slab_sendrecv_i_start   = zeros(nprocs, dtype=C2np['int'])
+    slab_sendrecv_i_end     = zeros(nprocs, dtype=C2np['int'])
+    slab_sendrecv_j_start   = zeros(nprocs, dtype=C2np['int'])
+    slab_sendrecv_j_end     = zeros(nprocs, dtype=C2np['int'])
+    slab_sendrecv_k_start   = zeros(nprocs, dtype=C2np['int'])
+    slab_sendrecv_k_end     = zeros(nprocs, dtype=C2np['int'])
+    for rank_other in range(nprocs):
+        # Overlap between the local domain and the slab
+        # of the other process.
+        overlap_bgn_i = pairmax(domain_bgn_i, rank_other*slab_size_i)
+        overlap_end_i = pairmin(domain_end_i, (rank_other + 1)*slab_size_i)
+        if overlap_bgn_i < overlap_end_i:
+            domain_sendrecv_i_start[rank_other] = overlap_bgn_i - domain_bgn_i
+            domain_sendrecv_i_end  [rank_other] = overlap_end_i - domain_bgn_i
+        # Overlap between the local slab and the domain of the other
+        # process. Since the slabs extend throughout the entire
+        # yz-plane, the overlap spans the entire yz-extent
+        # of the domain.
+        (
+            other_bgn_i, other_bgn_j, other_bgn_k,
+            other_end_i, other_end_j, other_end_k,
+        ) = get_domain_grid_bounds(gridsize, rank_other)
+        overlap_bgn_i = pairmax(slab_bgn_i, other_bgn_i)
+        overlap_end_i = pairmin(slab_end_i, other_end_i)
+        if overlap_bgn_i < overlap_end_i:
+            slab_sendrecv_i_start[rank_other] = overlap_bgn_i - slab_bgn_i
+            slab_sendrecv_i_end  [rank_other] = overlap_end_i - slab_bgn_i
+            slab_sendrecv_j_start[rank_other] = other_bgn_j
+            slab_sendrecv_j_end  [rank_other] = other_end_j
+            slab_sendrecv_k_start[rank_other] = other_bgn_k
+            slab_sendrecv_k_end  [rank_other] = other_end_k
     # Store and return all the resultant information,
     # needed for communicating between the domain and the slab.
-    info = (N_domain2slabs_communications,
-            domain2slabs_recvsend_ranks,
-            slabs2domain_sendrecv_ranks,
-            domain_sendrecv_i_start,
+    info = (domain_sendrecv_i_start,
             domain_sendrecv_i_end,
+            slab_sendrecv_i_start,
+            slab_sendrecv_i_end,
             slab_sendrecv_j_start,
             slab_sendrecv_j_end,
             slab_sendrecv_k_start,
@@ -2098,6 +2128,47 @@ def prepare_decomposition(domain_grid, slab):
 cython.declare(decomposition_info=dict)
 decomposition_info = {}
 
+# Function returning the global start and end indices
+# (bgn_i, bgn_j, bgn_k, end_i, end_j, end_k) of the domain governed by
+# the process of the given rank, within a global grid of the given size.
+@cython.header(
+    # Arguments
+    gridsize='Py_ssize_t',
+    rank_other='int',
+    # Locals
+    cells_per_unit='Py_ssize_t',
+    dim='int',
+    domain_layout_other=tuple,
+    index='Py_ssize_t',
+    indices_bgn=list,
+    indices_end=list,
+    returns=tuple,
+)
+def get_domain_grid_bounds(gridsize, rank_other):
+    domain_layout_other = np.unravel_index(rank_other, domain_subdivisions)
+    indices_bgn = []
+    indices_end = []
+    for dim in range(3):
+        cells_per_unit = gridsize//domain_info.resolution[dim]
+        index = domain_layout_other[dim]
+        indices_bgn.append(domain_info.cuts_units[dim][index    ]*cells_per_unit)
+        indices_end.append(domain_info.cuts_units[dim][index + 1]*cells_per_unit)
+    return tuple(indices_bgn + indices_end)
+
+# Function for clearing the caches of this module which depend on the
+# domain decomposition. This must be called whenever the domain
+# decomposition changes.
+@cython.pheader(returns='void')
+def clear_domain_grid_caches():
+    gridshape_local_cache.clear()
+    decomposition_info.clear()
+
+# Function returning the global grid sizes of all
+# domain grids encountered thus far.
+@cython.pheader(returns=list)
+def get_domain_gridsizes():
+    return sorted(gridshape_local_cache.keys())
+
 # Function for transferring data from slabs to domain grids
 @cython.pheader(
     # Arguments
@@ -2106,7 +2177,6 @@ decomposition_info = {}
     do_ghost_communication='bint',
     do_ghost_nullification='bint',
     # Locals
-    N_domain2slabs_communications='Py_ssize_t',
     buffer_name=object,  # int or str
     chunk_recv_bgn='Py_ssize_t',
     chunk_recv_end='Py_ssize_t',
@@ -2114,24 +2184,30 @@ decomposition_info = {}
     chunk_send_end='Py_ssize_t',
     domain_sendrecv_i_end='int[::1]',
     domain_sendrecv_i_start='int[::1]',
-    domain2slabs_recvsend_ranks='int[::1]',
     grid='double[:, :, ::1]',
     grid_noghosts='double[:, :, :]',
     gridsize='Py_ssize_t',
     i_chunk='Py_ssize_t',
-    n_chunks='Py_ssize_t',
+    n_chunks_recv='Py_ssize_t',
+    n_chunks_send='Py_ssize_t',
     rank_recv='int',
     rank_send='int',
+    recv_bgn='Py_ssize_t',
+    recv_end='Py_ssize_t',
     request=object,  # mpi4py.MPI.Request
+    send_bgn='Py_ssize_t',
+    send_end='Py_ssize_t',
     shape=tuple,
     should_recv='bint',
     should_send='bint',
+    slab_sendrecv_i_end='int[::1]',
+    slab_sendrecv_i_start='int[::1]',
     slab_sendrecv_j_end='int[::1]',
     slab_sendrecv_j_start='int[::1]',
     slab_sendrecv_k_end='int[::1]',
     slab_sendrecv_k_start='int[::1]',
-    slabs2domain_sendrecv_ranks='int[::1]',
-    thickness_chunk='Py_ssize_t',
+    thickness_chunk_recv='Py_ssize_t',
+    thickness_chunk_send='Py_ssize_t',
     ℓ='Py_ssize_t',
     returns='double[:, :, ::1]',
 )
@@ -2170,44 +2246,61 @@ def domain_decompose(
     ]
     # Compute needed communication variables
     (
-        N_domain2slabs_communications,
-        domain2slabs_recvsend_ranks,
-        slabs2domain_sendrecv_ranks,
         domain_sendrecv_i_start,
         domain_sendrecv_i_end,
+        slab_sendrecv_i_start,
+        slab_sendrecv_i_end,
         slab_sendrecv_j_start,
         slab_sendrecv_j_end,
         slab_sendrecv_k_start,
         slab_sendrecv_k_end,
     ) = prepare_decomposition(grid, slab)
-    # Communicate the slabs to the domain grid in chunks
-    n_chunks, thickness_chunk = get_slab_domain_decomposition_chunk_size(slab, grid_noghosts)
-    for ℓ in range(N_domain2slabs_communications):
-        should_send = (ℓ < ℤ[domain2slabs_recvsend_ranks.shape[0]])
-        should_recv = (ℓ < ℤ[slabs2domain_sendrecv_ranks.shape[0]])
+    # Communicate the slabs to the domain grids. At step ℓ, the local
+    # process sends part of its slab to the process ℓ ranks above it,
+    # while receiving part of its domain grid from the process ℓ ranks
+    # below it. Both the sending and the receiving process know of the
+    # overlap between the slab and the domain, and so pairs of
+    # processes without any overlap skip the step entirely.
+    for ℓ in range(nprocs):
+        rank_send = mod(rank + ℓ, nprocs)
+        rank_recv = mod(rank - ℓ, nprocs)
+        send_bgn = slab_sendrecv_i_start[rank_send]
+        send_end = slab_sendrecv_i_end  [rank_send]
+        recv_bgn = domain_sendrecv_i_start[rank_recv]
+        recv_end = domain_sendrecv_i_end  [rank_recv]
+        should_send = (send_bgn < send_end)
+        should_recv = (recv_bgn < recv_end)
         if not should_send and not should_recv:
             continue
+        # The data is communicated in chunks,
+        # with the chunk sizes agreed upon by both processes.
+        n_chunks_send = n_chunks_recv = 0
         if should_send:
-            rank_send = domain2slabs_recvsend_ranks[ℓ]
+            n_chunks_send, thickness_chunk_send = get_slab_domain_decomposition_chunk_size(
+                send_end - send_bgn,
+                (
+                      (slab_sendrecv_j_end[rank_send] - slab_sendrecv_j_start[rank_send])
+                    * (slab_sendrecv_k_end[rank_send] - slab_sendrecv_k_start[rank_send])
+                ),
+            )
         if should_recv:
-            rank_recv = slabs2domain_sendrecv_ranks[ℓ]
-        # Communicate the chunks
-        for i_chunk in range(n_chunks):
-            # The lower ranks storing the slabs sends part of their slab
+            n_chunks_recv, thickness_chunk_recv = get_slab_domain_decomposition_chunk_size(
+                recv_end - recv_bgn,
+                grid_noghosts.shape[1]*grid_noghosts.shape[2],
+            )
+        for i_chunk in range(pairmax(n_chunks_send, n_chunks_recv)):
+            # Send part of the local slab
+            should_send = (i_chunk < n_chunks_send)
             if should_send:
                 # A non-blocking send is used, because the communication
                 # is not pairwise.
-                # In the x-dimension, the slabs are always thinner than
-                # (or at least as thin as) the domain.
-                chunk_send_bgn = i_chunk*thickness_chunk
-                chunk_send_end = chunk_send_bgn + thickness_chunk
-                if chunk_send_end > ℤ[slab.shape[0]]:
-                    chunk_send_end = ℤ[slab.shape[0]]
+                chunk_send_bgn = send_bgn + i_chunk*thickness_chunk_send
+                chunk_send_end = pairmin(chunk_send_bgn + thickness_chunk_send, send_end)
                 request = smart_mpi(
                     slab[
                         chunk_send_bgn:chunk_send_end,
-                        ℤ[slab_sendrecv_j_start[ℓ]]:ℤ[slab_sendrecv_j_end[ℓ]],
-                        ℤ[slab_sendrecv_k_start[ℓ]]:ℤ[slab_sendrecv_k_end[ℓ]],
+                        ℤ[slab_sendrecv_j_start[rank_send]]:ℤ[slab_sendrecv_j_end[rank_send]],
+                        ℤ[slab_sendrecv_k_start[rank_send]]:ℤ[slab_sendrecv_k_end[rank_send]],
                     ],
                     dest=rank_send,
                     mpifun='Isend',
@@ -2216,11 +2309,9 @@ def domain_decompose(
             # Since the slabs extend throughout the entire yz-plane,
             # we receive into the entire yz-part of the domain grid
             # (excluding ghost points).
-            if should_recv:
-                chunk_recv_bgn = ℤ[domain_sendrecv_i_start[ℓ]] + i_chunk*thickness_chunk
-                chunk_recv_end = chunk_recv_bgn + thickness_chunk
-                if chunk_recv_end > ℤ[domain_sendrecv_i_end[ℓ]]:
-                    chunk_recv_end = ℤ[domain_sendrecv_i_end[ℓ]]
+            if i_chunk < n_chunks_recv:
+                chunk_recv_bgn = recv_bgn + i_chunk*thickness_chunk_recv
+                chunk_recv_end = pairmin(chunk_recv_bgn + thickness_chunk_recv, recv_end)
                 smart_mpi(
                     grid_noghosts[
                         chunk_recv_bgn:chunk_recv_end,
@@ -2250,7 +2341,6 @@ def domain_decompose(
     slab_or_buffer_name=object,  # double[:, :, ::1], int or str
     prepare_fft='bint',
     # Locals
-    N_domain2slabs_communications='Py_ssize_t',
     buffer_name=object,  # int or str
     chunk_recv_bgn='Py_ssize_t',
     chunk_recv_end='Py_ssize_t',
@@ -2258,26 +2348,31 @@ def domain_decompose(
     chunk_send_end='Py_ssize_t',
     domain_sendrecv_i_end='int[::1]',
     domain_sendrecv_i_start='int[::1]',
-    domain2slabs_recvsend_ranks='int[::1]',
     grid_noghosts='double[:, :, :]',
-    grids=dict,
     gridsize='Py_ssize_t',
     i_chunk='Py_ssize_t',
-    n_chunks='Py_ssize_t',
+    n_chunks_recv='Py_ssize_t',
+    n_chunks_send='Py_ssize_t',
     rank_recv='int',
     rank_send='int',
+    recv_bgn='Py_ssize_t',
+    recv_end='Py_ssize_t',
     request=object,  # mpi4py.MPI.Request
+    send_bgn='Py_ssize_t',
+    send_end='Py_ssize_t',
     shape=tuple,
     should_send='bint',
     should_recv='bint',
     slab='double[:, :, ::1]',
     slab_arr=object,
+    slab_sendrecv_i_end='int[::1]',
+    slab_sendrecv_i_start='int[::1]',
     slab_sendrecv_j_end='int[::1]',
     slab_sendrecv_j_start='int[::1]',
     slab_sendrecv_k_end='int[::1]',
     slab_sendrecv_k_start='int[::1]',
-    slabs2domain_sendrecv_ranks='int[::1]',
-    thickness_chunk='Py_ssize_t',
+    thickness_chunk_recv='Py_ssize_t',
+    thickness_chunk_send='Py_ssize_t',
     ℓ='Py_ssize_t',
     returns='double[:, :, ::1]',
 )
@@ -2306,7 +2401,7 @@ def slab_decompose(grid, slab_or_buffer_name=None, prepare_fft=False):
         nghosts:(grid.shape[1] - nghosts),
         nghosts:(grid.shape[2] - nghosts),
     ]
-    gridsize = grid_noghosts.shape[0]*domain_subdivisions[0]
+    gridsize = get_gridsize_from_local(grid_noghosts.shape[0])
     if gridsize%nprocs != 0:
         abort(
             f'A domain decomposed grid of size {gridsize} was passed to the slab_decompose() '
@@ -2339,43 +2434,58 @@ def slab_decompose(grid, slab_or_buffer_name=None, prepare_fft=False):
     slab_arr[:, :, gridsize:] = 0
     # Compute needed communication variables
     (
-        N_domain2slabs_communications,
-        domain2slabs_recvsend_ranks,
-        slabs2domain_sendrecv_ranks,
         domain_sendrecv_i_start,
         domain_sendrecv_i_end,
+        slab_sendrecv_i_start,
+        slab_sendrecv_i_end,
         slab_sendrecv_j_start,
         slab_sendrecv_j_end,
         slab_sendrecv_k_start,
         slab_sendrecv_k_end,
     ) = prepare_decomposition(grid, slab)
-    # Communicate the domain grid to the slabs in chunks
-    n_chunks, thickness_chunk = get_slab_domain_decomposition_chunk_size(
-        slab, grid_noghosts,
-    )
-    for ℓ in range(N_domain2slabs_communications):
-        should_send = (ℓ < ℤ[slabs2domain_sendrecv_ranks.shape[0]])
-        should_recv = (ℓ < ℤ[domain2slabs_recvsend_ranks.shape[0]])
+    # Communicate the domain grids to the slabs. At step ℓ, the local
+    # process sends part of its domain grid to the process ℓ ranks
+    # above it, while receiving part of its slab from the process ℓ
+    # ranks below it. See domain_decompose().
+    for ℓ in range(nprocs):
+        rank_send = mod(rank + ℓ, nprocs)
+        rank_recv = mod(rank - ℓ, nprocs)
+        send_bgn = domain_sendrecv_i_start[rank_send]
+        send_end = domain_sendrecv_i_end  [rank_send]
+        recv_bgn = slab_sendrecv_i_start[rank_recv]
+        recv_end = slab_sendrecv_i_end  [rank_recv]
+        should_send = (send_bgn < send_end)
+        should_recv = (recv_bgn < recv_end)
         if not should_send and not should_recv:
             continue
+        # The data is communicated in chunks,
+        # with the chunk sizes agreed upon by both processes.
+        n_chunks_send = n_chunks_recv = 0
         if should_send:
-            rank_send = slabs2domain_sendrecv_ranks[ℓ]
+            n_chunks_send, thickness_chunk_send = get_slab_domain_decomposition_chunk_size(
+                send_end - send_bgn,
+                grid_noghosts.shape[1]*grid_noghosts.shape[2],
+            )
         if should_recv:
-            rank_recv = domain2slabs_recvsend_ranks[ℓ]
-        # Communicate the chunks
-        for i_chunk in range(n_chunks):
+            n_chunks_recv, thickness_chunk_recv = get_slab_domain_decomposition_chunk_size(
+                recv_end - recv_bgn,
+                (
+                      (slab_sendrecv_j_end[rank_recv] - slab_sendrecv_j_start[rank_recv])
+                    * (slab_sendrecv_k_end[rank_recv] - slab_sendrecv_k_start[rank_recv])
+                ),
+            )
+        for i_chunk in range(pairmax(n_chunks_send, n_chunks_recv)):
             # Send part of the local domain
             # grid to the corresponding process.
+            should_send = (i_chunk < n_chunks_send)
             if should_send:
                 # A non-blocking send is used, because the communication
                 # is not pairwise.
                 # Since the slabs extend throughout the entire yz-plane,
                 # we should send the entire yz-part of domain
                 # (excluding ghost points).
-                chunk_send_bgn = ℤ[domain_sendrecv_i_start[ℓ]] + i_chunk*thickness_chunk
-                chunk_send_end = chunk_send_bgn + thickness_chunk
-                if chunk_send_end > ℤ[domain_sendrecv_i_end[ℓ]]:
-                    chunk_send_end = ℤ[domain_sendrecv_i_end[ℓ]]
+                chunk_send_bgn = send_bgn + i_chunk*thickness_chunk_send
+                chunk_send_end = pairmin(chunk_send_bgn + thickness_chunk_send, send_end)
                 request = smart_mpi(
                     grid_noghosts[
                         chunk_send_bgn:chunk_send_end,
@@ -2385,19 +2495,15 @@ def slab_decompose(grid, slab_or_buffer_name=None, prepare_fft=False):
                     dest=rank_send,
                     mpifun='Isend',
                 )
-            # The lower ranks storing the slabs receives the message.
-            # In the x-dimension, the slabs are always thinner than
-            # (or at least as thin as) the domain.
-            if should_recv:
-                chunk_recv_bgn = i_chunk*thickness_chunk
-                chunk_recv_end = chunk_recv_bgn + thickness_chunk
-                if chunk_recv_end > ℤ[slab.shape[0]]:
-                    chunk_recv_end = ℤ[slab.shape[0]]
+            # Receive part of the local slab
+            if i_chunk < n_chunks_recv:
+                chunk_recv_bgn = recv_bgn + i_chunk*thickness_chunk_recv
+                chunk_recv_end = pairmin(chunk_recv_bgn + thickness_chunk_recv, recv_end)
                 smart_mpi(
                     slab[
                         chunk_recv_bgn:chunk_recv_end,
-                        ℤ[slab_sendrecv_j_start[ℓ]]:ℤ[slab_sendrecv_j_end[ℓ]],
-                        ℤ[slab_sendrecv_k_start[ℓ]]:ℤ[slab_sendrecv_k_end[ℓ]],
+                        ℤ[slab_sendrecv_j_start[rank_recv]]:ℤ[slab_sendrecv_j_end[rank_recv]],
+                        ℤ[slab_sendrecv_k_start[rank_recv]]:ℤ[slab_sendrecv_k_end[rank_recv]],
                     ],
                     source=rank_recv,
                     mpifun='Recv',
@@ -2413,29 +2519,28 @@ def slab_decompose(grid, slab_or_buffer_name=None, prepare_fft=False):
 # Helper function for slab and domain decomposition
 @cython.header(
     # Arguments
-    slab='double[:, :, ::1]',
-    grid_noghosts='double[:, :, :]',
-    # Locals
+    thickness='Py_ssize_t',
     area='Py_ssize_t',
+    # Locals
     n_chunks='Py_ssize_t',
     n_send='Py_ssize_t',
     n_send_max_allowed='Py_ssize_t',
-    thickness='Py_ssize_t',
     thickness_chunk='Py_ssize_t',
     returns=tuple,
 )
-def get_slab_domain_decomposition_chunk_size(slab, grid_noghosts):
+def get_slab_domain_decomposition_chunk_size(thickness, area):
     """The communicating of the grid/slab data for slab/domain
     decomposition is done in chunks. These chunks are the full domain
-    size in the y and z direction, and smaller or equal to the slab size
-    in the x direction. This function computes and returns the number of
+    size in the y and z direction (given by area), and smaller or equal
+    to the thickness of the overlap between the slab and the domain in
+    the x direction. This function computes and returns the number of
     chunks and their size along long x direction for such communication.
+    As the thickness and area are known to both the sending and the
+    receiving process, these agree on the chunking.
     """
     # Maximum number of elements (grid values) to communicate at a time
     n_send_max_allowed = 2**23  # 64 MB
     # Compute number of chunks and their thickness
-    thickness = slab.shape[0]
-    area = grid_noghosts.shape[1]*grid_noghosts.shape[2]
     n_send = thickness*area
     if n_send <= n_send_max_allowed:
         n_chunks = 1
@@ -3358,7 +3463,11 @@ def fourier_operate(slab, deconv_order=0, lattice=None, diff_dim=-1):
         for index in range(slab_size_j*slab_size_i*slab_size_k):
             slab_ptr[index] *= ℝ[1/len(lattice)]
         return slab
-    # Perform the deconvolution and interlacing
+    # Perform the deconvolution and interlacing,
+    # possibly using multiple threads.
+    if 𝔹[num_threads > 1]:
+        fourier_operate_threaded(slab, deconv_order, lattice, diff_dim)
+        return slab
     k_fundamental = ℝ[2*π/boxsize]
     gridsize = slab_size_i
     interlace_lattice = lattice
@@ -3399,6 +3508,180 @@ def fourier_operate(slab, deconv_order=0, lattice=None, diff_dim=-1):
         slab_ptr[index + 1] = im
     return slab
 
+# Function performing in-place deconvolution, interlacing,
+# differentiation and multiplication by a Green's function of Fourier
+# slabs, using a team of threads within the local process.
+@cython.header(
+    # Arguments
+    slab='double[:, :, ::1]',
+    deconv_order='int',
+    lattice='Lattice',
+    diff_dim='int',
+    green='bint',
+    green_factor='double',
+    green_exponent='double',
+    # Locals
+    gridsize='Py_ssize_t',
+    slab_size_j='Py_ssize_t',
+    returns='void',
+)
+def fourier_operate_threaded(
+    slab, deconv_order=0, lattice=None, diff_dim=-1,
+    green=False, green_factor=1, green_exponent=0,
+):
+    """This function visits the same Fourier modes as fourier_loop()
+    and applies the same operations as fourier_operate(), but
+    distributes the local slab over a team of num_threads threads.
+    The work is done by the fourier_slab_threaded() C function.
+    When green is True, each mode is further multiplied by
+      green_factor/k²*exp(green_exponent*k²),
+    with k² the squared length of the wave vector in grid units,
+    leaving the origin untouched.
+    """
+    if lattice is None:
+        lattice = Lattice()
+    slab_size_j = slab.shape[0]
+    gridsize = slab.shape[1]
+    fourier_slab_threaded(
+        num_threads,
+        cython.address(slab[:, :, :]),
+        gridsize,
+        slab_size_j,
+        slab_size_j*rank,
+        deconv_order,
+        π/gridsize,
+        1/len(lattice),
+        lattice.shift != (0, 0, 0),
+        -2*π/gridsize*lattice.shift[0],
+        -2*π/gridsize*lattice.shift[1],
+        -2*π/gridsize*lattice.shift[2],
+        diff_dim,
+        2*π/boxsize,
+        green,
+        green_factor,
+        green_exponent,
+    )
+
+# Function performing deconvolution, interlacing, multiplication by a
+# Green's function and differentiation along all three dimensions of a
+# Fourier slab in a single sweep, writing the results to three
+# separate slabs.
+@cython.pheader(
+    # Arguments
+    slab='double[:, :, ::1]',
+    slabs_grad=list,
+    deconv_order='int',
+    lattice='Lattice',
+    green_factor='double',
+    green_exponent='double',
+    # Locals
+    cosθ='double',
+    factor='double',
+    gridsize='Py_ssize_t',
+    im='double',
+    index='Py_ssize_t',
+    interlace_lattice='Lattice',
+    k2='Py_ssize_t',
+    k_fundamental='double',
+    ki='Py_ssize_t',
+    kj='Py_ssize_t',
+    kk='Py_ssize_t',
+    re='double',
+    sinθ='double',
+    slab_ptr='double*',
+    slab_size_j='Py_ssize_t',
+    slab_x='double[:, :, ::1]',
+    slab_x_ptr='double*',
+    slab_y='double[:, :, ::1]',
+    slab_y_ptr='double*',
+    slab_z='double[:, :, ::1]',
+    slab_z_ptr='double*',
+    θ='double',
+    returns='void',
+)
+def fourier_operate_fused(
+    slab, slabs_grad, deconv_order=0, lattice=None, green_factor=1, green_exponent=0,
+):
+    """The passed slab is left unchanged, while the three slabs within
+    slabs_grad are populated with the x, y and z components of
+      ∇(green_factor/k²*exp(green_exponent*k²)*slab),
+    with k² the squared length of the wave vector in grid units and
+    with the deconvolution and interlacing of fourier_operate() applied.
+    This is equivalent to first multiplying the slab by the Green's
+    function and then calling fourier_operate() with diff_dim = 0, 1
+    and 2 on three copies, but with each mode visited only once.
+    The origin and the Nyquist planes of the output slabs are not
+    written to and so should be nullified beforehand.
+    """
+    if lattice is None:
+        lattice = Lattice()
+    slab_x, slab_y, slab_z = slabs_grad
+    slab_size_j = slab.shape[0]
+    gridsize = slab.shape[1]
+    # Perform the fused operations using multiple threads
+    if 𝔹[num_threads > 1]:
+        fourier_slab_fused_threaded(
+            num_threads,
+            cython.address(slab  [:, :, :]),
+            cython.address(slab_x[:, :, :]),
+            cython.address(slab_y[:, :, :]),
+            cython.address(slab_z[:, :, :]),
+            gridsize,
+            slab_size_j,
+            slab_size_j*rank,
+            deconv_order,
+            π/gridsize,
+            1/len(lattice),
+            lattice.shift != (0, 0, 0),
+            -2*π/gridsize*lattice.shift[0],
+            -2*π/gridsize*lattice.shift[1],
+            -2*π/gridsize*lattice.shift[2],
+            2*π/boxsize,
+            green_factor,
+            green_exponent,
+        )
+        return
+    # Perform the fused operations within a single Fourier loop
+    slab_ptr   = cython.address(slab  [:, :, :])
+    slab_x_ptr = cython.address(slab_x[:, :, :])
+    slab_y_ptr = cython.address(slab_y[:, :, :])
+    slab_z_ptr = cython.address(slab_z[:, :, :])
+    k_fundamental = ℝ[2*π/boxsize]
+    interlace_lattice = lattice
+    for index, ki, kj, kk, factor, θ in fourier_loop(
+        gridsize,
+        skip_origin=True, deconv_order=deconv_order, interlace_lattice=interlace_lattice,
+    ):
+        k2 = ℤ[ℤ[ℤ[kj**2] + ki**2] + kk**2]
+        # Extract real and imag part of slab
+        re = slab_ptr[index    ]
+        im = slab_ptr[index + 1]
+        # Rotate the complex phase due to interlacing
+        with unswitch:
+            if interlace_lattice.shift != (0, 0, 0):
+                cosθ = cos(θ)
+                sinθ = sin(θ)
+                re, im = (
+                    re*cosθ - im*sinθ,
+                    re*sinθ + im*cosθ,
+                )
+        # Apply the Green's function
+        factor *= ℝ[green_factor*k_fundamental]/k2
+        with unswitch:
+            if green_exponent != 0:
+                factor *= exp(k2*green_exponent)
+        re *= factor
+        im *= factor
+        # Differentiate by multiplying by the imaginary unit and each
+        # component of k⃗ in physical units, storing the results in the
+        # three output slabs.
+        slab_x_ptr[index    ] = -im*ki
+        slab_x_ptr[index + 1] =  re*ki
+        slab_y_ptr[index    ] = -im*kj
+        slab_y_ptr[index + 1] =  re*kj
+        slab_z_ptr[index    ] = -im*kk
+        slab_z_ptr[index + 1] =  re*kk
+
 # Function for in-place inverting the Laplacian in
 #   ∇²Φ = source
 @cython.pheader(
@@ -3429,6 +3712,11 @@ def laplacian_inverse(source, factor=1):
     # Invert Laplacian by dividing by -k²
     k_fundamental = ℝ[2*π/boxsize]
     scaling = factor  # rename to not clash with fourier_loop()
+    if 𝔹[num_threads > 1]:
+        fourier_operate_threaded(
+            source, green=True, green_factor=(-scaling/k_fundamental**2),
+        )
+        return source
     for index, ki, kj, kk, factor, θ in fourier_loop(gridsize, skip_origin=True):
         k2 = ℤ[ℤ[ℤ[kj**2] + ki**2] + kk**2]
         amplitude = ℝ[-scaling/k_fundamental**2]/k2
@@ -3773,6 +4061,7 @@ def get_fftw_slab(gridsize, buffer_name=None, nullify=False):
     # If this slab has already been constructed, fetch it
     slab = slabs.get((gridsize, buffer_name))
     if slab is not None:
+        slabs_last_use[gridsize, buffer_name] = memory_epoch
         nullify_modes(slab, nullify)
         return slab
     # Checks on the passed gridsize
@@ -3787,6 +4076,11 @@ def get_fftw_slab(gridsize, buffer_name=None, nullify=False):
             f'Some operations may not function correctly.'
     )
     shape = get_slabshape_local(gridsize)
+    # If a memory budget is set, make room for the new slab by freeing
+    # idle slabs (those not requested since the last call to
+    # manage_memory()), should the budget otherwise be exceeded.
+    if memory_budget > 0:
+        free_idle_slabs(shape[0]*shape[1]*shape[2]*ℤ[C2np['double']().itemsize])
     # In pure Python mode we use NumPy, which really means that there
     # is no needed preparations. In compiled mode we use FFTW,
     # which means that the grid and its plans must be prepared.
@@ -3810,6 +4104,7 @@ def get_fftw_slab(gridsize, buffer_name=None, nullify=False):
             bytes(fftw_wisdom_rigor, encoding='ascii'),
             fftw_wisdom_reuse,
             bytes(wisdom_filename, encoding='ascii'),
+            num_threads,
         )
         if acquire:
             masterprint('done')
@@ -3839,7 +4134,7 @@ def get_fftw_slab(gridsize, buffer_name=None, nullify=False):
                 f'    slab_start_i = {slab_start_i}, expected {shape[0]*rank},\n'
                 f'    slab_start_j = {slab_start_j}, expected {shape[0]*rank},\n'
             )
-        as_expected = allreduce(as_expected, op=MPI.LOR)
+        as_expected = allreduce(as_expected, op=MPI.LAND)
         if not as_expected:
             abort('Refusing to carry on with this non-expected decomposition')
         # Wrap the slab pointer in a memory view. Looping over this
@@ -3862,11 +4157,19 @@ def get_fftw_slab(gridsize, buffer_name=None, nullify=False):
         fftw_plans_mapping[slab_address] = fftw_plans_index
     # Store and return this slab
     slabs[gridsize, buffer_name] = slab
+    slabs_last_use[gridsize, buffer_name] = memory_epoch
     nullify_modes(slab, nullify)
     return slab
 # Cache storing slabs. The keys have the format (gridsize, buffer_name).
 cython.declare(slabs=dict)
 slabs = {}
+# The memory epoch at which each slab was last requested. The memory
+# epoch is advanced by manage_memory(), at points where no references
+# to slabs are held. Slabs with a last use earlier than the current
+# epoch are thus idle.
+cython.declare(memory_epoch='Py_ssize_t', slabs_last_use=dict)
+memory_epoch = 0
+slabs_last_use = {}
 # Arrays of FFTW plans
 cython.declare(
     fftw_plans_size='Py_ssize_t',
@@ -3884,13 +4187,87 @@ fftw_plans_mapping = {}
 cython.declare(wisdom_acquired=dict)
 wisdom_acquired = {}
 
+# Function returning the index into fftw_plans_single_forward and
+# fftw_plans_single_backward of the single-precision FFTW plans for
+# slabs of a given grid size, creating the plans if needed. Unlike the
+# double-precision plans, these are not tied to any particular slab.
+@cython.header(
+    # Arguments
+    gridsize='Py_ssize_t',
+    # Locals
+    acquire='bint',
+    fftw_plans_index='Py_ssize_t',
+    fftw_struct=fftw_single_struct,
+    wisdom_filename=str,
+    returns='Py_ssize_t',
+)
+def get_fftw_plans_single(gridsize):
+    global fftw_plans_single_size, fftw_plans_single_forward, fftw_plans_single_backward
+    fftw_plans_index = fftw_plans_single_mapping.get(gridsize, -1)
+    if fftw_plans_index != -1:
+        return fftw_plans_index
+    if not fftw_single_available():
+        abort(
+            f'Single-precision FFTs requested, but CO𝘕CEPT was built without '
+            f'single-precision FFTW. Reinstall FFTW with fftw_also_single_precision=True '
+            f'and rebuild CO𝘕CEPT.'
+        )
+    wisdom_filename = get_wisdom_filename(gridsize, 'single')
+    acquire = False
+    if master:
+        os.makedirs(os.path.dirname(wisdom_filename), exist_ok=True)
+        if (gridsize, 'single') not in wisdom_acquired and not os.path.isfile(wisdom_filename):
+            acquire = True
+            masterprint(
+                f'Acquiring single-precision FFTW wisdom ({fftw_wisdom_rigor}) '
+                f'for grid size {gridsize} ...'
+            )
+    fftw_struct = fftw_setup_single(
+        gridsize, gridsize, gridsize,
+        bytes(fftw_wisdom_rigor, encoding='ascii'),
+        fftw_wisdom_reuse,
+        bytes(wisdom_filename, encoding='ascii'),
+        num_threads,
+    )
+    fftw_plans_index = fftw_plans_single_size
+    fftw_plans_single_size += 1
+    fftw_plans_single_forward = realloc(
+        fftw_plans_single_forward, fftw_plans_single_size*sizeof('fftwf_plan'),
+    )
+    fftw_plans_single_backward = realloc(
+        fftw_plans_single_backward, fftw_plans_single_size*sizeof('fftwf_plan'),
+    )
+    fftw_plans_single_forward [fftw_plans_index] = fftw_struct.plan_forward
+    fftw_plans_single_backward[fftw_plans_index] = fftw_struct.plan_backward
+    fftw_plans_single_mapping[gridsize] = fftw_plans_index
+    if acquire:
+        masterprint('done')
+    wisdom_acquired[gridsize, 'single'] = True
+    return fftw_plans_index
+# Arrays of single-precision FFTW plans
+cython.declare(
+    fftw_plans_single_size='Py_ssize_t',
+    fftw_plans_single_forward ='fftwf_plan*',
+    fftw_plans_single_backward='fftwf_plan*',
+)
+fftw_plans_single_size = 0
+fftw_plans_single_forward  = malloc(fftw_plans_single_size*sizeof('fftwf_plan'))
+fftw_plans_single_backward = malloc(fftw_plans_single_size*sizeof('fftwf_plan'))
+# Mapping from grid sizes to indices in
+# fftw_plans_single_forward and fftw_plans_single_backward.
+cython.declare(fftw_plans_single_mapping=dict)
+fftw_plans_single_mapping = {}
+
 # Function that frees the memory of grid allocated by FFTW
 @cython.header(
     # Arguments
     gridsize='Py_ssize_t',
     buffer_name=object,  # int or str or None
     # Locals
+    fftw_plans_index='Py_ssize_t',
+    key=tuple,
     slab='double[:, :, ::1]',
+    slab_address='Py_ssize_t',
     slab_ptr='double*',
     returns='void',
 )
@@ -3904,26 +4281,241 @@ def free_fftw_slab(gridsize, buffer_name):
             f'free_fftw_slab(): No slab with '
             f'gridsize = {gridsize}, buffer_name = {buffer_name}'
         )
+    slabs_last_use.pop((gridsize, buffer_name), None)
     if not cython.compiled:
         try:
             [slab].pop().resize(0, refcheck=False)
         except Exception:
             pass
+        return
+    # Destroy the FFTW plans tied to this slab
+    slab_ptr = cython.address(slab[:, :, :])
+    slab_address = cast(slab_ptr, 'Py_ssize_t')
+    fftw_plans_index = fftw_plans_mapping.pop(slab_address)
+    fftw_destroy_plan(fftw_plans_forward [fftw_plans_index])
+    fftw_destroy_plan(fftw_plans_backward[fftw_plans_index])
+    fftw_plans_forward [fftw_plans_index] = NULL
+    fftw_plans_backward[fftw_plans_index] = NULL
+    fftw_free(slab_ptr)
+    # Destroy the single-precision FFTW plans
+    # if no slabs of this grid size remain.
+    for key in slabs:
+        if key[0] == gridsize:
+            break
     else:
-        slab_ptr = cython.address(slab[:, :, :])
-        fftw_free(slab_ptr)
-        # Note that we leave the FFTW plans as is
+        fftw_plans_index = fftw_plans_single_mapping.pop(gridsize, -1)
+        if fftw_plans_index != -1:
+            fftw_destroy_single(
+                fftw_plans_single_forward [fftw_plans_index],
+                fftw_plans_single_backward[fftw_plans_index],
+            )
+            fftw_plans_single_forward [fftw_plans_index] = NULL
+            fftw_plans_single_backward[fftw_plans_index] = NULL
+
+# Function returning whether a slab with the given grid size
+# and buffer name is currently allocated.
+@cython.pheader(
+    # Arguments
+    gridsize='Py_ssize_t',
+    buffer_name=object,  # int or str or None
+    returns='bint',
+)
+def has_fftw_slab(gridsize, buffer_name=None):
+    if buffer_name is None:
+        buffer_name = 'slab_global'
+    return ((gridsize, buffer_name) in slabs)
+
+# Function returning the memory usage of the slabs, as a dict mapping
+# (gridsize, buffer_name) to (size in bytes, memory epoch of last use).
+@cython.header(
+    # Locals
+    key=tuple,
+    slab='double[:, :, ::1]',
+    usage=dict,
+    returns=dict,
+)
+def get_slabs_usage():
+    usage = {}
+    for key, slab in slabs.items():
+        usage[key] = (
+            slab.shape[0]*slab.shape[1]*slab.shape[2]*ℤ[C2np['double']().itemsize],
+            slabs_last_use[key],
+        )
+    return usage
+
+# Function which collectively frees idle slabs (those not requested
+# since the last call to manage_memory()), least recently used first,
+# until the memory usage of buffers and slabs together with nbytes_extra
+# additional bytes is within memory_budget on all processes.
+# The resulting memory usage of buffers and slabs is returned.
+@cython.header(
+    # Arguments
+    nbytes_extra='Py_ssize_t',
+    # Locals
+    candidates=list,
+    key=tuple,
+    last_use='Py_ssize_t',
+    nbytes='Py_ssize_t',
+    usage='Py_ssize_t',
+    usage_max='Py_ssize_t',
+    usage_slabs=dict,
+    returns='Py_ssize_t',
+)
+def free_idle_slabs(nbytes_extra=0):
+    usage_slabs = get_slabs_usage()
+    usage = nbytes_extra
+    for nbytes, last_use in get_buffers_usage().values():
+        usage += nbytes
+    for nbytes, last_use in usage_slabs.values():
+        usage += nbytes
+    usage_max = allreduce(usage, op=MPI.MAX)
+    if usage_max > memory_budget:
+        # As slabs are requested collectively,
+        # their last use is the same on all processes.
+        candidates = sorted(
+            [key for key in usage_slabs if usage_slabs[key][1] < memory_epoch],
+            key=(lambda key, usage_slabs=usage_slabs: (usage_slabs[key][1], -key[0])),
+        )
+        for key in candidates:
+            if usage_max <= memory_budget:
+                break
+            free_fftw_slab(key[0], key[1])
+            usage -= usage_slabs[key][0]
+            usage_max = allreduce(usage, op=MPI.MAX)
+    return usage - nbytes_extra
+
+# Function managing the memory of the global buffers
+# (see get_buffer() in communication.py) and slabs.
+@cython.pheader(
+    # Arguments
+    report='bint',
+    # Locals
+    candidates=list,
+    description=str,
+    key=object,  # tuple or any hashable object
+    kind=str,
+    last_use='Py_ssize_t',
+    lines=list,
+    nbytes='Py_ssize_t',
+    usage='Py_ssize_t',
+    usage_kind=dict,
+    usage_buffers=dict,
+    usage_max='Py_ssize_t',
+    usage_slabs=dict,
+    returns='void',
+)
+def manage_memory(report=False):
+    """This function should be called collectively at points where no
+    references to buffers or slabs are held, e.g. between time steps.
+    Buffers and slabs not requested since the previous call are then
+    idle. If the memory usage of any process exceeds memory_budget,
+    idle slabs and then idle buffers are freed in least recently used
+    order until the usage is within the budget. Slabs are freed first
+    as they (together with their FFTW plans) tend to dominate the
+    memory usage, and as they have to be freed collectively. Idle slabs
+    are further freed as needed when new slabs are requested
+    (see get_fftw_slab()). If report is True and print_memory_usage
+    is set, the memory usage is printed.
+    """
+    global memory_epoch, memory_usage_peak
+    # Tally up the memory usage of buffers and slabs
+    usage_buffers = get_buffers_usage()
+    usage_slabs = get_slabs_usage()
+    usage = 0
+    for kind, usage_kind in (('buffer', usage_buffers), ('slab', usage_slabs)):
+        for key, (nbytes, last_use) in usage_kind.items():
+            usage += nbytes
+            memory_peaks[kind, key] = pairmax(memory_peaks.get((kind, key), 0), nbytes)
+    memory_usage_peak = pairmax(memory_usage_peak, usage)
+    # Enforce the memory budget
+    if memory_budget > 0:
+        usage = free_idle_slabs()
+        usage_max = allreduce(usage, op=MPI.MAX)
+        if usage_max > memory_budget:
+            # Free idle buffers, individually on each process
+            candidates = sorted(
+                [key for key in usage_buffers if usage_buffers[key][1] < memory_epoch],
+                key=(
+                    lambda key, usage_buffers=usage_buffers: (
+                        usage_buffers[key][1], -usage_buffers[key][0],
+                    )
+                ),
+            )
+            for key in candidates:
+                if usage <= memory_budget:
+                    break
+                free_buffer(key)
+                usage -= usage_buffers[key][0]
+            usage_max = allreduce(usage, op=MPI.MAX)
+            if usage_max > memory_budget:
+                masterwarn(
+                    f'Memory usage of buffers and slabs ({bytes2str(usage_max)}) '
+                    f'exceeds the memory budget ({bytes2str(memory_budget)}) '
+                    f'even after freeing all idle buffers and slabs'
+                )
+    # Report on memory usage
+    if report and print_memory_usage:
+        usage_max = allreduce(usage, op=MPI.MAX)
+        masterprint(
+            f'Memory usage of buffers and slabs: {bytes2str(usage)} '
+            f'(peak {bytes2str(memory_usage_peak)}) on the master process, '
+            f'{bytes2str(usage_max)} at most'
+        )
+        if print_memory_usage == 'full':
+            lines = []
+            for kind, usage_kind in (
+                ('buffer', get_buffers_usage()), ('slab', get_slabs_usage()),
+            ):
+                for key, (nbytes, last_use) in usage_kind.items():
+                    if kind == 'slab':
+                        description = f'Slab "{key[1]}" (grid size {key[0]})'
+                    else:
+                        description = f'Buffer "{key}"'
+                    lines.append(
+                        f'{description}: ${bytes2str(nbytes)} '
+                        f'(peak ${bytes2str(memory_peaks[kind, key])})'
+                        + ' (idle)'*(last_use < memory_epoch)
+                    )
+            if lines:
+                masterprint('\n'.join(align_text(lines, indent=4)))
+    # Advance the memory epoch, rendering all buffers and slabs idle
+    memory_epoch += 1
+    advance_buffers_epoch()
+# Peak memory usage of individual buffers and slabs, as well as
+# of all buffers and slabs combined, in bytes.
+cython.declare(memory_peaks=dict, memory_usage_peak='Py_ssize_t')
+memory_peaks = {}
+memory_usage_peak = 0
+
+# Function for formatting a number of bytes
+@cython.header(
+    # Arguments
+    nbytes='double',
+    # Locals
+    unit=str,
+    returns=str,
+)
+def bytes2str(nbytes):
+    for unit in ('B', 'KiB', 'MiB', 'GiB'):
+        if nbytes < 1024:
+            break
+        nbytes /= 1024
+    else:
+        unit = 'TiB'
+    return f'{significant_figures(nbytes, 3, incl_zeros=False)} {unit}'
 
 # Helper function for the get_fftw_slab() function,
 # which construct the absolute path to the wisdom file to use.
 @cython.header(
     # Arguments
     gridsize='Py_ssize_t',
+    precision=str,
     # Locals
     content=str,
     fftw_pkgconfig_filename=str,
     filename=str,
     index='Py_ssize_t',
+    key=list,
     match=object,  # re.Match
     node_process_count=object,  # collections.Counter
     other_node='int',
@@ -3933,12 +4525,15 @@ def free_fftw_slab(gridsize, buffer_name):
     process_count_max='Py_ssize_t',
     returns=str,
 )
-def get_wisdom_filename(gridsize):
+def get_wisdom_filename(gridsize, precision='double'):
     """The FFTW wisdom file name is built as a hash of several things:
     - The passed grid size.
     - The total number of processes.
+    - The number of threads used within each process.
     - The global FFTW wisdom rigour.
     - The FFTW version.
+    - The floating-point precision of the transforms, though only when
+      this is not 'double', keeping existing wisdom files valid.
     - The name of the node "owning" the wisdom in the case of
       fftw_wisdom_share being False. Here a node is said to own the
       wisdom if it hosts the majority of the processes. A more elaborate
@@ -3986,11 +4581,13 @@ def get_wisdom_filename(gridsize):
                 for other_node_name, process_count in primary_nodes
             ])[0]
     # The full path to the wisdom file
-    filename = get_reusable_filename(
-        'fftw',
-        gridsize, nprocs, fftw_wisdom_rigor, fftw_version, wisdom_owner,
-        extension='wisdom',
-    )
+    key = [
+        gridsize, nprocs, num_threads,
+        fftw_wisdom_rigor, fftw_version, wisdom_owner,
+    ]
+    if precision != 'double':
+        key.append(precision)
+    filename = get_reusable_filename('fftw', *key, extension='wisdom')
     # Broadcast and return result
     return bcast(filename)
 # Constant strings set and used by the get_wisdom_filename function
@@ -4004,12 +4601,16 @@ wisdom_owner = ''
     slab='double[:, :, ::1]',
     direction=str,
     apply_forward_normalization='bint',
+    precision=str,
     # Locals
     fftw_plans_index='Py_ssize_t',
+    gridsize='Py_ssize_t',
     slab_address='Py_ssize_t',
+    slab_ptr='double*',
+    slab_size='Py_ssize_t',
     returns='void',
 )
-def fft(slab, direction, apply_forward_normalization=False):
+def fft(slab, direction, apply_forward_normalization=False, precision='double'):
     """Fourier transform the given slab decomposed grid.
     For a forwards transformation from real to Fourier space, supply
     direction='forward'. By default this is an unnormalised transform,
@@ -4021,6 +4622,13 @@ def fft(slab, direction, apply_forward_normalization=False):
     direction='backward'. Here, no further normalization is needed,
     as defined by FFTW.
 
+    With precision='single', the transform (including the distributed
+    transposition) is carried out in single precision, in-place within
+    the double-precision slab. The slab values are rounded to single
+    precision in the process. Only the arithmetic and communication of
+    the transform itself are reduced, as the slab is still allocated
+    (and stored between transforms) in double precision.
+
     In pure Python, NumPy is used to carry out the Fourier transforms.
     To emulate the effects of FFTW perfectly, a lot of extra steps
     are needed.
@@ -4032,7 +4640,17 @@ def fft(slab, direction, apply_forward_normalization=False):
             f'fft() was called with the direction "{direction}", '
             f'which is neither "forward" nor "backward".'
         )
+    if precision not in ('double', 'single'):
+        abort(
+            f'fft() was called with the precision "{precision}", '
+            f'which is neither "double" nor "single".'
+        )
+    gridsize = slab.shape[1]
     if not cython.compiled:
+        # Emulate single-precision transforms by rounding
+        # the input to single precision.
+        if precision == 'single':
+            asarray(slab)[...] = asarray(slab).astype(np.float32)
         # Do to floating-point inaccuracies, the order in which the
         # three dimensions are handled by the FFT matters slightly
         # (this is the case for both NumPy and FFTW). By setting
@@ -4050,7 +4668,6 @@ def fft(slab, direction, apply_forward_normalization=False):
         slab_size_i = slab_size_j = slab.shape[0]
         slab_start_i = slab_size_i*rank
         slab_start_j = slab_size_j*rank
-        gridsize = slab.shape[1]
         gridsize_padding = slab.shape[2]
         grid_global_pure_python = empty(
             (gridsize, gridsize, gridsize_padding),
@@ -4141,7 +4758,26 @@ def fft(slab, direction, apply_forward_normalization=False):
             asarray(slab)[...] = grid_global_pure_python[
                 slab_start_i:(slab_start_i + slab_size_i), :, :,
             ]
-    else:  # Compiled mode
+        if precision == 'single':
+            asarray(slab)[...] = asarray(slab).astype(np.float32)
+    elif precision == 'single':
+        # Single-precision transforms use plans shared between all
+        # slabs of a given grid size. These are looked up (and possibly
+        # created) by all processes, as this is a collective operation.
+        fftw_plans_index = get_fftw_plans_single(gridsize)
+        slab_ptr = cython.address(slab[:, :, :])
+        slab_size = slab.shape[0]*slab.shape[1]*slab.shape[2]
+        if 𝔹[direction == 'forward']:
+            fftw_execute_single(
+                fftw_plans_single_forward[fftw_plans_index], slab_ptr, slab_size, True,
+                num_threads,
+            )
+        else:  # direction == 'backward':
+            fftw_execute_single(
+                fftw_plans_single_backward[fftw_plans_index], slab_ptr, slab_size, False,
+                num_threads,
+            )
+    else:  # Compiled mode, double precision
         # Look up the index of the FFTW plans for the passed slab.
         slab_address = cast(cython.address(slab[:, :, :]), 'Py_ssize_t')
         if slab_address not in fftw_plans_mapping:
@@ -5396,18 +6032,6 @@ domain_info = get_domain_info()
 cython.declare(
     domain_subdivisions='int[::1]',
     domain_layout_local_indices='int[::1]',
-    domain_size_x='double',
-    domain_size_y='double',
-    domain_size_z='double',
-    domain_bgn_x='double',
-    domain_bgn_y='double',
-    domain_bgn_z='double',
 )
 domain_subdivisions         = domain_info.subdivisions
 domain_layout_local_indices = domain_info.layout_local_indices
-domain_size_x               = domain_info.size_x
-domain_size_y               = domain_info.size_y
-domain_size_z               = domain_info.size_z
-domain_bgn_x                = domain_info.bgn_x
-domain_bgn_y                = domain_info.bgn_y
-domain_bgn_z                = domain_info.bgn_z
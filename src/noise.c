@@ -0,0 +1,148 @@
+/*
+This file is part of CO𝘕CEPT, the cosmological 𝘕-body code in Python.
+Copyright © 2015–2024 Jeppe Mosgaard Dakin.
+
+CO𝘕CEPT is free software: You can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+CO𝘕CEPT is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with CO𝘕CEPT. If not, see https://www.gnu.org/licenses/
+
+The author of CO𝘕CEPT can be contacted at dakin(at)phys.au.dk
+The latest version of CO𝘕CEPT is available at
+https://github.com/jmd-dk/concept/
+*/
+
+
+
+
+#include <math.h>
+#include <stdint.h>
+
+/* This file defines the function primordial_noise_threaded, which
+ * imprints primordial noise onto a Fourier space slab using the
+ * counter-based 'counter' scheme, with the slab split over a team of
+ * OpenMP threads within each MPI process. It is the threaded
+ * counterpart to the 'counter' branch of generate_primordial_noise()
+ * of the ic module, with philox_uniform() mirroring
+ * random_counter_based(). The two must agree bit for bit, so that the
+ * realisation is independent of the number of threads.
+ */
+
+/* Note on the slab layout
+ *
+ * In Fourier space, the slab is indexed as
+ *   slab[(j*gridsize + i)*(gridsize + 2) + 2*kk]
+ * with j the local index along the distributed dimension. Modes on
+ * either of the three Nyquist planes are left untouched.
+ */
+
+/* Philox4x32-10 counter-based generator, returning a uniform
+ * number in (0, 1] given the 64-bit key and the counter
+ * (stream, ki, kj, kk). Negative counter words are taken
+ * in two's complement.
+ */
+static double philox_uniform(
+    uint64_t key,
+    Py_ssize_t stream,
+    Py_ssize_t ki,
+    Py_ssize_t kj,
+    Py_ssize_t kk
+) {
+    uint64_t c0 = (uint64_t)ki     & 0xFFFFFFFFu;
+    uint64_t c1 = (uint64_t)kj     & 0xFFFFFFFFu;
+    uint64_t c2 = (uint64_t)kk     & 0xFFFFFFFFu;
+    uint64_t c3 = (uint64_t)stream & 0xFFFFFFFFu;
+    uint64_t k0 =  key        & 0xFFFFFFFFu;
+    uint64_t k1 = (key >> 32) & 0xFFFFFFFFu;
+    int i;
+    for (i = 0; i < 10; i++) {
+        uint64_t p0 = UINT64_C(0xD2511F53)*c0;
+        uint64_t p1 = UINT64_C(0xCD9E8D57)*c2;
+        c0 = (p1 >> 32) ^ c1 ^ k0;
+        c1 = p1 & 0xFFFFFFFFu;
+        c2 = (p0 >> 32) ^ c3 ^ k1;
+        c3 = p0 & 0xFFFFFFFFu;
+        /* Bump key */
+        k0 = (k0 + 0x9E3779B9u) & 0xFFFFFFFFu;
+        k1 = (k1 + 0xBB67AE85u) & 0xFFFFFFFFu;
+    }
+    uint64_t x = ((c0 << 21) | (c1 >> 11)) & UINT64_C(0x1FFFFFFFFFFFFF);
+    return (x + 1)*(1.0/9007199254740992.0);  /* 1/2⁵³ */
+}
+
+void primordial_noise_threaded(
+    int nthreads,
+    double* slab,
+    Py_ssize_t gridsize,
+    Py_ssize_t slab_size_j,
+    Py_ssize_t slab_start_j,
+    unsigned long long key_amplitudes,
+    unsigned long long key_phases,
+    int fixed_amplitude,
+    double phase_shift,
+    double pi
+) {
+    /* Arguments to this function:
+     * - Number of threads to use.
+     * - The local Fourier space slab.
+     * - The global grid size, the local size of the slab along the
+     *   distributed j-dimension and the global j-index of its start.
+     * - The keys (seeds) for the amplitudes and the phases.
+     * - Whether to use a fixed (unit) amplitude.
+     * - The phase shift to add to all phases.
+     * - The value of π as used by the Python code.
+     */
+    Py_ssize_t nyquist = gridsize/2;
+    Py_ssize_t size_k = gridsize + 2;
+    Py_ssize_t j;
+    #pragma omp parallel for num_threads(nthreads) schedule(static)
+    for (j = 0; j < slab_size_j; j++) {
+        Py_ssize_t j_global = slab_start_j + j;
+        if (j_global == nyquist)
+            continue;
+        Py_ssize_t kj = j_global - (j_global >= nyquist ? gridsize : 0);
+        Py_ssize_t i;
+        for (i = 0; i < gridsize; i++) {
+            if (i == nyquist)
+                continue;
+            Py_ssize_t ki = i - (i >= nyquist ? gridsize : 0);
+            double* slab_ij = slab + (j*gridsize + i)*size_k;
+            int lower_x_zdc = (ki < 0) || (ki == 0 && kj < 0);
+            Py_ssize_t kk;
+            for (kk = 0; kk < nyquist; kk++) {
+                /* Determine the source mode of the noise,
+                 * implementing the Hermitian symmetry
+                 * of the z DC plane.
+                 */
+                Py_ssize_t ki_source = ki;
+                Py_ssize_t kj_source = kj;
+                double conj = +1;
+                if (kk == 0 && !lower_x_zdc) {
+                    ki_source = -ki;
+                    kj_source = -kj;
+                    conj = -1;
+                }
+                double r = 1;
+                if (!fixed_amplitude)
+                    r = sqrt(-log(
+                        philox_uniform(key_amplitudes, 0, ki_source, kj_source, kk)
+                    ));
+                double theta = -pi + (2*pi)*philox_uniform(
+                    key_phases, 1, ki_source, kj_source, kk
+                );
+                if (phase_shift != 0)
+                    theta += phase_shift;
+                slab_ij[2*kk    ] = r*cos(theta);
+                slab_ij[2*kk + 1] = conj*(r*sin(theta));
+            }
+        }
+    }
+}
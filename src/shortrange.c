@@ -0,0 +1,512 @@
+/*
+This file is part of CO𝘕CEPT, the cosmological 𝘕-body code in Python.
+Copyright © 2015–2024 Jeppe Mosgaard Dakin.
+
+CO𝘕CEPT is free software: You can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+CO𝘕CEPT is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with CO𝘕CEPT. If not, see https://www.gnu.org/licenses/
+
+The author of CO𝘕CEPT can be contacted at dakin(at)phys.au.dk
+The latest version of CO𝘕CEPT is available at
+https://github.com/jmd-dk/concept/
+*/
+
+
+
+/* This file defines the function shortrange_tiles_threaded, which
+ * carries out the tile-tile short-range gravitational interaction
+ * between a receiver and a supplier component using a team of
+ * OpenMP threads within each MPI process. It is the threaded
+ * counterpart to the gravity_pairwise_shortrange() function of the
+ * gravity module, working directly on the coarse tiling of the two
+ * components, i.e. without subtiles.
+ */
+
+/* Note on race-free accumulation
+ *
+ * Each receiver tile is handled in its entirety by a single thread.
+ * Interacting with a receiver tile updates the momentum buffer of
+ * particles within the receiver tile itself, as well as within the
+ * (at most 27) neighbouring supplier tiles. Two receiver tiles with
+ * 3D tile indices which differ by at least 3 along some dimension
+ * thus never write to the same particles. We exploit this by colouring
+ * the receiver tiles according to their 3D tile index modulo 3, giving
+ * 3×3×3 = 27 colours. The colours are processed one after another,
+ * while all tiles of a given colour are distributed over the threads.
+ * Tile pairings within the local domain never wrap around the periodic
+ * box, while for pairings between different domains the receiver tiles
+ * all lie within a single layer along the direction(s) connecting the
+ * two domains. The colouring is then race-free for all domain pairings,
+ * and so no atomics or thread-private buffers are needed.
+ */
+
+#define N_COLOURS 27
+
+/* Upper bound on the number of rungs (rung indices are signed chars) */
+#define N_RUNGS_MAX 128
+
+/* Lookup into the short-range force table at the (scaled) squared
+ * distance u, using nearest grid point (table_order = 1), linear
+ * (table_order = 2) or cubic Catmull-Rom (table_order = 4)
+ * interpolation. This mirrors lookup_shortrange_table()
+ * of the gravity module, where the table layout is documented.
+ */
+static inline double lookup_table(const double* table, double u, int table_order) {
+    Py_ssize_t i = (Py_ssize_t)u;
+    if (table_order == 1)
+        return table[i];
+    double t = u - i;
+    if (table_order == 2)
+        return table[i] + t*(table[i + 1] - table[i]);
+    return table[i + 1] + 0.5*t*(
+        (table[i + 2] - table[i])
+        + t*(
+            (2*table[i] - 5*table[i + 1] + 4*table[i + 2] - table[i + 3])
+            + t*(3*(table[i + 1] - table[i + 2]) + table[i + 3] - table[i])
+        )
+    );
+}
+
+/* Single precision interaction between a receiver and a supplier tile,
+ * used by shortrange_tiles_threaded() when single is true. All particles
+ * of the supplier tile are first gathered into the thread-local single
+ * precision buffers, with positions taken relative to the location
+ * (ref) of the receiver tile so that only the separations between the
+ * particles are reduced in precision. The supplier momentum changes are
+ * accumulated in single precision within these buffers and scattered
+ * back once for the whole tile pair, with the factors applied. The
+ * innermost loop then only ever reads and writes single precision
+ * data. The buffers are enlarged as needed, with their new capacity
+ * returned.
+ */
+static Py_ssize_t shortrange_tilepair_single(
+    /* Receiver tile */
+    double* pos_r,
+    double* dmom_r,
+    signed char* rung_indices_jumped_r,
+    Py_ssize_t** tile_r,
+    Py_ssize_t* rungs_N_r,
+    int tile_contain_jumping_r,
+    signed char rung_index_r_bgn,
+    signed char rung_index_r_end,
+    signed char lowest_active_rung_r,
+    /* Supplier tile */
+    double* pos_s,
+    double* dmom_s,
+    signed char* rung_indices_jumped_s,
+    Py_ssize_t** tile_s,
+    Py_ssize_t* rungs_N_s,
+    int tile_contain_jumping_s,
+    signed char lowest_active_rung_s,
+    signed char lowest_populated_rung_s,
+    signed char highest_populated_rung_s,
+    /* Interaction */
+    double* ref,
+    double* periodic_offset,
+    int only_supply,
+    int local_interaction_flag_0,
+    const double* factors,
+    const double* table,
+    double r2_max,
+    double table_scaling,
+    int table_order,
+    /* Thread-local single precision buffers */
+    float** buffers,
+    Py_ssize_t capacity
+) {
+    signed char rung_index_s_end = highest_populated_rung_s + 1;
+    Py_ssize_t rung_offsets_s[N_RUNGS_MAX + 1];
+    signed char rung_index_s;
+    Py_ssize_t n, N_s = 0;
+    int dim;
+    for (rung_index_s = lowest_populated_rung_s; rung_index_s < rung_index_s_end; rung_index_s++) {
+        rung_offsets_s[rung_index_s] = N_s;
+        N_s += rungs_N_s[rung_index_s];
+    }
+    if (N_s > capacity) {
+        capacity = (Py_ssize_t)(1.25*N_s) + 1;
+        for (dim = 0; dim < 6; dim++)
+            buffers[dim] = realloc(buffers[dim], capacity*sizeof(float));
+    }
+    float* xs = buffers[0];
+    float* ys = buffers[1];
+    float* zs = buffers[2];
+    float* dxs = buffers[3];
+    float* dys = buffers[4];
+    float* dzs = buffers[5];
+    /* Gather the supplier particles */
+    n = 0;
+    for (rung_index_s = lowest_populated_rung_s; rung_index_s < rung_index_s_end; rung_index_s++) {
+        Py_ssize_t* rung_s = tile_s[rung_index_s];
+        Py_ssize_t rung_particle_index_s;
+        for (rung_particle_index_s = 0; rung_particle_index_s < rungs_N_s[rung_index_s]; rung_particle_index_s++) {
+            Py_ssize_t indexx_j = 3*rung_s[rung_particle_index_s];
+            xs[n] = (float)(pos_s[indexx_j + 0] - ref[0]);
+            ys[n] = (float)(pos_s[indexx_j + 1] - ref[1]);
+            zs[n] = (float)(pos_s[indexx_j + 2] - ref[2]);
+            dxs[n] = 0;
+            dys[n] = 0;
+            dzs[n] = 0;
+            n++;
+        }
+    }
+    /* Loop over all rungs in the receiver tile, pairing these with the
+     * supplier rungs as in shortrange_tiles_threaded().
+     */
+    signed char rung_index_r;
+    for (rung_index_r = rung_index_r_bgn; rung_index_r < rung_index_r_end; rung_index_r++) {
+        Py_ssize_t rung_N_r = rungs_N_r[rung_index_r];
+        if (rung_N_r == 0)
+            continue;
+        Py_ssize_t* rung_r = tile_r[rung_index_r];
+        int apply_to_i = 1;
+        signed char rung_index_s_bgn = lowest_populated_rung_s;
+        if (!only_supply && rung_index_r < lowest_active_rung_r) {
+            apply_to_i = 0;
+            rung_index_s_bgn = lowest_active_rung_s;
+        }
+        if (rung_index_s_bgn < lowest_populated_rung_s)
+            rung_index_s_bgn = lowest_populated_rung_s;
+        if (local_interaction_flag_0 && rung_index_s_bgn < rung_index_r)
+            rung_index_s_bgn = rung_index_r;
+        for (rung_index_s = rung_index_s_bgn; rung_index_s < rung_index_s_end; rung_index_s++) {
+            Py_ssize_t rung_N_s = rungs_N_s[rung_index_s];
+            if (rung_N_s == 0)
+                continue;
+            Py_ssize_t offset_s = rung_offsets_s[rung_index_s];
+            int apply_to_j = (!only_supply && rung_index_s >= lowest_active_rung_s);
+            int local_interaction_flag_2 = (
+                local_interaction_flag_0 && rung_index_r == rung_index_s
+            );
+            Py_ssize_t rung_particle_index_r;
+            for (rung_particle_index_r = 0; rung_particle_index_r < rung_N_r; rung_particle_index_r++) {
+                Py_ssize_t indexp_i = rung_r[rung_particle_index_r];
+                Py_ssize_t indexx_i = 3*indexp_i;
+                float xi = (float)(pos_r[indexx_i + 0] + periodic_offset[0] - ref[0]);
+                float yi = (float)(pos_r[indexx_i + 1] + periodic_offset[1] - ref[1]);
+                float zi = (float)(pos_r[indexx_i + 2] + periodic_offset[2] - ref[2]);
+                float dmomx_i = 0;
+                float dmomy_i = 0;
+                float dmomz_i = 0;
+                Py_ssize_t j;
+                for (
+                    j = offset_s + local_interaction_flag_2*(rung_particle_index_r + 1);
+                    j < offset_s + rung_N_s;
+                    j++
+                ) {
+                    float x_ji = xi - xs[j];
+                    float y_ji = yi - ys[j];
+                    float z_ji = zi - zs[j];
+                    float r2 = x_ji*x_ji + y_ji*y_ji + z_ji*z_ji;
+                    if (r2 > r2_max)
+                        continue;
+                    float shortrange_factor = (float)lookup_table(table, r2*table_scaling, table_order);
+                    dmomx_i += x_ji*shortrange_factor;
+                    dmomy_i += y_ji*shortrange_factor;
+                    dmomz_i += z_ji*shortrange_factor;
+                    if (apply_to_j) {
+                        dxs[j] -= x_ji*shortrange_factor;
+                        dys[j] -= y_ji*shortrange_factor;
+                        dzs[j] -= z_ji*shortrange_factor;
+                    }
+                }
+                /* Apply the accumulated momentum change of particle i */
+                if (apply_to_i) {
+                    signed char rung_index_i = (
+                        tile_contain_jumping_r ? rung_indices_jumped_r[indexp_i] : rung_index_r
+                    );
+                    double factor_i = factors[rung_index_i];
+                    dmom_r[indexx_i + 0] += factor_i*dmomx_i;
+                    dmom_r[indexx_i + 1] += factor_i*dmomy_i;
+                    dmom_r[indexx_i + 2] += factor_i*dmomz_i;
+                }
+            }
+        }
+    }
+    /* Scatter the accumulated momentum changes of the active
+     * supplier particles.
+     */
+    if (!only_supply) {
+        for (rung_index_s = lowest_populated_rung_s; rung_index_s < rung_index_s_end; rung_index_s++) {
+            if (rung_index_s < lowest_active_rung_s)
+                continue;
+            Py_ssize_t* rung_s = tile_s[rung_index_s];
+            Py_ssize_t offset_s = rung_offsets_s[rung_index_s];
+            Py_ssize_t rung_particle_index_s;
+            for (rung_particle_index_s = 0; rung_particle_index_s < rungs_N_s[rung_index_s]; rung_particle_index_s++) {
+                Py_ssize_t indexp_j = rung_s[rung_particle_index_s];
+                Py_ssize_t indexx_j = 3*indexp_j;
+                signed char rung_index_j = (
+                    tile_contain_jumping_s ? rung_indices_jumped_s[indexp_j] : rung_index_s
+                );
+                double factor_j = factors[rung_index_j];
+                n = offset_s + rung_particle_index_s;
+                dmom_s[indexx_j + 0] += factor_j*dxs[n];
+                dmom_s[indexx_j + 1] += factor_j*dys[n];
+                dmom_s[indexx_j + 2] += factor_j*dzs[n];
+            }
+        }
+    }
+    return capacity;
+}
+
+void shortrange_tiles_threaded(
+    int nthreads,
+    /* Receiver */
+    double* pos_r,
+    double* dmom_r,
+    signed char* rung_indices_jumped_r,
+    Py_ssize_t*** tiles_r,
+    Py_ssize_t** tiles_rungs_N_r,
+    signed char* tiles_contain_particles_r,
+    Py_ssize_t* layout_1Dto3D_r,
+    double* tiling_location_r,
+    signed char lowest_active_rung_r,
+    signed char lowest_populated_rung_r,
+    signed char highest_populated_rung_r,
+    /* Supplier */
+    double* pos_s,
+    double* dmom_s,
+    signed char* rung_indices_jumped_s,
+    Py_ssize_t*** tiles_s,
+    Py_ssize_t** tiles_rungs_N_s,
+    signed char* tiles_contain_particles_s,
+    Py_ssize_t* layout_1Dto3D_s,
+    double* tiling_location_s,
+    signed char lowest_active_rung_s,
+    signed char lowest_populated_rung_s,
+    signed char highest_populated_rung_s,
+    /* Tile pairings */
+    double* tile_extent,
+    Py_ssize_t* tile_indices_receiver,
+    Py_ssize_t tile_indices_receiver_N,
+    Py_ssize_t** tile_indices_supplier_paired,
+    Py_ssize_t* tile_indices_supplier_paired_N,
+    /* Interaction */
+    int only_supply,
+    int local,
+    int single,
+    const double* factors,
+    const double* table,
+    double r2_max,
+    double table_scaling,
+    int table_order,
+    double boxsize
+) {
+    /* Arguments to this function:
+     * - Number of threads to use.
+     * - Particle positions, momentum updates and jumped rung indices,
+     *   as well as the tiling data (tiles, rung occupation, tile
+     *   contents, 1D → 3D layout and location of the tiling)
+     *   of the receiver and supplier. Rung extrema of the receiver
+     *   and supplier.
+     * - Extent of a tile (the same for the receiver and supplier).
+     * - The receiver tiles to interact, together with the supplier
+     *   tiles paired with each of these (as returned by
+     *   get_tile_pairings() in the interactions module).
+     * - Flag specifying whether the supplier only supplies the force.
+     * - Flag specifying whether the receiver and supplier are the same
+     *   component within the same domain.
+     * - Flag specifying whether to compute in single precision
+     *   (see shortrange_tilepair_single() above).
+     * - Array of factors G*mass_r*mass_s*Δt/a, indexed by rung.
+     * - Softened short-range force table and the maximum r² together
+     *   with the r² → table index scaling and the interpolation order
+     *   of the table lookup (see lookup_table() above).
+     * - The box size, used for the periodic offsets between tiles.
+     */
+    signed char rung_index_r_bgn = (only_supply ? lowest_active_rung_r : lowest_populated_rung_r);
+    signed char rung_index_r_end = highest_populated_rung_r + 1;
+    signed char rung_index_s_end = highest_populated_rung_s + 1;
+    int colour;
+    Py_ssize_t i;
+    for (colour = 0; colour < N_COLOURS; colour++) {
+        #pragma omp parallel num_threads(nthreads)
+        {
+        /* Thread-local single precision buffers */
+        float* buffers[6] = {NULL, NULL, NULL, NULL, NULL, NULL};
+        Py_ssize_t capacity = 0;
+        #pragma omp for schedule(dynamic)
+        for (i = 0; i < tile_indices_receiver_N; i++) {
+            /* Only handle receiver tiles of the current colour */
+            Py_ssize_t tile_index_r = tile_indices_receiver[i];
+            Py_ssize_t* tile_index3D_r = layout_1Dto3D_r + 3*tile_index_r;
+            if (
+                  (tile_index3D_r[0]%3)*9
+                + (tile_index3D_r[1]%3)*3
+                + (tile_index3D_r[2]%3) != colour
+            )
+                continue;
+            /* Skip tile if it does not contain any particles at all,
+             * or only inactive particles when only_supply is True.
+             */
+            signed char tile_contain_particles_r = tiles_contain_particles_r[tile_index_r];
+            if (tile_contain_particles_r < (only_supply ? 2 : 1))
+                continue;
+            int tile_contain_onlyinactive_r = (tile_contain_particles_r == 1);
+            int tile_contain_jumping_r = (tile_contain_particles_r == 3);
+            Py_ssize_t** tile_r = tiles_r[tile_index_r];
+            Py_ssize_t* rungs_N_r = tiles_rungs_N_r[tile_index_r];
+            double tile_location_r[3];
+            int dim;
+            for (dim = 0; dim < 3; dim++)
+                tile_location_r[dim] = (
+                    tiling_location_r[dim] + tile_index3D_r[dim]*tile_extent[dim]
+                );
+            /* Loop over the paired supplier tiles */
+            Py_ssize_t* tile_indices_supplier = tile_indices_supplier_paired[i];
+            Py_ssize_t tile_indices_supplier_N = tile_indices_supplier_paired_N[i];
+            Py_ssize_t j;
+            for (j = 0; j < tile_indices_supplier_N; j++) {
+                Py_ssize_t tile_index_s = tile_indices_supplier[j];
+                /* Skip tile if it does not contain any particles,
+                 * or if both tiles contain inactive particles only.
+                 */
+                signed char tile_contain_particles_s = tiles_contain_particles_s[tile_index_s];
+                if (tile_contain_particles_s == 0)
+                    continue;
+                if (tile_contain_onlyinactive_r && tile_contain_particles_s == 1)
+                    continue;
+                int tile_contain_jumping_s = (tile_contain_particles_s == 3);
+                Py_ssize_t** tile_s = tiles_s[tile_index_s];
+                Py_ssize_t* rungs_N_s = tiles_rungs_N_s[tile_index_s];
+                /* Periodic particle offset between the two tiles */
+                Py_ssize_t* tile_index3D_s = layout_1Dto3D_s + 3*tile_index_s;
+                double periodic_offset[3];
+                for (dim = 0; dim < 3; dim++) {
+                    double tile_separation = (
+                        tiling_location_s[dim] + tile_index3D_s[dim]*tile_extent[dim]
+                        - tile_location_r[dim]
+                    );
+                    if (tile_separation > 0.5*boxsize)
+                        periodic_offset[dim] = boxsize;
+                    else if (tile_separation < -0.5*boxsize)
+                        periodic_offset[dim] = -boxsize;
+                    else
+                        periodic_offset[dim] = 0;
+                }
+                /* Flag specifying whether this is a local interaction */
+                int local_interaction_flag_0 = (local && tile_index_r == tile_index_s);
+                if (single) {
+                    capacity = shortrange_tilepair_single(
+                        pos_r, dmom_r, rung_indices_jumped_r,
+                        tile_r, rungs_N_r, tile_contain_jumping_r,
+                        rung_index_r_bgn, rung_index_r_end, lowest_active_rung_r,
+                        pos_s, dmom_s, rung_indices_jumped_s,
+                        tile_s, rungs_N_s, tile_contain_jumping_s,
+                        lowest_active_rung_s, lowest_populated_rung_s, highest_populated_rung_s,
+                        tile_location_r, periodic_offset, only_supply, local_interaction_flag_0,
+                        factors, table, r2_max, table_scaling, table_order,
+                        buffers, capacity
+                    );
+                    continue;
+                }
+                /* Loop over all rungs in the receiver tile */
+                signed char rung_index_r;
+                for (rung_index_r = rung_index_r_bgn; rung_index_r < rung_index_r_end; rung_index_r++) {
+                    Py_ssize_t rung_N_r = rungs_N_r[rung_index_r];
+                    if (rung_N_r == 0)
+                        continue;
+                    Py_ssize_t* rung_r = tile_r[rung_index_r];
+                    /* Pair active receiver rungs with all supplier
+                     * rungs and inactive receiver rungs with active
+                     * supplier rungs only.
+                     */
+                    int apply_to_i = 1;
+                    signed char rung_index_s_bgn = lowest_populated_rung_s;
+                    if (!only_supply && rung_index_r < lowest_active_rung_r) {
+                        apply_to_i = 0;
+                        rung_index_s_bgn = lowest_active_rung_s;
+                    }
+                    if (local_interaction_flag_0 && rung_index_s_bgn < rung_index_r)
+                        rung_index_s_bgn = rung_index_r;
+                    /* Loop over the needed supplier rungs */
+                    signed char rung_index_s;
+                    for (rung_index_s = rung_index_s_bgn; rung_index_s < rung_index_s_end; rung_index_s++) {
+                        Py_ssize_t rung_N_s = rungs_N_s[rung_index_s];
+                        if (rung_N_s == 0)
+                            continue;
+                        Py_ssize_t* rung_s = tile_s[rung_index_s];
+                        int apply_to_j = (!only_supply && rung_index_s >= lowest_active_rung_s);
+                        int local_interaction_flag_2 = (
+                            local_interaction_flag_0 && rung_index_r == rung_index_s
+                        );
+                        /* Loop over all particles in the receiver rung */
+                        Py_ssize_t rung_particle_index_r;
+                        for (rung_particle_index_r = 0; rung_particle_index_r < rung_N_r; rung_particle_index_r++) {
+                            Py_ssize_t indexp_i = rung_r[rung_particle_index_r];
+                            Py_ssize_t indexx_i = 3*indexp_i;
+                            signed char rung_index_i = (
+                                tile_contain_jumping_r ? rung_indices_jumped_r[indexp_i] : rung_index_r
+                            );
+                            double factor_i = factors[rung_index_i];
+                            double xi = pos_r[indexx_i + 0] + periodic_offset[0];
+                            double yi = pos_r[indexx_i + 1] + periodic_offset[1];
+                            double zi = pos_r[indexx_i + 2] + periodic_offset[2];
+                            double dmomx_i = 0;
+                            double dmomy_i = 0;
+                            double dmomz_i = 0;
+                            /* Loop over the needed particles
+                             * in the supplier rung.
+                             */
+                            Py_ssize_t rung_particle_index_s;
+                            for (
+                                rung_particle_index_s = local_interaction_flag_2*(rung_particle_index_r + 1);
+                                rung_particle_index_s < rung_N_s;
+                                rung_particle_index_s++
+                            ) {
+                                Py_ssize_t indexp_j = rung_s[rung_particle_index_s];
+                                Py_ssize_t indexx_j = 3*indexp_j;
+                                double x_ji = xi - pos_s[indexx_j + 0];
+                                double y_ji = yi - pos_s[indexx_j + 1];
+                                double z_ji = zi - pos_s[indexx_j + 2];
+                                double r2 = x_ji*x_ji + y_ji*y_ji + z_ji*z_ji;
+                                if (r2 > r2_max)
+                                    continue;
+                                double shortrange_factor = lookup_table(table, r2*table_scaling, table_order);
+                                /* Momentum change of particle i */
+                                if (apply_to_i) {
+                                    double total_factor = factor_i*shortrange_factor;
+                                    dmomx_i += x_ji*total_factor;
+                                    dmomy_i += y_ji*total_factor;
+                                    dmomz_i += z_ji*total_factor;
+                                }
+                                /* Momentum change of particle j */
+                                if (apply_to_j) {
+                                    signed char rung_index_j = (
+                                        tile_contain_jumping_s ? rung_indices_jumped_s[indexp_j] : rung_index_s
+                                    );
+                                    double total_factor = factors[rung_index_j]*shortrange_factor;
+                                    dmom_s[indexx_j + 0] -= x_ji*total_factor;
+                                    dmom_s[indexx_j + 1] -= y_ji*total_factor;
+                                    dmom_s[indexx_j + 2] -= z_ji*total_factor;
+                                }
+                            }
+                            /* Apply the accumulated momentum change
+                             * of particle i.
+                             */
+                            if (apply_to_i) {
+                                dmom_r[indexx_i + 0] += dmomx_i;
+                                dmom_r[indexx_i + 1] += dmomy_i;
+                                dmom_r[indexx_i + 2] += dmomz_i;
+                            }
+                        }
+                    }
+                }
+            }
+        }
+        int k;
+        for (k = 0; k < 6; k++)
+            free(buffers[k]);
+        }
+    }
+}
@@ -31,6 +31,7 @@ cimport(
     '    partition,            '
     '    smart_mpi,            '
 )
+cimport('from ic import realize')
 cimport(
     'from mesh import      '
     '    domain_decompose, '
@@ -125,6 +126,7 @@ class ConceptSnapshot:
         slab_end='Py_ssize_t',
         slab_start='Py_ssize_t',
         start_local='Py_ssize_t',
+        streamed='bint',
         returns=str,
     )
     def save(self, filename, save_all=False):
@@ -157,39 +159,61 @@ class ConceptSnapshot:
                         f'Writing out {component.name} '
                         f'({N_str} {component.species}) particle{plural} ...'
                     )
+                    # Particle components deferred for streaming are
+                    # realised now, directly onto disk (see
+                    # ic.realize_particles()), leaving no particle data
+                    # in memory to be written. Only the variables
+                    # selected for saving are realised.
+                    streamed = (component.name in components_streamed)
+                    if streamed:
+                        components_streamed.remove(component.name)
+                        realize(
+                            component,
+                            variables=[
+                                variable
+                                for variable, name in enumerate(('pos', 'mom'))
+                                if save_all or component.snapshot_vars['save'][name]
+                            ],
+                            component_h5=component_h5,
+                        )
                     # Save particle attributes
                     component_h5.attrs['mass'] = correct_float(component.mass)
                     component_h5.attrs['N'] = N
-                    # Get local indices of the particle data
-                    start_local = int(np.sum(smart_mpi(N_local, mpifun='allgather')[:rank]))
-                    end_local = start_local + component.N_local
-                    # Save particle data
-                    if save_all or component.snapshot_vars['save']['pos']:
-                        pos_h5 = component_h5.create_dataset('pos', (N, 3), dtype=C2np['double'])
-                        pos_h5[start_local:end_local, :] = component.pos_mv3[:N_local, :]
-                    if save_all or component.snapshot_vars['save']['mom']:
-                        mom_h5 = component_h5.create_dataset('mom', (N, 3), dtype=C2np['double'])
-                        mom_h5[start_local:end_local, :] = component.mom_mv3[:N_local, :]
-                    if component.use_ids:
-                        # Store IDs as unsigned integers using as few
-                        # bits as possible. We explicitly reinterpret
-                        # the IDs as unsigned (still 64-bit) prior to
-                        # writing to th efile. The convertion from
-                        # unsigned 64-bit to unsigned {32, 16, 8}-bit
-                        # appears to be handled by H5Py in a chunkified
-                        # manner, so this operation is safe.
-                        id_max = allreduce(max(component.ids_mv), op=MPI.MAX)
-                        if id_max >= 2**32:
-                            dtype = np.uint64
-                        elif id_max >= 2**16:
-                            dtype = np.uint32
-                        elif id_max >= 2**8:
-                            dtype = np.uint16
-                        else:
-                            dtype = np.uint8
-                        ids_h5 = component_h5.create_dataset('ids', (N, ), dtype=dtype)
-                        ids_mv_unsigned = asarray(component.ids_mv).view(np.uint64)
-                        ids_h5[start_local:end_local] = ids_mv_unsigned[:N_local]
+                    if not streamed:
+                        # Get local indices of the particle data
+                        start_local = int(np.sum(smart_mpi(N_local, mpifun='allgather')[:rank]))
+                        end_local = start_local + component.N_local
+                        # Save particle data
+                        if save_all or component.snapshot_vars['save']['pos']:
+                            pos_h5 = component_h5.create_dataset(
+                                'pos', (N, 3), dtype=C2np['double'],
+                            )
+                            pos_h5[start_local:end_local, :] = component.pos_mv3[:N_local, :]
+                        if save_all or component.snapshot_vars['save']['mom']:
+                            mom_h5 = component_h5.create_dataset(
+                                'mom', (N, 3), dtype=C2np['double'],
+                            )
+                            mom_h5[start_local:end_local, :] = component.mom_mv3[:N_local, :]
+                        if component.use_ids:
+                            # Store IDs as unsigned integers using as few
+                            # bits as possible. We explicitly reinterpret
+                            # the IDs as unsigned (still 64-bit) prior to
+                            # writing to th efile. The convertion from
+                            # unsigned 64-bit to unsigned {32, 16, 8}-bit
+                            # appears to be handled by H5Py in a chunkified
+                            # manner, so this operation is safe.
+                            id_max = allreduce(max(component.ids_mv), op=MPI.MAX)
+                            if id_max >= 2**32:
+                                dtype = np.uint64
+                            elif id_max >= 2**16:
+                                dtype = np.uint32
+                            elif id_max >= 2**8:
+                                dtype = np.uint16
+                            else:
+                                dtype = np.uint8
+                            ids_h5 = component_h5.create_dataset('ids', (N, ), dtype=dtype)
+                            ids_mv_unsigned = asarray(component.ids_mv).view(np.uint64)
+                            ids_h5[start_local:end_local] = ids_mv_unsigned[:N_local]
                 elif component.representation == 'fluid':
                     # Write out progress message
                     masterprint(
@@ -3467,11 +3491,26 @@ def get_initial_conditions(initial_conditions_touse=None, do_realization=True):
     # and universals_dict['class_species_present'].
     update_species_present(components)
     # Realise all components instantiated from
-    # initial condition specifications.
+    # initial condition specifications. When streaming initial
+    # conditions, the realisation of particle components is deferred
+    # until they are saved to a snapshot.
     if do_realization:
         for component in components[n_components_from_snapshot:]:
+            if initial_conditions_streaming and component.representation == 'particles':
+                if not component.snapshot_vars['save']['any']:
+                    abort(
+                        f'Component "{component.name}" is to be streamed to disk '
+                        f'(initial_conditions_streaming = True), but it is not '
+                        f'selected for snapshot output'
+                    )
+                components_streamed.add(component.name)
+                continue
             component.realize()
     return components
+# Set of names of particle components which are to be realised directly
+# onto disk when saved, when initial_conditions_streaming is True.
+cython.declare(components_streamed=set)
+components_streamed = set()
 
 # Function for determining the species of a component
 # by looking in the select_species user parameter.
@@ -491,6 +491,12 @@ class Tiling:
         public Py_ssize_t     refinement_offset
         double                computation_time
         double                computation_time_total
+        double*               tiles_computation_time
+        double*               tiles_cost
+        signed char*          tiles_subtiling_offset
+        signed char*          tiles_subtiling_step
+        Py_ssize_t            timed_tile_index
+        double                timed_tile_t_begin
         """
         # Remember the name of this tiling
         self.name = tiling_name
@@ -633,6 +639,22 @@ class Tiling:
         # and nullifies it at the beginning of each time step.
         self.computation_time = 0
         self.computation_time_total = 0
+        # With adaptive subtiling, the computation time is additionally
+        # measured for each tile separately. This is used to adjust
+        # the subtiling level of the individual tiles, given as an
+        # offset relative to the level set by the particle count.
+        # See adapt_subtiling_offsets().
+        self.tiles_computation_time = malloc(self.size*sizeof('double'))
+        self.tiles_cost             = malloc(self.size*sizeof('double'))
+        self.tiles_subtiling_offset = malloc(self.size*sizeof('signed char'))
+        self.tiles_subtiling_step   = malloc(self.size*sizeof('signed char'))
+        for tile_index in range(self.size):
+            self.tiles_computation_time[tile_index] = 0
+            self.tiles_cost            [tile_index] = 0
+            self.tiles_subtiling_offset[tile_index] = 0
+            self.tiles_subtiling_step  [tile_index] = 1
+        self.timed_tile_index = -1
+        self.timed_tile_t_begin = 0
 
     # Method for spatially relocating the tiling
     @cython.header(
@@ -657,6 +679,72 @@ class Tiling:
         tile_index3D = cython.address(self.layout_1Dto3D[tile_index, :])
         return tile_index3D
 
+    # Method for measuring the computation time of individual tiles.
+    # The time elapsed since the previous call is added to the tile
+    # given at that call, while the timing of the given tile begins.
+    # Call with a tile_index of -1 to stop the timing.
+    @cython.header(
+        # Arguments
+        tile_index='Py_ssize_t',
+        # Locals
+        t='double',
+        returns='void',
+    )
+    def time_tile(self, tile_index):
+        t = time()
+        if self.timed_tile_index != -1:
+            self.tiles_computation_time[self.timed_tile_index] += t - self.timed_tile_t_begin
+        self.timed_tile_index = tile_index
+        self.timed_tile_t_begin = t
+
+    # Method for adjusting the adaptive subtiling level of each tile,
+    # based on the computation times measured by time_tile() since the
+    # last call. The level offset of each tile is moved one step at a
+    # time, with the step kept as long as the computation time per
+    # particle within the tile decreases. If it increases, the step is
+    # undone and the opposite direction is tried next.
+    @cython.header(
+        # Arguments
+        offset_max='int',
+        # Locals
+        N_particles='Py_ssize_t',
+        computation_time='double',
+        cost='double',
+        offset='int',
+        rung_index='signed char',
+        rungs_N='Py_ssize_t*',
+        step='signed char',
+        tile_index='Py_ssize_t',
+        returns='void',
+    )
+    def adapt_subtiling_offsets(self, offset_max):
+        for tile_index in range(self.size):
+            computation_time = self.tiles_computation_time[tile_index]
+            if computation_time == 0:
+                continue
+            self.tiles_computation_time[tile_index] = 0
+            rungs_N = self.tiles_rungs_N[tile_index]
+            N_particles = 0
+            for rung_index in range(N_rungs):
+                N_particles += rungs_N[rung_index]
+            if N_particles == 0:
+                continue
+            cost = computation_time/N_particles
+            step = self.tiles_subtiling_step[tile_index]
+            if 0 < self.tiles_cost[tile_index] < cost:
+                # The previous step made matters worse. Undo it and
+                # measure anew before stepping the other way.
+                self.tiles_subtiling_offset[tile_index] -= step
+                self.tiles_subtiling_step[tile_index] = -step
+                self.tiles_cost[tile_index] = 0
+                continue
+            self.tiles_cost[tile_index] = cost
+            offset = self.tiles_subtiling_offset[tile_index] + step
+            if -offset_max <= offset <= offset_max:
+                self.tiles_subtiling_offset[tile_index] = offset
+            else:
+                self.tiles_subtiling_step[tile_index] = -step
+
     # Method for sorting particles into tiles. If the arguments
     # coarse_tiling and coarse_tiling_index are left out,
     # all particles within the attached component will be
@@ -839,6 +927,10 @@ class Tiling:
         free(self.tiles_rungs_N_data)
         free(self.tiles_rungs_N)
         free(self.contain_particles)
+        free(self.tiles_computation_time)
+        free(self.tiles_cost)
+        free(self.tiles_subtiling_offset)
+        free(self.tiles_subtiling_step)
 
     # String representation
     def __repr__(self):
@@ -1122,13 +1214,14 @@ class Component:
         self.forces = forces
         # Check that needed short-range parameters are set
         for force, method in self.forces.items():
-            if method == 'p3m':
+            if method in ('p3m', 'tree'):
                 if shortrange_params[force]['scale'] < 0:
+                    method_name = ('P³M' if method == 'p3m' else 'TreePM')
                     abort(
-                        f'It is specified that {self.name} should use P³M {force}, '
+                        f'It is specified that {self.name} should use {method_name} {force}, '
                         f'but the grid size to use could not be determined. Please also '
                         f'specify the grid size to use in '
-                        f'potential_options["gridsize"]["global"]["{force}"]["p3m"], '
+                        f'potential_options["gridsize"]["global"]["{force}"]["{method}"], '
                         f'and/or specify shortrange_params["{force}"]["scale"].'
                     )
         # Function for converting expressions involving
@@ -1173,10 +1266,10 @@ class Component:
         for force, method in self.forces.items():
             self.potential_gridsizes.setdefault(force, {})
             methods = [method]
-            if method == 'p3m':
-                # If P³M is to be used, also set up potential grid sizes
-                # for PM, as P³M will be switched out for PM in the case
-                # of fluid components.
+            if method in ('p3m', 'tree'):
+                # If P³M (or TreePM) is to be used, also set up
+                # potential grid sizes for PM, as P³M will be switched
+                # out for PM in the case of fluid components.
                 methods.append('pm')
             for method_extra in methods:
                 if self.representation == 'fluid':
@@ -1203,7 +1296,7 @@ class Component:
                         # we use the same grid size as for the
                         # simple cubic.
                         gridsizes = ('cbrt(Ñ)', )*2
-                        if method_extra == 'p3m':
+                        if method_extra in ('p3m', 'tree'):
                             gridsizes = ('2*cbrt(Ñ)', )*2
                     elif self.representation == 'fluid':
                         # Fluids should have upstream and downstream
@@ -1227,12 +1320,12 @@ class Component:
             self, potential_options['differentiation'], default={},
         )
         for force, method in self.forces.items():
-            if method not in ('pm', 'p3m'):
+            if method not in ('pm', 'p3m', 'tree'):
                 continue
             self.potential_differentiations.setdefault(force, {})
             methods = [method]
-            if method == 'p3m':
-                # If P³M is to be used, also set up potential
+            if method in ('p3m', 'tree'):
+                # If P³M (or TreePM) is to be used, also set up potential
                 # differentiation order for PM, as P³M will be switched
                 # out for PM in the case of fluid components.
                 methods.append('pm')
@@ -1444,7 +1537,7 @@ class Component:
         self.use_rungs = bool(
             N_rungs > 1
             and self.representation == 'particles'
-            and ({'ppnonperiodic', 'pp', 'p3m'} & set(self.forces.values()))
+            and ({'ppnonperiodic', 'treenonperiodic', 'pp', 'p3m', 'tree'} & set(self.forces.values()))
         )
         self.lowest_active_rung = 0
         self.lowest_populated_rung = 0
@@ -3880,13 +3973,16 @@ def update_species_present(components):
     tiling_name=str,
     initial_rung_size=object,  # sequence of length N_rungs or int-like
     # Locals
+    domain_widths='Py_ssize_t[::1]',
     extent='double[::1]',
     force=str,
     location='double[::1]',
     rung_index='signed char',
     shape=object, # sequence of length 3 of int-like
     shortrange_params_force=dict,
+    tiles_per_unit=object,  # np.ndarray
     tiling='Tiling',
+    tiling_global_shape=object,  # np.ndarray
     returns='Tiling',
 )
 def init_tiling(component, tiling_name, initial_rung_size=-1):
@@ -3894,9 +3990,13 @@ def init_tiling(component, tiling_name, initial_rung_size=-1):
         '<force_name> (tiles)'
     or
         '<force_name> (subtiles)'
+    or, with adaptive subtiling,
+        '<force_name> (subtiles, level <level>)'
     In addition, the special
         'trivial'
-    tiling_name is valid as well.
+    tiling_name is valid as well, as are tiling names of the form
+        'interpolation (tiles, gridsize <gridsize>)'
+    used for threaded particle interpolation.
     """
     # Handle the special case of a trivial tiling
     if tiling_name == 'trivial':
@@ -3921,8 +4021,11 @@ def init_tiling(component, tiling_name, initial_rung_size=-1):
         return Tiling(tiling_name, component, shape, extent, initial_rung_size,
             refinement_period=0)
     # Delegate subtiling initialisation
-    if ' (subtiles)' in tiling_name:
+    if ' (subtiles' in tiling_name:
         return init_subtiling(component, tiling_name, initial_rung_size)
+    # Delegate interpolation tiling initialisation
+    if tiling_name.startswith('interpolation (tiles'):
+        return init_interpolation_tiling(component, tiling_name, initial_rung_size)
     # Extract the name of the force
     match = re.search(r'(.+) \(tiles\)', tiling_name)
     if not match:
@@ -3938,15 +4041,42 @@ def init_tiling(component, tiling_name, initial_rung_size=-1):
     # by the criterion that a tile must be at least as large as
     # the given tilesize length, in all directions.
     # At the same time, we want to maximize the number of tiles.
+    # The tiles are laid out on the lattice on which the domain cuts
+    # are placed, with an integer number of tiles per lattice unit.
+    # For a uniform domain decomposition, the lattice units are simply
+    # the domains. For a non-uniform decomposition the domains span
+    # different numbers of lattice units, and so we let all domain
+    # tilings have the shape required by the largest domain. Only the
+    # tiles within the local domain will then be populated.
+    domain_widths = asarray(
+        [
+            np.diff(domain_info.cuts_units[dim])[domain_layout_local_indices[dim]]
+            for dim in range(3)
+        ],
+        dtype=C2np['Py_ssize_t'],
+    )
+    tiles_per_unit = asarray(
+        (boxsize/asarray(domain_info.resolution))/shortrange_params_force['tilesize']
+        *(1 + machine_ϵ),
+        dtype=C2np['Py_ssize_t'],
+    )
     shape = tiling_shapes.get(tiling_name)
     if shape is None:
         shape = asarray(
-            (boxsize/asarray(domain_subdivisions))/shortrange_params_force['tilesize']
-            *(1 + machine_ϵ),
+            [
+                np.max(np.diff(domain_info.cuts_units[dim]))*tiles_per_unit[dim]
+                for dim in range(3)
+            ],
             dtype=C2np['Py_ssize_t'],
         )
-        masterprint(f'Tile decomposition ({force}): {shape[0]}×{shape[1]}×{shape[2]}')
+        if not domain_info.dynamic:
+            masterprint(f'Tile decomposition ({force}): {shape[0]}×{shape[1]}×{shape[2]}')
         tiling_shapes[tiling_name] = shape
+        tiling_global_shapes[tiling_name] = asarray(
+            tiles_per_unit*asarray(domain_info.resolution),
+            dtype=C2np['Py_ssize_t'],
+        )
+    tiling_global_shape = tiling_global_shapes[tiling_name]
     # The tiling needs to have a minimum number of tiles
     # across each dimension. The minimum criteria are:
     # - The logic used for the tile pairing assumes that all domain
@@ -3968,12 +4098,12 @@ def init_tiling(component, tiling_name, initial_rung_size=-1):
     #   path, but the implemented logic for the particle periodicity in
     #   fact assumes that it can. We thus really need at least 4 tiles
     #   along each dimension of the global tiling, not just 3.
-    if np.min(asarray(shape)*asarray(domain_subdivisions)) < 4:
+    if np.min(tiling_global_shape) < 4:
         abort(
             f'The global {force} tiling needs to have at least 4 tiles across the box in '
             f'every direction. Consider lowering shortrange_params["{force}"]["tilesize"].'
         )
-    if np.min(shape) < 3:
+    if np.min(asarray(domain_widths)*tiles_per_unit) < 3:
         msg = (
             f'The {force} domain tiling needs a subdivision of at least 3 in every direction. '
             f'Consider lowering shortrange_params["{force}"]["tilesize"].'
@@ -3988,20 +4118,180 @@ def init_tiling(component, tiling_name, initial_rung_size=-1):
             component.rungs_N[rung_index]//(2*np.prod(shape))
             for rung_index in range(N_rungs)
         ]
-    # The extent of the entire tiling, i.e. the extent of the domain
-    extent = asarray((domain_size_x, domain_size_y, domain_size_z), dtype=C2np['double'])
+    # The extent of the entire tiling, i.e. the extent of the domain.
+    # For a non-uniform domain decomposition, the tiles of all domains
+    # have the same extent, with the padded tiling generally extending
+    # beyond the domain.
+    if domain_info.dynamic:
+        extent = asarray(shape)*(boxsize/tiling_global_shape)
+    else:
+        extent = asarray(
+            (domain_info.size_x, domain_info.size_y, domain_info.size_z),
+            dtype=C2np['double'],
+        )
     # The position of the beginning of the tiling,
     # i.e. the left, backward, lower corner of this domain.
-    location = asarray((domain_bgn_x, domain_bgn_y, domain_bgn_z), dtype=C2np['double'])
+    location = asarray(
+        (domain_info.bgn_x, domain_info.bgn_y, domain_info.bgn_z),
+        dtype=C2np['double'],
+    )
     # Instantiate Tiling instance
     tiling = Tiling(tiling_name, component, shape, extent, initial_rung_size, refinement_period=0)
     # Relocate the tiling
     tiling.relocate(location)
     return tiling
 # Mapping from tiling names to shapes of all tilings instantiated
-# across all components.
-cython.declare(tiling_shapes=dict)
+# across all components. For the short-range tilings, the shapes of the
+# global tilings (across the box) are stored as well.
+cython.declare(tiling_shapes=dict, tiling_global_shapes=dict)
 tiling_shapes = {}
+tiling_global_shapes = {}
+
+# Function returning the global start and end tile indices
+# (bgn_l, bgn_m, bgn_n, end_l, end_m, end_n) of the domain governed by
+# the process of the given rank, within the global tiling of the given
+# short-range tiling. Only the tiles within this range are populated.
+@cython.header(
+    # Arguments
+    tiling_name=str,
+    rank_other='int',
+    # Locals
+    dim='int',
+    domain_layout_other=tuple,
+    index='Py_ssize_t',
+    indices_bgn=list,
+    indices_end=list,
+    tiles_per_unit='Py_ssize_t',
+    tiling_global_shape='Py_ssize_t[::1]',
+    returns=tuple,
+)
+def get_domain_tile_bounds(tiling_name, rank_other):
+    tiling_global_shape = get_tiling_global_shape(tiling_name)
+    domain_layout_other = np.unravel_index(rank_other, domain_subdivisions)
+    indices_bgn = []
+    indices_end = []
+    for dim in range(3):
+        tiles_per_unit = tiling_global_shape[dim]//domain_info.resolution[dim]
+        index = domain_layout_other[dim]
+        indices_bgn.append(domain_info.cuts_units[dim][index    ]*tiles_per_unit)
+        indices_end.append(domain_info.cuts_units[dim][index + 1]*tiles_per_unit)
+    return tuple(indices_bgn + indices_end)
+
+# Function returning the shape of the global tiling (across the box)
+# of the given short-range tiling.
+@cython.header(
+    # Arguments
+    tiling_name=str,
+    returns='Py_ssize_t[::1]',
+)
+def get_tiling_global_shape(tiling_name):
+    return tiling_global_shapes[tiling_name]
+
+# Function for clearing the tiling shapes, which depend on the domain
+# decomposition. This must be called whenever the domain decomposition
+# changes, after which the tilings of all components should
+# be reinitialised. The subtiling shapes only depend on the extent of
+# the tiles, and so these are only cleared if so specified.
+@cython.pheader(
+    # Arguments
+    clear_subtilings='bint',
+    # Locals
+    tiling_name=str,
+    returns='void',
+)
+def clear_tiling_shapes(clear_subtilings=True):
+    for tiling_name in list(tiling_shapes.keys()):
+        if tiling_name == 'trivial':
+            continue
+        if not clear_subtilings and ' (subtiles' in tiling_name:
+            continue
+        tiling_shapes.pop(tiling_name)
+    tiling_global_shapes.clear()
+
+# Function for initialising a tiling used for threaded
+# particle interpolation onto domain grids.
+@cython.header(
+    # Arguments
+    component='Component',
+    tiling_name=str,
+    initial_rung_size=object,  # sequence of length N_rungs or int-like
+    # Locals
+    dim='int',
+    extent='double[::1]',
+    gridshape_local=list,
+    gridsize='Py_ssize_t',
+    location='double[::1]',
+    match=object,  # re.Match
+    rung_index='signed char',
+    shape=object,  # sequence of length 3 of int-like
+    shape_max='Py_ssize_t',
+    size='double',
+    tiling='Tiling',
+    returns='Tiling',
+)
+def init_interpolation_tiling(component, tiling_name, initial_rung_size=-1):
+    """The tiling_name should be of the form
+        'interpolation (tiles, gridsize <gridsize>)'
+    The tiles are made at least interpolation_tile_cells_min grid cells
+    wide in every direction. As a particle interpolated with any of the
+    implemented orders (NGP, CIC, TSC, PCS) only touches grid cells
+    within two cells of its position, two tiles separated by a third
+    tile never write to the same grid cells. The tiles can then be
+    coloured according to the parity of their 3D tile index, with all
+    tiles of the same colour being safe to interpolate concurrently.
+    """
+    match = re.fullmatch(r'interpolation \(tiles, gridsize (\d+)\)', tiling_name)
+    if not match:
+        abort(f'init_interpolation_tiling() called with tiling_name = "{tiling_name}"')
+    gridsize = int(match.group(1))
+    # Use as many tiles as possible given the minimum tile width,
+    # though no more than needed to keep all threads busy
+    # for each of the 8 colours.
+    shape = tiling_shapes.get(tiling_name)
+    if shape is None:
+        # The number of grid cells across the local domain
+        gridshape_local = [
+            int(round(size*gridsize/boxsize))
+            for size in (domain_info.size_x, domain_info.size_y, domain_info.size_z)
+        ]
+        shape_max = 4*int(ceil(cbrt(num_threads)))
+        shape = asarray(
+            [
+                pairmax(
+                    1,
+                    pairmin(
+                        shape_max,
+                        gridshape_local[dim]//interpolation_tile_cells_min,
+                    ),
+                )
+                for dim in range(3)
+            ],
+            dtype=C2np['Py_ssize_t'],
+        )
+        tiling_shapes[tiling_name] = shape
+    # If not already specified, the rungs within each tile start out
+    # with half of the mean required memory per rung.
+    if initial_rung_size == -1:
+        initial_rung_size = [
+            component.rungs_N[rung_index]//(2*np.prod(shape))
+            for rung_index in range(N_rungs)
+        ]
+    # The tiling spans the local domain
+    extent = asarray(
+        (domain_info.size_x, domain_info.size_y, domain_info.size_z),
+        dtype=C2np['double'],
+    )
+    location = asarray(
+        (domain_info.bgn_x, domain_info.bgn_y, domain_info.bgn_z),
+        dtype=C2np['double'],
+    )
+    tiling = Tiling(tiling_name, component, shape, extent, initial_rung_size, refinement_period=0)
+    tiling.relocate(location)
+    return tiling
+# The minimum width (in grid cells) of the tiles
+# of interpolation tilings.
+cython.declare(interpolation_tile_cells_min='Py_ssize_t')
+interpolation_tile_cells_min = 6
 
 # Function for initialising a subtiling on a component
 @cython.header(
@@ -4016,7 +4306,9 @@ tiling_shapes = {}
     i='int',
     j='int',
     k='int',
+    level='int',
     location='double[::1]',
+    match=object,  # re.Match
     particles_per_subtile='double',
     particles_per_subtile_max='double',
     particles_per_subtile_min='double',
@@ -4031,12 +4323,17 @@ tiling_shapes = {}
 def init_subtiling(component, subtiling_name, initial_rung_size=-1):
     """The subtiling_name should be of the form
         '<force_name> (subtiles)'
+    or, with adaptive subtiling,
+        '<force_name> (subtiles, level <level>)'
+    where the level is the number of subtiles across the longest
+    dimension of a tile.
     """
-    # Extract the name of the force
-    match = re.search(r'(.+) \(subtiles\)', subtiling_name)
+    # Extract the name of the force and the adaptive subtiling level
+    match = re.search(r'(.+) \(subtiles(?:, level (\d+))?\)', subtiling_name)
     if not match:
         abort(f'init_subtiling() called with subtiling_name = "{subtiling_name}"')
     force = match.group(1)
+    level = (int(match.group(2)) if match.group(2) else 0)
     # Extract the short-range parameters for the force
     shortrange_params_force = shortrange_params.get(force)
     if shortrange_params_force is None:
@@ -4074,7 +4371,7 @@ def init_subtiling(component, subtiling_name, initial_rung_size=-1):
             # above stated number of particles.
             particles_per_subtile_min, particles_per_subtile_max = 8, 14
             tiling_global_shape = asarray(
-                asarray(domain_subdivisions)*asarray(coarse_tiling.shape),
+                tiling_global_shapes[f'{force} (tiles)'],
                 dtype=C2np['double'],
             )
             shape_candidates = []
@@ -4084,7 +4381,7 @@ def init_subtiling(component, subtiling_name, initial_rung_size=-1):
                 shape = np.prod(tiling_global_shape)/tiling_global_shape
                 shape *= (
                     float(component.N)/(
-                        nprocs*np.prod(asarray(coarse_tiling.shape)*shape)*particles_per_subtile
+                        np.prod(tiling_global_shape*shape)*particles_per_subtile
                     )
                 )**(1./3.)
                 shape = asarray(np.round(shape), dtype=C2np['Py_ssize_t'])
@@ -4122,8 +4419,26 @@ def init_subtiling(component, subtiling_name, initial_rung_size=-1):
                         shape_candidates[tuple(key)] = shape
             # Pick the shape with the smallest key
             shape = shape_candidates[sorted(shape_candidates)[0]]
+        elif shape[0] == 'adaptive':
+            # The subtiling shape is set by the level, i.e. the number
+            # of subtiles across the longest dimension of a tile, with
+            # the other dimensions divided so as to keep the subtiles
+            # as cubic as possible. The main subtiling (without an
+            # explicit level) is given the level appropriate for a tile
+            # with the mean number of particles. It is used whenever
+            # a single subtiling is needed for all tiles.
+            if level == 0:
+                level = get_adaptive_subtiling_level(
+                    float(component.N)/np.prod(tiling_global_shapes[f'{force} (tiles)']),
+                    coarse_tiling.tile_extent,
+                    shape[1],
+                )
+            shape = asarray(coarse_tiling.tile_extent)*(level/max(coarse_tiling.tile_extent))
+            shape = asarray(np.round(shape), dtype=C2np['Py_ssize_t'])
+            shape[shape == 0] = 1
         shape = asarray(shape, dtype=C2np['Py_ssize_t'])
-        masterprint(f'Subtile decomposition ({force}): {shape[0]}×{shape[1]}×{shape[2]}')
+        if ', level ' not in subtiling_name and not domain_info.dynamic:
+            masterprint(f'Subtile decomposition ({force}): {shape[0]}×{shape[1]}×{shape[2]}')
         tiling_shapes[subtiling_name] = shape
     # If not already specified, the rungs within each subtile start out
     # with half of the mean required memory per rung.
@@ -4141,6 +4456,67 @@ def init_subtiling(component, subtiling_name, initial_rung_size=-1):
     # We thus do not care about the initial value of the location.
     return Tiling(subtiling_name, component, shape, extent, initial_rung_size, refinement_period)
 
+# Function computing the adaptive subtiling level appropriate for a tile
+# holding the given number of particles, i.e. the number of subtiles
+# across the longest dimension of the tile which results in the
+# requested mean number of particles per subtile. The offset is added
+# to this level, and is found from the measured computation time
+# of the tile (see Tiling.adapt_subtiling_offsets()).
+@cython.header(
+    # Arguments
+    N_particles='double',
+    tile_extent='double[::1]',
+    particles_per_subtile='double',
+    offset='int',
+    # Locals
+    level='int',
+    tile_extent_max='double',
+    volume_fraction='double',
+    returns='int',
+)
+def get_adaptive_subtiling_level(N_particles, tile_extent, particles_per_subtile, offset=0):
+    # With level subdivisions across the longest dimension, the number
+    # of subtiles is level³ times the volume of the tile relative to
+    # that of a cube with the longest side length.
+    tile_extent_max = max(tile_extent)
+    volume_fraction = tile_extent[0]*tile_extent[1]*tile_extent[2]/tile_extent_max**3
+    level = int(round(cbrt(N_particles/(volume_fraction*particles_per_subtile)))) + offset
+    return pairmax(1, pairmin(level, subtiling_adaptive_level_max))
+# The maximum allowed adaptive subtiling level, limiting the memory
+# spent on the subtilings of the most heavily populated tiles.
+cython.declare(subtiling_adaptive_level_max='int')
+subtiling_adaptive_level_max = 8
+
+# Function feeding the computation times measured for the individual
+# tiles back into the adaptive subtiling levels, for all tilings of
+# the component making use of adaptive subtiling. The offsets are only
+# adjusted every subtiling_adaptive_period base time steps, so that the
+# measured times are accumulated over several steps.
+@cython.header(
+    # Arguments
+    component='Component',
+    time_step='Py_ssize_t',
+    # Locals
+    force=str,
+    tiling='Tiling',
+    tiling_name=str,
+    returns='void',
+)
+def adapt_subtilings(component, time_step):
+    if time_step%subtiling_adaptive_period != 0:
+        return
+    for tiling_name, tiling in component.tilings.items():
+        if not tiling_name.endswith(' (tiles)'):
+            continue
+        force = tiling_name[:len(tiling_name) - len(' (tiles)')]
+        if shortrange_params.get(force, {}).get('subtiling', ('',))[0] != 'adaptive':
+            continue
+        tiling.adapt_subtiling_offsets(subtiling_adaptive_level_max - 1)
+# The number of base time steps over which the tile computation times
+# are accumulated before the adaptive subtiling levels are adjusted
+cython.declare(subtiling_adaptive_period='int')
+subtiling_adaptive_period = 4
+
 # Function which refines the subtiling corresponding to the given
 # interaction_name, on all instantiated components. The original
 # subtilings are not deleted, and so may later be substituted back in
@@ -4412,17 +4788,7 @@ components_all = []
 domain_info = get_domain_info()
 cython.declare(
     domain_subdivisions='int[::1]',
-    domain_size_x='double',
-    domain_size_y='double',
-    domain_size_z='double',
-    domain_bgn_x='double',
-    domain_bgn_y='double',
-    domain_bgn_z='double',
+    domain_layout_local_indices='int[::1]',
 )
-domain_subdivisions = domain_info.subdivisions
-domain_size_x       = domain_info.size_x
-domain_size_y       = domain_info.size_y
-domain_size_z       = domain_info.size_z
-domain_bgn_x        = domain_info.bgn_x
-domain_bgn_y        = domain_info.bgn_y
-domain_bgn_z        = domain_info.bgn_z
+domain_subdivisions         = domain_info.subdivisions
+domain_layout_local_indices = domain_info.layout_local_indices
@@ -0,0 +1,640 @@
+# This file is part of CO𝘕CEPT, the cosmological 𝘕-body code in Python.
+# Copyright © 2015–2024 Jeppe Mosgaard Dakin.
+#
+# CO𝘕CEPT is free software: You can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# CO𝘕CEPT is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with CO𝘕CEPT. If not, see https://www.gnu.org/licenses/
+#
+# The author of CO𝘕CEPT can be contacted at dakin(at)phys.au.dk
+# The latest version of CO𝘕CEPT is available at
+# https://github.com/jmd-dk/concept/
+
+
+
+# Import everything from the commons module.
+# In the .pyx file, Cython declared variables will also get cimported.
+from commons import *
+
+
+
+# Class implementing an octree over a set of particles,
+# used for hierarchical (tree) gravity.
+@cython.cclass
+class Octree:
+    """The tree is stored in flat arrays, with node 0 being the root.
+    The particles belonging to a node occupy the contiguous range
+    [node_bgn, node_end) of the particles array, which stores
+    particle indices into the positions of the component. Each node
+    further stores its geometric centre, its (cubic) extent and its
+    centre of mass. All particles of a component share the same mass,
+    and so the monopole of a node is given by its number of particles.
+    Finally, each node stores the index of its first child (-1 for
+    leaves) as well as the index of the node to visit next once the
+    node itself (with all of its children) has been dealt with
+    (-1 when the walk is complete). This allows for tree walks
+    without the need of a stack; whenever a node is opened,
+    continue to its first child, and whenever a node is accepted
+    (or is a leaf), continue to its next node.
+    """
+    # The maximum number of particles within a leaf
+    # and the maximum depth of the tree.
+    leaf_size = 8
+    depth_max = 48
+
+    # Initialisation method
+    @cython.header()
+    def __init__(self):
+        # The triple quoted string below serves as the type declaration
+        # for the data attributes of the Octree type.
+        # It will get picked up by the pyxpp script
+        # and included in the .pxd file.
+        """
+        double*      pos
+        Py_ssize_t   size
+        Py_ssize_t   size_allocated
+        Py_ssize_t*  particles
+        Py_ssize_t*  particles_buffer
+        signed char* particles_octant
+        Py_ssize_t   particles_N
+        Py_ssize_t   particles_allocated
+        Py_ssize_t*  node_bgn
+        Py_ssize_t*  node_end
+        Py_ssize_t*  node_child
+        Py_ssize_t*  node_next
+        double*      node_centre
+        double*      node_extent
+        double*      node_com
+        """
+        self.pos = NULL
+        self.size = 0
+        self.size_allocated = 1
+        self.node_bgn    = malloc(self.size_allocated*sizeof('Py_ssize_t'))
+        self.node_end    = malloc(self.size_allocated*sizeof('Py_ssize_t'))
+        self.node_child  = malloc(self.size_allocated*sizeof('Py_ssize_t'))
+        self.node_next   = malloc(self.size_allocated*sizeof('Py_ssize_t'))
+        self.node_centre = malloc(3*self.size_allocated*sizeof('double'))
+        self.node_extent = malloc(self.size_allocated*sizeof('double'))
+        self.node_com    = malloc(3*self.size_allocated*sizeof('double'))
+        self.particles_N = 0
+        self.particles_allocated = 1
+        self.particles        = malloc(self.particles_allocated*sizeof('Py_ssize_t'))
+        self.particles_buffer = malloc(self.particles_allocated*sizeof('Py_ssize_t'))
+        self.particles_octant = malloc(self.particles_allocated*sizeof('signed char'))
+
+    # Method for (re)building the tree from the particles within
+    # a tile, including only the rungs within the given range.
+    @cython.header(
+        # Arguments
+        pos='double*',
+        tile='Py_ssize_t**',
+        rungs_N='Py_ssize_t*',
+        rung_index_bgn='signed char',
+        rung_index_end='signed char',
+        # Locals
+        dim='int',
+        extent='double',
+        indexᵖ='Py_ssize_t',
+        indexˣ='Py_ssize_t',
+        pos_max='double[::1]',
+        pos_min='double[::1]',
+        rung='Py_ssize_t*',
+        rung_N='Py_ssize_t',
+        rung_index='signed char',
+        rung_particle_index='Py_ssize_t',
+        returns='void',
+    )
+    def build(self, pos, tile, rungs_N, rung_index_bgn, rung_index_end):
+        self.pos = pos
+        self.size = 0
+        # Count up the particles and ensure sufficient memory
+        self.particles_N = 0
+        for rung_index in range(rung_index_bgn, rung_index_end):
+            self.particles_N += rungs_N[rung_index]
+        if self.particles_N == 0:
+            return
+        if self.particles_N > self.particles_allocated:
+            self.particles_allocated = self.particles_N
+            self.particles = realloc(
+                self.particles, self.particles_allocated*sizeof('Py_ssize_t'),
+            )
+            self.particles_buffer = realloc(
+                self.particles_buffer, self.particles_allocated*sizeof('Py_ssize_t'),
+            )
+            self.particles_octant = realloc(
+                self.particles_octant, self.particles_allocated*sizeof('signed char'),
+            )
+        # Gather the particle indices,
+        # while also finding their bounding box.
+        pos_min = ထ*ones(3, dtype=C2np['double'])
+        pos_max = -ထ*ones(3, dtype=C2np['double'])
+        self.particles_N = 0
+        for rung_index in range(rung_index_bgn, rung_index_end):
+            rung_N = rungs_N[rung_index]
+            if rung_N == 0:
+                continue
+            rung = tile[rung_index]
+            for rung_particle_index in range(rung_N):
+                indexᵖ = rung[rung_particle_index]
+                self.particles[self.particles_N] = indexᵖ
+                self.particles_N += 1
+                indexˣ = 3*indexᵖ
+                for dim in range(3):
+                    if pos[indexˣ + dim] < pos_min[dim]:
+                        pos_min[dim] = pos[indexˣ + dim]
+                    if pos[indexˣ + dim] > pos_max[dim]:
+                        pos_max[dim] = pos[indexˣ + dim]
+        # The root node is a cube enclosing the bounding box
+        extent = 0
+        for dim in range(3):
+            extent = pairmax(extent, pos_max[dim] - pos_min[dim])
+        extent = (1 + ℝ[1e+3*machine_ϵ])*extent + machine_ϵ
+        self.size = 1
+        self.build_node(
+            0, 0, self.particles_N,
+            0.5*(pos_min[0] + pos_max[0]),
+            0.5*(pos_min[1] + pos_max[1]),
+            0.5*(pos_min[2] + pos_max[2]),
+            extent, -1, 0,
+        )
+
+    # Method for recursively building the node with the given index,
+    # together with all of its descendants.
+    @cython.header(
+        # Arguments
+        node='Py_ssize_t',
+        bgn='Py_ssize_t',
+        end='Py_ssize_t',
+        x='double',
+        y='double',
+        z='double',
+        extent='double',
+        node_next='Py_ssize_t',
+        depth='int',
+        # Locals
+        N_inv='double',
+        child='Py_ssize_t',
+        child_end='Py_ssize_t',
+        children_N='Py_ssize_t',
+        counts='Py_ssize_t[::1]',
+        i='Py_ssize_t',
+        indexˣ='Py_ssize_t',
+        octant='signed char',
+        offsets='Py_ssize_t[::1]',
+        pos='double*',
+        x_com='double',
+        y_com='double',
+        z_com='double',
+        returns='void',
+    )
+    def build_node(self, node, bgn, end, x, y, z, extent, node_next, depth):
+        pos = self.pos
+        # Store basic node information
+        self.node_bgn[node] = bgn
+        self.node_end[node] = end
+        self.node_next[node] = node_next
+        self.node_centre[3*node + 0] = x
+        self.node_centre[3*node + 1] = y
+        self.node_centre[3*node + 2] = z
+        self.node_extent[node] = extent
+        # Compute centre of mass
+        x_com = y_com = z_com = 0
+        for i in range(bgn, end):
+            indexˣ = 3*self.particles[i]
+            x_com += pos[indexˣ + 0]
+            y_com += pos[indexˣ + 1]
+            z_com += pos[indexˣ + 2]
+        N_inv = 1./(end - bgn)
+        self.node_com[3*node + 0] = x_com*N_inv
+        self.node_com[3*node + 1] = y_com*N_inv
+        self.node_com[3*node + 2] = z_com*N_inv
+        # Leaf node
+        if end - bgn <= self.leaf_size or depth == self.depth_max:
+            self.node_child[node] = -1
+            return
+        # Sort the particles of this node into the eight octants
+        counts = zeros(8, dtype=C2np['Py_ssize_t'])
+        for i in range(bgn, end):
+            indexˣ = 3*self.particles[i]
+            octant = (
+                  4*(pos[indexˣ + 0] >= x)
+                + 2*(pos[indexˣ + 1] >= y)
+                +   (pos[indexˣ + 2] >= z)
+            )
+            self.particles_octant[i] = octant
+            counts[octant] += 1
+        offsets = zeros(8, dtype=C2np['Py_ssize_t'])
+        offsets[0] = bgn
+        for octant in range(1, 8):
+            offsets[octant] = offsets[octant - 1] + counts[octant - 1]
+        for i in range(bgn, end):
+            octant = self.particles_octant[i]
+            self.particles_buffer[offsets[octant]] = self.particles[i]
+            offsets[octant] += 1
+        for i in range(bgn, end):
+            self.particles[i] = self.particles_buffer[i]
+        # Allocate the non-empty child nodes
+        # consecutively after the existing nodes.
+        children_N = 0
+        for octant in range(8):
+            children_N += (counts[octant] > 0)
+        child = self.size
+        self.size += children_N
+        if self.size > self.size_allocated:
+            self.resize(2*self.size)
+        self.node_child[node] = child
+        # Build the child nodes. The next node of each child
+        # is its next sibling, except for the last child,
+        # which inherits the next node of this node.
+        for octant in range(8):
+            if counts[octant] == 0:
+                continue
+            child_end = bgn + counts[octant]
+            children_N -= 1
+            self.build_node(
+                child, bgn, child_end,
+                x + ℝ[0.25*extent]*(2*(octant//4    ) - 1),
+                y + ℝ[0.25*extent]*(2*(octant//2 % 2) - 1),
+                z + ℝ[0.25*extent]*(2*(octant    % 2) - 1),
+                ℝ[0.5*extent],
+                (child + 1 if children_N > 0 else node_next),
+                depth + 1,
+            )
+            bgn = child_end
+            child += 1
+
+    # Method for resizing the node arrays
+    @cython.header(
+        # Arguments
+        size='Py_ssize_t',
+        returns='void',
+    )
+    def resize(self, size):
+        self.size_allocated = size
+        self.node_bgn    = realloc(self.node_bgn   , size*sizeof('Py_ssize_t'))
+        self.node_end    = realloc(self.node_end   , size*sizeof('Py_ssize_t'))
+        self.node_child  = realloc(self.node_child , size*sizeof('Py_ssize_t'))
+        self.node_next   = realloc(self.node_next  , size*sizeof('Py_ssize_t'))
+        self.node_centre = realloc(self.node_centre, 3*size*sizeof('double'))
+        self.node_extent = realloc(self.node_extent, size*sizeof('double'))
+        self.node_com    = realloc(self.node_com   , 3*size*sizeof('double'))
+
+    # This method is automatically called when an Octree instance
+    # is garbage collected. All manually allocated memory is freed.
+    def __dealloc__(self):
+        free(self.node_bgn)
+        free(self.node_end)
+        free(self.node_child)
+        free(self.node_next)
+        free(self.node_centre)
+        free(self.node_extent)
+        free(self.node_com)
+        free(self.particles)
+        free(self.particles_buffer)
+        free(self.particles_octant)
+
+    # String representation
+    def __repr__(self):
+        return f'<octree of {self.particles_N} particles in {self.size} nodes>'
+    def __str__(self):
+        return self.__repr__()
+
+# Function returning the Octree instance with the given index
+# within a global pool of trees. The pool grows as needed,
+# allowing the memory of the trees to be reused between calls.
+@cython.header(
+    # Arguments
+    index='Py_ssize_t',
+    # Locals
+    tree='Octree',
+    returns='Octree',
+)
+def get_octree(index):
+    while index >= len(octrees):
+        octrees.append(Octree())
+    tree = octrees[index]
+    return tree
+# Pool of Octree instances used by the get_octree() function
+cython.declare(octrees=list)
+octrees = []
+
+
+
+# Class implementing cached (Verlet) neighbour lists between the
+# particles of a component within the local domain, used for
+# short-range interactions over several rung sub-steps.
+@cython.cclass
+class NeighbourList:
+    """The neighbour lists are built from a reference copy of the
+    particle positions. All particle pairs closer than the force range
+    plus the skin within this reference configuration are stored, and
+    so the lists remain complete as long as no particle has moved more
+    than half the skin since the reference copy was taken.
+    The particles are sorted into the tiles of the given tiling based
+    on their reference positions, making the tile membership immune to
+    later drifts. The lists are then built lazily for each tile pair
+    when first needed. For each tile pair (r, s), each particle within
+    tile r is stored as a "member" together with its neighbours within
+    tile s. For r ≠ s, the particles of tile s are similarly stored as
+    members together with their neighbours within tile r. As all lists
+    refer to particle indices, they are invalidated whenever the number
+    of local particles changes or the tiling is altered. Should
+    particles be exchanged between processes or be reordered in memory
+    without altering their number, the displacement check covers this
+    as well, as neighbour lists build from reference positions are
+    valid for any particle within half a skin of these. The lists are
+    thus kept across base time steps, for as long as they remain valid.
+    For all pairs of particles within the force range to be found
+    within neighbouring tiles, the tile extent must be at least the
+    force range plus the skin.
+    """
+
+    # Initialisation method
+    @cython.header(
+        # Arguments
+        forcerange='double',
+        skin='double',
+    )
+    def __init__(self, forcerange, skin):
+        # The triple quoted string below serves as the type declaration
+        # for the data attributes of the NeighbourList type.
+        # It will get picked up by the pyxpp script
+        # and included in the .pxd file.
+        """
+        double      forcerange
+        double      skin
+        tuple       layout
+        Py_ssize_t  N
+        Py_ssize_t  N_allocated
+        double*     pos
+        Py_ssize_t* particles_tile
+        Py_ssize_t  tiles_N
+        Py_ssize_t  tiles_allocated
+        Py_ssize_t* tiles_bgn
+        Py_ssize_t* tiles_particles
+        Py_ssize_t  members_N
+        Py_ssize_t  members_allocated
+        Py_ssize_t* members
+        Py_ssize_t* neighbours_bgn
+        Py_ssize_t  neighbours_N
+        Py_ssize_t  neighbours_allocated
+        Py_ssize_t* neighbours
+        dict        blocks
+        """
+        self.forcerange = forcerange
+        self.skin = skin
+        self.layout = ()
+        self.N = -1
+        self.N_allocated = 1
+        self.pos             = malloc(3*self.N_allocated*sizeof('double'))
+        self.particles_tile  = malloc(self.N_allocated*sizeof('Py_ssize_t'))
+        self.tiles_particles = malloc(self.N_allocated*sizeof('Py_ssize_t'))
+        self.tiles_N = 0
+        self.tiles_allocated = 1
+        self.tiles_bgn = malloc((self.tiles_allocated + 1)*sizeof('Py_ssize_t'))
+        self.members_N = 0
+        self.members_allocated = 1
+        self.members        = malloc(self.members_allocated*sizeof('Py_ssize_t'))
+        self.neighbours_bgn = malloc((self.members_allocated + 1)*sizeof('Py_ssize_t'))
+        self.neighbours_bgn[0] = 0
+        self.neighbours_N = 0
+        self.neighbours_allocated = 1
+        self.neighbours = malloc(self.neighbours_allocated*sizeof('Py_ssize_t'))
+        self.blocks = {}
+
+    # Method returning whether the neighbour lists are still valid
+    # for the given particle positions and tiling, the latter specified
+    # by its location, tile extent and shape.
+    @cython.header(
+        # Arguments
+        pos='double*',
+        N='Py_ssize_t',
+        location='double*',
+        tile_extent='double*',
+        shape='Py_ssize_t*',
+        # Locals
+        dim='int',
+        displacement='double',
+        displacement2='double',
+        indexˣ='Py_ssize_t',
+        returns='bint',
+    )
+    def is_valid(self, pos, N, location, tile_extent, shape):
+        if N != self.N or self.layout != self.get_layout(location, tile_extent, shape):
+            return False
+        # Check whether any particle has moved more than half the skin,
+        # taking periodicity into account. This O(N) check is carried
+        # out once per rung sub-step, which is cheap compared to the
+        # interactions themselves.
+        for indexˣ in range(0, 3*N, 3):
+            displacement2 = 0
+            for dim in range(3):
+                displacement = pos[indexˣ + dim] - self.pos[indexˣ + dim]
+                displacement -= boxsize*floor(displacement*ℝ[1/boxsize] + 0.5)
+                displacement2 += displacement**2
+            if displacement2 > ℝ[0.25*self.skin**2]:
+                return False
+        return True
+
+    # Method for discarding all neighbour lists, taking a new reference
+    # copy of the particle positions and sorting the particles into the
+    # tiles of the tiling specified by its location, tile extent and
+    # shape. The neighbour lists themselves are built by get_block().
+    @cython.header(
+        # Arguments
+        pos='double*',
+        N='Py_ssize_t',
+        location='double*',
+        tile_extent='double*',
+        shape='Py_ssize_t*',
+        # Locals
+        i='Py_ssize_t',
+        indexᵖ='Py_ssize_t',
+        indexˣ='Py_ssize_t',
+        j='Py_ssize_t',
+        k='Py_ssize_t',
+        tile_index='Py_ssize_t',
+        returns='void',
+    )
+    def reset(self, pos, N, location, tile_extent, shape):
+        self.layout = self.get_layout(location, tile_extent, shape)
+        self.N = N
+        self.blocks.clear()
+        self.members_N = 0
+        self.neighbours_N = 0
+        self.neighbours_bgn[0] = 0
+        # Ensure sufficient memory
+        if N > self.N_allocated:
+            self.N_allocated = N
+            self.pos = realloc(self.pos, 3*self.N_allocated*sizeof('double'))
+            self.particles_tile = realloc(
+                self.particles_tile, self.N_allocated*sizeof('Py_ssize_t'),
+            )
+            self.tiles_particles = realloc(
+                self.tiles_particles, self.N_allocated*sizeof('Py_ssize_t'),
+            )
+        self.tiles_N = shape[0]*shape[1]*shape[2]
+        if self.tiles_N > self.tiles_allocated:
+            self.tiles_allocated = self.tiles_N
+            self.tiles_bgn = realloc(
+                self.tiles_bgn, (self.tiles_allocated + 1)*sizeof('Py_ssize_t'),
+            )
+        # Take reference copy of the positions and count up
+        # the number of particles within each tile.
+        for tile_index in range(self.tiles_N + 1):
+            self.tiles_bgn[tile_index] = 0
+        for indexᵖ in range(N):
+            indexˣ = 3*indexᵖ
+            self.pos[indexˣ + 0] = pos[indexˣ + 0]
+            self.pos[indexˣ + 1] = pos[indexˣ + 1]
+            self.pos[indexˣ + 2] = pos[indexˣ + 2]
+            i = int((pos[indexˣ + 0] - location[0])*ℝ[1/tile_extent[0]])
+            j = int((pos[indexˣ + 1] - location[1])*ℝ[1/tile_extent[1]])
+            k = int((pos[indexˣ + 2] - location[2])*ℝ[1/tile_extent[2]])
+            i = pairmin(pairmax(i, 0), ℤ[shape[0] - 1])
+            j = pairmin(pairmax(j, 0), ℤ[shape[1] - 1])
+            k = pairmin(pairmax(k, 0), ℤ[shape[2] - 1])
+            tile_index = (i*ℤ[shape[1]] + j)*ℤ[shape[2]] + k
+            self.particles_tile[indexᵖ] = tile_index
+            self.tiles_bgn[tile_index + 1] += 1
+        # Place the particles into the tiles (counting sort)
+        for tile_index in range(self.tiles_N):
+            self.tiles_bgn[tile_index + 1] += self.tiles_bgn[tile_index]
+        for indexᵖ in range(N):
+            tile_index = self.particles_tile[indexᵖ]
+            self.tiles_particles[self.tiles_bgn[tile_index]] = indexᵖ
+            self.tiles_bgn[tile_index] += 1
+        for tile_index in range(self.tiles_N, 0, -1):
+            self.tiles_bgn[tile_index] = self.tiles_bgn[tile_index - 1]
+        self.tiles_bgn[0] = 0
+
+    # Helper method returning the layout of a tiling as a tuple
+    @cython.header(
+        # Arguments
+        location='double*',
+        tile_extent='double*',
+        shape='Py_ssize_t*',
+        # Locals
+        dim='int',
+        returns=tuple,
+    )
+    def get_layout(self, location, tile_extent, shape):
+        return (
+            tuple([location   [dim] for dim in range(3)])
+            + tuple([tile_extent[dim] for dim in range(3)])
+            + tuple([shape      [dim] for dim in range(3)])
+        )
+
+    # Method returning the members of the neighbour lists between the
+    # given pair of tiles, as (members_bgn_r, members_end_r,
+    # members_bgn_s, members_end_s). The neighbour lists are built if
+    # they do not already exist. Note that this may reallocate the
+    # members, neighbours_bgn and neighbours arrays.
+    @cython.header(
+        # Arguments
+        tile_index_r='Py_ssize_t',
+        tile_index_s='Py_ssize_t',
+        # Locals
+        block=tuple,
+        members_bgn_r='Py_ssize_t',
+        members_bgn_s='Py_ssize_t',
+        members_end_r='Py_ssize_t',
+        members_end_s='Py_ssize_t',
+        returns=tuple,
+    )
+    def get_block(self, tile_index_r, tile_index_s):
+        block = self.blocks.get((tile_index_r, tile_index_s))
+        if block is not None:
+            return block
+        members_bgn_r = self.members_N
+        self.build_lists(tile_index_r, tile_index_s)
+        members_end_r = self.members_N
+        members_bgn_s = members_end_s = self.members_N
+        if tile_index_r != tile_index_s:
+            self.build_lists(tile_index_s, tile_index_r)
+            members_end_s = self.members_N
+        block = (members_bgn_r, members_end_r, members_bgn_s, members_end_s)
+        self.blocks[tile_index_r, tile_index_s] = block
+        return block
+
+    # Method for appending the particles of tile a as members,
+    # with neighbours within tile b.
+    @cython.header(
+        # Arguments
+        tile_index_a='Py_ssize_t',
+        tile_index_b='Py_ssize_t',
+        # Locals
+        a='Py_ssize_t',
+        b='Py_ssize_t',
+        indexᵖ_a='Py_ssize_t',
+        indexᵖ_b='Py_ssize_t',
+        indexˣ_a='Py_ssize_t',
+        indexˣ_b='Py_ssize_t',
+        x_ab='double',
+        y_ab='double',
+        z_ab='double',
+        returns='void',
+    )
+    def build_lists(self, tile_index_a, tile_index_b):
+        for a in range(self.tiles_bgn[tile_index_a], self.tiles_bgn[tile_index_a + 1]):
+            indexᵖ_a = self.tiles_particles[a]
+            indexˣ_a = 3*indexᵖ_a
+            if self.members_N == self.members_allocated:
+                self.members_allocated *= 2
+                self.members = realloc(
+                    self.members, self.members_allocated*sizeof('Py_ssize_t'),
+                )
+                self.neighbours_bgn = realloc(
+                    self.neighbours_bgn, (self.members_allocated + 1)*sizeof('Py_ssize_t'),
+                )
+            self.members[self.members_N] = indexᵖ_a
+            for b in range(self.tiles_bgn[tile_index_b], self.tiles_bgn[tile_index_b + 1]):
+                indexᵖ_b = self.tiles_particles[b]
+                if indexᵖ_b == indexᵖ_a:
+                    continue
+                indexˣ_b = 3*indexᵖ_b
+                x_ab = self.pos[indexˣ_a + 0] - self.pos[indexˣ_b + 0]
+                y_ab = self.pos[indexˣ_a + 1] - self.pos[indexˣ_b + 1]
+                z_ab = self.pos[indexˣ_a + 2] - self.pos[indexˣ_b + 2]
+                x_ab -= boxsize*floor(x_ab*ℝ[1/boxsize] + 0.5)
+                y_ab -= boxsize*floor(y_ab*ℝ[1/boxsize] + 0.5)
+                z_ab -= boxsize*floor(z_ab*ℝ[1/boxsize] + 0.5)
+                if x_ab**2 + y_ab**2 + z_ab**2 > ℝ[(self.forcerange + self.skin)**2]:
+                    continue
+                if self.neighbours_N == self.neighbours_allocated:
+                    self.neighbours_allocated *= 2
+                    self.neighbours = realloc(
+                        self.neighbours, self.neighbours_allocated*sizeof('Py_ssize_t'),
+                    )
+                self.neighbours[self.neighbours_N] = indexᵖ_b
+                self.neighbours_N += 1
+            self.members_N += 1
+            self.neighbours_bgn[self.members_N] = self.neighbours_N
+
+    # This method is automatically called when a NeighbourList instance
+    # is garbage collected. All manually allocated memory is freed.
+    def __dealloc__(self):
+        free(self.pos)
+        free(self.particles_tile)
+        free(self.tiles_bgn)
+        free(self.tiles_particles)
+        free(self.members)
+        free(self.neighbours_bgn)
+        free(self.neighbours)
+
+    # String representation
+    def __repr__(self):
+        return (
+            f'<neighbour lists of {self.members_N} particles '
+            f'with {self.neighbours_N} neighbours in total>'
+        )
+    def __str__(self):
+        return self.__repr__()
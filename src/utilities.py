@@ -43,7 +43,13 @@ cimport(
     '    get_k_magnitudes,                '
     '    transferfunctions_registered,    '
 )
-cimport('from mesh import convert_particles_to_fluid')
+cimport(
+    'from mesh import                 '
+    '    convert_particles_to_fluid,  '
+    '    free_fftw_slab,              '
+    '    get_fftw_plans_single,       '
+    '    get_fftw_slab,               '
+)
 cimport(
     'from snapshot import     '
     '    compare_parameters,  '
@@ -591,6 +597,136 @@ def render3D():
     # Render the snapshot
     graphics.render3D(snapshot.components, output_filename)
 
+# Function which generates FFTW wisdom for all grid sizes
+# needed by the simulation specified by the parameter file,
+# so that no planning is needed within the actual simulation.
+@cython.pheader(
+    # Locals
+    Declaration=object,
+    component='Component',
+    components=list,
+    declaration=object,
+    force=str,
+    gridsize='Py_ssize_t',
+    gridsizes=dict,
+    gridsizes_single=set,
+    gridsizes_str=str,
+    initial_condition=object,
+    initial_conditions_list=list,
+    kind=str,
+    lines=list,
+    method=str,
+    method_extra=str,
+    methods=list,
+    options=dict,
+    selections=dict,
+    time_param=str,
+    usage=str,
+    usages=set,
+)
+def wisdom():
+    if not fftw_wisdom_reuse and not special_params['list']:
+        abort(
+            'The wisdom utility cannot be used with fftw_wisdom_reuse = False, '
+            'as the generated wisdom would then not be stored'
+        )
+    # Instantiate the components of the initial conditions
+    # without realizing or loading in any data.
+    initial_conditions_list = initial_conditions
+    if isinstance(initial_conditions_list, (str, dict)):
+        initial_conditions_list = [initial_conditions_list]
+    components = []
+    with allow_similarly_named_components():
+        for initial_condition in any2list(initial_conditions_list):
+            if isinstance(initial_condition, str):
+                components += load(
+                    sensible_path(initial_condition),
+                    compare_params=False,
+                    only_params=True,
+                ).components
+            else:
+                components += get_initial_conditions([initial_condition], do_realization=False)
+    # Collect all grid sizes, together with their usages
+    gridsizes = {}
+    gridsizes_single = set()
+    # Grid sizes used for realization of the components
+    for component in components:
+        gridsizes.setdefault(component.gridsize, set()).add(f'realization of {component.name}')
+    # Grid sizes used for the potentials
+    for component in components:
+        for force, method in component.forces.items():
+            methods = [method]
+            if method in ('p3m', 'tree'):
+                methods.append('pm')
+            for method_extra in methods:
+                usage = f'{force} potential ({method_extra})'
+                gridsize = potential_options['gridsize']['global'].get(force, {}).get(
+                    method_extra, -1,
+                )
+                gridsizes.setdefault(gridsize, set()).add(usage)
+                if potential_options['precision'].get(force, {}).get(method_extra) == 'single':
+                    gridsizes_single.add(gridsize)
+                if method_extra not in component.potential_gridsizes.get(force, {}):
+                    continue
+                for gridsize in component.potential_gridsizes[force][method_extra]:
+                    gridsizes.setdefault(gridsize, set()).add(f'{usage} of {component.name}')
+    # Grid sizes used for outputs
+    for kind, Declaration, selections, options in (
+        ('powerspec', analysis.PowerspecDeclaration, powerspec_select, powerspec_options),
+        ('bispec'   , analysis.BispecDeclaration   , bispec_select   , bispec_options   ),
+        ('render2D' , graphics.Render2DDeclaration , render2D_select , render2D_options ),
+        ('render3D' , graphics.Render3DDeclaration , render3D_select , render3D_options ),
+    ):
+        if not any([output_times[time_param].get(kind) for time_param in ('a', 't')]):
+            continue
+        for declaration in graphics.get_output_declarations(
+            kind, components, selections, options, Declaration,
+        ):
+            gridsizes.setdefault(getattr(declaration, 'gridsize', -1), set()).add(kind)
+            for component in declaration.components:
+                gridsizes.setdefault(
+                    getattr(component, f'{kind}_upstream_gridsize'), set(),
+                ).add(f'{kind} of {component.name}')
+    # Additional grid sizes specified directly
+    gridsizes_str = special_params['gridsizes']
+    for gridsize_str in gridsizes_str.replace(',', ' ').split():
+        gridsizes.setdefault(int(round(float(gridsize_str))), set()).add('user specified')
+    # Remove non-existing grid sizes, signalled by values below 2
+    gridsizes = {
+        gridsize: usages
+        for gridsize, usages in gridsizes.items()
+        if gridsize > 1
+    }
+    # Print out the grid sizes
+    if not gridsizes:
+        masterwarn('No grid sizes in need of FFTW wisdom found')
+        return
+    lines = []
+    for gridsize, usages in sorted(gridsizes.items()):
+        lines.append(
+            '{}${}'.format(
+                gridsize,
+                ', '.join(sorted(usages))
+                + (' (also single precision)' if gridsize in gridsizes_single else ''),
+            )
+        )
+    masterprint('Grid sizes:')
+    masterprint('\n'.join(align_text(lines, indent=4)), wrap=False)
+    if special_params['list']:
+        return
+    # Generate the wisdom by constructing the FFTW plans.
+    # The planning takes place within the get_fftw_slab() and
+    # get_fftw_plans_single() functions, with the wisdom
+    # written to disk immediately afterwards.
+    for gridsize in sorted(gridsizes):
+        masterprint(f'Generating FFTW wisdom for grid size {gridsize} ...')
+        get_fftw_slab(gridsize, 'slab_wisdom')
+        free_fftw_slab(gridsize, 'slab_wisdom')
+        if gridsize in gridsizes_single:
+            get_fftw_plans_single(gridsize)
+        masterprint('done')
+    masterprint(f'FFTW wisdom stored in "{path.reusable_dir}/fftw"')
+
 # Function for printing all informations within a snapshot
 @cython.pheader(
     # Locals
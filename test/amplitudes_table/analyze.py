@@ -0,0 +1,57 @@
+# This file has to be run in pure Python mode!
+
+# Imports from the CO𝘕CEPT code
+from commons import *
+from ic import amplitudes_table_density, get_amplitudes
+from integration import init_time
+from species import Component
+
+# Absolute path and name of this test
+this_dir  = os.path.dirname(os.path.realpath(__file__))
+this_test = os.path.basename(os.path.dirname(this_dir))
+
+# Begin analysis
+masterprint(f'Analysing {this_test} data ...')
+
+# Initiate the cosmic time and the scale factor
+init_time()
+
+# Grid size of the linear neutrino component
+gridsize = user_params['_gridsize']
+
+# Linear neutrino component
+component = Component(
+    'linear neutrino', 'neutrino', gridsize=gridsize, boltzmann_order=-1,
+)
+
+# Compare tabulated and directly computed amplitudes of ϱ and J,
+# at single times as well as averaged over time step sized intervals.
+# With the default table density, the relative difference should be
+# well below the rel_tol below.
+if amplitudes_table_density != 20:
+    abort(f'Expected amplitudes_table_density = 20, got {amplitudes_table_density}')
+rel_tol = 1e-3
+for variable, multi_index in [(0, 0), (1, 0)]:
+    for a in np.logspace(np.log10(1.2*a_begin), np.log10(0.9), 7):
+        for a_next in (-1, 1.02*a):
+            amplitudes = {
+                tabulate: asarray(get_amplitudes(
+                    gridsize, component, a, a_next, variable, multi_index,
+                    tabulate=tabulate,
+                ))
+                for tabulate in (False, True)
+            }
+            reldiff = (
+                np.max(np.abs(amplitudes[True] - amplitudes[False]))
+                /np.max(np.abs(amplitudes[False]))
+            )
+            if reldiff > rel_tol:
+                abort(
+                    f'Tabulated and direct amplitudes of variable {variable} '
+                    f'at a = {a}' + f' (averaged until a = {a_next})'*(a_next != -1)
+                    + f' differ by {reldiff} relative to the largest amplitude, '
+                    f'exceeding the tolerance of {rel_tol}'
+                )
+
+# Done analysing
+masterprint('done')
@@ -0,0 +1,104 @@
+# This file has to be run in pure Python mode!
+
+# Imports from the CO𝘕CEPT code
+from commons import *
+from snapshot import load
+import species
+plt = get_matplotlib().pyplot
+
+# Absolute path and name of this test
+this_dir  = os.path.dirname(os.path.realpath(__file__))
+this_test = os.path.basename(os.path.dirname(this_dir))
+
+# Read in data from the CO𝘕CEPT snapshots,
+# ordering the particles according to their IDs.
+species.allow_similarly_named_components = True
+a = []
+nprocs_list = sorted({
+    int(os.path.basename(dname).split('_')[1])
+    for dname in glob(f'{this_dir}/output_*')
+})
+pos = {}
+mom = {}
+for n in nprocs_list:
+    for balance in (False, True):
+        pos[n, balance] = []
+        mom[n, balance] = []
+        for fname in sorted(
+            glob(f'{this_dir}/output_{n}_{balance}/snapshot_a=*'),
+            key=(lambda s: s[(s.index('=') + 1):]),
+        ):
+            snapshot = load(fname, compare_params=False)
+            if n == nprocs_list[0] and not balance:
+                a.append(snapshot.params['a'])
+            component = snapshot.components[0]
+            ordering = np.argsort(component.ids)
+            pos[n, balance].append(asarray(component.pos_mv3)[ordering, :])
+            mom[n, balance].append(asarray(component.mom_mv3)[ordering, :])
+N_snapshots = len(a)
+
+# Begin analysis
+masterprint(f'Analysing {this_test} data ...')
+
+# Compute distances between particles in the runs with and without
+# domain balancing, as well as the relative difference in momenta.
+dist = {n: [] for n in nprocs_list}
+momdiff = {n: [] for n in nprocs_list}
+for n in nprocs_list:
+    for i in range(N_snapshots):
+        Δpos = pos[n, True][i] - pos[n, False][i]
+        Δpos -= boxsize*np.round(Δpos/boxsize)
+        dist[n].append(np.sqrt(np.sum(Δpos**2, axis=1)))
+        momdiff[n].append(
+            np.sqrt(np.sum((mom[n, True][i] - mom[n, False][i])**2, axis=1))
+            /np.std(mom[n, False][i])
+        )
+
+# Plot
+fig_file = f'{this_dir}/result.png'
+fig, axes = plt.subplots(len(nprocs_list), sharex=True, sharey=True, squeeze=False)
+axes = axes[:, 0]
+for n, ax in zip(nprocs_list, axes):
+    for i in range(N_snapshots):
+        ax.semilogy(
+            machine_ϵ + dist[n][i]/boxsize,
+            '.',
+            alpha=0.7,
+            label=f'$a={a[i]}$',
+            zorder=-i,
+        )
+    ax.set_ylabel(
+        rf'$|\mathbf{{x}}_{{\mathrm{{balanced}}}} - \mathbf{{x}}|/\mathrm{{boxsize}}$'
+        f'\n(nprocs = {n})'
+    )
+axes[-1].set_xlabel('Particle ID')
+fig.subplots_adjust(hspace=0)
+plt.setp([ax.get_xticklabels() for ax in axes[:-1]], visible=False)
+axes[0].legend()
+fig.tight_layout()
+fig.savefig(fig_file, dpi=150)
+
+# Printout error message for unsuccessful test. At the first snapshot,
+# the runs should agree up to round-off errors (from the different
+# order of summation). At later times, these errors grow
+# chaotically and so a looser tolerance is used.
+tol_first = 1e-6
+tol = 2e-2
+for n in nprocs_list:
+    if (
+           np.mean(dist[n][0])/boxsize > tol_first
+        or np.mean(momdiff[n][0]) > tol_first
+    ):
+        abort(
+            f'Runs with and without domain balancing (nprocs = {n}) yield different '
+            f'results at a = {a[0]}!\n'
+            f'See "{fig_file}" for a visualization.'
+        )
+    if any(np.mean(d)/boxsize > tol for d in dist[n]):
+        abort(
+            f'Runs with and without domain balancing (nprocs = {n}) yield different results!\n'
+            f'See "{fig_file}" for a visualization.'
+        )
+
+# Done analysing
+masterprint('done')
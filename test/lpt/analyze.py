@@ -2,6 +2,8 @@
 
 # Imports from the CO𝘕CEPT code
 from commons import *
+from snapshot import load
+import species
 plt = get_matplotlib().pyplot
 
 # Absolute path and name of this test
@@ -78,6 +80,66 @@ for dealias in [False, True]:
             f'See {fig_file}.'
         )
 
+# The 3LPT particle positions should not depend on the number of slots
+# used for the LPT derivatives, up to round-off errors.
+species.allow_similarly_named_components = True
+rel_tol = 1e-9
+for dealias in [False, True]:
+    pos = {}
+    for slots in ['few', 'many']:
+        snapshot = load(
+            glob(f'{this_dir}/output/slots_{slots}_{dealias}/snapshot*')[0],
+            compare_params=False,
+        )
+        pos[slots] = asarray(snapshot.components[0].pos_mv3)
+    Δpos = pos['many'] - pos['few']
+    Δpos -= boxsize*np.round(Δpos/boxsize)
+    if np.max(np.abs(Δpos))/boxsize > rel_tol:
+        abort(
+            f'The {"dealiased" if dealias else "aliased"} 3LPT particle positions '
+            f'differ depending on the number of slots used for the LPT derivatives'
+        )
+
+# The streamed 3LPT initial conditions should match those realised in
+# memory, up to round-off errors due to the positions being wrapped into
+# the box after each displacement when streaming. This should hold
+# regardless of the number of processes streaming to the snapshot.
+pos = {}
+mom = {}
+for streaming, nprocs in [(False, 1), (True, 1), (True, 4)]:
+    snapshot = load(
+        glob(f'{this_dir}/output/streaming_{streaming}_{nprocs}/snapshot*')[0],
+        compare_params=False,
+    )
+    component = snapshot.components[0]
+    ordering = np.argsort(component.ids)
+    pos[streaming, nprocs] = asarray(component.pos_mv3)[ordering, :]
+    mom[streaming, nprocs] = asarray(component.mom_mv3)[ordering, :]
+for nprocs in [1, 4]:
+    Δpos = pos[True, nprocs] - pos[False, 1]
+    Δpos -= boxsize*np.round(Δpos/boxsize)
+    if np.max(np.abs(Δpos))/boxsize > rel_tol:
+        abort(
+            f'The 3LPT particle positions streamed using {nprocs} process(es) '
+            f'differ from those realised in memory'
+        )
+    if np.max(np.abs(mom[True, nprocs] - mom[False, 1]))/np.std(mom[False, 1]) > rel_tol:
+        abort(
+            f'The 3LPT particle momenta streamed using {nprocs} process(es) '
+            f'differ from those realised in memory'
+        )
+# When only positions are selected for saving,
+# only these should be streamed to disk.
+with open_hdf5(
+    glob(f'{this_dir}/output/streaming_pos/snapshot*')[0], mode='r',
+) as hdf5_file:
+    component_h5 = next(iter(hdf5_file['components'].values()))
+    if 'pos' not in component_h5 or 'mom' in component_h5:
+        abort(
+            'Streaming only positions to disk resulted in a snapshot '
+            'with datasets ' + ', '.join(component_h5.keys())
+        )
+
 # Done analysing
 masterprint('done')
 
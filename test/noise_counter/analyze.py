@@ -0,0 +1,64 @@
+# This file has to be run in pure Python mode!
+
+# Imports from the CO𝘕CEPT code
+from commons import *
+from snapshot import load
+import species
+
+# Absolute path and name of this test
+this_dir  = os.path.dirname(os.path.realpath(__file__))
+this_test = os.path.basename(os.path.dirname(this_dir))
+
+# Read in the realised fluid density from the CO𝘕CEPT snapshots
+species.allow_similarly_named_components = True
+runs = [(32, 1, 1), (32, 4, 1), (32, 1, 4), (64, 2, 2)]
+ϱ = {}
+for gridsize, n, threads in runs:
+    snapshot = load(
+        glob(f'{this_dir}/output_{gridsize}_{n}_{threads}/snapshot*')[0],
+        compare_params=False,
+    )
+    fluid = snapshot.components[0]
+    ϱ[gridsize, n, threads] = asarray(
+        fluid.ϱ.grid_noghosts[:gridsize, :gridsize, :gridsize]
+    ).copy()
+
+# Begin analysis
+masterprint(f'Analysing {this_test} data ...')
+
+# The realisations using the same grid size should be identical
+# regardless of the number of processes and threads,
+# up to round-off errors from the differently distributed FFTs.
+rel_tol = 1e-9
+ϱ_ref = ϱ[runs[0]]
+for run in runs[1:3]:
+    reldiff = np.max(np.abs(ϱ[run] - ϱ_ref))/np.std(ϱ_ref)
+    if reldiff > rel_tol:
+        abort(
+            f'The counter scheme realisation using {run[1]} processes and {run[2]} threads '
+            f'differs from that using {runs[0][1]} process and {runs[0][2]} thread'
+        )
+
+# Modes shared between the two grid sizes should be identical.
+# We compare all modes below the Nyquist frequency of the smaller grid,
+# with the Fourier transforms normalised by the number of grid points.
+gridsize_small, gridsize_large = runs[0][0], runs[3][0]
+ϱ_small = np.fft.rfftn(ϱ_ref)/gridsize_small**3
+ϱ_large = np.fft.rfftn(ϱ[runs[3]])/gridsize_large**3
+nyquist = gridsize_small//2
+indices = np.concatenate((np.arange(nyquist), np.arange(-nyquist + 1, 0)))
+ϱ_small_shared = ϱ_small[np.ix_(indices, indices, np.arange(nyquist))]
+ϱ_large_shared = ϱ_large[np.ix_(indices, indices, np.arange(nyquist))]
+ϱ_small_shared[0, 0, 0] = ϱ_large_shared[0, 0, 0] = 0
+reldiff = (
+    np.max(np.abs(ϱ_large_shared - ϱ_small_shared))
+    /np.sqrt(np.mean(np.abs(ϱ_small_shared)**2))
+)
+if reldiff > 1e-6:
+    abort(
+        f'The modes shared between counter scheme realisations with grid sizes '
+        f'{gridsize_small} and {gridsize_large} differ (relative difference {reldiff})'
+    )
+
+# Done analysing
+masterprint('done')
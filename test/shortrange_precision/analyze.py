@@ -0,0 +1,128 @@
+# This file has to be run in pure Python mode!
+
+# Imports from the CO𝘕CEPT code
+from commons import *
+from snapshot import load
+import species
+plt = get_matplotlib().pyplot
+
+# Absolute path and name of this test
+this_dir  = os.path.dirname(os.path.realpath(__file__))
+this_test = os.path.basename(os.path.dirname(this_dir))
+
+# Read in the wall times of the runs
+times = {}
+with open_file(f'{this_dir}/times', mode='r', encoding='utf-8') as f:
+    for line in f:
+        threads, precision, t_begin, t_end = line.split()
+        times[int(threads), precision] = float(t_end) - float(t_begin)
+num_threads_list = sorted({threads for threads, precision in times})
+
+# Read in data from the CO𝘕CEPT snapshots,
+# ordering the particles according to their IDs.
+species.allow_similarly_named_components = True
+a = []
+pos = {}
+mom = {}
+for threads in num_threads_list:
+    for precision in ('double', 'single'):
+        pos[threads, precision] = []
+        mom[threads, precision] = []
+        for fname in sorted(
+            glob(f'{this_dir}/output_{threads}_{precision}/snapshot_a=*'),
+            key=(lambda s: s[(s.index('=') + 1):]),
+        ):
+            snapshot = load(fname, compare_params=False)
+            if threads == num_threads_list[0] and precision == 'double':
+                a.append(snapshot.params['a'])
+            component = snapshot.components[0]
+            ordering = np.argsort(component.ids)
+            pos[threads, precision].append(asarray(component.pos_mv3)[ordering, :])
+            mom[threads, precision].append(asarray(component.mom_mv3)[ordering, :])
+N_snapshots = len(a)
+
+# Begin analysis
+masterprint(f'Analysing {this_test} data ...')
+
+# Compute distances between particles in the single and double
+# precision runs, as well as the relative difference in momenta.
+dist = {threads: [] for threads in num_threads_list}
+momdiff = {threads: [] for threads in num_threads_list}
+for threads in num_threads_list:
+    for i in range(N_snapshots):
+        Δpos = pos[threads, 'single'][i] - pos[threads, 'double'][i]
+        Δpos -= boxsize*np.round(Δpos/boxsize)
+        dist[threads].append(np.sqrt(np.sum(Δpos**2, axis=1)))
+        momdiff[threads].append(
+            np.sqrt(np.sum((mom[threads, 'single'][i] - mom[threads, 'double'][i])**2, axis=1))
+            /np.std(mom[threads, 'double'][i])
+        )
+
+# Plot
+fig_file = f'{this_dir}/result.png'
+fig, axes = plt.subplots(len(num_threads_list), sharex=True, sharey=True, squeeze=False)
+axes = axes[:, 0]
+for threads, ax in zip(num_threads_list, axes):
+    for i in range(N_snapshots):
+        ax.semilogy(
+            machine_ϵ + dist[threads][i]/boxsize,
+            '.',
+            alpha=0.7,
+            label=f'$a={a[i]}$',
+            zorder=-i,
+        )
+    ax.set_ylabel(
+        rf'$|\mathbf{{x}}_{{\mathrm{{single}}}} - \mathbf{{x}}_{{\mathrm{{double}}}}|'
+        rf'/\mathrm{{boxsize}}$'
+        f'\n(num_threads = {threads})'
+    )
+axes[-1].set_xlabel('Particle ID')
+fig.subplots_adjust(hspace=0)
+plt.setp([ax.get_xticklabels() for ax in axes[:-1]], visible=False)
+axes[0].legend()
+fig.tight_layout()
+fig.savefig(fig_file, dpi=150)
+
+# Report the wall times
+for threads in num_threads_list:
+    masterprint(
+        f'Wall time with num_threads = {threads}: '
+        f'{times[threads, "double"]:.2f} s (double), '
+        f'{times[threads, "single"]:.2f} s (single), '
+        f'speed-up {times[threads, "double"]/times[threads, "single"]:.2f}'
+    )
+
+# Printout error message for unsuccessful test. At the first snapshot,
+# the runs should agree up to the single precision round-off errors of
+# the short-range forces. At later times, these errors grow
+# chaotically and so a looser tolerance is used. The single precision
+# runs should not be slower than the double precision runs, allowing
+# for some noise in the wall times.
+tol_first = 1e-5
+tol = 2e-2
+rel_tol_time = 0.1
+for threads in num_threads_list:
+    if (
+           np.mean(dist[threads][0])/boxsize > tol_first
+        or np.mean(momdiff[threads][0]) > 100*tol_first
+    ):
+        abort(
+            f'Runs in single and double precision (num_threads = {threads}) yield different '
+            f'results at a = {a[0]}!\n'
+            f'See "{fig_file}" for a visualization.'
+        )
+    if any(np.mean(d)/boxsize > tol for d in dist[threads]):
+        abort(
+            f'Runs in single and double precision (num_threads = {threads}) '
+            f'yield different results!\n'
+            f'See "{fig_file}" for a visualization.'
+        )
+    if times[threads, 'single'] > (1 + rel_tol_time)*times[threads, 'double']:
+        abort(
+            f'The run in single precision (num_threads = {threads}) took '
+            f'{times[threads, "single"]:.2f} s, longer than the '
+            f'{times[threads, "double"]:.2f} s of the run in double precision'
+        )
+
+# Done analysing
+masterprint('done')
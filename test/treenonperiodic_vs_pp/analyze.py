@@ -0,0 +1,103 @@
+# This file has to be run in pure Python mode!
+
+# Imports from the CO𝘕CEPT code
+from commons import *
+from snapshot import load
+import species
+plt = get_matplotlib().pyplot
+
+# Absolute path and name of this test
+this_dir  = os.path.dirname(os.path.realpath(__file__))
+this_test = os.path.basename(os.path.dirname(this_dir))
+
+# Read in data from the CO𝘕CEPT snapshots,
+# ordering the particles according to their IDs.
+species.allow_similarly_named_components = True
+labels = ('pp', 'tree_0', 'tree_0.5')
+a = []
+pos = {label: [] for label in labels}
+mom = {label: [] for label in labels}
+for label in labels:
+    for fname in sorted(
+        glob(f'{this_dir}/output_{label}/snapshot_a=*'),
+        key=(lambda s: s[(s.index('=') + 1):]),
+    ):
+        snapshot = load(fname, compare_params=False)
+        if label == 'pp':
+            a.append(snapshot.params['a'])
+        component = snapshot.components[0]
+        ordering = np.argsort(component.ids)
+        pos[label].append(asarray(component.pos_mv3)[ordering, :])
+        mom[label].append(asarray(component.mom_mv3)[ordering, :])
+N_snapshots = len(a)
+
+# Begin analysis
+masterprint(f'Analysing {this_test} data ...')
+
+# Compute distances between particles in the tree and PP runs,
+# as well as the relative difference in momenta.
+dist = {label: [] for label in labels[1:]}
+momdiff = {label: [] for label in labels[1:]}
+for label in labels[1:]:
+    for i in range(N_snapshots):
+        Δpos = pos[label][i] - pos['pp'][i]
+        Δpos -= boxsize*np.round(Δpos/boxsize)
+        dist[label].append(np.sqrt(np.sum(Δpos**2, axis=1)))
+        momdiff[label].append(
+            np.sqrt(np.sum((mom[label][i] - mom['pp'][i])**2, axis=1))
+            /np.std(mom['pp'][i])
+        )
+
+# Plot
+fig_file = f'{this_dir}/result.png'
+fig, axes = plt.subplots(len(labels) - 1, sharex=True, sharey=True)
+for label, ax in zip(labels[1:], axes):
+    for i in range(N_snapshots):
+        ax.semilogy(
+            machine_ϵ + dist[label][i]/boxsize,
+            '.',
+            alpha=0.7,
+            label=f'$a={a[i]}$',
+            zorder=-i,
+        )
+    θ = label.split('_')[1]
+    ax.set_ylabel(
+        rf'$|\mathbf{{x}}_{{\mathrm{{tree}}}} - \mathbf{{x}}_{{\mathrm{{PP}}}}|'
+        rf'/\mathrm{{boxsize}}$'
+        f'\n($\\theta = {θ}$)'
+    )
+axes[-1].set_xlabel('Particle ID')
+fig.subplots_adjust(hspace=0)
+plt.setp([ax.get_xticklabels() for ax in axes[:-1]], visible=False)
+axes[0].legend()
+fig.tight_layout()
+fig.savefig(fig_file, dpi=150)
+
+# With a vanishing opening angle, the tree run should agree with the
+# PP run up to round-off errors at the first snapshot. At later times,
+# these errors grow chaotically and so a looser tolerance is used.
+tol_first = 1e-6
+tol = 2e-2
+if np.mean(dist['tree_0'][0])/boxsize > tol_first or np.mean(momdiff['tree_0'][0]) > tol_first:
+    abort(
+        f'The tree run with an opening angle of 0 does not agree with the PP run '
+        f'at a = {a[0]}!\n'
+        f'See "{fig_file}" for a visualization.'
+    )
+if any(np.mean(d)/boxsize > tol for d in dist['tree_0']):
+    abort(
+        f'The tree run with an opening angle of 0 does not agree with the PP run!\n'
+        f'See "{fig_file}" for a visualization.'
+    )
+# With a finite opening angle, the forces are approximate,
+# though the particles should still end up close to their PP positions
+# at the first snapshot.
+if np.mean(dist['tree_0.5'][0])/boxsize > tol:
+    abort(
+        f'The tree run with an opening angle of 0.5 does not agree with the PP run '
+        f'at a = {a[0]}!\n'
+        f'See "{fig_file}" for a visualization.'
+    )
+
+# Done analysing
+masterprint('done')